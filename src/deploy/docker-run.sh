@@ -6,5 +6,16 @@ set -x
 # Secure endpoints
 ./oauth2-proxy --config oauth2-proxy.cfg 2>&1 | tee /var/log/oauth2-proxy/oauth2proxy.log &
 
-# Start web server
+# Collect the metrics of all uWSGI workers, see gobstuf/metrics.py
+export prometheus_multiproc_dir=${prometheus_multiproc_dir:-/tmp/gobstuf_metrics}
+rm -rf "${prometheus_multiproc_dir}"
+mkdir -p "${prometheus_multiproc_dir}"
+
+# Start web server. With ASGI_WORKERS the REST API is served asynchronously by uvicorn, see gobstuf/asgi.py
+# The connection with the GOB message broker runs in one dedicated process, restarted when it stops
+if [ -n "${ASGI_WORKERS:-}" ]; then
+  (while true; do python3 -m gobstuf.message_service; sleep 5; done) &
+  exec uvicorn gobstuf.asgi:app --host 0.0.0.0 --port 8001 --workers "${ASGI_WORKERS}"
+fi
+export UWSGI_MULE=${UWSGI_MULE:-gobstuf/message_service.py}
 exec uwsgi
@@ -1,3 +1,4 @@
+import math
 import re
 
 import flask
@@ -10,14 +11,21 @@ from flask_audit_log.middleware import AuditLogMiddleware
 
 from gobstuf.auth.routes import secure_route
 from gobstuf.config import GOB_STUF_PORT, ROUTE_SCHEME, ROUTE_NETLOC, ROUTE_PATH_310, ROUTE_PATH_204, \
-                           API_BASE_PATH, AUDIT_LOG_CONFIG
+                           API_BASE_PATH, AUDIT_LOG_CONFIG, STUF_PROXY_STREAMING, STUF_PROXY_CHUNK_SIZE
 from gobstuf.logger import get_default_logger
 from gobstuf.certrequest import cert_get, cert_post
-from gobstuf.rest.routes import REST_ROUTES
-from werkzeug.exceptions import BadRequest, MethodNotAllowed, HTTPException
+from gobstuf.lib.circuitbreaker import CircuitOpenException
+from gobstuf.lib.stream import rewrite_chunks
+from gobstuf.metrics import get_metrics
+from gobstuf.rest.routes import REST_ROUTES, REST_BATCH_ROUTES
+from werkzeug.exceptions import BadRequest, MethodNotAllowed, HTTPException, ServiceUnavailable
 
 logger = get_default_logger()
 
+# The address of the underlying SOAP API (domain + optional port number)
+ROUTE_NETLOC_PATTERN = ROUTE_NETLOC + r"(:\d{2,5})?"
+ROUTE_NETLOC_MAX_LENGTH = len(ROUTE_NETLOC) + len(":65535")
+
 
 def _health():
     """
@@ -27,6 +35,15 @@ def _health():
     return 'Connectivity OK'
 
 
+def _metrics():
+    """
+
+    :return: The Prometheus metrics of this StUF API
+    """
+    data, content_type = get_metrics()
+    return Response(data, content_type=content_type)
+
+
 def _routed_url(url):
     """
     Transforms an url so that it directs to the underlying SOAP API endpoint
@@ -57,8 +74,27 @@ def _update_response(text):
     :param text: any text, normally a XML string
     :return: the text where any reference to the underlying SOAP API is changed to ourself
     """
-    pattern = ROUTE_NETLOC + r"(:\d{2,5})?"
-    return re.sub(pattern, f"localhost:{GOB_STUF_PORT}", text)
+    return re.sub(ROUTE_NETLOC_PATTERN, f"localhost:{GOB_STUF_PORT}", text)
+
+
+def _stream_response(response):
+    """
+    Stream the response from the underlying SOAP API while updating the address of the underlying api
+
+    The response is read and rewritten chunk by chunk, see _update_response.
+    A reference to the underlying api that spans multiple chunks is rewritten as well.
+
+    :param response: streamed response object
+    :return: generator of rewritten chunks
+    """
+    try:
+        yield from rewrite_chunks(response.iter_content(STUF_PROXY_CHUNK_SIZE),
+                                  ROUTE_NETLOC_PATTERN.encode(),
+                                  f"localhost:{GOB_STUF_PORT}".encode(),
+                                  ROUTE_NETLOC_MAX_LENGTH)
+    finally:
+        # Release the connection to the pool
+        response.close()
 
 
 def _update_request(text):
@@ -80,7 +116,7 @@ def _get_stuf(url):
     :param url: url of SOAP endpoint of underlying SOAP server
     :return: response object
     """
-    return cert_get(url)
+    return cert_get(url, stream=True)
 
 
 def _post_stuf(url, data, headers):
@@ -105,18 +141,22 @@ def _post_stuf(url, data, headers):
         "Soapaction": soap_action,
         "Content-Type": content_type
     }
-    return cert_post(url, data=data, headers=headers)
+    return cert_post(url, data=data, headers=headers, stream=True)
 
 
 def _handle_stuf_request(request, routed_url):
     method = request.method
-    if method == 'GET':
-        response = _get_stuf(routed_url)
-    elif method == 'POST':
-        data = _update_request(request.data.decode())
-        response = _post_stuf(routed_url, data, request.headers)
-    else:
-        raise MethodNotAllowed(f"Unknown method {method}, GET or POST required")
+    try:
+        if method == 'GET':
+            response = _get_stuf(routed_url)
+        elif method == 'POST':
+            data = _update_request(request.data.decode())
+            response = _post_stuf(routed_url, data, request.headers)
+        else:
+            raise MethodNotAllowed(f"Unknown method {method}, GET or POST required")
+    except CircuitOpenException as e:
+        # Fail fast while the underlying SOAP API is unavailable
+        raise ServiceUnavailable(str(e), retry_after=max(1, math.ceil(e.retry_after)))
 
     return response
 
@@ -147,6 +187,12 @@ def _stuf():
 
     # Successful
     response_log_data['remote_response_code'] = response.status_code
+
+    if STUF_PROXY_STREAMING:
+        # Pass the bytes through as they arrive, in the encoding of the underlying SOAP API
+        content_type = response.headers.get('Content-Type', 'text/xml')
+        return Response(_stream_response(response), content_type=content_type)
+
     text = _update_response(response.text)
 
     return Response(text, mimetype="text/xml")
@@ -187,6 +233,9 @@ def get_flask_app():
     # Health check route
     app.route(rule='/status/health/')(_health)
 
+    # Metrics route
+    app.route(rule='/status/metrics')(_metrics)
+
     # Application routes
     ROUTES = [
         (API_BASE_PATH, f'{ROUTE_PATH_310}', _stuf, ['GET', 'POST'], '310'),
@@ -198,5 +247,10 @@ def get_flask_app():
 
     for route, view_func in REST_ROUTES:
         _add_route(app, API_BASE_PATH, route, view_func, ['GET'])
+        # Parse the request template at startup, not on the first request
+        view_func.view_class.request_template.get_template()
+
+    for route, view_func in REST_BATCH_ROUTES:
+        _add_route(app, API_BASE_PATH, route, view_func, ['POST'])
 
     return app
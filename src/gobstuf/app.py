@@ -1,8 +1,9 @@
 import os
+import sys
 import datetime
 
 from gobstuf.api import get_flask_app
-from threading import Thread
+from multiprocessing import Process
 
 from gobcore.logging.logger import logger
 from gobcore.message_broker.config import WORKFLOW_EXCHANGE, BRP_REGRESSION_TEST_QUEUE, BRP_REGRESSION_TEST_RESULT_KEY
@@ -41,12 +42,13 @@ SERVICEDEFINITION = {
 }
 
 
-def run_message_thread():
+def run_message_service():
     """
-    The connection with GOB is run in a separate service
+    The connection with GOB is run in a dedicated process, see message_service.py.
+    It never runs in a process that serves requests
 
     If the connection cannot be initialized or breaks during operation
-    the application is killed using os._exit with an exit code that signals unavailability
+    the process exits with an exit code that signals unavailability, the process is then restarted
 
     :return: None
     """
@@ -54,15 +56,11 @@ def run_message_thread():
         messagedriven_service(SERVICEDEFINITION, "StUF")
     except:  # noqa: E722 do not use bare 'except'
         pass
-    print(f"ERROR: no connection with GOB message broker, application is stopped")
-    os._exit(os.EX_UNAVAILABLE)
+    print(f"ERROR: no connection with GOB message broker, message service is stopped")
+    sys.exit(os.EX_UNAVAILABLE)
 
 
 def get_app():
-    # Start messagedriven_service in separate thread
-    t = Thread(target=run_message_thread)
-    t.start()
-
     return get_flask_app()
 
 
@@ -70,7 +68,11 @@ def run():
     """
     Get the Flask app and run it at the port as defined in config
 
+    The message service runs in a separate process
+
     :return: None
     """
+    Process(target=run_message_service, daemon=True).start()
+
     app = get_app()
     app.run(port=GOB_STUF_PORT)
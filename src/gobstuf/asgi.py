@@ -0,0 +1,6 @@
+from gobstuf.app import get_app
+from gobstuf.rest.asgi import AsyncRESTApplication
+from gobstuf.rest.routes import REST_ROUTES
+
+# Run the app with an ASGI server, eg uvicorn gobstuf.asgi:app
+app = AsyncRESTApplication(get_app(), REST_ROUTES)
@@ -1,6 +1,11 @@
 from functools import reduce
+import atexit
 import json
 import logging
+import os
+import queue
+import threading
+import time
 import uuid
 
 from flask import request
@@ -8,7 +13,8 @@ from flask import request
 from flask_audit_log.util import get_client_ip
 
 from gobcore.logging.audit_logger import AuditLogger
-from gobstuf.config import CORRELATION_ID_HEADER, UNIQUE_ID_HEADER
+from gobstuf.config import CORRELATION_ID_HEADER, UNIQUE_ID_HEADER, AUDIT_LOG_QUEUE_SIZE, AUDIT_LOG_BATCH_SIZE, \
+    AUDIT_LOG_FLUSH_INTERVAL
 from gobstuf.logger import get_default_logger
 
 logger = get_default_logger()
@@ -18,61 +24,200 @@ def get_log_handler():
     return GOBAuditLogHandler()
 
 
-class GOBAuditLogHandler(logging.StreamHandler):
+class AuditLogWriter:
+    """Writes audit log entries in a background thread
 
-    def emit(self, record):
+    Entries are collected in batches. A batch is written when it contains batch_size entries or when the first entry
+    of the batch has waited for flush_interval seconds.
+
+    When the queue is full, put() blocks until the writer has made room (backpressure). No entry is dropped.
+    On stop() all pending entries are written before the writer thread ends.
+    """
+
+    # Signals the writer thread to write all pending entries and stop
+    _STOP = object()
+
+    def __init__(self, write, queue_size: int, batch_size: int, flush_interval: float):
         """
-        Format the data received from the audit log middleware to match the current temporay storage
-        in the database. The source and destination of the message are extracted and the msg is split
-        in separate request and response logs.
-
-        Once the audit logs can be stored in Elastic, the handler can be changed.
-
-        The middleware logs message in the following format:
-        {
-            'audit': {
-                'http_request': ....,
-                'http_response': ....,
-                'user': ....,
-                ...
-            }
-        }
+
+        :param write: function that writes a list of entries
+        :param queue_size: the maximum number of entries waiting to be written
+        :param batch_size: the maximum number of entries in a batch
+        :param flush_interval: the maximum time in seconds that an entry waits for a batch to complete
         """
-        try:
-            msg = json.loads(self.format(record))
-        except (json.JSONDecodeError, TypeError) as exception:
-            on_audit_log_exception(exception, record)
-            return
-
-        request_uuid = request.headers.get(CORRELATION_ID_HEADER, str(uuid.uuid4()))
-        # Get the source and destination from the middleware log message
-        source = get_nested_item(msg, 'audit', 'http_request', 'url')
-        destination = get_nested_item(msg, 'audit', 'user', 'ip')
-        # Strip the response data from the msg to create request only data and vice versa
-        request_data = {k: v for k, v in msg.get('audit', {}).items() if k != 'http_response'}
-        response_data = {k: v for k, v in msg.get('audit', {}).items() if k != 'http_request'}
-
-        request_data.update({
-            CORRELATION_ID_HEADER: request.headers.get(CORRELATION_ID_HEADER),
-            UNIQUE_ID_HEADER: request.headers.get(UNIQUE_ID_HEADER),
-        })
-
-        audit_logger = AuditLogger.get_instance()
+        self.write = write
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.reset()
+
+    def reset(self):
+        """
+        Forget any pending entries and the writer thread
+
+        A forked process does not inherit the writer thread; it starts its own writer on first use.
+        The entries of the parent process are written by the parent process
+
+        :return: None
+        """
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def put(self, entry):
+        """
+        Queue entry for writing. Blocks while the queue is full
+
+        :param entry:
+        :return: None
+        """
+        self._start()
+        self._queue.put(entry)
+
+    def _start(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    # A daemon thread does not block the exit of the process, stop() is called at exit
+                    self._thread = threading.Thread(target=self._run, name='AuditLogWriter', daemon=True)
+                    self._thread.start()
+
+    def stop(self, timeout: float = None):
+        """
+        Write all pending entries and stop the writer thread
+
+        :param timeout: the maximum time in seconds to wait for the pending entries to be written
+        :return: None
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(self._STOP)
+            thread.join(timeout)
+
+    def _run(self):
+        stopped = False
+        while not stopped:
+            batch, stopped = self._next_batch()
+            if batch:
+                self._write(batch)
+
+    def _next_batch(self):
+        """
+        Waits for the next batch of entries
+
+        :return: tuple (batch, stopped)
+        """
+        entry = self._queue.get()
+        if entry is self._STOP:
+            return [], True
 
+        batch = [entry]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                entry = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if entry is self._STOP:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    def _write(self, batch: list):
         try:
-            audit_logger.log_request(
-                source=source,
-                destination=destination,
-                extra_data=request_data,
-                request_uuid=request_uuid)
-
-            audit_logger.log_response(
-                source=source,
-                destination=destination,
-                extra_data=response_data,
-                request_uuid=request_uuid)
+            self.write(batch)
         except Exception as exception:
-            on_audit_log_exception(exception, msg)
+            # The writer thread should never die
+            for entry in batch:
+                on_audit_log_exception(exception, entry)
+
+
+class GOBAuditLogHandler(logging.StreamHandler):
+
+    def emit(self, record):
+        """
+        Queue the data received from the audit log middleware for the audit log writer.
+
+        The request headers are read here, in the request thread. Formatting and writing the audit log is done in
+        the background by the audit log writer, see write_audit_logs.
+        """
+        audit_log_writer.put((
+            self.format(record),
+            request.headers.get(CORRELATION_ID_HEADER),
+            request.headers.get(UNIQUE_ID_HEADER),
+        ))
+
+
+def write_audit_logs(entries: list):
+    """
+    Write a batch of audit log entries
+
+    :param entries: list of (formatted record, correlation id, unique id)
+    :return: None
+    """
+    audit_logger = AuditLogger.get_instance()
+    for entry in entries:
+        write_audit_log(audit_logger, *entry)
+
+
+def write_audit_log(audit_logger, formatted_record, correlation_id, unique_id):
+    """
+    Format the data received from the audit log middleware to match the current temporay storage
+    in the database. The source and destination of the message are extracted and the msg is split
+    in separate request and response logs.
+
+    Once the audit logs can be stored in Elastic, the handler can be changed.
+
+    The middleware logs message in the following format:
+    {
+        'audit': {
+            'http_request': ....,
+            'http_response': ....,
+            'user': ....,
+            ...
+        }
+    }
+    """
+    try:
+        msg = json.loads(formatted_record)
+    except (json.JSONDecodeError, TypeError) as exception:
+        on_audit_log_exception(exception, formatted_record)
+        return
+
+    request_uuid = correlation_id or str(uuid.uuid4())
+    # Get the source and destination from the middleware log message
+    source = get_nested_item(msg, 'audit', 'http_request', 'url')
+    destination = get_nested_item(msg, 'audit', 'user', 'ip')
+    # Strip the response data from the msg to create request only data and vice versa
+    request_data = {k: v for k, v in msg.get('audit', {}).items() if k != 'http_response'}
+    response_data = {k: v for k, v in msg.get('audit', {}).items() if k != 'http_request'}
+
+    request_data.update({
+        CORRELATION_ID_HEADER: correlation_id,
+        UNIQUE_ID_HEADER: unique_id,
+    })
+
+    try:
+        audit_logger.log_request(
+            source=source,
+            destination=destination,
+            extra_data=request_data,
+            request_uuid=request_uuid)
+
+        audit_logger.log_response(
+            source=source,
+            destination=destination,
+            extra_data=response_data,
+            request_uuid=request_uuid)
+    except Exception as exception:
+        on_audit_log_exception(exception, msg)
+
+
+audit_log_writer = AuditLogWriter(write_audit_logs, AUDIT_LOG_QUEUE_SIZE, AUDIT_LOG_BATCH_SIZE,
+                                  AUDIT_LOG_FLUSH_INTERVAL)
+atexit.register(audit_log_writer.stop)
+os.register_at_fork(after_in_child=audit_log_writer.reset)
 
 
 def on_audit_log_exception(exception, msg):
@@ -18,8 +18,7 @@ def secure_route(rule, func, name=None):
     :return:
     """
     def wrapper(*args, **kwargs):
-        # Check that the endpoint is protected by gatekeeper and check access
-        if is_secured_request(request.headers) and _allows_access(rule, *args, **kwargs):
+        if is_authorized(rule, *args, **kwargs):
             return func(*args, **kwargs)
         else:
             return "Forbidden", 403
@@ -28,6 +27,16 @@ def secure_route(rule, func, name=None):
     return wrapper
 
 
+def is_authorized(rule, *args, **kwargs):
+    """
+    Check that the endpoint is protected by gatekeeper and check access
+
+    :param rule:
+    :return:
+    """
+    return is_secured_request(request.headers) and _allows_access(rule, *args, **kwargs)
+
+
 def _get_roles():
     """
     Gets the user roles from the request headers
@@ -0,0 +1,62 @@
+import argparse
+
+from gobstuf.benchmarks.runner import measure, load_baseline, save_baseline, format_report
+from gobstuf.benchmarks.stages import STAGES, Fixture, get_app
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description="Benchmarks the stages of the request-to-JSON pipeline offline")
+    parser.add_argument('stages', nargs='*', choices=[[], *STAGES], help="the stages to run, default all")
+    parser.add_argument('--iterations', type=int, default=1000, help="the number of timed calls per stage")
+    parser.add_argument('--warmup', type=int, default=10, help="the number of calls before the timed calls")
+    parser.add_argument('--objects', type=int, default=20, help="the number of persons in the answer to a search")
+    parser.add_argument('--relatives', type=int, default=3, help="the number of kinderen and partners of a person")
+    parser.add_argument('--seed', type=int, default=0, help="the seed of the corpus")
+    parser.add_argument('--baseline', default='benchmark_baseline.json',
+                        help="the file with the results of the previous run")
+    parser.add_argument('--no-save', action='store_true', help="do not replace the baseline with the results")
+    return parser
+
+
+def run_stages(stages: list, fixture: Fixture, iterations: int, warmup: int) -> dict:
+    """Runs the stages in a request of the app
+
+    :param stages: the names of the stages
+    :param fixture:
+    :param iterations:
+    :param warmup:
+    :return: the results by stage
+    """
+    results = {}
+    with get_app().test_request_context('/brp/ingeschrevenpersonen'):
+        for name in stages:
+            results[name] = measure(STAGES[name](fixture), iterations, warmup)
+    return results
+
+
+def main(args=None):
+    args = get_parser().parse_args(args)
+    settings = {
+        'iterations': args.iterations,
+        'objects': args.objects,
+        'relatives': args.relatives,
+        'seed': args.seed,
+    }
+
+    fixture = Fixture(objects=args.objects, relatives=args.relatives, seed=args.seed)
+    results = run_stages(args.stages or list(STAGES), fixture, args.iterations, args.warmup)
+
+    baseline = load_baseline(args.baseline)
+    print(format_report(results, baseline))
+    if not args.no_save:
+        # Keep the results of the stages that did not run, unless they were run with other settings
+        previous = baseline['stages'] if baseline.get('settings') == settings else {}
+        save_baseline(args.baseline, {**previous, **results}, settings)
+
+
+def init():
+    if __name__ == "__main__":
+        main()
+
+
+init()
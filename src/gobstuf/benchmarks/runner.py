@@ -0,0 +1,144 @@
+"""Times benchmark stages and compares the results with a baseline
+
+Every stage is a callable that handles one request. The runner reports per stage:
+- ops_per_sec: the number of calls per second
+- p50_ms, p99_ms: the 50th and 99th percentile of the duration of a call in milliseconds
+- allocated_kib: the peak memory that is allocated during a call, in KiB (measured with tracemalloc)
+"""
+import datetime
+import json
+import math
+import os
+import platform
+import time
+import tracemalloc
+
+# The metrics of a result and whether a higher value is better
+METRICS = {
+    'ops_per_sec': True,
+    'p50_ms': False,
+    'p99_ms': False,
+    'allocated_kib': False,
+}
+
+
+def percentile(values: list, p: float) -> float:
+    """Returns the p-th percentile (nearest rank) of values
+
+    :param values:
+    :param p: 0 - 100
+    :return:
+    """
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def measure_allocations(func, samples: int) -> float:
+    """Returns the mean peak memory in bytes that is allocated during a call of func
+
+    :param func:
+    :param samples: the number of calls
+    :return:
+    """
+    tracemalloc.start()
+    try:
+        peaks = []
+        for _ in range(samples):
+            tracemalloc.reset_peak()
+            start, _ = tracemalloc.get_traced_memory()
+            func()
+            peaks.append(tracemalloc.get_traced_memory()[1] - start)
+    finally:
+        tracemalloc.stop()
+    return sum(peaks) / samples
+
+
+def measure(func, iterations: int, warmup: int = 10, allocation_samples: int = 10) -> dict:
+    """Times iterations calls of func
+
+    The allocations are measured separately, because tracemalloc slows down every call
+
+    :param func:
+    :param iterations: the number of timed calls
+    :param warmup: the number of calls before the timed calls, eg to fill caches
+    :param allocation_samples: the number of calls to measure the allocations
+    :return: dict with the metrics, see METRICS
+    """
+    for _ in range(warmup):
+        func()
+
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+
+    return {
+        'ops_per_sec': round(iterations / sum(durations), 1),
+        'p50_ms': round(percentile(durations, 50) * 1000, 4),
+        'p99_ms': round(percentile(durations, 99) * 1000, 4),
+        'allocated_kib': round(measure_allocations(func, allocation_samples) / 1024, 1),
+    }
+
+
+def load_baseline(path: str) -> dict:
+    """Returns the baseline that is stored at path, or an empty baseline if there is none
+
+    :param path:
+    :return:
+    """
+    if not os.path.exists(path):
+        return {'stages': {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, results: dict, settings: dict):
+    """Stores results as the baseline for the next run
+
+    :param path:
+    :param results: the results by stage
+    :param settings: the settings of the run, eg the number of iterations and the size of the corpus
+    :return:
+    """
+    baseline = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'settings': settings,
+        'stages': results,
+    }
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2)
+
+
+def get_change(value: float, previous: float, higher_is_better: bool) -> str:
+    """Returns the relative change of value to previous, eg '+5.0%'. Improvements are marked with a '*'
+
+    :param value:
+    :param previous:
+    :param higher_is_better:
+    :return:
+    """
+    if not previous:
+        return ''
+    change = (value - previous) / previous * 100
+    improved = change > 0 if higher_is_better else change < 0
+    return f"{change:+.1f}%{'*' if improved else ''}"
+
+
+def format_report(results: dict, baseline: dict) -> str:
+    """Returns a table of the results, with the change to the baseline
+
+    :param results: the results by stage
+    :param baseline: the baseline, see load_baseline
+    :return:
+    """
+    lines = [f"{'stage':<24}" + ''.join(f"{metric:>14}{'change':>10}" for metric in METRICS)]
+    for stage, result in results.items():
+        previous = baseline['stages'].get(stage, {})
+        lines.append(f"{stage:<24}" + ''.join(
+            f"{result[metric]:>14}{get_change(result[metric], previous.get(metric), higher_is_better):>10}"
+            for metric, higher_is_better in METRICS.items()))
+    if baseline.get('settings'):
+        lines.append(f"Compared with the baseline of {baseline['created']} {baseline['settings']}")
+    return '\n'.join(lines)
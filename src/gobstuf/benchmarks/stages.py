@@ -0,0 +1,145 @@
+"""The stages of the request-to-JSON pipeline, as benchmarked by the runner
+
+Every stage is a function that takes the Fixture and returns the callable that is timed. Anything that is not
+part of the stage, like parsing the message for a mapping stage, is done before the callable is returned.
+"""
+from flask import Flask
+
+from gobstuf.mks_simulator.generator import generate_answer
+from gobstuf.rest.brp.rest_response import RESTResponse
+from gobstuf.rest.routes import REST_ROUTES
+from gobstuf.stuf.brp.mapping_plan import NAMESPACES
+from gobstuf.stuf.brp.request.ingeschrevenpersonen import IngeschrevenpersonenFilterStufRequest
+from gobstuf.stuf.brp.response.ingeschrevenpersonen import (
+    IngeschrevenpersonenStufResponse,
+    IngeschrevenpersonenStufPartnersDetailResponse,
+)
+from gobstuf.stuf.message import StufMessage
+
+GEBRUIKER = 'benchmark'
+APPLICATIE = 'benchmark'
+
+SEARCH_VALUES = {
+    'verblijfplaats__postcode': '1011AB',
+    'verblijfplaats__huisnummer': '1',
+    'naam__geslachtsnaam': 'Jans*',
+}
+WILDCARDS = {
+    'naam__geslachtsnaam': 'Jans*',
+}
+
+
+class Fixture:
+    """The fixed corpus that the stages are timed against
+
+    The MKS answers are generated, they are the same for every run with the same seed and sizes
+    """
+
+    def __init__(self, objects: int = 20, relatives: int = 3, seed: int = 0):
+        """
+        :param objects: the number of persons in the answer to a search
+        :param relatives: the number of kinderen and partners of a person
+        :param seed:
+        """
+        self.person_message = generate_answer(objects=1, seed=seed, kinderen=relatives, partners=relatives)
+        self.list_message = generate_answer(objects=objects, seed=seed)
+
+    def get_response(self, response_class=IngeschrevenpersonenStufResponse, message=None, **kwargs):
+        """Returns the parsed response for message, by default the answer with one person
+
+        :param response_class:
+        :param message:
+        :param kwargs: the arguments of the response, as passed by the REST views
+        :return:
+        """
+        return response_class(message or self.person_message, inclusiefoverledenpersonen=True, **kwargs)
+
+
+def request_stage(fixture: Fixture):
+    """StufRequest.set_values and to_string for a search
+
+    :param fixture:
+    :return:
+    """
+    def run():
+        stuf_request = IngeschrevenpersonenFilterStufRequest(GEBRUIKER, APPLICATIE)
+        stuf_request.set_values(SEARCH_VALUES)
+        return stuf_request.to_string()
+    return run
+
+
+def parse_stage(fixture: Fixture):
+    """StufMessage parsing of the answer to a search
+
+    :param fixture:
+    :return:
+    """
+    return lambda: StufMessage(fixture.list_message, NAMESPACES)
+
+
+def answer_object_stage(fixture: Fixture):
+    """StufMappedResponse.get_answer_object for a person with all relatives expanded
+
+    :param fixture:
+    :return:
+    """
+    return fixture.get_response(expand='partners,ouders,kinderen').get_answer_object
+
+
+def all_answer_objects_stage(fixture: Fixture):
+    """StufMappedResponse.get_all_answer_objects for the answer to a search
+
+    :param fixture:
+    :return:
+    """
+    return fixture.get_response(message=fixture.list_message).get_all_answer_objects
+
+
+def related_detail_filter_stage(fixture: Fixture):
+    """StufMappedResponse.get_answer_object with a RelatedDetailResponseFilter, for the first partner
+
+    :param fixture:
+    :return:
+    """
+    return fixture.get_response(IngeschrevenpersonenStufPartnersDetailResponse, partners_id='1').get_answer_object
+
+
+def wildcard_filter_stage(fixture: Fixture):
+    """StufMappedResponse.get_all_answer_objects with a WildcardSearchResponseFilter, for the answer to a search
+
+    :param fixture:
+    :return:
+    """
+    return fixture.get_response(message=fixture.list_message, wildcards=WILDCARDS).get_all_answer_objects
+
+
+def serialize_stage(fixture: Fixture):
+    """RESTResponse.ok for the answer to a search
+
+    :param fixture:
+    :return:
+    """
+    data = {'_embedded': {'ingeschrevenpersonen': all_answer_objects_stage(fixture)()}}
+    return lambda: RESTResponse.ok(data, {})
+
+
+STAGES = {
+    'request': request_stage,
+    'parse': parse_stage,
+    'answer_object': answer_object_stage,
+    'all_answer_objects': all_answer_objects_stage,
+    'related_detail_filter': related_detail_filter_stage,
+    'wildcard_filter': wildcard_filter_stage,
+    'serialize': serialize_stage,
+}
+
+
+def get_app() -> Flask:
+    """Returns the app that the stages run in. The links in the responses refer to its REST routes
+
+    :return:
+    """
+    app = Flask(__name__)
+    for rule, view in REST_ROUTES:
+        app.add_url_rule(rule, view_func=view)
+    return app
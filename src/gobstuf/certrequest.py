@@ -1,27 +1,203 @@
-from requests_pkcs12 import get, post
+import os
+import secrets
+import ssl
+import tempfile
+import threading
 
-from gobstuf.config import PKCS12_FILENAME, PKCS12_PASSWORD
+from urllib.parse import urlsplit
+
+import aiohttp
+from cryptography.hazmat.primitives.serialization import pkcs12, Encoding, PrivateFormat, BestAvailableEncryption
+from requests import Session, Response
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests_pkcs12 import Pkcs12Adapter
+
+from gobstuf.config import PKCS12_FILENAME, PKCS12_PASSWORD, MKS_POOL_MAXSIZE, MKS_KEEP_ALIVE, \
+    MKS_CONNECT_TIMEOUT, MKS_READ_TIMEOUT, MKS_ASYNC_POOL_MAXSIZE, MKS_CIRCUIT_BREAKER, MKS_CIRCUIT_WINDOW_SIZE, \
+    MKS_CIRCUIT_MIN_CALLS, MKS_CIRCUIT_FAILURE_RATE, MKS_CIRCUIT_SLOW_CALL_DURATION, MKS_CIRCUIT_OPEN_DURATION
+from gobstuf.lib.circuitbreaker import CircuitBreaker, CircuitOpenException
 from gobstuf.logger import get_default_logger
+from gobstuf.metrics import MKS_CIRCUIT_REJECTED, observe_circuit_state
 
 
 logger = get_default_logger()
 
+# The adapter holds the SSL context and the connection pool. It is shared by all threads within a worker
+_adapter = None
+_adapter_lock = threading.Lock()
+
+# Sessions are not guaranteed to be thread safe, every thread gets its own session on top of the shared adapter
+_local = threading.local()
+
+# The session for the async requests holds the SSL context and the connection pool of the event loop of the worker
+_async_session = None
+
+# The circuit breakers of this worker, by upstream (host and port)
+_circuit_breakers = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+def _create_adapter():
+    """
+    Create the adapter that is used for all requests
+
+    The PKCS12 certificate is loaded once, when the adapter is created
+
+    :return: The adapter, with certificate info if a certificate is configured
+    """
+    kwargs = {
+        'pool_maxsize': MKS_POOL_MAXSIZE
+    }
+    if PKCS12_FILENAME:
+        return Pkcs12Adapter(pkcs12_filename=PKCS12_FILENAME, pkcs12_password=PKCS12_PASSWORD, **kwargs)
+    return HTTPAdapter(**kwargs)
+
+
+def _get_adapter():
+    """
+    Get the adapter for this worker, create it on first use
+
+    :return: The shared adapter
+    """
+    global _adapter
+    if _adapter is None:
+        with _adapter_lock:
+            if _adapter is None:
+                _adapter = _create_adapter()
+    return _adapter
+
+
+def _reset():
+    """
+    Forget any adapter and sessions
+
+    Connections are not to be shared between processes. A forked worker creates its own pool on first use
+
+    :return: None
+    """
+    global _adapter, _local, _async_session, _circuit_breakers
+    _adapter = None
+    _local = threading.local()
+    _async_session = None
+    _circuit_breakers = {}
+
+
+os.register_at_fork(after_in_child=_reset)
 
-def _add_cert_info(kwargs):
+
+def get_session():
+    """
+    Get the session for the current thread
+
+    The session uses the shared adapter so that connections are reused across requests
+
+    :return: The session for the current thread
+    """
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = Session()
+        adapter = _get_adapter()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        if not MKS_KEEP_ALIVE:
+            session.headers['Connection'] = 'close'
+        _local.session = session
+    return session
+
+
+def _add_timeout(kwargs):
     """
-    Update get/post arguments with any certificate info
+    Update get/post arguments with the connect and read timeouts, unless a timeout is given
 
     :param kwargs: dictionary with get/post arguments
     :return: The updated dictionary
     """
-    if PKCS12_FILENAME:
-        kwargs.update({
-            'pkcs12_filename': PKCS12_FILENAME,
-            'pkcs12_password': PKCS12_PASSWORD
-        })
+    kwargs.setdefault('timeout', (MKS_CONNECT_TIMEOUT, MKS_READ_TIMEOUT))
     return kwargs
 
 
+def _is_upstream_failure(response):
+    """
+    Tells if the response signals that the upstream is unavailable
+
+    MKS answers functional errors with status 500, these are no failures of the upstream
+
+    :param response:
+    :return:
+    """
+    return response.status_code in (502, 503, 504)
+
+
+def get_circuit_breaker(url):
+    """
+    Get the circuit breaker for the upstream of url, create it on first use
+
+    :param url:
+    :return: The circuit breaker, or None when circuit breaking is disabled
+    """
+    if not MKS_CIRCUIT_BREAKER:
+        return None
+
+    upstream = urlsplit(url).netloc
+    circuit_breaker = _circuit_breakers.get(upstream)
+    if circuit_breaker is None:
+        with _circuit_breakers_lock:
+            circuit_breaker = _circuit_breakers.get(upstream)
+            if circuit_breaker is None:
+                circuit_breaker = CircuitBreaker(upstream,
+                                                 window_size=MKS_CIRCUIT_WINDOW_SIZE,
+                                                 min_calls=MKS_CIRCUIT_MIN_CALLS,
+                                                 failure_rate=MKS_CIRCUIT_FAILURE_RATE,
+                                                 slow_call_duration=MKS_CIRCUIT_SLOW_CALL_DURATION,
+                                                 open_duration=MKS_CIRCUIT_OPEN_DURATION,
+                                                 is_failure=_is_upstream_failure,
+                                                 on_state_change=observe_circuit_state)
+                observe_circuit_state(upstream, circuit_breaker.state, transition=False)
+                _circuit_breakers[upstream] = circuit_breaker
+    return circuit_breaker
+
+
+def _send(send, url, **kwargs):
+    """
+    Send the request, unless the circuit for the upstream is open
+
+    Raises a CircuitOpenException when the circuit is open
+
+    :param send: function that sends the request
+    :param url:
+    :return: request response
+    """
+    circuit_breaker = get_circuit_breaker(url)
+    if circuit_breaker is None:
+        return send(url, **kwargs)
+
+    try:
+        return circuit_breaker.call(send, url, **kwargs)
+    except CircuitOpenException:
+        MKS_CIRCUIT_REJECTED.labels(upstream=circuit_breaker.name).inc()
+        raise
+
+
+async def _send_async(send, url, **kwargs):
+    """
+    Async variant of _send
+
+    :param send: coroutine function that sends the request
+    :param url:
+    :return: request response
+    """
+    circuit_breaker = get_circuit_breaker(url)
+    if circuit_breaker is None:
+        return await send(url, **kwargs)
+
+    try:
+        return await circuit_breaker.call_async(send, url, **kwargs)
+    except CircuitOpenException:
+        MKS_CIRCUIT_REJECTED.labels(upstream=circuit_breaker.name).inc()
+        raise
+
+
 def cert_get(url, **kwargs):
     """
     Get request with certificate
@@ -30,8 +206,8 @@ def cert_get(url, **kwargs):
     :return: request response
     """
     logger.info(f"GET {url}")
-    kwargs = _add_cert_info(kwargs)
-    response = get(url, **kwargs)
+    kwargs = _add_timeout(kwargs)
+    response = _send(get_session().get, url, **kwargs)
     logger.info(f"RESPONSE {response.status_code}, {response.reason}")
     return response
 
@@ -46,7 +222,98 @@ def cert_post(url, **kwargs):
     :return: request response
     """
     logger.info(f"POST {url}")
-    kwargs = _add_cert_info(kwargs)
-    response = post(url, **kwargs)
+    kwargs = _add_timeout(kwargs)
+    response = _send(get_session().post, url, **kwargs)
     logger.info(f"RESPONSE {response.status_code}, {response.reason}")
     return response
+
+
+def _create_ssl_context():
+    """
+    Create the SSL context for the async requests, with the PKCS12 certificate if a certificate is configured
+
+    The ssl module only loads certificates from a file. The certificate is written to a temporary PEM file, with the
+    private key encrypted by a one-time password
+
+    :return: The SSL context
+    """
+    context = ssl.create_default_context(cafile=os.getenv('REQUESTS_CA_BUNDLE'))
+    if PKCS12_FILENAME:
+        with open(PKCS12_FILENAME, 'rb') as f:
+            password = PKCS12_PASSWORD.encode() if PKCS12_PASSWORD else None
+            key, cert, ca_certs = pkcs12.load_key_and_certificates(f.read(), password)
+
+        pem_password = secrets.token_bytes(16)
+        with tempfile.NamedTemporaryFile(suffix='.pem') as pem:
+            pem.write(key.private_bytes(Encoding.PEM, PrivateFormat.PKCS8, BestAvailableEncryption(pem_password)))
+            for certificate in [cert, *(ca_certs or [])]:
+                pem.write(certificate.public_bytes(Encoding.PEM))
+            pem.flush()
+            context.load_cert_chain(pem.name, password=pem_password)
+    return context
+
+
+def get_async_session():
+    """
+    Get the async session for this worker, create it on first use
+
+    The session is bound to the event loop of the worker and should be created and used within that loop.
+    The PKCS12 certificate is loaded once, when the session is created
+
+    :return: The async session
+    """
+    global _async_session
+    if _async_session is None:
+        connector = aiohttp.TCPConnector(ssl=_create_ssl_context(),
+                                         limit=MKS_ASYNC_POOL_MAXSIZE,
+                                         force_close=not MKS_KEEP_ALIVE)
+        timeout = aiohttp.ClientTimeout(sock_connect=MKS_CONNECT_TIMEOUT, sock_read=MKS_READ_TIMEOUT)
+        _async_session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+    return _async_session
+
+
+async def close_async_session():
+    """
+    Close the async session and its connections, if any
+
+    :return: None
+    """
+    global _async_session
+    session, _async_session = _async_session, None
+    if session is not None:
+        await session.close()
+
+
+async def cert_post_async(url, data=None, headers=None):
+    """
+    Async post request with certificate
+
+    The response body is read completely. The result is a requests Response, so that it is handled in the same way
+    as the response of cert_post
+
+    :param url: url to post
+    :param data: data to post
+    :param headers: optional headers
+    :return: request response
+    """
+    logger.info(f"POST {url}")
+    response = await _send_async(_post_async, url, data=data, headers=headers)
+    logger.info(f"RESPONSE {response.status_code}, {response.reason}")
+    return response
+
+
+async def _post_async(url, **kwargs):
+    """
+    Post the request with the async session and read the response
+
+    :param url:
+    :return: request response
+    """
+    async with get_async_session().post(url, **kwargs) as async_response:
+        response = Response()
+        response.url = str(async_response.url)
+        response.status_code = async_response.status
+        response.reason = async_response.reason
+        response.headers = CaseInsensitiveDict(async_response.headers)
+        response._content = await async_response.read()
+    return response
@@ -16,6 +16,36 @@ def _getenv(varname, default_value=None, is_optional=False):
     return value
 
 
+def _getenv_number(varname, default_value, number_type=int):
+    """
+    Returns the numeric value of the environment variable "varname"
+    or the default value if the environment variable is not set or is not a valid number
+
+    :param varname: name of the environment variable
+    :param default_value: value to return if variable is not set or invalid
+    :param number_type: the type to convert the value to, eg int or float
+    :return: the numeric value of the given variable
+    """
+    value = _getenv(varname, default_value=default_value, is_optional=True)
+    try:
+        return number_type(value)
+    except (TypeError, ValueError):
+        return default_value
+
+
+def _getenv_bool(varname, default_value):
+    """
+    Returns the boolean value of the environment variable "varname"
+    or the default value if the environment variable is not set or is not 'true' or 'false'
+
+    :param varname: name of the environment variable
+    :param default_value: value to return if variable is not set or invalid
+    :return: the boolean value of the given variable
+    """
+    value = str(_getenv(varname, default_value=default_value, is_optional=True)).lower()
+    return {'true': True, 'false': False}.get(value, default_value)
+
+
 # Required parameters
 ROUTE_PATH_310 = _getenv("ROUTE_PATH_310")
 ROUTE_PATH_204 = _getenv("ROUTE_PATH_204")
@@ -29,8 +59,55 @@ ROUTE_SCHEME = _getenv("ROUTE_SCHEME", default_value="https")
 PKCS12_FILENAME = _getenv("PKCS12_FILENAME", is_optional=True)
 PKCS12_PASSWORD = _getenv("PKCS12_PASSWORD", is_optional=True)
 
+# Connection pool for the requests to MKS. Connections are kept alive and reused within a worker
+MKS_POOL_MAXSIZE = _getenv_number("MKS_POOL_MAXSIZE", default_value=10)
+MKS_KEEP_ALIVE = _getenv_bool("MKS_KEEP_ALIVE", default_value=True)
+# Connection pool for the async requests to MKS (ASGI serving mode). All requests in a worker share this pool
+MKS_ASYNC_POOL_MAXSIZE = _getenv_number("MKS_ASYNC_POOL_MAXSIZE", default_value=100)
+# Timeouts in seconds for connecting to and reading from MKS
+MKS_CONNECT_TIMEOUT = _getenv_number("MKS_CONNECT_TIMEOUT", default_value=5.0, number_type=float)
+MKS_READ_TIMEOUT = _getenv_number("MKS_READ_TIMEOUT", default_value=30.0, number_type=float)
+# Circuit breaker for MKS. The circuit opens when at least MKS_CIRCUIT_FAILURE_RATE of the last
+# MKS_CIRCUIT_WINDOW_SIZE requests failed or were slower than MKS_CIRCUIT_SLOW_CALL_DURATION seconds
+MKS_CIRCUIT_BREAKER = _getenv_bool("MKS_CIRCUIT_BREAKER", default_value=True)
+MKS_CIRCUIT_WINDOW_SIZE = _getenv_number("MKS_CIRCUIT_WINDOW_SIZE", default_value=20)
+MKS_CIRCUIT_MIN_CALLS = _getenv_number("MKS_CIRCUIT_MIN_CALLS", default_value=10)
+MKS_CIRCUIT_FAILURE_RATE = _getenv_number("MKS_CIRCUIT_FAILURE_RATE", default_value=0.5, number_type=float)
+MKS_CIRCUIT_SLOW_CALL_DURATION = _getenv_number("MKS_CIRCUIT_SLOW_CALL_DURATION", default_value=10.0,
+                                                number_type=float)
+MKS_CIRCUIT_OPEN_DURATION = _getenv_number("MKS_CIRCUIT_OPEN_DURATION", default_value=30.0, number_type=float)
+# Share one MKS request between concurrent identical requests
+MKS_SINGLE_FLIGHT = _getenv_bool("MKS_SINGLE_FLIGHT", default_value=True)
+
+# Cache for the responses of BSN lookups. A maximum size of 0 disables the cache. Time to live in seconds
+RESPONSE_CACHE_MAXSIZE = _getenv_number("RESPONSE_CACHE_MAXSIZE", default_value=1000)
+RESPONSE_CACHE_TTL = _getenv_number("RESPONSE_CACHE_TTL", default_value=300)
+
+# Stream the responses of the SOAP proxy in chunks of STUF_PROXY_CHUNK_SIZE bytes instead of buffering them
+STUF_PROXY_STREAMING = _getenv_bool("STUF_PROXY_STREAMING", default_value=True)
+STUF_PROXY_CHUNK_SIZE = _getenv_number("STUF_PROXY_CHUNK_SIZE", default_value=16384)
+
+# Parse MKS responses incrementally, keeping only the elements that are mapped
+STUF_STREAMING_PARSER = _getenv_bool("STUF_STREAMING_PARSER", default_value=False)
+
+# ASGI serving mode: the number of threads per worker for the requests that are not handled asynchronously
+ASGI_WSGI_THREADS = _getenv_number("ASGI_WSGI_THREADS", default_value=10)
+
+# Send the objects of REST list responses as soon as they have been mapped, instead of after the complete response
+REST_STREAMING_RESPONSE = _getenv_bool("REST_STREAMING_RESPONSE", default_value=False)
+
+# Batch lookups. Maximum number of values in one request and maximum number of concurrent MKS requests for a batch
+BATCH_MAX_SIZE = _getenv_number("BATCH_MAX_SIZE", default_value=100)
+BATCH_CONCURRENCY = _getenv_number("BATCH_CONCURRENCY", default_value=4)
+
 API_BASE_PATH = _getenv("BASE_PATH", default_value="", is_optional=True)
 
+# Audit log entries are written in the background. Requests wait when the queue is full.
+# A batch is written when it is complete or when the oldest entry has waited for the flush interval (in seconds)
+AUDIT_LOG_QUEUE_SIZE = _getenv_number("AUDIT_LOG_QUEUE_SIZE", default_value=10000)
+AUDIT_LOG_BATCH_SIZE = _getenv_number("AUDIT_LOG_BATCH_SIZE", default_value=100)
+AUDIT_LOG_FLUSH_INTERVAL = _getenv_number("AUDIT_LOG_FLUSH_INTERVAL", default_value=1.0, number_type=float)
+
 AUDIT_LOG_CONFIG = {
     'EXEMPT_URLS': [],
     'LOG_HANDLER_CALLABLE_PATH': 'gobstuf.audit_log.get_log_handler',
@@ -0,0 +1,84 @@
+import datetime
+import threading
+import time
+
+from collections import OrderedDict
+
+
+def next_midnight(timestamp: float) -> float:
+    """Returns the timestamp of the first (local) midnight after timestamp
+
+    :param timestamp:
+    :return:
+    """
+    tomorrow = datetime.datetime.fromtimestamp(timestamp).date() + datetime.timedelta(days=1)
+    return datetime.datetime.combine(tomorrow, datetime.time()).timestamp()
+
+
+class TTLCache:
+    """Thread safe in-memory cache with a maximum number of entries and a time to live per entry
+
+    When the cache is full the least recently used entry is removed.
+
+    An optional boundary function limits the lifetime of entries beyond the time to live.
+    For example next_midnight makes sure that no entry is used on another day than it was created.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, boundary=None):
+        """
+
+        :param maxsize: the maximum number of entries
+        :param ttl: the time to live of an entry, in seconds
+        :param boundary: optional function that returns for the current time the time when entries expire at the latest
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.boundary = boundary
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the value for key, or None if the key is not in the cache or has expired
+
+        :param key:
+        :return:
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires, value = entry
+            if expires <= time.time():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Stores value for key
+
+        :param key:
+        :param value:
+        :return:
+        """
+        now = time.time()
+        expires = now + self.ttl
+        if self.boundary:
+            expires = min(expires, self.boundary(now))
+
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
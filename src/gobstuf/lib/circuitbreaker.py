@@ -0,0 +1,145 @@
+import collections
+import threading
+import time
+
+
+class CircuitOpenException(Exception):
+    """Raised when a call is rejected because the circuit is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        """
+        :param name: the name of the circuit
+        :param retry_after: the number of seconds after which a call may be tried again
+        """
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"Circuit {name} is open, retry after {retry_after:.1f} seconds")
+
+
+class CircuitBreaker:
+    """Thread safe circuit breaker
+
+    Closed: calls are executed. The results of the last window_size calls are kept. A call fails when it raises an
+    exception, when is_failure(result) is true or when it takes longer than slow_call_duration. When at least
+    min_calls have been recorded and the rate of failed calls reaches failure_rate the circuit opens.
+
+    Open: calls are rejected immediately with a CircuitOpenException, for open_duration seconds.
+
+    Half open: one call (the probe) is executed, any other call is rejected. The circuit closes when the probe
+    succeeds and opens again when the probe fails.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, window_size: int, min_calls: int, failure_rate: float, slow_call_duration: float,
+                 open_duration: float, is_failure=None, on_state_change=None):
+        """
+
+        :param name: the name of the circuit, eg the upstream host
+        :param window_size: the number of recent calls that determine the failure rate
+        :param min_calls: the minimum number of recorded calls before the circuit can open
+        :param failure_rate: the rate of failed calls (0 - 1) at which the circuit opens
+        :param slow_call_duration: calls that take longer (in seconds) count as failed calls
+        :param open_duration: the number of seconds that the circuit stays open before a probe is allowed
+        :param is_failure: optional function that tells if the result of a call is a failure
+        :param on_state_change: optional function that is called with the name and new state on every state change
+        """
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_duration = slow_call_duration
+        self.open_duration = open_duration
+        self.is_failure = is_failure or (lambda result: False)
+        self.on_state_change = on_state_change or (lambda name, state: None)
+
+        self.state = self.CLOSED
+        self._failures = collections.deque(maxlen=window_size)
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def call(self, func, *args, **kwargs):
+        """Executes func(*args, **kwargs) when the circuit allows it and records the result
+
+        :param func:
+        :return: the result of func
+        """
+        probe = self._allow()
+        start = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException:
+            self._record(True, time.monotonic() - start, probe)
+            raise
+        self._record(self.is_failure(result), time.monotonic() - start, probe)
+        return result
+
+    async def call_async(self, func, *args, **kwargs):
+        """Awaits func(*args, **kwargs) when the circuit allows it and records the result
+
+        :param func: a coroutine function
+        :return: the result of func
+        """
+        probe = self._allow()
+        start = time.monotonic()
+        try:
+            result = await func(*args, **kwargs)
+        except BaseException:
+            # Including cancellation, a probe always gets a result
+            self._record(True, time.monotonic() - start, probe)
+            raise
+        self._record(self.is_failure(result), time.monotonic() - start, probe)
+        return result
+
+    def _allow(self) -> bool:
+        """Checks if a call is allowed, raises a CircuitOpenException if it is not
+
+        :return: True when the call is the probe of a half open circuit
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                retry_after = self._opened_at + self.open_duration - time.monotonic()
+                if retry_after > 0:
+                    raise CircuitOpenException(self.name, retry_after)
+                self._set_state(self.HALF_OPEN)
+
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    raise CircuitOpenException(self.name, 0)
+                self._probing = True
+                return True
+            return False
+
+    def _record(self, failed: bool, duration: float, probe: bool):
+        """Records the result of a call
+
+        :param failed: whether the call failed
+        :param duration: the duration of the call in seconds
+        :param probe: whether the call was the probe of a half open circuit
+        :return:
+        """
+        failed = failed or duration > self.slow_call_duration
+        with self._lock:
+            if probe:
+                self._probing = False
+                if failed:
+                    self._open()
+                else:
+                    self._failures.clear()
+                    self._set_state(self.CLOSED)
+            elif self.state == self.CLOSED:
+                # Calls that were started before the circuit opened are ignored
+                self._failures.append(failed)
+                if len(self._failures) >= self.min_calls and \
+                        sum(self._failures) / len(self._failures) >= self.failure_rate:
+                    self._open()
+
+    def _open(self):
+        self._opened_at = time.monotonic()
+        self._set_state(self.OPEN)
+
+    def _set_state(self, state: str):
+        self.state = state
+        self.on_state_change(self.name, state)
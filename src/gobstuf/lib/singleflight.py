@@ -0,0 +1,105 @@
+import asyncio
+import threading
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one call
+
+    The first caller for a key (the leader) executes the function. Any caller that arrives with the same key while
+    the leader is busy waits for the leader and gets the same result, or the same exception.
+    Results are not kept; once the leader is finished the next call for the key executes the function again.
+    """
+
+    class _Call:
+
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.exception = None
+            self.callers = 1
+
+    def __init__(self, on_result=None):
+        """
+
+        :param on_result: called by the leader with the result and the number of callers that share the result,
+            before any caller gets the result
+        """
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._on_result = on_result
+
+    def do(self, key, func, *args, **kwargs):
+        """Executes func(*args, **kwargs), unless a call with the same key is already in flight
+
+        :param key: any hashable value that identifies the call
+        :param func: the function to execute
+        :return: the result of func
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = self._Call()
+            else:
+                call.callers += 1
+
+        if not is_leader:
+            return self._wait(call)
+
+        try:
+            call.result = func(*args, **kwargs)
+        except Exception as e:
+            call.exception = e
+            raise
+        finally:
+            self._finish(key, call)
+        return call.result
+
+    def _finish(self, key, call):
+        """Ends the call for key and releases the callers that wait for it
+
+        :param key:
+        :param call:
+        :return:
+        """
+        with self._lock:
+            del self._calls[key]
+
+        try:
+            # No caller can join the call anymore, the number of callers is final
+            if call.exception is None and self._on_result is not None:
+                self._on_result(call.result, call.callers)
+        finally:
+            call.done.set()
+
+    def _wait(self, call):
+        call.done.wait()
+        if call.exception is not None:
+            raise call.exception
+        return call.result
+
+
+class AsyncSingleFlight:
+    """Coalesces concurrent coroutine calls with the same key into one call, within one event loop
+
+    The first caller for a key starts the coroutine in a separate task. Every caller with the same key, including the
+    first, waits for this task. A caller that is cancelled (eg because the client has gone) does not cancel the task
+    for the other callers.
+    Results are not kept; once the task is finished the next call for the key starts the coroutine again.
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, func, *args, **kwargs):
+        """Awaits func(*args, **kwargs), unless a call with the same key is already in flight
+
+        :param key: any hashable value that identifies the call
+        :param func: the coroutine function to execute
+        :return: the result of func
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(func(*args, **kwargs))
+            task.add_done_callback(lambda _: self._calls.pop(key))
+        return await asyncio.shield(task)
@@ -0,0 +1,162 @@
+import re
+import threading
+
+
+def rewrite_chunks(chunks, pattern: bytes, replacement: bytes, max_length: int):
+    """Replaces all matches of pattern in a stream of byte chunks
+
+    The result is the same as re.sub(pattern, replacement, b''.join(chunks)), but the chunks are processed as they
+    arrive. A match can span multiple chunks, so the last max_length - 1 bytes of the data seen so far are held back
+    until the next chunk arrives or the stream ends.
+
+    :param chunks: iterable of bytes
+    :param pattern: regular expression
+    :param replacement:
+    :param max_length: the maximum length of a match of pattern
+    :return: generator of rewritten chunks
+    """
+    regex = re.compile(pattern)
+    pending = b''
+
+    for chunk in chunks:
+        pending += chunk
+        # Any match that starts before safe is complete, it cannot be extended by the next chunk
+        safe = len(pending) - max_length + 1
+        if safe <= 0:
+            continue
+
+        output = []
+        pos = 0
+        for match in regex.finditer(pending):
+            if match.start() >= safe:
+                break
+            output.extend([pending[pos:match.start()], match.expand(replacement)])
+            pos = match.end()
+
+        end = max(pos, safe)
+        output.append(pending[pos:end])
+        pending = pending[end:]
+        yield b''.join(output)
+
+    if pending:
+        yield regex.sub(replacement, pending)
+
+
+class SharedChunks:
+    """Reads a stream of chunks once and lets a known number of readers iterate over all chunks
+
+    Chunks are read from the stream when the first reader needs them. A chunk is kept only until every reader has
+    read it, eg for the requests that share one MKS response (see SingleFlight). A single reader keeps no chunks at
+    all. Every reader gets all chunks, from the start, and readers may iterate concurrently from different threads.
+
+    Every reader releases the stream when it is done with it. The stream is closed once all readers have released it.
+    """
+
+    def __init__(self, chunks, readers: int = 1, on_close=None):
+        """
+
+        :param chunks: iterable of bytes
+        :param readers: the number of readers, None to keep all chunks for any number of readers
+        :param on_close: called once all readers have released the stream, eg to close the underlying response
+        """
+        self._chunks = iter(chunks)
+        self._readers = readers
+        self._on_close = on_close
+        # The chunks that have not been read by every reader, starting at chunk number _start
+        self._buffer = []
+        self._remaining = []
+        self._start = 0
+        self._size = 0
+        self._released = 0
+        self._done = False
+        self._exception = None
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        """The number of bytes that have been read from the stream
+
+        :return:
+        """
+        return self._size
+
+    def share(self, readers: int):
+        """Sets the number of readers, before any chunk has been read
+
+        :param readers:
+        :return:
+        """
+        self._readers = readers
+
+    def release(self):
+        """Releases the stream for one reader, the last reader closes the stream
+
+        :return:
+        """
+        with self._lock:
+            self._released += 1
+            if self._released != self._readers:
+                return
+            self._buffer, self._remaining = [], []
+
+        if self._on_close is not None:
+            self._on_close()
+
+    def __iter__(self):
+        index = 0
+        while True:
+            chunk = self._get_chunk(index)
+            if chunk is None:
+                return
+            yield chunk
+            index += 1
+
+    def _get_chunk(self, index: int):
+        """Returns the chunk at index, reads it from the stream if needed
+
+        :param index:
+        :return: the chunk, or None when the stream has ended
+        :raises: any exception that the stream raised
+        """
+        with self._lock:
+            if index < self._start:
+                raise RuntimeError(f"Chunk {index} has been read by all {self._readers} readers")
+
+            if index == self._start + len(self._buffer) and not self._done:
+                self._read_next()
+
+            if index < self._start + len(self._buffer):
+                return self._take(index)
+            if self._exception is not None:
+                raise self._exception
+            return None
+
+    def _take(self, index: int) -> bytes:
+        """Returns the buffered chunk at index for one reader, drops the chunks that every reader has read
+
+        :param index:
+        :return:
+        """
+        position = index - self._start
+        chunk = self._buffer[position]
+        if self._readers is not None:
+            self._remaining[position] -= 1
+            while self._remaining and self._remaining[0] == 0:
+                self._buffer.pop(0)
+                self._remaining.pop(0)
+                self._start += 1
+        return chunk
+
+    def _read_next(self):
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self._done = True
+        except Exception as e:
+            # Any reader that needs more chunks gets the exception
+            self._done = True
+            self._exception = e
+        else:
+            self._buffer.append(chunk)
+            self._remaining.append(self._readers)
+            self._size += len(chunk)
@@ -0,0 +1,71 @@
+import argparse
+import json
+import logging
+
+from gobstuf.loadtest.harness import LoadTest, FlaskTarget, HttpTarget, get_gatekeeper_headers, format_report
+from gobstuf.loadtest.mix import RequestMix, DEFAULT_MIX, parse_mix
+from gobstuf.mks_simulator.corpus import Corpus
+
+
+def levels(value: str) -> list:
+    """Parses the levels of concurrency, eg 1,2,4,8
+
+    :param value:
+    :return:
+    """
+    return [int(level) for level in value.split(',')]
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description="Load test of the REST endpoints against the MKS simulator")
+    parser.add_argument('--url', help="the url of the REST endpoints of a running server, eg "
+                                      "http://localhost:8165/gob_stuf. Default the app is run in this process")
+    parser.add_argument('--concurrency', type=levels, default=levels('1,2,4,8,16,32'),
+                        help="the numbers of concurrent clients, comma separated")
+    parser.add_argument('--duration', type=float, default=10.0, help="the duration of every level in seconds")
+    parser.add_argument('--warmup', type=float, default=2.0, help="the duration of the warmup in seconds")
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"the weights of the kinds of requests, default {DEFAULT_MIX}")
+    parser.add_argument('--persons', type=int, default=1000, help="the number of persons of the MKS simulator")
+    parser.add_argument('--seed', type=int, default=0, help="the seed of the MKS simulator and of the requests")
+    parser.add_argument('--user', default='loadtest', help="the user in the gatekeeper headers")
+    parser.add_argument('--role', default='fp_loadtest', help="the role in the gatekeeper headers")
+    parser.add_argument('--output', help="the file to store the results in, as JSON")
+    return parser
+
+
+def get_target(url: str = None):
+    """Returns the target for url, or the Flask app in this process
+
+    :param url:
+    :return:
+    """
+    if url:
+        return HttpTarget(url)
+
+    # The app needs the configuration of the service, a running server is tested without it
+    from gobstuf.api import get_flask_app
+    from gobstuf.config import API_BASE_PATH
+    return FlaskTarget(get_flask_app(), API_BASE_PATH)
+
+
+def main(args=None):
+    logging.basicConfig(level=logging.INFO)
+    args = get_parser().parse_args(args)
+
+    mix = RequestMix(Corpus(size=args.persons, seed=args.seed), args.mix)
+    load_test = LoadTest(get_target(args.url), mix, get_gatekeeper_headers(args.user, args.role), seed=args.seed)
+    summaries = load_test.run(args.concurrency, args.duration, args.warmup)
+
+    print(format_report(summaries))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summaries, f, indent=2)
+
+
+def init():
+    if __name__ == "__main__":
+        main()
+
+
+init()
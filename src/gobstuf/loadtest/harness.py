@@ -0,0 +1,205 @@
+"""Runs a mix of requests at increasing concurrency
+
+Every level of concurrency runs for a fixed duration. Each of the concurrent clients sends its next request as soon as
+it has received the response to its previous request. The achieved throughput, the latencies and the errors are
+reported per level. The level with the highest throughput is the saturation point.
+"""
+import logging
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from gobcore.secure.request import USER_ID_HEADER, USER_NAME_HEADER, ROLES_HEADER
+
+from gobstuf.benchmarks.runner import percentile
+from gobstuf.loadtest.mix import RequestMix
+
+# The status of a request that failed without a response, eg on a connection error
+NO_RESPONSE = 0
+
+
+def get_gatekeeper_headers(user: str, role: str) -> dict:
+    """Returns the headers that gatekeeper adds to an authenticated request
+
+    :param user: the user, the MKS gebruiker
+    :param role: the role of the user, the MKS applicatie
+    :return:
+    """
+    return {
+        USER_ID_HEADER: user,
+        USER_NAME_HEADER: user,
+        ROLES_HEADER: role,
+    }
+
+
+class FlaskTarget:
+    """Sends the requests to a Flask app in this process, eg get_flask_app()"""
+
+    def __init__(self, app, base_path: str = ''):
+        """
+        :param app:
+        :param base_path: the path of the REST endpoints in the app
+        """
+        self.app = app
+        self.base_path = base_path
+
+    def get(self, path: str, headers: dict) -> int:
+        response = self.app.test_client().get(f"{self.base_path}{path}", headers=headers)
+        # Read a streamed response completely
+        response.get_data()
+        return response.status_code
+
+
+class HttpTarget:
+    """Sends the requests over HTTP to a running server, eg uWSGI or uvicorn"""
+
+    def __init__(self, url: str, timeout: float = 60.0):
+        """
+        :param url: the url of the REST endpoints, eg http://localhost:8165/gob_stuf
+        :param timeout:
+        """
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        # Every client thread keeps its connection alive
+        self.local = threading.local()
+
+    def get(self, path: str, headers: dict) -> int:
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = requests.Session()
+        response = session.get(f"{self.url}{path}", headers=headers, timeout=self.timeout)
+        return response.status_code
+
+
+def is_error(status: int) -> bool:
+    return not 200 <= status < 400
+
+
+def summarize(results: list, elapsed: float) -> dict:
+    """Returns the throughput, latencies and errors of the results of a level
+
+    :param results: tuples (kind, status, latency in seconds)
+    :param elapsed: the duration of the level in seconds
+    :return:
+    """
+    latencies = [latency for _, _, latency in results] or [0.0]
+    errors = {}
+    for _, status, _ in results:
+        if is_error(status):
+            errors[status] = errors.get(status, 0) + 1
+    return {
+        'requests': len(results),
+        'rps': round(len(results) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p90_ms': round(percentile(latencies, 90) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+        'max_ms': round(max(latencies) * 1000, 1),
+        'error_rate': round(sum(errors.values()) / len(results), 4) if results else 0.0,
+        'errors': errors,
+    }
+
+
+class LoadTest:
+    """Runs a RequestMix against a target at increasing concurrency"""
+
+    def __init__(self, target, mix: RequestMix, headers: dict, seed: int = 0):
+        """
+        :param target: FlaskTarget or HttpTarget
+        :param mix:
+        :param headers: the gatekeeper headers, see get_gatekeeper_headers
+        :param seed: the seed of the sequences of requests
+        """
+        self.target = target
+        self.mix = mix
+        self.headers = headers
+        self.seed = seed
+
+    def _send(self, kind: str, path: str) -> tuple:
+        """Sends one request
+
+        :param kind:
+        :param path:
+        :return: tuple (kind, status, latency in seconds)
+        """
+        start = time.perf_counter()
+        try:
+            status = self.target.get(path, self.headers)
+        except Exception as e:
+            logging.warning(f"Request {path} failed: {e}")
+            status = NO_RESPONSE
+        return kind, status, time.perf_counter() - start
+
+    def _client(self, index: int, deadline: float) -> list:
+        """Sends requests one after the other until deadline
+
+        :param index: the index of the client, every client sends another sequence of requests
+        :param deadline:
+        :return: the results of the requests
+        """
+        results = []
+        for kind, path in self.mix.iter_requests(self.seed * 1000 + index):
+            if time.perf_counter() >= deadline:
+                break
+            results.append(self._send(kind, path))
+        return results
+
+    def run_level(self, concurrency: int, duration: float) -> dict:
+        """Runs concurrency clients for duration seconds
+
+        :param concurrency:
+        :param duration:
+        :return: the summary of the level, overall and by kind of request, see summarize
+        """
+        start = time.perf_counter()
+        deadline = start + duration
+        with ThreadPoolExecutor(concurrency) as executor:
+            futures = [executor.submit(self._client, index, deadline) for index in range(concurrency)]
+        results = [result for future in futures for result in future.result()]
+        elapsed = time.perf_counter() - start
+
+        kinds = {kind: summarize([result for result in results if result[0] == kind], elapsed)
+                 for kind in sorted(set(kind for kind, _, _ in results))}
+        return {'concurrency': concurrency, **summarize(results, elapsed), 'kinds': kinds}
+
+    def run(self, levels: list, duration: float, warmup: float = 0.0) -> list:
+        """Runs the levels of concurrency one after the other
+
+        :param levels: the numbers of concurrent clients
+        :param duration: the duration of every level in seconds
+        :param warmup: the duration in seconds of a run with one client before the first level, it is not reported
+        :return: the summaries of the levels
+        """
+        if warmup > 0:
+            self.run_level(1, warmup)
+
+        summaries = []
+        for concurrency in levels:
+            summaries.append(self.run_level(concurrency, duration))
+            logging.info(format_level(summaries[-1]))
+        return summaries
+
+
+LEVEL_COLUMNS = ['concurrency', 'requests', 'rps', 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms', 'error_rate']
+
+
+def format_level(summary: dict) -> str:
+    return ''.join(f"{summary[column]:>12}" for column in LEVEL_COLUMNS) + \
+        ''.join(f"  {status}: {count}" for status, count in summary['errors'].items())
+
+
+def format_report(summaries: list) -> str:
+    """Returns a table of the summaries of the levels and the saturation point
+
+    :param summaries:
+    :return:
+    """
+    lines = [''.join(f"{column:>12}" for column in LEVEL_COLUMNS) + '  errors']
+    lines.extend(format_level(summary) for summary in summaries)
+    if summaries:
+        saturation = max(summaries, key=lambda summary: summary['rps'])
+        lines.append(f"Saturation: {saturation['rps']} requests per second at concurrency "
+                     f"{saturation['concurrency']}")
+    return '\n'.join(lines)
@@ -0,0 +1,100 @@
+"""The requests of a load test
+
+The requests are drawn from the corpus of the MKS simulator, so that every lookup or search asks for persons that
+the simulator knows. The corpus is generated with the same size and seed as the corpus of the simulator.
+"""
+import random
+
+from urllib.parse import urlencode
+
+from gobstuf.mks_simulator.corpus import Corpus
+from gobstuf.mks_simulator.generator import GEMEENTE_AMSTERDAM
+
+BASE_PATH = '/brp/ingeschrevenpersonen'
+EXPAND_VARIANTS = ['partners', 'ouders', 'kinderen', 'partners,ouders,kinderen']
+WOONADRES = 'BG:verblijfsadres'
+
+DEFAULT_MIX = 'bsn=4,expand=2,postcode=2,wildcard=1'
+
+
+def bsn_request(person: dict, rng: random.Random) -> str:
+    return f"{BASE_PATH}/{person['BG:inp.bsn']}"
+
+
+def expand_request(person: dict, rng: random.Random) -> str:
+    return f"{bsn_request(person, rng)}?{urlencode({'expand': rng.choice(EXPAND_VARIANTS)})}"
+
+
+def postcode_request(person: dict, rng: random.Random) -> str:
+    address = person[WOONADRES]
+    return f"{BASE_PATH}?" + urlencode({
+        'verblijfplaats__postcode': address['BG:aoa.postcode'],
+        'verblijfplaats__huisnummer': address['BG:aoa.huisnummer'],
+    })
+
+
+def wildcard_request(person: dict, rng: random.Random) -> str:
+    """Searches on the start of the straatnaam of the person, at least 2 characters followed by a wildcard
+
+    :param person:
+    :param rng:
+    :return:
+    """
+    address = person[WOONADRES]
+    return f"{BASE_PATH}?" + urlencode({
+        'verblijfplaats__gemeentevaninschrijving': GEMEENTE_AMSTERDAM,
+        'verblijfplaats__naamopenbareruimte': address['BG:gor.openbareRuimteNaam'][:rng.randint(2, 5)] + '*',
+        'verblijfplaats__huisnummer': address['BG:aoa.huisnummer'],
+    })
+
+
+# The kinds of requests and whether they search on the woonadres
+REQUESTS = {
+    'bsn': (bsn_request, False),
+    'expand': (expand_request, False),
+    'postcode': (postcode_request, True),
+    'wildcard': (wildcard_request, True),
+}
+
+
+def parse_mix(value: str) -> dict:
+    """Parses a mix of requests, eg 'bsn=4,wildcard=1' for 4 BSN lookups for every wildcard search
+
+    :param value:
+    :return: the weight by kind of request
+    :raises: ValueError for an unknown kind of request or an invalid weight
+    """
+    mix = {}
+    for item in value.split(','):
+        kind, _, weight = item.partition('=')
+        if kind not in REQUESTS:
+            raise ValueError(f"Unknown request {kind}, expected one of {', '.join(REQUESTS)}")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+class RequestMix:
+    """Draws requests from a corpus, in proportion to their weights"""
+
+    def __init__(self, corpus: Corpus, weights: dict):
+        """
+        :param corpus: the corpus of the MKS simulator
+        :param weights: the weight by kind of request, see parse_mix
+        """
+        self.weights = weights
+        self.persons = corpus.persons
+        # The persons that can be found by their woonadres. The others only have a briefadres
+        self.residents = [person for person in corpus.persons if WOONADRES in person]
+
+    def iter_requests(self, seed: int):
+        """Yields an endless sequence of requests, the same seed gives the same sequence
+
+        :param seed:
+        :return: tuples (kind, path)
+        """
+        rng = random.Random(seed)
+        kinds, weights = list(self.weights), list(self.weights.values())
+        while True:
+            kind = rng.choices(kinds, weights)[0]
+            get_path, searches_woonadres = REQUESTS[kind]
+            yield kind, get_path(rng.choice(self.residents if searches_woonadres else self.persons), rng)
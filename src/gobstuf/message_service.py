@@ -0,0 +1,5 @@
+from gobstuf.app import run_message_service
+
+# Run the connection with the GOB message broker in a dedicated process, either a uWSGI mule
+# (mule = gobstuf/message_service.py) or a separate process (python -m gobstuf.message_service)
+run_message_service()
@@ -0,0 +1,212 @@
+"""Prometheus metrics
+
+The metrics are exposed at /status/metrics.
+
+When the environment variable prometheus_multiproc_dir is set (see deploy/docker-run.sh) every uWSGI worker writes its
+metrics to this directory and the metrics of all workers are aggregated when they are collected.
+
+The duration of the stages of a REST request are measured with RequestMetrics. The stages are measured exclusively;
+when a stage is started within another stage, the time is counted for the inner stage only.
+"""
+import contextvars
+import os
+import time
+
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry, REGISTRY, CONTENT_TYPE_LATEST, \
+    generate_latest, multiprocess
+
+RESPONSE_CACHE_REQUESTS = Counter(
+    'gobstuf_response_cache_requests_total',
+    'Number of lookups in the REST response cache, by view and result (hit or miss)',
+    ['view', 'result']
+)
+
+STAGE_DURATION = Histogram(
+    'gobstuf_stage_duration_seconds',
+    'Duration of the stages of a REST request, by view, stage and response status',
+    ['view', 'stage', 'status'],
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+MKS_RESPONSE_SIZE = Histogram(
+    'gobstuf_mks_response_size_bytes',
+    'Size of the MKS responses, by view and response status',
+    ['view', 'status'],
+    buckets=tuple(1024 * 4 ** n for n in range(8))
+)
+
+RESPONSE_OBJECTS = Histogram(
+    'gobstuf_response_objects',
+    'Number of objects in the REST responses, by view and response status',
+    ['view', 'status'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+)
+
+# The value of MKS_CIRCUIT_STATE for every state of the circuit breaker, see lib/circuitbreaker.py
+CIRCUIT_STATES = {
+    'closed': 0,
+    'half_open': 1,
+    'open': 2,
+}
+
+# Workers have their own circuit breakers. The worst state of all workers is reported
+MKS_CIRCUIT_STATE = Gauge(
+    'gobstuf_mks_circuit_state',
+    'State of the circuit breaker for MKS, by upstream (0 closed, 1 half open, 2 open)',
+    ['upstream'],
+    multiprocess_mode='max'
+)
+
+MKS_CIRCUIT_TRANSITIONS = Counter(
+    'gobstuf_mks_circuit_transitions_total',
+    'Number of state changes of the circuit breaker for MKS, by upstream and new state',
+    ['upstream', 'state']
+)
+
+MKS_CIRCUIT_REJECTED = Counter(
+    'gobstuf_mks_circuit_rejected_total',
+    'Number of MKS requests that were rejected because the circuit was open, by upstream',
+    ['upstream']
+)
+
+# The metrics of the request that is handled in the current thread
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Collects the metrics of a single REST request
+
+    The metrics are published when the response status is known
+    """
+
+    def __init__(self):
+        self.durations = {}
+        self.mks_response_size = None
+        self.objects = None
+
+        self._stages = []
+
+    @contextmanager
+    def stage(self, name: str):
+        """Measures the duration of stage name
+
+        Any running (outer) stage is paused until this stage is finished
+
+        :param name:
+        :return:
+        """
+        start = time.perf_counter()
+        self._pause(start)
+        self._stages.append([name, start])
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self._pause(end)
+            self._stages.pop()
+            if self._stages:
+                # Resume outer stage
+                self._stages[-1][1] = end
+
+    def _pause(self, now: float):
+        if self._stages:
+            name, start = self._stages[-1]
+            self.durations[name] = self.durations.get(name, 0) + now - start
+            self._stages[-1][1] = now
+
+    @contextmanager
+    def activate(self):
+        """Makes these metrics the metrics of the current request
+
+        :return:
+        """
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def iterate(self, iterable):
+        """Iterates over iterable with these metrics as the metrics of the current request
+
+        Used for the body of a streamed response, which is generated after the view has returned
+
+        :param iterable:
+        :return:
+        """
+        iterator = iter(iterable)
+        try:
+            while True:
+                with self.activate():
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        return
+                yield item
+        finally:
+            if hasattr(iterator, 'close'):
+                iterator.close()
+
+    def observe(self, view: str, status: int):
+        """Publishes the metrics
+
+        :param view: the name of the view that handled the request
+        :param status: the response status
+        :return:
+        """
+        for name, duration in self.durations.items():
+            STAGE_DURATION.labels(view=view, stage=name, status=status).observe(duration)
+        if self.mks_response_size is not None:
+            MKS_RESPONSE_SIZE.labels(view=view, status=status).observe(self.mks_response_size)
+        if self.objects is not None:
+            RESPONSE_OBJECTS.labels(view=view, status=status).observe(self.objects)
+
+
+def current_request_metrics() -> RequestMetrics:
+    """Returns the metrics of the current request
+
+    Outside a request the returned metrics are not published
+
+    :return:
+    """
+    return _current.get() or RequestMetrics()
+
+
+def stage(name: str):
+    """Measures the duration of stage name for the current request
+
+    Example:
+        with stage('parse'):
+            ...
+
+    :param name:
+    :return:
+    """
+    return current_request_metrics().stage(name)
+
+
+def get_metrics():
+    """Returns the metrics in the Prometheus text format, aggregated over all workers when running multiprocess
+
+    :return: tuple (data, content type)
+    """
+    registry = REGISTRY
+    if 'prometheus_multiproc_dir' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def observe_circuit_state(upstream: str, state: str, transition=True):
+    """Publishes the state of the circuit breaker for upstream
+
+    :param upstream:
+    :param state:
+    :param transition: False for the initial state
+    :return:
+    """
+    MKS_CIRCUIT_STATE.labels(upstream=upstream).set(CIRCUIT_STATES[state])
+    if transition:
+        MKS_CIRCUIT_TRANSITIONS.labels(upstream=upstream, state=state).inc()
@@ -0,0 +1,61 @@
+import argparse
+import logging
+
+from aiohttp import web
+
+from gobstuf.mks_simulator.corpus import Corpus
+from gobstuf.mks_simulator.simulator import MKSSimulator
+
+
+def size(value: str):
+    """Parses a size of the persons, a number or a range min,max
+
+    :param value:
+    :return:
+    """
+    bounds = tuple(int(bound) for bound in value.split(','))
+    return bounds if len(bounds) > 1 else bounds[0]
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description="Local stand-in for MKS, answers npsLv01 questions")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8002)
+    parser.add_argument('--persons', type=int, default=1000, help="the number of persons in the corpus")
+    parser.add_argument('--seed', type=int, default=0, help="the seed of the corpus and the simulated behaviour")
+    for relation, default in [('kinderen', '0,3'), ('partners', '0,2'), ('ouders', '2'), ('nationaliteiten', '1,2')]:
+        parser.add_argument(f'--{relation}', type=size, default=size(default),
+                            help=f"the number of {relation} per person, a number or a range min,max")
+    parser.add_argument('--latency', type=float, default=0.0, help="the mean response time in seconds")
+    parser.add_argument('--jitter', type=float, default=0.0, help="the maximum deviation from latency in seconds")
+    parser.add_argument('--fault-rate', type=float, default=0.0, help="the rate (0 - 1) of Fo02 faults")
+    parser.add_argument('--fault-codes', default='StUF003,StUF010', help="comma separated StUF codes of the faults")
+    parser.add_argument('--unavailable-rate', type=float, default=0.0,
+                        help="the rate (0 - 1) of requests that are answered with status 503")
+    parser.add_argument('--max-answers', type=int, help="the maximum number of objects in an answer")
+    return parser
+
+
+def main(args=None):
+    logging.basicConfig(level=logging.INFO)
+    args = get_parser().parse_args(args)
+
+    corpus = Corpus(size=args.persons, seed=args.seed, kinderen=args.kinderen, partners=args.partners,
+                    ouders=args.ouders, nationaliteiten=args.nationaliteiten)
+    simulator = MKSSimulator(corpus,
+                             latency=args.latency,
+                             jitter=args.jitter,
+                             fault_rate=args.fault_rate,
+                             fault_codes=args.fault_codes.split(','),
+                             unavailable_rate=args.unavailable_rate,
+                             max_answers=args.max_answers,
+                             seed=args.seed)
+    web.run_app(simulator.get_app(), host=args.host, port=args.port)
+
+
+def init():
+    if __name__ == "__main__":
+        main()
+
+
+init()
@@ -0,0 +1,72 @@
+"""A corpus of synthetic persons that the MKS simulator answers from
+
+Persons are generated by the PersonGenerator, see generator.py
+"""
+import re
+
+from gobstuf.lib.utils import get_value
+from gobstuf.mks_simulator.generator import PersonGenerator
+from gobstuf.stuf.message import STUF_WILDCARD_CHAR
+
+# The number of persons that share an address
+HOUSEHOLD_SIZE = 3
+
+
+def get_text(person: dict, path: tuple):
+    """Returns the text of the element at path in person
+
+    :param person:
+    :param path: tuple of prefixed tags, eg ('BG:verblijfsadres', 'BG:aoa.postcode')
+    :return:
+    """
+    value = get_value(person, *path)
+    return value.get('#text') if isinstance(value, dict) else value
+
+
+def compile_criterion(value: str):
+    """Returns a predicate for the value of a BG:gelijk element
+
+    MKS matches case insensitive, STUF_WILDCARD_CHAR matches any sequence of characters
+
+    :param value:
+    :return:
+    """
+    pattern = re.compile('.*'.join(re.escape(part) for part in value.split(STUF_WILDCARD_CHAR)), re.IGNORECASE)
+    return lambda text: text is not None and pattern.fullmatch(text) is not None
+
+
+class Corpus:
+    """A corpus of synthetic persons, indexed by burgerservicenummer"""
+
+    BSN_PATH = ('BG:inp.bsn',)
+
+    def __init__(self, size: int = 1000, seed: int = 0, **kwargs):
+        """
+        :param size: the number of persons
+        :param seed: the seed of the generator
+        :param kwargs: the sizes and rates of the PersonGenerator
+        """
+        self.persons = PersonGenerator(seed=seed, **kwargs).persons(size, household_size=HOUSEHOLD_SIZE)
+        self.by_bsn = {person['BG:inp.bsn']: person for person in self.persons}
+
+    def search(self, criteria: dict, limit: int) -> list:
+        """Returns the persons that match all criteria
+
+        :param criteria: the values of the BG:gelijk elements (see compile_criterion) by path (see get_text)
+        :param limit: the maximum number of persons to return
+        :return:
+        """
+        bsn = criteria.get(self.BSN_PATH)
+        if bsn is None or STUF_WILDCARD_CHAR in bsn:
+            persons = self.persons
+        else:
+            persons = [self.by_bsn[bsn]] if bsn in self.by_bsn else []
+
+        predicates = {path: compile_criterion(value) for path, value in criteria.items()}
+        matches = []
+        for person in persons:
+            if len(matches) == limit:
+                break
+            if all(predicate(get_text(person, path)) for path, predicate in predicates.items()):
+                matches.append(person)
+        return matches
@@ -0,0 +1,365 @@
+"""Synthetic persons, as MKS returns them in an npsLa01 answer
+
+Persons are dicts in the format of messages.py, with the elements that NPSMapping, NPSNPSHUWMapping, NPSNPSOUDMapping
+and NPSNPSKNDMapping map. The generator is seeded, the same seed and sizes always give the same persons.
+
+The size of a person is set by the number of kinderen, partners, ouders and nationaliteiten. A size is either a
+number or a (min, max) range that is sampled for every person, eg:
+
+    generate_answer(objects=15, kinderen=30, partners=(0, 5))
+
+returns an npsLa01 answer with 15 persons, each with 30 kinderen and at most 5 partners.
+"""
+import random
+
+from gobstuf.mks_simulator.messages import answer_message
+
+GEMEENTE_AMSTERDAM = '0363'
+LAND_NEDERLAND = '6030'
+
+GESLACHTSNAMEN = ['Jansen', 'de Vries', 'van den Berg', 'Bakker', 'Visser', 'Smit', 'Meijer', 'de Boer', 'Mulder',
+                  'de Groot', 'Bos', 'Vos', 'Peters', 'Hendriks', 'van Leeuwen', 'Dekker', 'Brouwer', 'de Wit',
+                  'Dijkstra', 'Smits', 'de Graaf', 'van der Meer', 'van der Linden', 'Kok', 'Jacobs', 'de Haan']
+VOORNAMEN = {
+    'M': ['Jan', 'Pieter', 'Kees', 'Mohammed', 'Daan', 'Sem', 'Lucas', 'Willem', 'Thomas', 'Ahmed', 'Johannes'],
+    'V': ['Maria', 'Anna', 'Emma', 'Fatima', 'Julia', 'Sophie', 'Tess', 'Elisabeth', 'Johanna', 'Noor', 'Sara'],
+}
+STRAATNAMEN = ['Kalverstraat', 'Damrak', 'Prinsengracht', 'Keizersgracht', 'Herengracht', 'Rozengracht',
+               'Javastraat', 'Amstelveenseweg', 'Overtoom', 'Ferdinand Bolstraat', 'Van Woustraat', 'Bos en Lommerweg']
+POSTCODE_LETTERS = 'ABCDEGHJKLMNPRSTVWXZ'
+# Code and omschrijving. The first one is the nationaliteit of every person, the others are added in this order
+NATIONALITEITEN = [('0001', 'Nederlandse'), ('0052', 'Belgische'), ('0055', 'Duitse'), ('0057', 'Franse'),
+                   ('0100', 'Marokkaanse'), ('0263', 'Turkse'), ('0308', 'Surinaamse'), ('0324', 'Britse')]
+
+# The indications of incomplete dates and the unknown parts of the date (yyyymmdd) that are filled with a default
+INCOMPLETE_DATES = {
+    'D': (6, '01'),
+    'M': (4, '0101'),
+    'J2': (0, '19000101'),
+}
+
+# The first and last year of birth. Persons with partners or kinderen are born early enough to be adult before
+# LAST_YEAR, with room for all their partnerships
+FIRST_YEAR = 1930
+LAST_YEAR = 2020
+# The age at which a person can marry or get kinderen
+ADULT_AGE = 18
+# The maximum number of years from the start of a partnership to the start of the next one
+PARTNERSHIP_YEARS = 5
+
+
+def bsn_numbers(start: int = 100000000):
+    """Generates burgerservicenummers that pass the eleven test, starting at start
+
+    :param start:
+    :return:
+    """
+    for number in range(start, 1000000000):
+        if is_valid_bsn(str(number)):
+            yield str(number)
+
+
+def is_valid_bsn(bsn: str) -> bool:
+    digits = [int(digit) for digit in bsn]
+    return sum(digit * weight for digit, weight in zip(digits, range(9, 1, -1))) % 11 == digits[-1]
+
+
+class PersonGenerator:
+    """Generates persons with their relatives"""
+
+    def __init__(self, seed: int = 0, kinderen=(0, 3), partners=(0, 2), ouders=2, nationaliteiten=(1, 2),
+                 briefadres_rate: float = 0.05, incomplete_date_rate: float = 0.05, overleden_rate: float = 0.02):
+        """
+        Sizes are a number or a (min, max) range
+
+        :param seed: the seed of the random generator
+        :param kinderen: the number of kinderen
+        :param partners: the number of partners, all but the last one are historic (ontbonden)
+        :param ouders: the number of ouders
+        :param nationaliteiten: the number of nationaliteiten, at most len(NATIONALITEITEN)
+        :param briefadres_rate: the rate (0 - 1) of persons with a briefadres instead of a woonadres
+        :param incomplete_date_rate: the rate (0 - 1) of incomplete dates
+        :param overleden_rate: the rate (0 - 1) of overleden persons
+        """
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.sizes = {
+            'kinderen': kinderen,
+            'partners': partners,
+            'ouders': ouders,
+            'nationaliteiten': nationaliteiten,
+        }
+        self.briefadres_rate = briefadres_rate
+        self.incomplete_date_rate = incomplete_date_rate
+        self.overleden_rate = overleden_rate
+
+    def _size(self, name: str) -> int:
+        size = self.sizes[name]
+        return self.random.randint(*size) if isinstance(size, tuple) else size
+
+    def _is(self, rate: float) -> bool:
+        return self.random.random() < rate
+
+    def _bsn(self) -> str:
+        """Returns a random bsn, for relatives
+
+        :return:
+        """
+        while True:
+            bsn = str(self.random.randint(100000000, 999999999))
+            if is_valid_bsn(bsn):
+                return bsn
+
+    def _date(self, year: int, may_be_incomplete: bool = True):
+        """Returns a date in year, incomplete at incomplete_date_rate
+
+        :param year:
+        :param may_be_incomplete: False for dates that MKS always sends complete
+        :return:
+        """
+        date = self._complete_date(year)
+        return self._incomplete(date) if may_be_incomplete else date
+
+    def _complete_date(self, year: int) -> str:
+        return f'{year}{self.random.randint(1, 12):02}{self.random.randint(1, 28):02}'
+
+    def _incomplete(self, date: str):
+        """Returns date, or at incomplete_date_rate the date with its unknown parts filled with a default
+
+        :param date: a complete date (yyyymmdd)
+        :return:
+        """
+        if not self._is(self.incomplete_date_rate):
+            return date
+
+        indication = self.random.choice(list(INCOMPLETE_DATES))
+        length, unknown = INCOMPLETE_DATES[indication]
+        return {
+            '@StUF:indOnvolledigeDatum': indication,
+            '#text': date[:length] + unknown,
+        }
+
+    def _naam(self, geslacht: str) -> dict:
+        voornamen = self.random.sample(VOORNAMEN[geslacht], self.random.randint(1, 3))
+        voorvoegsel, _, geslachtsnaam = self.random.choice(GESLACHTSNAMEN).rpartition(' ')
+        return {
+            'BG:geslachtsnaam': geslachtsnaam,
+            'BG:voorvoegselGeslachtsnaam': voorvoegsel or None,
+            'BG:voorletters': ''.join(f'{naam[0]}.' for naam in voornamen),
+            'BG:voornamen': ' '.join(voornamen),
+        }
+
+    def _gerelateerde(self, geboortedatum: str, geslacht: str = None) -> dict:
+        """Returns a related person, as it is embedded in a relation
+
+        :param geboortedatum: the complete date of birth (yyyymmdd)
+        :param geslacht: M or V, random if not given
+        :return:
+        """
+        geslacht = geslacht or self.random.choice('MV')
+        return {
+            '@StUF:entiteittype': 'NPS',
+            'BG:inp.bsn': self._bsn(),
+            **self._naam(geslacht),
+            'BG:geslachtsaanduiding': geslacht,
+            'BG:geboortedatum': self._incomplete(geboortedatum),
+            'BG:inp.geboorteplaats': GEMEENTE_AMSTERDAM,
+            'BG:inp.geboorteLand': LAND_NEDERLAND,
+        }
+
+    def address(self, seed) -> dict:
+        """Returns an address in Amsterdam, the same seed gives the same address
+
+        :param seed:
+        :return:
+        """
+        rng = random.Random(f'{self.seed}:{seed}')
+        straatnaam = rng.choice(STRAATNAMEN)
+        return {
+            'BG:aoa.identificatie': f'{GEMEENTE_AMSTERDAM}200000{rng.randint(0, 999999):06}',
+            'BG:wpl.woonplaatsNaam': 'Amsterdam',
+            'BG:gor.openbareRuimteNaam': straatnaam,
+            'BG:gor.straatnaam': straatnaam,
+            'BG:aoa.postcode': f'10{rng.randint(11, 99)}{"".join(rng.choices(POSTCODE_LETTERS, k=2))}',
+            'BG:aoa.huisnummer': str(rng.randint(1, 250)),
+        }
+
+    def _verblijfplaats(self, address: dict) -> dict:
+        """Returns the woonadres, or at briefadres_rate the briefadres, for address
+
+        :param address:
+        :return:
+        """
+        if not self._is(self.briefadres_rate):
+            return {'BG:verblijfsadres': address}
+
+        briefadres = {key.replace('BG:aoa.postcode', 'BG:postcode'): value for key, value in address.items()}
+        return {'BG:sub.correspondentieAdres': briefadres}
+
+    def _nationaliteiten(self, geboortedatum: str) -> list:
+        """Returns the nationaliteiten, acquired at birth
+
+        :param geboortedatum: the complete date of birth of the person
+        :return:
+        """
+        return [{
+            '@StUF:entiteittype': 'NPSNAT',
+            'BG:gerelateerde': {
+                '@StUF:entiteittype': 'NAT',
+                'BG:code': code,
+                'BG:omschrijving': omschrijving,
+            },
+            'BG:inp.datumVerkrijging': self._incomplete(geboortedatum),
+        } for code, omschrijving in NATIONALITEITEN[:self._size('nationaliteiten')]]
+
+    def _partners(self, year: int, count: int) -> list:
+        """Returns count partners, all but the last one are historic
+
+        A partnership starts when both partners are adult and after the previous partnership has ended
+
+        :param year: the year of birth of the person
+        :param count:
+        :return:
+        """
+        if not count:
+            return []
+
+        # The last partnership starts before LAST_YEAR, see _birth_year
+        last_start = LAST_YEAR - PARTNERSHIP_YEARS * (count - 1)
+        sluiting = self.random.randint(year + ADULT_AGE, min(year + 40, last_start))
+        partners = []
+        for index in range(count):
+            ontbinding = sluiting + self.random.randint(1, PARTNERSHIP_YEARS - 1) if index < count - 1 else None
+            partners.append({
+                '@StUF:entiteittype': 'NPSNPSHUW',
+                'BG:gerelateerde': self._gerelateerde(
+                    self._complete_date(min(year + self.random.randint(-5, 5), sluiting - ADULT_AGE))),
+                'BG:soortVerbintenis': self.random.choice('HP'),
+                'BG:datumSluiting': self._date(sluiting),
+                'BG:plaatsSluiting': GEMEENTE_AMSTERDAM,
+                'BG:landSluiting': LAND_NEDERLAND,
+                'BG:datumOntbinding': self._date(ontbinding, may_be_incomplete=False) if ontbinding else None,
+            })
+            sluiting = ontbinding and ontbinding + 1
+        return partners
+
+    def _ouders(self, year: int, geboortedatum: str) -> list:
+        """Returns the ouders, the relation starts at the birth of the person
+
+        :param year: the year of birth of the person
+        :param geboortedatum: the complete date of birth of the person
+        :return:
+        """
+        return [{
+            '@StUF:entiteittype': 'NPSNPSOUD',
+            'BG:gerelateerde': self._gerelateerde(self._complete_date(year - self.random.randint(ADULT_AGE, 45)),
+                                                  'VM'[index % 2]),
+            'BG:ouderAanduiding': str(index + 1),
+            'BG:datumIngangFamilierechtelijkeBetrekking': geboortedatum,
+        } for index in range(self._size('ouders'))]
+
+    def _kinderen(self, year: int, count: int) -> list:
+        """Returns count kinderen, born when the person is adult and before LAST_YEAR
+
+        :param year: the year of birth of the person
+        :param count:
+        :return:
+        """
+        kinderen = []
+        for _ in range(count):
+            geboortedatum = self._complete_date(self.random.randint(year + ADULT_AGE, min(year + 45, LAST_YEAR)))
+            kinderen.append({
+                '@StUF:entiteittype': 'NPSNPSKND',
+                'BG:gerelateerde': self._gerelateerde(geboortedatum),
+                'BG:datumIngangFamilierechtelijkeBetrekking': geboortedatum,
+            })
+        return kinderen
+
+    def _birth_year(self, partners: int, kinderen: int) -> int:
+        """Returns a year of birth that leaves room for partners partnerships and for kinderen before LAST_YEAR
+
+        :param partners: the number of partners
+        :param kinderen: the number of kinderen
+        :return:
+        """
+        if not (partners or kinderen):
+            return self.random.randint(FIRST_YEAR, LAST_YEAR)
+
+        last_year = LAST_YEAR - ADULT_AGE - PARTNERSHIP_YEARS * max(partners - 1, 0)
+        return self.random.randint(min(FIRST_YEAR, last_year), last_year)
+
+    def _overlijdensdatum(self, year: int, relations: list):
+        """Returns the date of death, at overleden_rate, after the birth and the relations of the person
+
+        :param year: the year of birth of the person
+        :param relations: the partners and kinderen of the person
+        :return:
+        """
+        if not self._is(self.overleden_rate):
+            return None
+
+        dates = [relation.get(key) for relation in relations
+                 for key in ['BG:datumSluiting', 'BG:datumOntbinding', 'BG:datumIngangFamilierechtelijkeBetrekking']]
+        last_year = max([year] + [int(self._text(date)[:4]) for date in dates if date])
+        return self._date(self.random.randint(last_year + 1, LAST_YEAR + 1), may_be_incomplete=False)
+
+    @staticmethod
+    def _text(date) -> str:
+        return date['#text'] if isinstance(date, dict) else date
+
+    def person(self, bsn: str, address: dict) -> dict:
+        """Returns a person with relatives
+
+        :param bsn:
+        :param address: the address of the person (see address)
+        :return:
+        """
+        geslacht = self.random.choice('MV')
+        sizes = self._size('partners'), self._size('kinderen')
+        year = self._birth_year(*sizes)
+        geboortedatum = self._complete_date(year)
+        partners = self._partners(year, sizes[0])
+        kinderen = self._kinderen(year, sizes[1])
+
+        return {
+            '@StUF:entiteittype': 'NPS',
+            'BG:inp.bsn': bsn,
+            **self._naam(geslacht),
+            'BG:aanduidingNaamgebruik': 'E',
+            'BG:geslachtsaanduiding': geslacht,
+            'BG:geboortedatum': self._incomplete(geboortedatum),
+            'BG:inp.geboorteplaats': GEMEENTE_AMSTERDAM,
+            'BG:inp.geboorteLand': LAND_NEDERLAND,
+            'BG:overlijdensdatum': self._overlijdensdatum(year, partners + kinderen),
+            'BG:inp.indicatieGeheim': '0',
+            'BG:inp.gemeenteVanInschrijving': GEMEENTE_AMSTERDAM,
+            # Registered at birth
+            'BG:inp.datumInschrijving': geboortedatum,
+            **self._verblijfplaats(address),
+            'BG:inp.heeftAlsNationaliteit': self._nationaliteiten(geboortedatum),
+            'BG:inp.heeftAlsEchtgenootPartner': partners,
+            'BG:inp.heeftAlsOuders': self._ouders(year, geboortedatum),
+            'BG:inp.heeftAlsKinderen': kinderen,
+        }
+
+    def persons(self, count: int, household_size: int = 1, start_bsn: int = 100000000) -> list:
+        """Returns count persons with consecutive burgerservicenummers
+
+        :param count:
+        :param household_size: the number of consecutive persons that share an address
+        :param start_bsn: the first bsn
+        :return:
+        """
+        bsns = bsn_numbers(start_bsn)
+        return [self.person(next(bsns), self.address(index // household_size)) for index in range(count)]
+
+
+def generate_answer(objects: int = 1, seed: int = 0, **kwargs) -> bytes:
+    """Returns an npsLa01 answer with objects persons, eg the answer to a wildcard search for maximumAantal objects
+
+    :param objects: the number of persons
+    :param seed: the seed of the generator
+    :param kwargs: the sizes and rates of the PersonGenerator
+    :return:
+    """
+    return answer_message(PersonGenerator(seed=seed, **kwargs).persons(objects))
@@ -0,0 +1,176 @@
+"""StUF messages, as MKS sends them
+
+Elements are described by dicts that mirror their XML:
+
+- keys are the (prefixed) tags of the child elements, eg 'BG:inp.bsn'
+- keys starting with '@' are attributes, eg '@StUF:entiteittype'
+- the key '#text' holds the text of an element that also has attributes
+- a list value is a repeated element
+- None values are left out
+"""
+import datetime
+import random
+import xml.etree.ElementTree as ET
+
+from gobstuf.stuf.brp.mapping_plan import NAMESPACES
+from gobstuf.stuf.message import register_namespaces
+
+# The omschrijving of the Fo02 codes that the simulator returns
+FAULTS = {
+    'StUF003': 'De gevraagde gegevens zijn niet beschikbaar',
+    'StUF005': 'Er heeft zich in de StUF-communicatie een time-out voorgedaan',
+    'StUF008': 'De beantwoording van het vraagbericht vergt meer systeemresources dan het antwoordende systeem '
+               'beschikbaar heeft',
+    'StUF010': 'Het vragende systeem is niet geautoriseerd voor de gevraagde gegevens',
+    'StUF011': 'De syntax van het StUF-vraagbericht is onjuist',
+}
+
+
+def qname(tag: str) -> str:
+    """Returns the qualified name of a prefixed tag
+
+    qname('BG:inp.bsn') returns '{http://www.egem.nl/StUF/sector/bg/0310}inp.bsn'
+
+    :param tag:
+    :return:
+    """
+    prefix, name = tag.split(':')
+    return f'{{{NAMESPACES[prefix]}}}{name}'
+
+
+def get_prefixed_tag(tag: str) -> str:
+    """Returns the prefixed tag for a qualified name, the reverse of qname
+
+    :param tag:
+    :return:
+    """
+    for prefix, namespace in NAMESPACES.items():
+        if tag.startswith(f'{{{namespace}}}'):
+            return f'{prefix}:{tag[len(namespace) + 2:]}'
+    return tag
+
+
+def append_element(parent: ET.Element, tag: str, value):
+    """Appends the element(s) for value to parent
+
+    :param parent:
+    :param tag: the prefixed tag of the element
+    :param value: a str, a dict (see module docstring) or a list of values for a repeated element
+    :return:
+    """
+    if isinstance(value, list):
+        for item in value:
+            append_element(parent, tag, item)
+        return
+
+    elm = ET.SubElement(parent, qname(tag))
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _set_content(elm, key, item)
+    else:
+        elm.text = value
+
+
+def _set_content(elm: ET.Element, key: str, value):
+    """Sets the text, an attribute or a child element of elm
+
+    :param elm:
+    :param key: a key of a dict value, see module docstring
+    :param value:
+    :return:
+    """
+    if value is None:
+        return
+    elif key == '#text':
+        elm.text = value
+    elif key.startswith('@'):
+        elm.set(qname(key[1:]), value)
+    else:
+        append_element(elm, key, value)
+
+
+def _envelope():
+    """Returns the SOAP envelope and its body element
+
+    :return:
+    """
+    envelope = ET.Element(qname('soapenv:Envelope'))
+    return envelope, ET.SubElement(envelope, qname('soapenv:Body'))
+
+
+def _stuurgegevens(berichtcode: str, question: dict = None) -> dict:
+    """Returns the stuurgegevens of an answer, addressed to the zender of the question
+
+    The referentienummer and tijdstipBericht differ for every answer. They are only set for an answer to a question,
+    so that any other message only depends on its contents.
+
+    :param berichtcode:
+    :param question: the parsed question, if any
+    :return:
+    """
+    stuurgegevens = {
+        'StUF:berichtcode': berichtcode,
+        'StUF:zender': {
+            'StUF:organisatie': 'Amsterdam',
+            'StUF:applicatie': 'CGM',
+        },
+    }
+    if question:
+        stuurgegevens.update({
+            'StUF:ontvanger': {
+                'StUF:applicatie': question.get('applicatie'),
+                'StUF:gebruiker': question.get('gebruiker'),
+            },
+            'StUF:referentienummer': f"SIM{random.randrange(10 ** 12):012}",
+            'StUF:tijdstipBericht': datetime.datetime.now().strftime('%Y%m%d%H%M%S%f')[:17],
+            'StUF:crossRefnummer': question.get('referentienummer'),
+        })
+    return stuurgegevens
+
+
+def _to_string(envelope: ET.Element) -> bytes:
+    register_namespaces(NAMESPACES)
+    return ET.tostring(envelope, encoding='utf-8', xml_declaration=True)
+
+
+def answer_message(persons: list, question: dict = None) -> bytes:
+    """Returns the npsLa01 answer with persons
+
+    :param persons: the persons, as dicts
+    :param question: the parsed question, if any
+    :return:
+    """
+    envelope, body = _envelope()
+    append_element(body, 'BG:npsLa01', {
+        'BG:stuurgegevens': {**_stuurgegevens('La01', question), 'StUF:entiteittype': 'NPS'},
+        'BG:parameters': {
+            'StUF:indicatorVervolgvraag': 'false',
+        },
+        'BG:antwoord': {
+            'BG:object': persons,
+        },
+    })
+    return _to_string(envelope)
+
+
+def fault_message(code: str, question: dict = None) -> bytes:
+    """Returns the SOAP fault with an Fo02 message for code, as parsed by StufErrorResponse
+
+    :param code: the StUF error code, eg StUF003
+    :param question: the parsed question, if any
+    :return:
+    """
+    envelope, body = _envelope()
+    fault = ET.SubElement(body, qname('soapenv:Fault'))
+    ET.SubElement(fault, 'faultcode').text = 'soapenv:Server'
+    ET.SubElement(fault, 'faultstring').text = 'Proces voor afhandelen bericht geeft fout'
+    detail = ET.SubElement(fault, 'detail')
+    append_element(detail, 'StUF:Fo02Bericht', {
+        'StUF:stuurgegevens': _stuurgegevens('Fo02', question),
+        'StUF:body': {
+            'StUF:code': code,
+            'StUF:plek': 'server',
+            'StUF:omschrijving': FAULTS.get(code, code),
+        },
+    })
+    return _to_string(envelope)
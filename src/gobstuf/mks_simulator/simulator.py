@@ -0,0 +1,140 @@
+"""Local stand-in for MKS
+
+Answers npsLv01 questions from a Corpus of synthetic persons with npsLa01 answers, as MKS does. Latency, faults and
+unavailability are simulated at configurable rates, so that GOB-StUF can be load tested without access to MKS.
+"""
+import asyncio
+import random
+import xml.etree.ElementTree as ET
+
+from aiohttp import web
+
+from gobstuf.mks_simulator.corpus import Corpus
+from gobstuf.mks_simulator.messages import get_prefixed_tag, answer_message, fault_message
+from gobstuf.stuf.brp.mapping_plan import NAMESPACES
+
+# Criteria that MKS accepts on another element than the one that holds the value in the answer
+CRITERIA_PATHS = {
+    ('BG:gem.gemeenteCode',): ('BG:inp.gemeenteVanInschrijving',),
+}
+
+
+class StufSyntaxError(Exception):
+    pass
+
+
+def get_criteria(elm: ET.Element, path: tuple = ()):
+    """Yields the path and value of every element with a value in elm
+
+    :param elm: the BG:gelijk element of a question
+    :param path: the path of elm
+    :return:
+    """
+    for child in elm:
+        child_path = path + (get_prefixed_tag(child.tag),)
+        if len(child):
+            yield from get_criteria(child, child_path)
+        elif child.text and child.text.strip():
+            yield CRITERIA_PATHS.get(child_path, child_path), child.text.strip()
+
+
+def parse_question(body: bytes) -> dict:
+    """Parses an npsLv01 question
+
+    :param body: the SOAP message
+    :return: dict with the stuurgegevens, maximumAantal and criteria of the question
+    :raises: StufSyntaxError if the message is not an npsLv01 question
+    """
+    try:
+        root = ET.fromstring(body)
+    except ET.ParseError as e:
+        raise StufSyntaxError(str(e))
+
+    question = root.find('soapenv:Body/BG:npsLv01', NAMESPACES)
+    gelijk = None if question is None else question.find('BG:gelijk', NAMESPACES)
+    if gelijk is None:
+        raise StufSyntaxError("No npsLv01 question")
+
+    def findtext(path):
+        return question.findtext(path, namespaces=NAMESPACES)
+
+    maximum_aantal = findtext('BG:parameters/StUF:maximumAantal')
+    return {
+        'applicatie': findtext('BG:stuurgegevens/StUF:zender/StUF:applicatie'),
+        'gebruiker': findtext('BG:stuurgegevens/StUF:zender/StUF:gebruiker'),
+        'referentienummer': findtext('BG:stuurgegevens/StUF:referentienummer'),
+        'maximumAantal': int(maximum_aantal) if maximum_aantal and maximum_aantal.isdigit() else None,
+        'criteria': dict(get_criteria(gelijk)),
+    }
+
+
+class MKSSimulator:
+    """Serves npsLv01 questions over HTTP
+
+    Every request waits latency +/- jitter seconds. Then the request is answered with:
+    - status 503, at unavailable_rate
+    - a StUF011 fault, when the message is not an npsLv01 question
+    - a fault with one of fault_codes, at fault_rate
+    - the persons that match the question, at most maximumAantal (or max_answers if that is less).
+      The antwoord is empty when no person matches
+    """
+
+    def __init__(self, corpus: Corpus, latency: float = 0.0, jitter: float = 0.0, fault_rate: float = 0.0,
+                 fault_codes: list = None, unavailable_rate: float = 0.0, max_answers: int = None, seed: int = None):
+        """
+        :param corpus: the persons to answer from
+        :param latency: the mean response time in seconds
+        :param jitter: the maximum deviation from latency in seconds
+        :param fault_rate: the rate (0 - 1) of questions that are answered with a fault
+        :param fault_codes: the StUF error codes of these faults, one is chosen at random for every fault
+        :param unavailable_rate: the rate (0 - 1) of requests that are answered with status 503
+        :param max_answers: the maximum number of objects in an answer
+        :param seed: the seed of the random generator, for repeatable runs
+        """
+        self.corpus = corpus
+        self.latency = latency
+        self.jitter = jitter
+        self.fault_rate = fault_rate
+        self.fault_codes = fault_codes or ['StUF003', 'StUF010']
+        self.unavailable_rate = unavailable_rate
+        self.max_answers = max_answers
+        self.random = random.Random(seed)
+
+    def get_app(self) -> web.Application:
+        """Returns the web application, it answers POST requests on any path
+
+        :return:
+        """
+        app = web.Application()
+        app.router.add_post('/{path:.*}', self.handle)
+        return app
+
+    def get_delay(self) -> float:
+        return max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+
+    async def handle(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        await asyncio.sleep(self.get_delay())
+
+        if self.random.random() < self.unavailable_rate:
+            return web.Response(status=503, text="Service Unavailable")
+
+        status, message = self.answer(body)
+        return web.Response(status=status, body=message, content_type='text/xml', charset='utf-8')
+
+    def answer(self, body: bytes):
+        """Answers the question in body
+
+        :param body: the SOAP message
+        :return: tuple (status, SOAP message). Faults have status 500, as MKS returns them
+        """
+        try:
+            question = parse_question(body)
+        except StufSyntaxError:
+            return 500, fault_message('StUF011')
+
+        if self.random.random() < self.fault_rate:
+            return 500, fault_message(self.random.choice(self.fault_codes), question)
+
+        limit = min(filter(None, [question['maximumAantal'], self.max_answers]), default=None)
+        return 200, answer_message(self.corpus.search(question['criteria'], limit), question)
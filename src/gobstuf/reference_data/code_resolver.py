@@ -1,6 +1,8 @@
 import os
 import csv
 
+from gobstuf.reference_data.snapshot import get_sources, load_snapshot, save_snapshot
+
 
 class DataNotFoundException(Exception):
     pass
@@ -10,10 +12,54 @@ class DataItemNotFoundException(Exception):
     pass
 
 
+class ReferenceTable:
+    """Compact, read-only reference table
+
+    The rows are stored as tuples of strings, in the order of the fields. The index refers to the rows
+    by the value of the key field. Tables that are indexed on different fields share the same rows.
+
+    Compared to a dict per row this saves memory and it keeps the number of objects low, so that the pages holding
+    the table stay shared between forked workers.
+    """
+
+    def __init__(self, fields: tuple, rows: tuple, key_field: str):
+        """
+
+        :param fields: the names of the fields
+        :param rows: tuple of rows, every row is a tuple with a value for every field
+        :param key_field: the field to index the rows on
+        """
+        self.fields = fields
+        self.rows = rows
+
+        self._positions = {field: position for position, field in enumerate(fields)}
+        key = self._positions[key_field]
+        self._index = {row[key]: row for row in rows}
+
+    def __bool__(self):
+        return bool(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def get_value(self, key: str, field: str):
+        """Returns the value of field in the row with the given key
+
+        :param key:
+        :param field:
+        :raises KeyError: when no row exists for the key
+        :return:
+        """
+        return self._index[key][self._positions[field]]
+
+
 class CodeResolver:
 
     DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
 
+    # Snapshot of the parsed tables, see snapshot.py
+    SNAPSHOT = os.path.join(DATA_DIR, 'reference_data.snapshot')
+
     # Maps code on omschrijving
     CODE = 'code'
     DESCRIPTION = 'omschrijving'
@@ -52,31 +98,77 @@ class CodeResolver:
         }
     }
 
-    # Local dictionaries
-    _landen = {}
-    _gemeenten = {}
-    _gemeenten_omschrijving = {}
-    _adellijke_titel = {}
+    # The tables, by name
+    TABLES = {
+        'landen': LANDEN,
+        'gemeenten': GEMEENTEN,
+        'adellijke_titel': ADELLIJKE_TITEL,
+    }
+
+    # Local tables
+    _landen = None
+    _gemeenten = None
+    _gemeenten_omschrijving = None
+    _adellijke_titel = None
 
     @classmethod
     def initialize(cls):
         """
-        Load landen table at startup
+        Load the tables at startup
+
+        The tables are loaded from the snapshot. If no valid snapshot exists the tables are read from the CSV files
+        and a snapshot is saved for the next start
 
         :return:
         """
-        cls._gemeenten = cls._load_data(cls.GEMEENTEN, cls.CODE)
-        cls._gemeenten_omschrijving = cls._load_data(cls.GEMEENTEN, cls.DESCRIPTION)
-        cls._landen = cls._load_data(cls.LANDEN, cls.CODE)
-        cls._adellijke_titel = cls._load_data(cls.ADELLIJKE_TITEL, cls.DESCRIPTION)
+        tables = load_snapshot(cls.SNAPSHOT, cls._get_sources())
+        if tables is None:
+            tables = cls._read_tables()
+            save_snapshot(cls.SNAPSHOT, cls._get_sources(), tables)
+
+        cls._set_tables(tables)
 
     @classmethod
-    def _load_data(cls, config, key_field):
+    def build_snapshot(cls):
         """
-        Load reference data from internal data file
+        Read the tables from the CSV files and save the snapshot
+
+        :return: True if the snapshot has been saved
+        """
+        return save_snapshot(cls.SNAPSHOT, cls._get_sources(), cls._read_tables())
+
+    @classmethod
+    def _get_sources(cls):
+        try:
+            return get_sources([os.path.join(cls.DATA_DIR, config['table']) for config in cls.TABLES.values()])
+        except FileNotFoundError:
+            # The missing table is reported when the tables are read
+            return None
+
+    @classmethod
+    def _set_tables(cls, tables):
+        gemeenten = tables['gemeenten']
+        cls._gemeenten = ReferenceTable(*gemeenten, cls.CODE)
+        cls._gemeenten_omschrijving = ReferenceTable(*gemeenten, cls.DESCRIPTION)
+        cls._landen = ReferenceTable(*tables['landen'], cls.CODE)
+        cls._adellijke_titel = ReferenceTable(*tables['adellijke_titel'], cls.DESCRIPTION)
+
+    @classmethod
+    def _read_tables(cls):
+        """
+        Read all tables from the CSV files
+
+        :return: dictionary with (fields, rows) for every table
+        """
+        return {name: cls._read_table(config) for name, config in cls.TABLES.items()}
+
+    @classmethod
+    def _read_table(cls, config):
+        """
+        Read reference data from internal data file
 
         See README for details how to refresh the reference data
-        :return:
+        :return: tuple (fields, rows)
         """
         path = os.path.join(cls.DATA_DIR, config['table'])
         try:
@@ -85,22 +177,19 @@ class CodeResolver:
         except FileNotFoundError:
             raise DataNotFoundException(f"ERROR: Table {config['table']} not found")
 
-        data = {}
-        for line in lines[1:]:  # Skip header
-            code = line[config['fields'][key_field]]
-            data[code] = {
-                attr: line[index] for attr, index in config['fields'].items()
-            }
-        return data
+        fields = tuple(config['fields'])
+        indexes = tuple(config['fields'].values())
+        rows = tuple(tuple(line[index] for index in indexes) for line in lines[1:])  # Skip header
+        return fields, rows
 
     @classmethod
     def _get_dataitem(cls, data, key, value_field):
         """
         Get the value field for the given code
 
-        :param data: The dictionary to search in
+        :param data: The table to search in
         :param key: The key to look for
-        :param value_field: Which field to return from the dictionary
+        :param value_field: Which field to return from the table
         :return:
         """
         assert data, f"{cls.__name__} initialize method not called"
@@ -109,7 +198,7 @@ class CodeResolver:
             return
 
         try:
-            return data[key][value_field]
+            return data.get_value(key, value_field)
         except KeyError:
             raise DataItemNotFoundException(f"ERROR: {key} could not be found")
 
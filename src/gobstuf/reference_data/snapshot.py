@@ -0,0 +1,88 @@
+"""Snapshot of the reference data
+
+Reading the reference data CSV files (UTF-16) is relatively slow. The parsed tables are therefore stored in a
+snapshot file that is loaded at startup. The snapshot is built in the Docker image (see Dockerfile) or on first run.
+
+The snapshot records the size and modification time of the CSV files it was built from.
+When any of the CSV files has changed, the snapshot is ignored and the CSV files are read instead.
+
+Build the snapshot:
+
+    python -m gobstuf.reference_data.snapshot
+"""
+import logging
+import marshal
+import os
+
+SNAPSHOT_VERSION = 1
+
+
+def get_sources(paths: list) -> dict:
+    """Returns the size and modification time of the source files
+
+    :param paths:
+    :return:
+    """
+    sources = {}
+    for path in paths:
+        stat = os.stat(path)
+        sources[os.path.basename(path)] = (stat.st_size, stat.st_mtime_ns)
+    return sources
+
+
+def load_snapshot(path: str, sources: dict):
+    """Returns the tables from the snapshot, or None if the snapshot is missing, invalid or out of date
+
+    :param path: the path of the snapshot file
+    :param sources: the current sources, see get_sources
+    :return:
+    """
+    try:
+        with open(path, 'rb') as f:
+            # Read at once, marshal.load reads a file in small pieces
+            snapshot = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+    if not isinstance(snapshot, dict) or \
+            snapshot.get('version') != SNAPSHOT_VERSION or \
+            snapshot.get('sources') != sources:
+        return None
+    return snapshot['tables']
+
+
+def save_snapshot(path: str, sources: dict, tables: dict):
+    """Saves the tables in the snapshot file
+
+    The snapshot is written to a temporary file first, so that a concurrent reader never sees a partial snapshot.
+    Failures are logged and ignored; the tables are then read from the CSV files on the next start.
+
+    :param path: the path of the snapshot file
+    :param sources: the sources of the tables, see get_sources
+    :param tables: the tables to save
+    :return: True if the snapshot has been saved
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(marshal.dumps({'version': SNAPSHOT_VERSION, 'sources': sources, 'tables': tables}))
+        os.replace(tmp_path, path)
+        return True
+    except OSError as e:
+        logging.warning(f"Reference data snapshot {path} not saved: {str(e)}")
+        return False
+
+
+def build():
+    from gobstuf.reference_data.code_resolver import CodeResolver
+
+    if not CodeResolver.build_snapshot():
+        raise SystemExit(1)
+
+
+def init():
+    if __name__ == "__main__":
+        build()
+
+
+init()
@@ -0,0 +1,172 @@
+import io
+import sys
+
+from a2wsgi import WSGIMiddleware
+from flask import Flask, request, Response
+from werkzeug.exceptions import HTTPException
+
+from gobstuf.auth.routes import is_authorized
+from gobstuf.certrequest import close_async_session
+from gobstuf.config import ASGI_WSGI_THREADS
+
+
+def get_environ(scope: dict) -> dict:
+    """Returns the WSGI environ for the ASGI scope of an HTTP request without a body
+
+    :param scope:
+    :return:
+    """
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin1'),
+        'PATH_INFO': scope['path'].encode().decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = scope['client'][0], str(scope['client'][1])
+
+    for name, value in scope['headers']:
+        name, value = name.decode('latin1'), value.decode('latin1')
+        key = name.upper().replace('-', '_')
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = f'HTTP_{key}'
+        # Repeated headers are combined, as in WSGI
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+class AsyncRESTApplication:
+    """ASGI application for the Flask app
+
+    GET requests for the REST views are handled in the event loop. The views await the MKS request, so that a worker
+    serves many requests at the same time without a thread per request.
+
+    All other requests (the StUF proxy, batch requests, status and metrics) are handled by the Flask app as usual, in
+    a pool of threads.
+    """
+
+    def __init__(self, flask_app: Flask, routes: list):
+        """
+        :param flask_app:
+        :param routes: the REST routes, (rule, view function) pairs of StufRestViews
+        """
+        self.flask_app = flask_app
+        self.wsgi_app = WSGIMiddleware(flask_app, workers=ASGI_WSGI_THREADS)
+
+        # The view classes, by endpoint
+        self.views = {view_func.__name__: view_func.view_class for _, view_func in routes}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            environ = get_environ(scope)
+            view_class = self._get_view_class(environ)
+            if view_class is not None:
+                return await self._handle(environ, view_class, send)
+
+        return await self.wsgi_app(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        """Handles the startup and shutdown of the ASGI server
+
+        Connections to MKS are closed on shutdown
+
+        :param receive:
+        :param send:
+        :return:
+        """
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await close_async_session()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _get_view_class(self, environ: dict):
+        """Returns the class of the async view that handles the request, if any
+
+        :param environ:
+        :return:
+        """
+        try:
+            endpoint, _ = self.flask_app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            # Not found, redirects etc. are left to the Flask app
+            return None
+        return self.views.get(endpoint)
+
+    async def _handle(self, environ: dict, view_class, send):
+        """Handles the request in the request context of the Flask app, as Flask would do for a sync view
+
+        :param environ:
+        :param view_class:
+        :param send:
+        :return:
+        """
+        with self.flask_app.request_context(environ):
+            try:
+                response = self.flask_app.finalize_request(await self._full_dispatch(view_class))
+            except Exception as e:
+                response = self.flask_app.handle_exception(e)
+
+            try:
+                await self._send_response(environ, response, send)
+            finally:
+                response.close()
+
+    async def _full_dispatch(self, view_class):
+        """Returns the return value of the before request functions or else of the view
+
+        :param view_class:
+        :return:
+        """
+        try:
+            rv = self.flask_app.preprocess_request()
+            if rv is None:
+                rv = await self._dispatch(view_class)
+            return rv
+        except Exception as e:
+            return self.flask_app.handle_user_exception(e)
+
+    async def _dispatch(self, view_class):
+        """Checks access to the endpoint and awaits the view
+
+        :param view_class:
+        :return:
+        """
+        if not is_authorized(request.url_rule.rule, **request.view_args):
+            return "Forbidden", 403
+        return await view_class().get_async(**request.view_args)
+
+    async def _send_response(self, environ: dict, response: Response, send):
+        """Sends response, a streamed response is sent as it is generated
+
+        :param environ:
+        :param response:
+        :param send:
+        :return:
+        """
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': [(name.lower().encode('latin1'), value.encode('latin1'))
+                        for name, value in response.get_wsgi_headers(environ).items()],
+        })
+        for chunk in response.iter_encoded():
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
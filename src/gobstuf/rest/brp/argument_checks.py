@@ -5,11 +5,23 @@ Request argument checks are defined here
 import re
 import datetime
 
+from types import MappingProxyType
+
 from gobstuf.reference_data.code_resolver import CodeResolver, DataItemNotFoundException
 from gobstuf.stuf.message import WILDCARD_CHARS
 
 MIN_WILDCARD_LENGTH = 2
 
+# Defined at the module level so they're only compiled once
+_wildcard_chars = ''.join(WILDCARD_CHARS)
+wildcard_chars_match = re.compile(rf'[{_wildcard_chars}]')
+wildcard_position_match = re.compile(rf'^[{_wildcard_chars}]*[^{_wildcard_chars}]+[{_wildcard_chars}]*$')
+postcode_match = re.compile(r'^[1-9]{1}[0-9]{3}[A-Z]{2}$')
+integer_match = re.compile(r'^\d+$')
+alphabetic_match = re.compile(r'^[A-Za-z]+$')
+positive_integer_match = re.compile(r'^[1-9][0-9]*$')
+date_format_match = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
 
 def validate_date(value: str):
     try:
@@ -32,16 +44,14 @@ def validate_gemeentecode(value: str):
 def validate_wildcard_length(value: str):
     # Test if the value is a valid wildcard search when a wildcard is used, meaning it has at least 2 characters
     if any(wildcard in value for wildcard in WILDCARD_CHARS):
-        wildcard_regex = ''.join(WILDCARD_CHARS)
-        return len(re.sub(rf'[{wildcard_regex}]', '', value)) >= MIN_WILDCARD_LENGTH
+        return len(wildcard_chars_match.sub('', value)) >= MIN_WILDCARD_LENGTH
     return True
 
 
 def validate_wildcard_position(value: str):
     # Test if wildcards are at the beginning or end of the search string
     if any(wildcard in value for wildcard in WILDCARD_CHARS):
-        wildcard_regex = ''.join(WILDCARD_CHARS)
-        return re.match(rf'^[{wildcard_regex}]*[^{wildcard_regex}]+[{wildcard_regex}]*$', value)
+        return wildcard_position_match.match(value)
     return True
 
 
@@ -56,7 +66,7 @@ class ArgumentCheck():
     }
 
     is_postcode = {
-        'check': lambda v: re.match(r'^[1-9]{1}[0-9]{3}[A-Z]{2}$', v) is not None,
+        'check': lambda v: postcode_match.match(v) is not None,
         'msg': {
             "code": "pattern",
             "reason": "Waarde voldoet niet aan patroon ^[1-9]{1}[0-9]{3}[A-Z]{2}$."
@@ -64,7 +74,7 @@ class ArgumentCheck():
     }
 
     is_integer = {
-        'check': lambda v: re.match(r'^\d+$', v) is not None,
+        'check': lambda v: integer_match.match(v) is not None,
         'msg': {
             "code": "integer",
             "reason": "Waarde is geen geldige integer."
@@ -72,7 +82,7 @@ class ArgumentCheck():
     }
 
     is_alphabetic = {
-        'check': lambda v: re.match(r'^[A-Za-z]+$', v) is not None,
+        'check': lambda v: alphabetic_match.match(v) is not None,
         'msg': {
             "code": "alphabetic",
             "reason": "Waarde is geen geldige letter."
@@ -80,7 +90,7 @@ class ArgumentCheck():
     }
 
     is_positive_integer = {
-        'check': lambda v: re.match(r'^[1-9][0-9]*$', v) is not None,
+        'check': lambda v: positive_integer_match.match(v) is not None,
         'msg': {
             "code": "minimum",
             "reason": "Waarde is lager dan minimum 1."
@@ -88,7 +98,7 @@ class ArgumentCheck():
     }
 
     is_valid_date_format = {
-        'check': lambda v: re.match(r'^\d{4}-\d{2}-\d{2}$', v) is not None,
+        'check': lambda v: date_format_match.match(v) is not None,
         'msg': {
             "code": "invalidFormat",
             "reason": "Waarde voldoet niet aan het formaat YYYY-MM-DD",
@@ -157,9 +167,47 @@ class ArgumentCheck():
         :param value:
         :return:
         """
-        if not isinstance(checks, list):
+        if not isinstance(checks, (list, tuple)):
             # Accept a single check as value by converting it to a list
             checks = [checks]
         for check in checks:
             if not check['check'](value):
                 return check
+
+
+class ValidationPlan():
+    """The checks for the arguments of a request
+
+    The plan is created once per view and is not changed afterwards. Every argument gets its own checks, followed by
+    the wildcard checks when the argument accepts wildcards.
+    """
+
+    def __init__(self, parameter_checks: dict, parameter_wildcards, wildcard_checks: list):
+        """
+
+        :param parameter_checks: a check or list of checks by argument
+        :param parameter_wildcards: the arguments that accept wildcards
+        :param wildcard_checks: the checks for arguments that accept wildcards
+        """
+        plan = {}
+        for arg in [*parameter_checks, *parameter_wildcards]:
+            checks = parameter_checks.get(arg) or []
+            checks = tuple(checks if isinstance(checks, list) else [checks])
+            if arg in parameter_wildcards:
+                checks += tuple(wildcard_checks)
+            if checks:
+                plan[arg] = checks
+        self.checks = MappingProxyType(plan)
+
+    def validate(self, arg: str, value: str):
+        """
+        Validate the value of arg against its checks
+        The first failing check is returned, or None if all checks pass or arg has no checks
+
+        :param arg:
+        :param value:
+        :return:
+        """
+        checks = self.checks.get(arg)
+        if checks:
+            return ArgumentCheck.validate(checks, value)
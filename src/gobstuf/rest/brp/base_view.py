@@ -1,20 +1,49 @@
+import json
 import traceback
 import logging
 
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 from flask.views import MethodView
-from flask import g, request
+from flask import g, request, Response, copy_current_request_context
 from requests.exceptions import HTTPError
 from abc import abstractmethod
 
-from gobstuf.certrequest import cert_post
+from gobstuf.certrequest import cert_post, cert_post_async
+from gobstuf.lib.circuitbreaker import CircuitOpenException
+from gobstuf.lib.singleflight import SingleFlight, AsyncSingleFlight
+from gobstuf.lib.stream import SharedChunks
 from gobstuf.auth.routes import MKS_USER_KEY, MKS_APPLICATION_KEY
 from gobstuf.stuf.brp.base_request import StufRequest
 from gobstuf.stuf.brp.base_response import StufMappedResponse
 from gobstuf.stuf.exception import NoStufAnswerException
 from gobstuf.stuf.brp.error_response import StufErrorResponse, UnknownErrorCode
 from gobstuf.rest.brp.rest_response import RESTResponse
-from gobstuf.config import ROUTE_SCHEME, ROUTE_NETLOC, ROUTE_PATH_310, CORRELATION_ID_HEADER
-from gobstuf.rest.brp.argument_checks import ArgumentCheck
+from gobstuf.config import ROUTE_SCHEME, ROUTE_NETLOC, ROUTE_PATH_310, CORRELATION_ID_HEADER, MKS_SINGLE_FLIGHT, \
+    BATCH_MAX_SIZE, BATCH_CONCURRENCY, STUF_STREAMING_PARSER, REST_STREAMING_RESPONSE
+from gobstuf.rest.brp.argument_checks import ArgumentCheck, ValidationPlan
+from gobstuf.metrics import RESPONSE_CACHE_REQUESTS, RequestMetrics, current_request_metrics, stage
+
+
+def _share_mks_response(response, callers: int):
+    """Every request that shares a streamed MKS response reads its body, see StufRestView._post_request
+
+    :param response:
+    :param callers: the number of requests that share the response
+    :return:
+    """
+    chunks = getattr(response, 'chunks', None)
+    if chunks is not None:
+        chunks.share(callers)
+
+
+# Concurrent identical MKS requests within a worker share one upstream call
+mks_requests = SingleFlight(on_result=_share_mks_response)
+async_mks_requests = AsyncSingleFlight()
+
+# The lookups of all batch requests within a worker share these threads, at most BATCH_CONCURRENCY lookups run at the
+# same time. The threads are started on first use, after the worker has been forked
+batch_lookups = ThreadPoolExecutor(max_workers=max(1, BATCH_CONCURRENCY), thread_name_prefix='batch_lookup')
 
 
 class StufRestView(MethodView):
@@ -35,24 +64,113 @@ class StufRestView(MethodView):
 
     WILDCARD_CHECKS = [ArgumentCheck.has_min_wildcard_length, ArgumentCheck.is_valid_wildcard_position]
 
+    # Optional cache (TTLCache) for successful responses
+    response_cache = None
+
+    # Validation plans, by view class
+    _validation_plans = {}
+
+    # The request arguments that have been parsed by _get_request_args
+    _request_args_source = None
+
     def get(self, **kwargs):
+        metrics = RequestMetrics()
+        with metrics.activate():
+            response = self._handle_get(**kwargs)
+        return self._observe(metrics, response)
+
+    async def get_async(self, **kwargs):
+        """Handles the GET request like get, but awaits the MKS request instead of blocking the worker
+
+        Used by the ASGI application, see gobstuf.rest.asgi
+
+        :param kwargs:
+        :return:
+        """
+        metrics = RequestMetrics()
+        with metrics.activate():
+            response = await self._handle_get_async(**kwargs)
+        return self._observe(metrics, response)
+
+    def _observe(self, metrics: RequestMetrics, response: Response, view: str = None):
+        """Observes the metrics of the request once the response is complete
+
+        :param metrics:
+        :param response:
+        :param view: the name of the view in the metrics, default the name of this view
+        :return:
+        """
+        view = view or self.__class__.__name__
+        if response.is_streamed:
+            # The body is generated after the view has returned, the metrics are complete when the response is closed
+            response.response = metrics.iterate(response.response)
+            response.call_on_close(lambda: metrics.observe(view, response.status_code))
+        else:
+            metrics.observe(view, response.status_code)
+        return response
+
+    def _handle_get(self, **kwargs):
+        errors = self._get_validation_errors(**kwargs)
+        if errors:
+            return RESTResponse.bad_request(**errors)
+
+        return self.lookup(g.get(MKS_USER_KEY), g.get(MKS_APPLICATION_KEY), request.args, **kwargs)
+
+    def lookup(self, mks_user: str, mks_application: str, args, **kwargs) -> Response:
+        """Looks up the resource for the URL parameters and returns the REST response, the request has been validated
+
+        The MKS gebruiker and applicatie and the query arguments are passed explicitly, so that StufRestBatchView can
+        do its lookups in worker threads, that have a copy of the request context but not its g
+
+        :param mks_user: the MKS gebruiker
+        :param mks_application: the MKS applicatie
+        :param args: the query arguments
+        :param kwargs: Dictionary with URL parameters
+        :return:
+        """
+        try:
+            return self._get(mks_user, mks_application, args, **kwargs)
+        except CircuitOpenException as e:
+            return RESTResponse.service_unavailable(retry_after=e.retry_after)
+        except Exception:
+            return self._request_failed()
+
+    async def _handle_get_async(self, **kwargs):
+        errors = self._get_validation_errors(**kwargs)
+        if errors:
+            return RESTResponse.bad_request(**errors)
+
         try:
-            errors = self._validate(**kwargs)
+            return await self._get_async(g.get(MKS_USER_KEY), g.get(MKS_APPLICATION_KEY), request.args, **kwargs)
+        except CircuitOpenException as e:
+            return RESTResponse.service_unavailable(retry_after=e.retry_after)
+        except Exception:
+            return self._request_failed()
+
+    def _get_validation_errors(self, **kwargs) -> dict:
+        """Validates the request, returns the errors if the request is invalid
+
+        :param kwargs:
+        :return:
+        """
+        try:
+            with stage('validate'):
+                errors = self._validate(**kwargs)
         except StufRestFilterView.InvalidQueryParametersException as e:
             errors = e.err
 
         assert getattr(self, '_validate_called', False), \
             f"Make sure to call super()._validate() from children of {self.__class__}"
+        return errors
 
-        if errors:
-            return RESTResponse.bad_request(**errors)
+    def _request_failed(self):
+        """Logs the exception that is being handled and returns an internal server error
 
-        try:
-            return self._get(**kwargs)
-        except Exception:
-            logging.error(f"ERROR: Request failed:")
-            logging.error(traceback.format_exc())
-            return RESTResponse.internal_server_error()
+        :return:
+        """
+        logging.error(f"ERROR: Request failed:")
+        logging.error(traceback.format_exc())
+        return RESTResponse.internal_server_error()
 
     def _validate_request_args(self, **kwargs):
         """
@@ -92,24 +210,42 @@ class StufRestView(MethodView):
         :param value:
         :return:
         """
-        checks = self.request_template.parameter_checks.get(arg)
-
-        # If the argument is allowed to have a wildcard, check if the wildcard search is valid
-        if arg in self.request_template.parameter_wildcards:
-            if checks:
-                checks.extend(self.WILDCARD_CHECKS)
-            else:
-                checks = self.WILDCARD_CHECKS
-
-        if not checks:
-            return
-        error = ArgumentCheck.validate(checks, value)
+        error = self._get_validation_plan().validate(arg, value)
         if error:
             return {
                 'name': arg,
                 **error['msg'],
             }
 
+    @classmethod
+    def _get_validation_plan(cls) -> ValidationPlan:
+        """Returns the validation plan for the request arguments of this view
+
+        The plan is created on first use and shared by all requests for this view. If the argument is allowed to
+        have a wildcard, the plan also checks if the wildcard search is valid
+
+        :return:
+        """
+        plan = cls._validation_plans.get(cls)
+        if plan is None:
+            plan = ValidationPlan(cls.request_template.parameter_checks,
+                                  cls.request_template.parameter_wildcards,
+                                  cls.WILDCARD_CHECKS)
+            plan = cls._validation_plans.setdefault(cls, plan)
+        return plan
+
+    def _get_request_args(self) -> dict:
+        """Returns the request arguments with their values transformed by _transform_query_parameter_value
+
+        The request arguments are parsed once per request
+
+        :return:
+        """
+        if self._request_args_source is not request.args:
+            self._request_args = {k: self._transform_query_parameter_value(v) for k, v in request.args.items()}
+            self._request_args_source = request.args
+        return self._request_args
+
     def _request_template_parameters(self, **kwargs):
         """Return kwargs by default. Childs may override this
 
@@ -154,49 +290,231 @@ class StufRestView(MethodView):
 
         return {}
 
-    def _get_functional_query_parameters(self):
-        return {k: self._transform_query_parameter_value(request.args.get(k, v))
+    def _get_functional_query_parameters(self, args=None):
+        """Returns the functional query parameters, with their default value when they are not in args
+
+        :param args: the query arguments, default the parsed arguments of this request
+        :return:
+        """
+        args = self._get_request_args() if args is None else args
+        return {k: self._transform_query_parameter_value(args.get(k, v))
                 for k, v in self.functional_query_parameters.items()}
 
-    def _get_wildcard_query_parameters(self):
-        wildcards = {wildcard_mapping: request.args.get(wildcard_arg)
+    def _get_wildcard_query_parameters(self, args=None):
+        """Returns the wildcard query parameters in args, by the attribute that they search on
+
+        :param args: the query arguments, default the arguments of this request
+        :return:
+        """
+        args = request.args if args is None else args
+        wildcards = {wildcard_mapping: args.get(wildcard_arg)
                      for wildcard_arg, wildcard_mapping in self.request_template.parameter_wildcards.items()
-                     if wildcard_arg in request.args}
+                     if wildcard_arg in args}
         return {'wildcards': wildcards}
 
-    def _get(self, **kwargs):
+    def _get(self, mks_user: str, mks_application: str, args, **kwargs):
+        """Returns the cached response if this view has a response cache and the response is cached.
+
+        Otherwise the response is requested and cached when successful.
+
+        :param mks_user:
+        :param mks_application:
+        :param args: the query arguments
+        :param kwargs: Dictionary with URL parameters
+        :return:
+        """
+        if self.response_cache is None:
+            return self._get_response(mks_user, mks_application, args, **kwargs)
+
+        key = self._response_cache_key(mks_application, **kwargs)
+        response = self._get_cached_response(key)
+        if response is None:
+            response = self._cache_response(key, self._get_response(mks_user, mks_application, args, **kwargs))
+        return response
+
+    async def _get_async(self, mks_user: str, mks_application: str, args, **kwargs):
+        """Async variant of _get
+
+        :param mks_user:
+        :param mks_application:
+        :param args: the query arguments
+        :param kwargs: Dictionary with URL parameters
+        :return:
+        """
+        if self.response_cache is None:
+            return await self._get_response_async(mks_user, mks_application, args, **kwargs)
+
+        key = self._response_cache_key(mks_application, **kwargs)
+        response = self._get_cached_response(key)
+        if response is None:
+            response = self._cache_response(key,
+                                            await self._get_response_async(mks_user, mks_application, args, **kwargs))
+        return response
+
+    def _get_cached_response(self, key):
+        """Returns the cached response for key, or None when the response is not cached
+
+        :param key:
+        :return:
+        """
+        cached = self.response_cache.get(key)
+        RESPONSE_CACHE_REQUESTS.labels(view=self.__class__.__name__, result='miss' if cached is None else 'hit').inc()
+
+        if cached is not None:
+            data, status, headers = cached
+            return Response(data, status=status, headers=headers)
+
+    def _cache_response(self, key, response: Response):
+        """Caches response when it is successful, and returns response
+
+        :param key:
+        :param response:
+        :return:
+        """
+        if response.status_code == 200 and not response.is_streamed:
+            cached = (response.get_data(), response.status_code, list(response.headers))
+            self.response_cache.set(key, cached)
+        return response
+
+    def _response_cache_key(self, mks_application: str, **kwargs):
+        """Returns the key of the response in the response cache.
+
+        The response depends on the view (the request and response class), the URL parameters (eg the BSN), the
+        query parameters and host (used in the links) and on the MKS application (the role of the user). A response
+        is never shared between roles.
+
+        :param mks_application:
+        :param kwargs: Dictionary with URL parameters
+        :return:
+        """
+        return (
+            self.__class__,
+            mks_application,
+            tuple(sorted(kwargs.items())),
+            request.url
+        )
+
+    def _get_response(self, mks_user: str, mks_application: str, args, **kwargs):
         """kwargs contains the URL parameters, for example {'bsn': xxxx'} when the requested resource is
         /brp/ingeschrevenpersonen/<bsn>
 
+        :param mks_user:
+        :param mks_application:
+        :param args: the query arguments
         :param kwargs: Dictionary with URL parameters
         :return:
         """
+        request_template = self._get_request_template(mks_user, mks_application, **kwargs)
+        with stage('mks'):
+            response = self._make_request(request_template, mks_user, mks_application)
+        return self._handle_mks_response(response, args, **kwargs)
 
-        # Request MKS with given request_template
-        request_template = self.request_template(
-            g.get(MKS_USER_KEY),
-            g.get(MKS_APPLICATION_KEY),
-            correlation_id=request.headers.get(CORRELATION_ID_HEADER)
-        )
-        request_template.set_values(self._request_template_parameters(**kwargs))
+    async def _get_response_async(self, mks_user: str, mks_application: str, args, **kwargs):
+        """Async variant of _get_response
 
-        response = self._make_request(request_template)
+        :param mks_user:
+        :param mks_application:
+        :param args: the query arguments
+        :param kwargs: Dictionary with URL parameters
+        :return:
+        """
+        request_template = self._get_request_template(mks_user, mks_application, **kwargs)
+        with stage('mks'):
+            response = await self._make_request_async(request_template, mks_user, mks_application)
+        return self._handle_mks_response(response, args, **kwargs)
+
+    def _get_request_template(self, mks_user: str, mks_application: str, **kwargs) -> StufRequest:
+        """Returns the MKS request for the URL parameters and query parameters of this request
 
+        :param mks_user:
+        :param mks_application:
+        :param kwargs: Dictionary with URL parameters
+        :return:
+        """
+        with stage('request'):
+            request_template = self.request_template(
+                mks_user,
+                mks_application,
+                correlation_id=request.headers.get(CORRELATION_ID_HEADER)
+            )
+            request_template.set_values(self._request_template_parameters(**kwargs))
+        return request_template
+
+    def _handle_mks_response(self, response, args, **kwargs):
+        """Maps the MKS response to the REST response
+
+        A streamed MKS response is released as soon as the REST response is done with it, see _release_mks_response
+
+        :param response: the MKS response
+        :param args: the query arguments
+        :param kwargs: Dictionary with URL parameters
+        :return:
+        """
+        if not STUF_STREAMING_PARSER:
+            return self._map_mks_response(response, args, **kwargs)
+
+        metrics = current_request_metrics()
+        try:
+            rest_response = self._map_mks_response(response, args, **kwargs)
+        except Exception:
+            self._release_mks_response(response, metrics)
+            raise
+
+        if rest_response.is_streamed:
+            # The MKS response is read while the REST response is sent
+            rest_response.call_on_close(lambda: self._release_mks_response(response, metrics))
+        else:
+            self._release_mks_response(response, metrics)
+        return rest_response
+
+    def _map_mks_response(self, response, args, **kwargs):
+        """Maps the MKS response to the REST response
+
+        :param response: the MKS response
+        :param args: the query arguments
+        :param kwargs: Dictionary with URL parameters
+        :return:
+        """
         try:
             response.raise_for_status()
         except HTTPError:
             # Received error status code from MKS (always 500)
-            response_obj = StufErrorResponse(response.text)
+            response_obj = StufErrorResponse(self._get_content(response))
             return self._error_response(response_obj)
 
         # Map MKS response back to REST response. Include the path parameters to the response
-        response_obj = self.response_template(response.text,
-                                              **self._get_functional_query_parameters(),
-                                              **self._get_wildcard_query_parameters(),
+        # A streamed MKS response is parsed while it is read, the XML parser decodes the raw bytes
+        content = response.chunks if STUF_STREAMING_PARSER else self._get_content(response)
+        response_obj = self.response_template(content,
+                                              streaming_parser=STUF_STREAMING_PARSER,
+                                              **self._get_functional_query_parameters(args),
+                                              **self._get_wildcard_query_parameters(args),
                                               **kwargs)
 
         return self._build_response(response_obj, **kwargs)
 
+    def _release_mks_response(self, response, metrics: RequestMetrics):
+        """Releases the streamed MKS response for this request
+
+        The connection is returned to the pool once every request that shares the response has released it
+
+        :param response:
+        :param metrics: the metrics of this request
+        :return:
+        """
+        metrics.mks_response_size = response.chunks.size
+        response.chunks.release()
+
+    def _get_content(self, response) -> bytes:
+        """Returns the complete body of the MKS response
+
+        :param response:
+        :return:
+        """
+        content = b''.join(response.chunks) if STUF_STREAMING_PARSER else response.content
+        current_request_metrics().mks_response_size = len(content)
+        return content
+
     def _build_response(self, response_obj: StufMappedResponse, **kwargs):
         """Return single object response by default
 
@@ -210,13 +528,57 @@ class StufRestView(MethodView):
             data = response_obj.get_answer_object()
         except NoStufAnswerException:
             # Return 404, answer section is empty
+            current_request_metrics().objects = 0
             return RESTResponse.not_found(detail=self.get_not_found_message(**kwargs))
         else:
+            current_request_metrics().objects = 1
             return RESTResponse.ok(data)
 
-    def _make_request(self, request_template: StufRequest):
+    def _make_request(self, request_template: StufRequest, mks_user: str, mks_application: str):
         """Makes the MKS request
 
+        Concurrent requests that ask MKS the same question for the same MKS gebruiker and applicatie share one MKS
+        request and its response (for example a person and its partners, ouders and kinderen that are requested at
+        the same time). Only the referentienummer of the first request is sent to MKS.
+
+        :param request_template:
+        :param mks_user:
+        :param mks_application:
+        :return:
+        """
+        if not MKS_SINGLE_FLIGHT:
+            return self._post_request(request_template)
+
+        return mks_requests.do(self._single_flight_key(request_template, mks_user, mks_application),
+                               self._post_request, request_template)
+
+    async def _make_request_async(self, request_template: StufRequest, mks_user: str, mks_application: str):
+        """Async variant of _make_request
+
+        :param request_template:
+        :param mks_user:
+        :param mks_application:
+        :return:
+        """
+        if not MKS_SINGLE_FLIGHT:
+            return await self._post_request_async(request_template)
+
+        return await async_mks_requests.do(self._single_flight_key(request_template, mks_user, mks_application),
+                                           self._post_request_async, request_template)
+
+    def _single_flight_key(self, request_template: StufRequest, mks_user: str, mks_application: str):
+        """Returns the key that identifies identical MKS requests
+
+        :param request_template:
+        :param mks_user:
+        :param mks_application:
+        :return:
+        """
+        return mks_user, mks_application, request_template.fingerprint()
+
+    def _get_post_args(self, request_template: StufRequest) -> tuple:
+        """Returns the url and the data and headers of the MKS request
+
         :param request_template:
         :return:
         """
@@ -226,7 +588,43 @@ class StufRestView(MethodView):
         }
         url = f'{ROUTE_SCHEME}://{ROUTE_NETLOC}{ROUTE_PATH_310}'
 
-        return cert_post(url, data=request_template.to_string(), headers=soap_headers)
+        with stage('request'):
+            data = request_template.to_string()
+
+        return url, {'data': data, 'headers': soap_headers}
+
+    async def _post_request_async(self, request_template: StufRequest):
+        """Posts the request to MKS, without blocking the event loop
+
+        The response body has been read completely. With STUF_STREAMING_PARSER the body is parsed from its chunks,
+        as in _post_request
+
+        :param request_template:
+        :return:
+        """
+        url, kwargs = self._get_post_args(request_template)
+        response = await cert_post_async(url, **kwargs)
+        # The body is in memory already, any number of requests that share the response may read it
+        response.chunks = SharedChunks([response.content], readers=None)
+        return response
+
+    def _post_request(self, request_template: StufRequest):
+        """Posts the request to MKS
+
+        :param request_template:
+        :return:
+        """
+        url, kwargs = self._get_post_args(request_template)
+        if not STUF_STREAMING_PARSER:
+            return cert_post(url, **kwargs)
+
+        # Return as soon as the headers have been received. The body is read while it is parsed and is shared with any
+        # requests that wait for this request, see _share_mks_response. The connection is returned to the pool once
+        # all of them have released the response
+        response = cert_post(url, stream=True, **kwargs)
+        response.chunks = SharedChunks(response.iter_content(self.response_template.parser_chunk_size),
+                                       on_close=response.close)
+        return response
 
     def _error_response(self, response_obj: StufErrorResponse):
         """Builds the error response based on the error response received from MKS
@@ -369,17 +767,53 @@ class StufRestFilterView(StufRestView):
             ]
         }
 
+        With REST_STREAMING_RESPONSE the objects are sent as soon as they have been mapped and filtered, see
+        _stream_answer_objects
+
         :param response_obj:
         :param kwargs:
         :return:
         """
+        if REST_STREAMING_RESPONSE:
+            return RESTResponse.ok_stream(self.name, self._stream_answer_objects(response_obj), {})
+
         data = response_obj.get_all_answer_objects()
+        current_request_metrics().objects = len(data)
         return RESTResponse.ok({
             '_embedded': {
                 self.name: data,
             }
         }, {})
 
+    def _stream_answer_objects(self, response_obj: StufMappedResponse):
+        """Returns an iterator over the answer objects of response_obj
+
+        The first object is requested before the response is sent. Any error up to the first object (eg an
+        invalid MKS response) still results in an error response. A later error aborts the response.
+
+        :param response_obj:
+        :return:
+        """
+        objects = response_obj.iter_answer_objects()
+        first = next(objects, None)
+
+        def generate():
+            count = 0
+            try:
+                if first is not None:
+                    count += 1
+                    yield first
+                for obj in objects:
+                    count += 1
+                    yield obj
+            except Exception:
+                logging.error(f"ERROR: Streamed response failed after {count} objects:")
+                logging.error(traceback.format_exc())
+                raise
+            current_request_metrics().objects = count
+
+        return generate()
+
     def _get_query_parameters(self) -> dict:
         """Returns the query parameters as k:v pairs. Returns only the parameters that are in the first matching
         combination in query_parameter_combinations.
@@ -396,14 +830,13 @@ class StufRestFilterView(StufRestView):
 
         :return:
         """
+        request_args = self._get_request_args()
         for combination in self.query_parameter_combinations:
-            args = {arg: self._transform_query_parameter_value(request.args.get(arg)) for arg in combination}
+            args = {arg: request_args.get(arg) for arg in combination}
             if all(args.values()):
                 # Get all optional query parameters with their values
-                optional_args = {k: v for k, v in {
-                    arg: self._transform_query_parameter_value(request.args.get(arg))
-                    for arg in self.optional_query_parameters
-                }.items() if v}
+                optional_args = {arg: request_args[arg]
+                                 for arg in self.optional_query_parameters if request_args.get(arg)}
 
                 return {
                     **args,
@@ -439,3 +872,152 @@ class StufRestFilterView(StufRestView):
         def __init__(self, err=None):
             self.err = err
             super().__init__()
+
+
+class StufRestBatchView(MethodView):
+    """StufRestBatchView
+
+    Handles a POST request with a list of values. Every value is looked up with the item_view, as the item view looks
+    up a GET request for the value with the query parameters of the POST request. The lookups are done
+    concurrently by the executor, that is shared by all batch requests in the worker and bounds the number of lookups
+    that run at the same time. Their metrics are published for the view `<name of the batch view>.<item_name>`.
+
+    The result is one HAL document with the status and result (or error) of every lookup.
+
+    Example, with values_name = 'burgerservicenummers' and item_parameter = 'bsn':
+
+    POST {"burgerservicenummers": ["123456789", "987654321"]}
+
+    _embedded: {
+        name: [
+            {"bsn": "123456789", "status": 200, item_name: { item view response }},
+            {"bsn": "987654321", "status": 404, "fout": { item view error response }},
+        ]
+    }
+    """
+
+    # Maximum number of values in one request
+    max_size = BATCH_MAX_SIZE
+
+    # Runs the lookups of all batch requests, with at most BATCH_CONCURRENCY lookups at the same time
+    executor = batch_lookups
+
+    def post(self):
+        values = self._get_values()
+        if not isinstance(values, list):
+            # Error response
+            return values
+
+        # The lookups run in other threads, with a copy of the request context. The copy has its own g
+        mks_user, mks_application = g.get(MKS_USER_KEY), g.get(MKS_APPLICATION_KEY)
+        lookups = [copy_current_request_context(partial(self._lookup, mks_user, mks_application, value))
+                   for value in values]
+
+        responses = list(self.executor.map(lambda lookup: lookup(), lookups))
+
+        return RESTResponse.ok({
+            '_embedded': {
+                self.name: [self._item_result(value, response) for value, response in zip(values, responses)]
+            }
+        })
+
+    def _get_values(self):
+        """Returns the list of values from the request body, or a bad request response when the body is invalid
+
+        :return:
+        """
+        body = request.get_json(silent=True)
+        values = body.get(self.values_name) if isinstance(body, dict) else None
+
+        if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+            return RESTResponse.bad_request(
+                title="De request body is niet correct.",
+                detail=f"Geef een lijst met {self.values_name} op.",
+                code="paramsValidation"
+            )
+        elif not 0 < len(values) <= self.max_size:
+            return RESTResponse.bad_request(
+                title="De request body is niet correct.",
+                detail=f"Geef minimaal 1 en maximaal {self.max_size} {self.values_name} op.",
+                code="paramsValidation"
+            )
+        return values
+
+    def _lookup(self, mks_user: str, mks_application: str, value: str) -> Response:
+        """Validates and looks up value with the item view
+
+        :param mks_user: the MKS gebruiker of the POST request
+        :param mks_application: the MKS applicatie of the POST request
+        :param value:
+        :return: the response of the item view
+        """
+        view = self.item_view()
+        kwargs = {self.item_parameter: value}
+
+        metrics = RequestMetrics()
+        with metrics.activate():
+            errors = view._get_validation_errors(**kwargs)
+            response = RESTResponse.bad_request(**errors) if errors else \
+                view.lookup(mks_user, mks_application, request.args, **kwargs)
+        return view._observe(metrics, response, f"{self.__class__.__name__}.{self.item_name}")
+
+    def _item_result(self, value: str, response: Response):
+        """Returns the result for value in the batch response
+
+        :param value:
+        :param response: the response of the item view
+        :return:
+        """
+        status = response.status_code
+        data = json.loads(response.get_data())
+        response.close()
+        return {
+            self.item_parameter: value,
+            'status': status,
+            self.item_name if status == 200 else 'fout': data,
+        }
+
+    @property
+    @abstractmethod
+    def item_view(self):
+        """The StufRestView that handles the lookup of a single value
+
+        :return:
+        """
+        pass  # pragma: no cover
+
+    @property
+    @abstractmethod
+    def item_parameter(self):
+        """The URL parameter of the item view that receives the value, for example 'bsn'
+
+        :return:
+        """
+        pass  # pragma: no cover
+
+    @property
+    @abstractmethod
+    def item_name(self):
+        """The name of a successful result, for example 'ingeschrevenpersoon'
+
+        :return:
+        """
+        pass  # pragma: no cover
+
+    @property
+    @abstractmethod
+    def values_name(self):
+        """The name of the list of values in the request body, for example 'burgerservicenummers'
+
+        :return:
+        """
+        pass  # pragma: no cover
+
+    @property
+    @abstractmethod
+    def name(self):
+        """The name of the list of results in the batch response
+
+        :return:
+        """
+        pass  # pragma: no cover
@@ -3,10 +3,13 @@ Formatting of all REST responses
 
 """
 import json
+import math
 
-from flask import Response, request
+from flask import Response, request, stream_with_context
 from flask_api import status as http_status
 
+from gobstuf.metrics import stage
+
 
 class RESTResponse():
 
@@ -19,7 +22,39 @@ class RESTResponse():
         :param kwargs:
         :return:
         """
-        return Response(response=json.dumps(data), **kwargs)
+        with stage('serialize'):
+            return Response(response=json.dumps(data), **kwargs)
+
+    @classmethod
+    def _json_stream_response(cls, data, name, objects, **kwargs):
+        """
+        JSON response that is sent while it is generated
+
+        data is serialized as data['_embedded'][name] = list(objects), but every object is serialized and sent as
+        soon as it is produced. The output is the same as the output of _json_response.
+
+        :param data: the response data, without the objects
+        :param name: the name of the list of objects in _embedded
+        :param objects: iterable of objects
+        :param kwargs:
+        :return:
+        """
+        envelope = json.dumps({**data, '_embedded': {name: []}})
+        # _embedded is the last key, so the last empty list in the envelope is the list of objects
+        split = envelope.rindex('[]') + 1
+        head, tail = envelope[:split], envelope[split:]
+
+        def generate():
+            yield head
+            separator = ''
+            for obj in objects:
+                with stage('serialize'):
+                    chunk = separator + json.dumps(obj)
+                separator = ', '
+                yield chunk
+            yield tail
+
+        return Response(response=stream_with_context(generate()), **kwargs)
 
     @classmethod
     def _client_error_response(cls, data, status, **kwargs):
@@ -39,6 +74,7 @@ class RESTResponse():
             403: {'code': 'autorisation',   'description': 'Forbidden',             'sec': '10.4.4'},
             404: {'code': 'notFound',       'description': 'Not Found',             'sec': '10.4.5'},
             500: {'code': 'serverError',    'description': 'Internal Server Error', 'sec': '10.5.1'},
+            503: {'code': 'notAvailable',   'description': 'Service Unavailable',   'sec': '10.5.4'},
         }[status]
 
         sec = f'{status_info["sec"]} {status} {status_info["description"]}'
@@ -89,6 +125,25 @@ class RESTResponse():
                                   content_type='application/hal+json',
                                   status=http_status.HTTP_200_OK)
 
+    @classmethod
+    def ok_stream(cls, name, objects, links=None):
+        """
+        An OK response that returns the objects in _embedded[name] in HAL JSON format
+
+        The response is streamed. Every object is sent as soon as it is produced by objects
+
+        :param name:
+        :param objects: iterable of objects
+        :param links:
+        :return:
+        """
+        hal_data = cls._hal({}, links)
+        return cls._json_stream_response(data=hal_data,
+                                         name=name,
+                                         objects=objects,
+                                         content_type='application/hal+json',
+                                         status=http_status.HTTP_200_OK)
+
     @classmethod
     def bad_request(cls, **kwargs):
         """
@@ -143,3 +198,24 @@ class RESTResponse():
             **kwargs
         }
         return cls._client_error_response(data=data, status=http_status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @classmethod
+    def service_unavailable(cls, retry_after: float = None, **kwargs):
+        """
+        Service Unavailable: The server is currently unable to handle the request due to a temporary overloading or
+        maintenance of the server
+
+        :param retry_after: optional number of seconds after which the request may be repeated
+        :param kwargs:
+        :return:
+        """
+        data = {
+            "title": "MKS is tijdelijk niet beschikbaar.",
+            "detail": "The server is currently unable to handle the request due to a temporary overloading or "
+                      "maintenance of the server.",
+            **kwargs
+        }
+        response = cls._client_error_response(data=data, status=http_status.HTTP_503_SERVICE_UNAVAILABLE)
+        if retry_after is not None:
+            response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response
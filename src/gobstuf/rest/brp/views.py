@@ -1,4 +1,6 @@
-from gobstuf.rest.brp.base_view import StufRestView, StufRestFilterView
+from gobstuf.config import RESPONSE_CACHE_MAXSIZE, RESPONSE_CACHE_TTL
+from gobstuf.lib.cache import TTLCache, next_midnight
+from gobstuf.rest.brp.base_view import StufRestView, StufRestFilterView, StufRestBatchView
 from gobstuf.stuf.brp.request.ingeschrevenpersonen import (
     IngeschrevenpersonenBsnStufRequest,
     IngeschrevenpersonenBsnPartnerStufRequest,
@@ -16,6 +18,10 @@ from gobstuf.stuf.brp.response.ingeschrevenpersonen import (
     IngeschrevenpersonenStufKinderenDetailResponse
 )
 
+# Shared by the BSN views. Entries expire at midnight because of date dependent values like leeftijd
+bsn_response_cache = TTLCache(RESPONSE_CACHE_MAXSIZE, RESPONSE_CACHE_TTL, boundary=next_midnight) \
+    if RESPONSE_CACHE_MAXSIZE > 0 else None
+
 
 class IngeschrevenpersonenView(StufRestView):
     """
@@ -64,6 +70,8 @@ class IngeschrevenpersonenBsnView(IngeschrevenpersonenView):
     request_template = IngeschrevenpersonenBsnStufRequest
     response_template = IngeschrevenpersonenStufResponse
 
+    response_cache = bsn_response_cache
+
     @property
     def functional_query_parameters(self):
         return {
@@ -109,3 +117,12 @@ class IngeschrevenpersonenBsnKinderenDetailView(IngeschrevenpersonenBsnView):
 
     def get_not_found_message(self, **kwargs):
         return f"Ingeschreven kind voor persoon niet gevonden met burgerservicenummer {kwargs['bsn']}."
+
+
+class IngeschrevenpersonenBsnBatchView(StufRestBatchView):
+    item_view = IngeschrevenpersonenBsnView
+    item_parameter = 'bsn'
+    item_name = 'ingeschrevenpersoon'
+
+    values_name = 'burgerservicenummers'
+    name = 'ingeschrevenpersonen'
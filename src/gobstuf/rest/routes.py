@@ -6,7 +6,8 @@ from gobstuf.rest.brp.views import (
     IngeschrevenpersonenBsnOudersDetailView,
     IngeschrevenpersonenBsnOudersListView,
     IngeschrevenpersonenBsnKinderenDetailView,
-    IngeschrevenpersonenBsnKinderenListView
+    IngeschrevenpersonenBsnKinderenListView,
+    IngeschrevenpersonenBsnBatchView
 )
 
 REST_ROUTES = [
@@ -25,3 +26,7 @@ REST_ROUTES = [
     ('/brp/ingeschrevenpersonen/<bsn>/kinderen/<kinderen_id>',
      IngeschrevenpersonenBsnKinderenDetailView.as_view('brp_ingeschrevenpersonen_bsn_kinderen_detail')),
 ]
+
+REST_BATCH_ROUTES = [
+    ('/brp/ingeschrevenpersonen/batch', IngeschrevenpersonenBsnBatchView.as_view('brp_ingeschrevenpersonen_batch')),
+]
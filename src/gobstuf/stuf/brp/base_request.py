@@ -1,8 +1,10 @@
 import os
 import pytz
 import datetime
+import hashlib
 import random
 import sys
+import threading
 
 from abc import ABC, abstractmethod
 
@@ -11,6 +13,43 @@ from gobstuf.stuf.message import StufMessage, WILDCARD_CHARS
 TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), 'request_template')
 
 
+class StufRequestTemplate:
+    """Parsed XML template file.
+
+    The template file is read and parsed only once. Every request works on its own copy of the parsed message.
+    The slots are the elements that are set on every request. Their positions are located once as well.
+    """
+
+    def __init__(self, path: str, content_root_elm: str, slot_paths: list):
+        """
+
+        :param path: absolute path to the template file
+        :param content_root_elm: the root of the content in the XML file
+        :param slot_paths: the paths to the slots, relative to content_root_elm
+        """
+        with open(path, 'r') as f:
+            self.stuf_message = StufMessage(f.read())
+
+        self.slots = {slot_path: self.stuf_message.get_elm_index_path(f"{content_root_elm} {slot_path}")
+                      for slot_path in slot_paths}
+
+    def new_message(self) -> StufMessage:
+        """Returns a new message, based on the parsed template
+
+        :return:
+        """
+        return self.stuf_message.copy()
+
+    def get_slot(self, stuf_message: StufMessage, slot_path: str):
+        """Returns the slot element in stuf_message
+
+        :param stuf_message: a message as returned by new_message
+        :param slot_path: one of the slot paths
+        :return:
+        """
+        return stuf_message.get_elm_by_index_path(self.slots[slot_path])
+
+
 class StufRequest(ABC):
     """Creates a new StUF request, based on a template from an *.xml file.
 
@@ -29,6 +68,10 @@ class StufRequest(ABC):
     parameter_wildcards = {}
     parameters = []
 
+    # Parsed templates, by request class
+    _templates = {}
+    _templates_lock = threading.Lock()
+
     def __init__(self, gebruiker: str, applicatie: str, correlation_id: str = None):
         """
 
@@ -46,10 +89,27 @@ class StufRequest(ABC):
         self._set_gebruiker(gebruiker)
 
     def _set_applicatie(self, applicatie: str):
-        self.set_element(self.applicatie_path, applicatie)
+        self._set_slot(self.applicatie_path, applicatie)
 
     def _set_gebruiker(self, gebruiker: str):
-        self.set_element(self.gebruiker_path, gebruiker)
+        self._set_slot(self.gebruiker_path, gebruiker)
+
+    def _set_slot(self, path: str, value: str):
+        """Sets the value of one of the pre-located elements in the template
+
+        :param path: one of the paths returned by _slot_paths
+        :param value:
+        :return:
+        """
+        self.get_template().get_slot(self.stuf_message, path).text = value
+
+    @classmethod
+    def _slot_paths(cls):
+        """Returns the paths of the elements that are set on every request
+
+        :return:
+        """
+        return [cls.applicatie_path, cls.gebruiker_path, cls.tijdstip_bericht_path, cls.referentienummer_path]
 
     def set_values(self, values: dict):
         """Sets values in XML. Accepts a dict with {key: value} pairs, where key exists in
@@ -92,19 +152,34 @@ class StufRequest(ABC):
         return value
 
     def _load(self):
-        """Loads xml template file.
+        """Loads a copy of the parsed xml template.
 
         :return:
         """
-        with open(self._template_path(), 'r') as f:
-            self.stuf_message = StufMessage(f.read())
+        self.stuf_message = self.get_template().new_message()
+
+    @classmethod
+    def get_template(cls) -> StufRequestTemplate:
+        """Returns the parsed xml template for this request class. The template is parsed on first use.
 
-    def _template_path(self):
+        :return:
+        """
+        template = cls._templates.get(cls)
+        if template is None:
+            with cls._templates_lock:
+                template = cls._templates.get(cls)
+                if template is None:
+                    template = StufRequestTemplate(cls._template_path(), cls.content_root_elm, cls._slot_paths())
+                    cls._templates[cls] = template
+        return template
+
+    @classmethod
+    def _template_path(cls):
         """Returns absolute path to the template file
 
         :return:
         """
-        return os.path.join(TEMPLATE_DIR, self.template)
+        return os.path.join(TEMPLATE_DIR, cls.template)
 
     def time_str(self, dt: datetime.datetime):
         """Returns formatted time string
@@ -138,14 +213,37 @@ class StufRequest(ABC):
         """
         timestr = self.time_str(datetime.datetime.utcnow().astimezone(tz=pytz.timezone(self.default_tz)))
 
-        self.set_element(self.tijdstip_bericht_path, timestr)
-        self.set_element(
+        self._set_slot(self.tijdstip_bericht_path, timestr)
+        self._set_slot(
             self.referentienummer_path,
             self.correlation_id or f"GOB{timestr}_{random.randint(0, sys.maxsize)}"
         )
 
         return self.stuf_message.to_string()
 
+    def fingerprint(self) -> str:
+        """Canonical fingerprint of this request.
+
+        Requests with the same fingerprint ask MKS the same question. The tijdstip_bericht and referentienummer
+        differ for every request and are left out of the fingerprint.
+
+        :return:
+        """
+        template = self.get_template()
+        slots = [template.get_slot(self.stuf_message, path)
+                 for path in (self.tijdstip_bericht_path, self.referentienummer_path)]
+        values = [slot.text for slot in slots]
+
+        for slot in slots:
+            slot.text = None
+        try:
+            message = self.stuf_message.to_string()
+        finally:
+            for slot, value in zip(slots, values):
+                slot.text = value
+
+        return hashlib.sha256(self.soap_action.encode() + b'\n' + message).hexdigest()
+
     def params_errors(self, names, invalid_params):
         """
         If a request argument parameter(s) validation fails a params error object is returned
@@ -6,9 +6,11 @@ from typing import List, Optional
 from xml.etree.ElementTree import Element
 
 from gobstuf.lib.utils import get_value
+from gobstuf.metrics import stage
 from gobstuf.rest.brp.argument_checks import WILDCARD_CHARS
-from gobstuf.stuf.message import StufMessage
+from gobstuf.stuf.message import StufMessage, StufMessageParser
 from gobstuf.stuf.exception import NoStufAnswerException
+from gobstuf.stuf.brp.mapping_plan import NAMESPACES, MappingContext, compile_mapping, compile_path, resolve_path
 from gobstuf.stuf.brp.response_mapping import StufObjectMapping, Mapping, RelatedMapping
 
 
@@ -17,17 +19,13 @@ class StufResponse(ABC):
     """
 
     # Predefined namespaces
-    namespaces = {
-        'soapenv': 'http://schemas.xmlsoap.org/soap/envelope/',
-        'BG': 'http://www.egem.nl/StUF/sector/bg/0310',
-        'StUF': 'http://www.egem.nl/StUF/StUF0301',
-        'xsi': 'http://www.w3.org/2001/XMLSchema-instance',
-    }
+    namespaces = NAMESPACES
 
     def __init__(self, msg: str, **kwargs):
         """
 
-        :param msg: The string representation of the XML StUF message
+        :param msg: The XML StUF message (str or bytes).
+            With streaming_parser (see StufMappedResponse) also an iterable of chunks of the message
         """
         self.stuf_message = None
 
@@ -39,7 +37,8 @@ class StufResponse(ABC):
         self.load(msg)
 
     def load(self, msg: str):
-        self.stuf_message = StufMessage(msg, self.namespaces)
+        with stage('parse'):
+            self.stuf_message = StufMessage(msg, self.namespaces)
 
     def to_string(self):
         return self.stuf_message.pretty_print()
@@ -78,8 +77,18 @@ class StufMappedResponse(StufResponse):
     # Class properties to pass to the mapped object filter
     filter_kwargs = []
 
+    # The classes of the filters that are applied to every answer object. Every response creates its own instances
     response_filters = []
-    response_filters_instances = []
+
+    # The paths of the elements that hold the value of a wildcard attribute in an answer object, by attribute.
+    # Answer objects that do not match the wildcards on these elements are not mapped, see WildcardSearchResponseFilter
+    wildcard_elements = {}
+
+    # Parse the message with StufMessageParser when the answer objects are requested, instead of on initialisation.
+    # Elements that are not used by any mapping are skipped and answer objects are mapped while the message is parsed
+    streaming_parser = False
+    # The size of the chunks in which a message string is fed to the parser
+    parser_chunk_size = 65536
 
     def __init__(self, msg: str, **kwargs):
         if 'expand' in kwargs:
@@ -88,6 +97,9 @@ class StufMappedResponse(StufResponse):
         else:
             self.expand = []
 
+        # The (1-based) index of the only embedded object that is requested, by embedded type. Set by a response filter
+        self.embedded_index = {}
+
         # Initialize a response filter if one is provided to allow them to add expand properties
         self.response_filters_instances = [filter(self, **kwargs) for filter in self.response_filters]
 
@@ -100,6 +112,53 @@ class StufMappedResponse(StufResponse):
 
         super().__init__(msg, **kwargs)
 
+    def load(self, msg):
+        if self.streaming_parser:
+            # The message is parsed on demand, see parse and iter_answer_objects
+            self.source = msg
+        else:
+            super().load(msg)
+
+    def to_string(self):
+        self.parse()
+        return super().to_string()
+
+    def _get_chunks(self):
+        """Returns the message source in chunks
+
+        The source is either a message string or an iterable of message chunks (str or bytes)
+
+        :return:
+        """
+        if isinstance(self.source, (str, bytes)):
+            size = self.parser_chunk_size
+            return (self.source[i:i + size] for i in range(0, len(self.source), size))
+        return self.source
+
+    def _get_parser(self, collect_objects: bool = False):
+        """Returns a parser that keeps only the elements that are used by the registered mappings
+
+        :param collect_objects: collect the object elements in the answer section, see StufMessageParser.read_elements
+        :return:
+        """
+        object_path = resolve_path(f"{self.answer_section} {self.object_elm}", self.namespaces)
+        tags, subtree_tags = StufObjectMapping.get_tags()
+        if tags is not None:
+            tags = tags | set(object_path)
+        return StufMessageParser(object_path if collect_objects else None, tags, subtree_tags)
+
+    def parse(self):
+        """Parses the complete message, when it has not been parsed yet
+
+        :return:
+        """
+        if self.stuf_message is None:
+            with stage('parse'):
+                parser = self._get_parser()
+                for chunk in self._get_chunks():
+                    parser.feed(chunk)
+                self.stuf_message = StufMessage.from_tree(parser.close(), self.namespaces)
+
     def get_object_elm(self):
         """Returns the object wrapper element from the response message.
 
@@ -160,34 +219,65 @@ class StufMappedResponse(StufResponse):
     def _add_embedded_objects(self, mapped_object: MappedObjectWrapper):
         """Adds the _embedded objects to :mapped_object:
 
+        Only the embedded objects in expand are mapped. The other embedded objects are only counted to include
+        the links to these objects.
+
         :param mapped_object:
         :return:
         """
         mapping = mapped_object.mapping_class
         embedded = {}
+        counts = {}
         for related_attr, root_obj in mapping.related.items():
-            objects = self.create_objects_from_elements(
-                self.stuf_message.find_all_elms(root_obj, mapped_object.element)
-            )
-            embedded[related_attr] = self._sort_embedded_objects(objects, related_attr, mapping)
+            elements = self.stuf_message.find_all_elms(root_obj, mapped_object.element)
+            if related_attr in self.expand:
+                embedded[related_attr], counts[related_attr] = self._get_embedded_objects(elements, related_attr,
+                                                                                          mapping)
+            else:
+                counts[related_attr] = self.count_objects_from_elements(elements)
 
-        mapped_object.mapped_object['_embedded'] = embedded
+        # Place the number of related objects in links for further processing
+        if counts:
+            mapped_object.mapped_object['_links'] = counts
 
-        # Filter embedded values not in expand, this is done now to include the links
-        filtered_embedded = {key: value for key, value in mapped_object.mapped_object.get('_embedded', {}).items()
-                             if key in self.expand}
+        if embedded:
+            mapped_object.mapped_object['_embedded'] = embedded
 
-        # Place all related objects in links for further processing
-        links = mapped_object.mapped_object.get('_embedded', {})
+    def _get_embedded_objects(self, elements: list, type: str, mapping: Mapping) -> tuple:
+        """Returns the embedded objects of type for the given elements and the total number of embedded objects
 
-        if links:
-            mapped_object.mapped_object['_links'] = links
+        When only one embedded object is requested (see RelatedDetailResponseFilter) only that object is returned.
+        Unless the objects are sorted, the other objects are only counted.
 
-        # Replace the embedded values with the filtered embedded or remove if empty
-        if filtered_embedded:
-            mapped_object.mapped_object['_embedded'] = filtered_embedded
-        else:
-            mapped_object.mapped_object.pop('_embedded', None)
+        :param elements:
+        :param type:
+        :param mapping:
+        :return: tuple (objects, count)
+        """
+        index = self.embedded_index.get(type)
+        if index and not callable(getattr(mapping, f'sort_{type}', None)):
+            return self._create_object_at_index(elements, index)
+
+        objects = self._sort_embedded_objects(self.create_objects_from_elements(elements), type, mapping)
+        return (objects[index - 1:index] if index else objects), len(objects)
+
+    def _create_object_at_index(self, elements: list, index: int) -> tuple:
+        """Maps only the object at (1-based) index of the objects for the given elements
+
+        :param elements:
+        :param index:
+        :return: tuple ([object] or [] if there is no object at index, number of objects)
+        """
+        objects = []
+        count = 0
+        for element in elements:
+            if count == index - 1:
+                obj = self.create_object_from_element(element)
+                objects = [obj] if obj else []
+                count += len(objects)
+            else:
+                count += self._has_object(element)
+        return objects, count
 
     def get_answer_object(self):
         """
@@ -201,12 +291,16 @@ class StufMappedResponse(StufResponse):
         :return: the object to be returned as answer to the REST call
         :raises: NoStufAnswerException if the object is empty
         """
-        object = self.get_object_elm()
-        answer_object = self.create_object_from_element(object)
+        self.parse()
+
+        with stage('mapping'):
+            object = self.get_object_elm()
+            answer_object = self.create_object_from_element(object)
 
         # Filter the response if a response type is defined
-        for filter in self.response_filters_instances:
-            answer_object = filter.filter_response(answer_object)
+        with stage('filter'):
+            for filter in self.response_filters_instances:
+                answer_object = filter.filter_response(answer_object)
 
         if not answer_object:
             raise NoStufAnswerException()
@@ -225,6 +319,27 @@ class StufMappedResponse(StufResponse):
         self._add_embedded_objects(mapped_object)
         return mapped_object.get_filtered_object(**self._get_filter_kwargs())
 
+    def _has_object(self, element: Element) -> bool:
+        """Returns whether create_object_from_element returns an object for :element:
+
+        The element is only mapped on the keys that are used to filter the object, see Mapping.get_filter_keys
+
+        :param element:
+        :return:
+        """
+        mapping = self._get_mapping(element)
+        filter_kwargs = self._get_filter_kwargs()
+        mapped_object = self.get_mapped_object(element, mapping, tuple(mapping.get_filter_keys(**filter_kwargs)))
+        return mapped_object is not None and mapping.filter(mapped_object.mapped_object, **filter_kwargs) is not None
+
+    def count_objects_from_elements(self, object_elements: list) -> int:
+        """Returns the number of objects that create_objects_from_elements returns for a list of XMLtree elements
+
+        :param object_elements:
+        :return:
+        """
+        return sum(1 for obj in object_elements if self._has_object(obj))
+
     def create_objects_from_elements(self, object_elements: list) -> List[dict]:
         """Create a list of objects from a list of XMLtree elements
 
@@ -246,15 +361,83 @@ class StufMappedResponse(StufResponse):
 
         :return:
         """
-        answer_objects = self.create_objects_from_elements(self.get_all_object_elms())
+        if self.stuf_message is None:
+            return list(self.iter_answer_objects())
+
+        with stage('mapping'):
+            object_elms = self.get_all_object_elms()
+
+        answer_objects = self._create_answer_objects(object_elms)
+        return self._filter_answer_objects(answer_objects)
+
+    def iter_answer_objects(self):
+        """Yields all objects from the StUF response, see get_all_answer_objects
+
+        When the message has not been parsed yet, the objects are mapped and filtered while the message is parsed.
+        Every object is removed from the message when it has been mapped.
 
+        :return:
+        """
+        if self.stuf_message is not None:
+            yield from self.get_all_answer_objects()
+            return
+
+        parser = self._get_parser(collect_objects=True)
+        for chunk in self._get_chunks():
+            with stage('parse'):
+                parser.feed(chunk)
+            yield from self._get_parsed_answer_objects(parser)
+
+        with stage('parse'):
+            parser.close()
+        yield from self._get_parsed_answer_objects(parser)
+
+    def _get_parsed_answer_objects(self, parser: StufMessageParser):
+        """Returns the filtered answer objects for the object elements that have been parsed
+
+        :param parser:
+        :return:
+        """
+        if self.stuf_message is None and parser.root is not None:
+            # Mapping requires the root of the message
+            self.stuf_message = StufMessage.from_tree(parser.root, self.namespaces)
+
+        answer_objects = self._create_answer_objects(parser.read_elements())
+        return self._filter_answer_objects(answer_objects)
+
+    def _create_answer_objects(self, object_elements: list) -> List[dict]:
+        """Creates the answer objects for the object elements that pass the element filters of the response filters
+
+        Object elements that do not pass are never mapped, see ResponseFilter.filter_element
+
+        :param object_elements:
+        :return:
+        """
+        # Without object elements the root of the message may not have been parsed yet
+        if self.response_filters_instances and object_elements:
+            with stage('filter'):
+                context = MappingContext(self.stuf_message.tree)
+                object_elements = [element for element in object_elements
+                                   if all(filter.filter_element(element, context)
+                                          for filter in self.response_filters_instances)]
+
+        with stage('mapping'):
+            return self.create_objects_from_elements(object_elements)
+
+    def _filter_answer_objects(self, answer_objects: list):
+        """Applies the response filters to answer_objects
+
+        :param answer_objects:
+        :return:
+        """
         filtered_answer_objects = []
-        for answer_object in answer_objects:
-            # Filter the response if a response type is defined
-            for filter in self.response_filters_instances:
-                answer_object = filter.filter_response(answer_object)
+        with stage('filter'):
+            for answer_object in answer_objects:
+                # Filter the response if a response type is defined
+                for filter in self.response_filters_instances:
+                    answer_object = filter.filter_response(answer_object)
 
-            filtered_answer_objects += [answer_object] if answer_object is not None else []
+                filtered_answer_objects += [answer_object] if answer_object is not None else []
 
         return filtered_answer_objects
 
@@ -267,7 +450,7 @@ class StufMappedResponse(StufResponse):
         stuf_entity_type = element.attrib.get('{%s}entiteittype' % self.namespaces['StUF'])
         return StufObjectMapping.get_for_entity_type(stuf_entity_type)
 
-    def _get_mapped_related_object(self, mapping: RelatedMapping, wrapper_element: Element):
+    def _get_mapped_related_object(self, mapping: RelatedMapping, wrapper_element: Element, keys: tuple = None):
         """Returns the mapping for the inner entity of RelatedMapping
 
         For example, NPSNPSHUW contains an inner NPS entity.
@@ -275,16 +458,24 @@ class StufMappedResponse(StufResponse):
 
         :param mapping:
         :param wrapper_element:
+        :param keys: optional projection of mapping
         :return:
         """
-        related_obj = self.stuf_message.find_elm(mapping.related_entity_wrapper, wrapper_element)
+        plan = StufObjectMapping.get_plan(mapping)
+        related_obj = plan.find_related(wrapper_element, MappingContext(self.stuf_message.tree))
+        if not related_obj:
+            return None
+
+        # Map only the attributes of the related entity that are used by the RelatedMapping
+        related_mapping = self._get_mapping(related_obj)
+        related_keys = mapping.get_related_keys(related_mapping, keys)
 
-        return self.get_mapped_object(related_obj).get_filtered_object(**{
+        return self.get_mapped_object(related_obj, related_mapping, related_keys).get_filtered_object(**{
             **self._get_filter_kwargs(),
             **mapping.override_related_filters
-        }) if related_obj else None
+        })
 
-    def get_mapped_object(self, obj, mapping=None):  # noqa: C901
+    def get_mapped_object(self, obj, mapping=None, keys: tuple = None):
         """
         Returns a dict with key -> value pairs for the keys in mapping with the value extracted
         from the response message.
@@ -297,7 +488,14 @@ class StufMappedResponse(StufResponse):
         Optionally a tuple can be specified (method, element value).
         The element value is the passed as an argument to the given method
 
-        Nested mappings are resolved by recursive calls to this method
+        A list (element, mapping) maps every instance of element
+
+        Element values can be a literal (=value), an attribute (element@attribute) or an XPath value (element!xpath)
+
+        The mapping of a Mapping object is compiled once to a MappingPlan, see mapping_plan.py.
+        Any other mapping is compiled on each call.
+
+        Keys optionally restricts a Mapping object to the given (top level) keys.
 
         :return:
         """
@@ -314,49 +512,20 @@ class StufMappedResponse(StufResponse):
                 related object would be an NPS entity.
                 """
                 # Get inner entity
-                dict_mapping = self._get_mapped_related_object(mapping, obj)
+                dict_mapping = self._get_mapped_related_object(mapping, obj, keys)
 
                 if dict_mapping is None:
                     # Object is filtered out. Return None
                     return None
 
             # Initial call. Return mapped dictionary and Mapping class
-            if mapping.mapping:
-                # Do only when mapping is not empty to avoid infinite recursion
-                dict_mapping.update(self.get_mapped_object(obj, mapping.mapping))
+            plan = StufObjectMapping.get_plan(mapping, keys)
+            if plan.extract:
+                # Do only when mapping is not empty
+                dict_mapping.update(plan.extract(obj, MappingContext(self.stuf_message.tree)))
             return MappedObjectWrapper(dict_mapping, mapping, obj)
-        elif isinstance(mapping, dict):
-            # the values are resolved at a nested level by recursively calling this method
-            # Example: 'naam': {'voornamen': '<attribute>', 'geslachtsnaam': '<attribute>'}
-            return {k: self.get_mapped_object(obj, v) for k, v in mapping.items()}
-        elif isinstance(mapping, tuple):
-            # The value is resolved by a function call with the attribute value(s) as parameter(s)
-            # Example: 'naamlengte': (len, '<attribute>')
-            # will result in 'naamlengte': len(<attribute value>)
-            method, *mappings = mapping
-            attributes = [self.get_mapped_object(obj, v) for v in mappings]
-            return method(*attributes)
-        elif isinstance(mapping, list):
-            # Iterate over a list of items
-            # The main key is the first element in the list
-            # The mapping to be resolved for every instance of this key is the second element
-            elms = self.stuf_message.find_all_elms(mapping[0], obj)
-            subobj = mapping[1]
-            return [self.get_mapped_object(elm, subobj) for elm in elms]
-        elif mapping and mapping[0] == '=':
-            # Literal value, eg: =value results in value
-            return mapping[1:]
-        elif mapping and '!' in mapping:
-            # XPath value, eg !.//<element>...
-            mapping, path = mapping.split('!')
-            return self.stuf_message.get_elm_value_by_path(mapping, path, obj)
-        elif mapping and '@' in mapping:
-            # Element attribute value, eg: element@attribute
-            mapping, attr = mapping.split('@')
-            return self.stuf_message.get_elm_attr(mapping, attr, obj)
         else:
-            # Plain element value
-            return self.stuf_message.get_elm_value(mapping, obj)
+            return compile_mapping(mapping, self.namespaces)(obj, MappingContext(self.stuf_message.tree))
 
     @property
     @abstractmethod
@@ -382,6 +551,17 @@ class ResponseFilter(ABC):
     def __init__(self, response: StufMappedResponse, **kwargs):
         self.response = response
 
+    def filter_element(self, element: Element, context: MappingContext) -> bool:
+        """Tells whether the answer object for element can pass filter_response, before the element is mapped
+
+        An answer object is only mapped when its element passes. By default every element passes
+
+        :param element: the object element
+        :param context: the context of the message, see MappingContext
+        :return:
+        """
+        return True
+
     @abstractmethod
     def filter_response(self, response_object: dict) -> dict:  # pragma: no cover
         pass
@@ -440,6 +620,10 @@ class RelatedDetailResponseFilter(RelatedListResponseFilter):
 
         super().__init__(response, **kwargs)
 
+        if self.related_id > 0:
+            # Only the requested relation is embedded in the response object
+            response.embedded_index[self.related_type] = self.related_id
+
     def filter_response(self, response_object: dict):
         """Filter the response object to only return the requested relation from _embedded
 
@@ -453,13 +637,17 @@ class RelatedDetailResponseFilter(RelatedListResponseFilter):
 
         {'id': 1}
 
+        For a valid (positive) id the response only embeds the requested relation, see
+        StufMappedResponse._get_embedded_objects.
+
         The correct link to self is added to make it a valid HAL response.
 
         :param response_obj: The mapped and filtered response object
         :return: A filtered responsed object
         """
+        index = 0 if self.related_type in self.response.embedded_index else self.related_id - 1
         try:
-            response_object = response_object['_embedded'][self.related_type][self.related_id-1]
+            response_object = response_object['_embedded'][self.related_type][index]
         except (KeyError, IndexError):
             return
         # Add the link to self in the new response object
@@ -478,8 +666,39 @@ class WildcardSearchResponseFilter(ResponseFilter):
     def __init__(self, response: StufMappedResponse, **kwargs):
         self.wildcards = {**kwargs}
 
+        # The wildcards are compiled once for all answer objects
+        self.patterns = {attribute: re.compile(self._convert_wildcard_query(value), re.IGNORECASE)
+                         for attribute, value in self.wildcards.items()}
+
+        # The elements that hold the value of an attribute, see StufMappedResponse.wildcard_elements
+        self.element_values = {attribute: [compile_path(path, response.namespaces)
+                                           for path in response.wildcard_elements.get(attribute, [])]
+                               for attribute in self.wildcards}
+
         super().__init__(response, **kwargs)
 
+    def _matches(self, attribute: str, value: Optional[str]) -> bool:
+        return value is not None and self.patterns[attribute].match(value) is not None
+
+    def filter_element(self, element: Element, context: MappingContext) -> bool:
+        """Tells whether element matches the wildcards, on the values of the elements of the wildcard attributes
+
+        The mapped value of an attribute is the value of one of its elements (eg a woonadres or a briefadres), so an
+        element only passes when for every attribute any of its elements matches. Attributes without elements are
+        only filtered after mapping.
+
+        :param element:
+        :param context:
+        :return:
+        """
+        for attribute, finds in self.element_values.items():
+            if finds and not any(self._matches(attribute, self._get_text(find(element, context))) for find in finds):
+                return False
+        return True
+
+    def _get_text(self, element: Optional[Element]) -> Optional[str]:
+        return None if element is None else element.text
+
     def filter_response(self, response_object: dict):
         """Filter the response object to only return if it matches the wildcard search query
 
@@ -505,11 +724,8 @@ class WildcardSearchResponseFilter(ResponseFilter):
 
         'A*', '*A', 'A*n', 'A??n' will all result in an error (handled in ArgumentCheck)
         """
-        for attribute, value in self.wildcards.items():
-            attribute_path = attribute.split('__')
-            regex = self._convert_wildcard_query(value)
-
-            if not re.match(regex, get_value(response_object, *attribute_path), re.IGNORECASE):
+        for attribute in self.patterns:
+            if not self._matches(attribute, get_value(response_object, *attribute.split('__'))):
                 return None
 
         return response_object
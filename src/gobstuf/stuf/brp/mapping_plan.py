@@ -0,0 +1,339 @@
+"""Compiled mapping plans
+
+A Mapping describes how to extract a dict from a StUF object element, see response_mapping.py.
+Interpreting the (nested) mapping definition for every element is costly. The mapping definition is therefore
+compiled once into a plan: a tree of functions with the element paths tokenized and the namespaces resolved.
+Executing the plan for an element only walks the element tree and calls the converter functions.
+
+The plan gives the same results as interpreting the mapping with the find methods of StufMessage.
+"""
+import re
+
+from xml.etree.ElementTree import Element
+
+# Predefined namespaces, as used in the MKS StUF responses
+NAMESPACES = {
+    'soapenv': 'http://schemas.xmlsoap.org/soap/envelope/',
+    'BG': 'http://www.egem.nl/StUF/sector/bg/0310',
+    'StUF': 'http://www.egem.nl/StUF/StUF0301',
+    'xsi': 'http://www.w3.org/2001/XMLSchema-instance',
+}
+
+# A simple tag, optionally prefixed by a namespace, eg BG:inp.bsn
+SIMPLE_TAG = re.compile(r'^(?:(\w+):)?(\w[\w.\-]*)$')
+
+
+class MappingContext:
+    """Holds the state for executing a plan on a message
+
+    Children of visited elements are indexed by tag, so that consecutive lookups on the same element
+    (eg all attributes of a person) do not search the element again.
+    """
+
+    def __init__(self, root: Element):
+        """
+
+        :param root: the root element of the message
+        """
+        self.root = root
+        self._children = {}
+
+    def child(self, elm: Element, tag: str):
+        """Returns the first child of elm with the given tag, or None
+
+        :param elm:
+        :param tag: resolved tag, eg {http://www.egem.nl/StUF/sector/bg/0310}inp.bsn
+        :return:
+        """
+        try:
+            children = self._children[elm]
+        except KeyError:
+            # Reversed, so that the first child with a tag wins
+            children = self._children[elm] = {child.tag: child for child in reversed(elm)}
+        return children.get(tag)
+
+
+def _resolve_tag(element: str, namespaces: dict):
+    """Returns the resolved tag for a simple element, or None if element is not a simple tag
+
+    Example:
+        _resolve_tag('BG:inp.bsn', NAMESPACES) returns '{http://www.egem.nl/StUF/sector/bg/0310}inp.bsn'
+
+    :param element:
+    :param namespaces:
+    :return:
+    """
+    match = SIMPLE_TAG.match(element)
+    if not match:
+        return None
+
+    prefix, tag = match.groups()
+    if prefix is None:
+        return tag
+    if prefix in namespaces:
+        return '{%s}%s' % (namespaces[prefix], tag)
+
+
+def resolve_path(elements_str: str, namespaces: dict) -> list:
+    """Returns the resolved tags of a path of simple elements
+
+    Example:
+        resolve_path('BG:object BG:inp.bsn', NAMESPACES) returns ['{...}object', '{...}inp.bsn']
+
+    :param elements_str:
+    :param namespaces:
+    :return:
+    """
+    tags = [_resolve_tag(element, namespaces) for element in elements_str.split(' ')]
+    assert None not in tags, f"Path {elements_str} contains an element that is not a simple tag"
+    return tags
+
+
+def collect_path_tags(elements_str: str, namespaces: dict, tags: set, subtree_tags: set) -> bool:
+    """Adds the tags of the elements that are visited to find elements_str to tags
+
+    Elements that are not simple tags are searched by ElementTree in the previous element on the path. The complete
+    subtree of the previous element may then be visited, its tag is added to subtree_tags.
+
+    :param elements_str:
+    :param namespaces:
+    :param tags:
+    :param subtree_tags:
+    :return: False if the path starts with an element that is not a simple tag, the visited tags are then unknown
+    """
+    previous = None
+    for element in elements_str.split(' '):
+        tag = _resolve_tag(element, namespaces)
+        if tag is None:
+            if previous is None:
+                return False
+            subtree_tags.add(previous)
+            return True
+        tags.add(tag)
+        previous = tag
+    return True
+
+
+def _collect_value_tags(mapping: str, namespaces: dict, tags: set, subtree_tags: set) -> bool:
+    """Adds the tags that are visited by a string mapping, see _compile_value
+
+    :param mapping:
+    :param namespaces:
+    :param tags:
+    :param subtree_tags:
+    :return:
+    """
+    if mapping[:1] == '=':
+        return True
+    elif '!' in mapping:
+        # The XPath expression is evaluated on the element, as the last element on the path
+        return collect_path_tags(' '.join(mapping.split('!')), namespaces, tags, subtree_tags)
+    return collect_path_tags(mapping.split('@')[0], namespaces, tags, subtree_tags)
+
+
+def collect_tags(mapping, namespaces: dict, tags: set, subtree_tags: set) -> bool:
+    """Adds the tags of the elements that are visited by a (possibly nested) mapping definition
+
+    :param mapping:
+    :param namespaces:
+    :param tags:
+    :param subtree_tags:
+    :return: False if the visited tags are unknown
+    """
+    if isinstance(mapping, dict):
+        mappings = mapping.values()
+    elif isinstance(mapping, tuple):
+        mappings = mapping[1:]
+    elif isinstance(mapping, list):
+        return collect_path_tags(mapping[0], namespaces, tags, subtree_tags) and \
+            collect_tags(mapping[1], namespaces, tags, subtree_tags)
+    else:
+        return _collect_value_tags(mapping, namespaces, tags, subtree_tags)
+    return all([collect_tags(value, namespaces, tags, subtree_tags) for value in mappings])
+
+
+def compile_step(element: str, namespaces: dict):
+    """Compiles a single element in a path to a function that finds the first matching child
+
+    :param element:
+    :param namespaces:
+    :return:
+    """
+    tag = _resolve_tag(element, namespaces)
+    if tag is None:
+        # Leave anything other than a simple tag to ElementTree
+        return lambda elm, context: elm.find(element, namespaces)
+    return lambda elm, context: context.child(elm, tag)
+
+
+def compile_path(elements_str: str, namespaces: dict):
+    """Compiles an element path to a function that returns the first element identified by the path
+
+    Works like StufMessage.find_elm. When an element on the path is not found,
+    the search continues from the root of the message.
+
+    :param elements_str: space separated elements, eg 'BG:verblijfsadres BG:aoa.postcode'
+    :param namespaces:
+    :return:
+    """
+    steps = [compile_step(element, namespaces) for element in elements_str.split(' ')]
+
+    def find(obj, context: MappingContext):
+        elm = obj
+        for step in steps:
+            elm = step(context.root if elm is None else elm, context)
+        return elm
+
+    return find
+
+
+def compile_findall(elements_str: str, namespaces: dict):
+    """Compiles an element path to a function that returns all matching elements
+
+    Works like StufMessage.find_all_elms. The parent of the last element is searched from the root of the message.
+
+    :param elements_str:
+    :param namespaces:
+    :return:
+    """
+    elements = elements_str.split(' ')
+    find_parent = compile_path(' '.join(elements[:-1]), namespaces) if len(elements) > 1 else None
+
+    last = elements[-1]
+    tag = _resolve_tag(last, namespaces)
+
+    def findall(obj, context: MappingContext):
+        parent = find_parent(None, context) if find_parent else obj or context.root
+
+        if parent is None:
+            return []
+        if tag is None:
+            return parent.findall(last, namespaces)
+        return [child for child in parent if child.tag == tag]
+
+    return findall
+
+
+def _compile_literal(literal: str):
+    return lambda obj, context: literal
+
+
+def _compile_xpath_value(elements_str: str, path: str, namespaces: dict):
+    find = compile_path(elements_str, namespaces)
+
+    def xpath_value(obj, context: MappingContext):
+        elm = find(obj, context)
+        if elm is not None:
+            # Find element using XPath expression
+            elm = elm.find(path, namespaces)
+            if elm is not None:
+                return elm.text
+
+    return xpath_value
+
+
+def _compile_attr_value(elements_str: str, element_attr: str, namespaces: dict):
+    find = compile_path(elements_str, namespaces)
+
+    if ':' in element_attr:
+        # namespace attribute
+        # example StUF:attr => {http://www.egem.nl/StUF/StUF0301}attr
+        ns, attr = element_attr.split(':')
+        element_attr = '{%s}%s' % (namespaces.get(ns, ''), attr)
+
+    def attr_value(obj, context: MappingContext):
+        elm = find(obj, context)
+        if elm is not None:
+            return elm.get(element_attr)
+
+    return attr_value
+
+
+def _compile_elm_value(elements_str: str, namespaces: dict):
+    find = compile_path(elements_str, namespaces)
+
+    def elm_value(obj, context: MappingContext):
+        elm = find(obj, context)
+        if elm is not None:
+            return elm.text
+
+    return elm_value
+
+
+def _compile_value(mapping: str, namespaces: dict):
+    """Compiles a string mapping
+
+    :param mapping: literal (=value), XPath (element!xpath), attribute (element@attr) or element value
+    :param namespaces:
+    :return:
+    """
+    if mapping[:1] == '=':
+        # Literal value, eg: =value results in value
+        return _compile_literal(mapping[1:])
+    elif '!' in mapping:
+        # XPath value, eg !.//<element>...
+        return _compile_xpath_value(*mapping.split('!'), namespaces)
+    elif '@' in mapping:
+        # Element attribute value, eg: element@attribute
+        return _compile_attr_value(*mapping.split('@'), namespaces)
+    else:
+        # Plain element value
+        return _compile_elm_value(mapping, namespaces)
+
+
+def compile_mapping(mapping, namespaces: dict):
+    """Compiles a (possibly nested) mapping definition to a function f(obj, context)
+
+    See StufMappedResponse.get_mapped_object for the supported mapping definitions
+
+    :param mapping:
+    :param namespaces:
+    :return:
+    """
+    if isinstance(mapping, dict):
+        items = [(key, compile_mapping(value, namespaces)) for key, value in mapping.items()]
+        return lambda obj, context: {key: extract(obj, context) for key, extract in items}
+    elif isinstance(mapping, tuple):
+        method, *mappings = mapping
+        extracts = [compile_mapping(value, namespaces) for value in mappings]
+        return lambda obj, context: method(*[extract(obj, context) for extract in extracts])
+    elif isinstance(mapping, list):
+        findall = compile_findall(mapping[0], namespaces)
+        extract = compile_mapping(mapping[1], namespaces)
+        return lambda obj, context: [extract(elm, context) for elm in findall(obj, context)]
+    else:
+        return _compile_value(mapping, namespaces)
+
+
+class MappingPlan:
+    """The compiled form of a Mapping
+
+    """
+
+    def __init__(self, mapping, namespaces: dict = NAMESPACES, keys: tuple = None):
+        """
+
+        :param mapping: the Mapping instance to compile
+        :param namespaces:
+        :param keys: optional projection; compile only these (top level) keys of the mapping
+        """
+        mapping_definition = mapping.mapping
+        if keys is not None:
+            mapping_definition = {key: value for key, value in mapping_definition.items() if key in keys}
+
+        # An empty mapping does not extract anything (eg a RelatedMapping that only includes related attributes)
+        self.extract = compile_mapping(mapping_definition, namespaces) if mapping_definition else None
+
+        # The element that holds the related entity of a RelatedMapping
+        wrapper = getattr(mapping, 'related_entity_wrapper', None)
+        self.find_related = compile_path(wrapper, namespaces) if wrapper else None
+
+        # The tags of the elements that are visited by the mapping, including the wrapper and the related entities.
+        # None when the visited elements cannot be determined. See StufMessageParser
+        self.tags = set()
+        self.subtree_tags = set()
+        paths = [wrapper] if wrapper else []
+        paths.extend(getattr(mapping, 'related', {}).values())
+        if not (collect_tags(mapping_definition, namespaces, self.tags, self.subtree_tags) and
+                all([collect_path_tags(path, namespaces, self.tags, self.subtree_tags) for path in paths])):
+            self.tags = None
@@ -16,6 +16,14 @@ class IngeschrevenpersonenStufResponse(StufMappedResponse):
     # These properties are passed to the filter method of the mapped object
     filter_kwargs = ['inclusiefoverledenpersonen']
 
+    # See NPSMapping. The verblijfplaats is either the woonadres or the briefadres
+    wildcard_elements = {
+        'naam__geslachtsnaam': ['BG:geslachtsnaam'],
+        'naam__voornamen': ['BG:voornamen'],
+        'verblijfplaats__naamOpenbareRuimte': ['BG:verblijfsadres BG:gor.openbareRuimteNaam',
+                                               'BG:sub.correspondentieAdres BG:gor.openbareRuimteNaam'],
+    }
+
 
 class IngeschrevenpersonenStufPartnersDetailResponse(IngeschrevenpersonenStufResponse):
     response_filters = [PartnersDetailResponseFilter]
@@ -7,6 +7,7 @@ from gobstuf.auth.routes import get_auth_url
 from gobstuf.indications import Geslachtsaanduiding
 from gobstuf.mks_utils import MKSConverter
 from gobstuf.lib.utils import get_value
+from gobstuf.stuf.brp.mapping_plan import MappingPlan
 
 
 class Mapping(ABC):
@@ -32,6 +33,18 @@ class Mapping(ABC):
     def get_links(self, mapped_object) -> dict:
         return {}
 
+    def get_filter_keys(self, **kwargs) -> list:
+        """Returns the keys of the mapped object that filter() needs, given the filter kwargs
+
+        A projected mapping (see RelatedMapping.get_related_keys) always includes these keys.
+        A mapping on only these keys tells whether filter() keeps or removes an object,
+        see StufMappedResponse.count_objects_from_elements
+
+        :param kwargs: the filter kwargs
+        :return:
+        """
+        return []
+
     def filter(self, mapped_object: dict, **kwargs):  # noqa: C901
         """
         Filter the mapped object on the mapped attribute values
@@ -69,8 +82,10 @@ class Mapping(ABC):
 class StufObjectMapping:
     """Class holding all Mapping objects. Call register() with each Mapping to make the mapping available.
 
+    Each Mapping is compiled to a MappingPlan once, the plans are kept by Mapping class.
     """
     mappings = {}
+    plans = {}
 
     @classmethod
     def get_for_entity_type(cls, entity_type: str):
@@ -80,9 +95,46 @@ class StufObjectMapping:
             raise Exception(f"Can't find mapping for entity type {entity_type}")
         return mapping()
 
+    @classmethod
+    def get_plan(cls, mapping: Mapping, keys: tuple = None) -> MappingPlan:
+        """Returns the compiled plan for :mapping:
+
+        Plans for registered mappings are compiled on registration, any other mapping is compiled on first use.
+        A plan for a projection of the mapping on :keys: is compiled on first use.
+
+        :param mapping: a Mapping instance
+        :param keys: optional tuple of (top level) keys to compile
+        :return:
+        """
+        plan_key = type(mapping) if keys is None else (type(mapping), keys)
+        plan = cls.plans.get(plan_key)
+
+        if plan is None:
+            # Concurrent requests may compile the same plan, all of them use the plan that is stored first
+            plan = cls.plans.setdefault(plan_key, MappingPlan(mapping, keys=keys))
+        return plan
+
+    @classmethod
+    def get_tags(cls):
+        """Returns the tags of the elements that are visited by the registered mappings, see MappingPlan
+
+        :return: tuple (tags, subtree_tags). tags is None when the visited elements cannot be determined
+        """
+        tags = set()
+        subtree_tags = set()
+        for mapping in cls.mappings.values():
+            plan = cls.plans[mapping]
+            if plan.tags is None:
+                return None, set()
+            tags |= plan.tags
+            subtree_tags |= plan.subtree_tags
+        return tags, subtree_tags
+
     @classmethod
     def register(cls, mapping: Type[Mapping]):
-        cls.mappings[mapping().entity_type] = mapping
+        instance = mapping()
+        cls.mappings[instance.entity_type] = mapping
+        cls.plans[mapping] = MappingPlan(instance)
 
 
 class NPSMapping(Mapping):
@@ -358,8 +410,22 @@ class NPSMapping(Mapping):
         :param mapped_object: The mapped response object
         :return:
         """
-        # Set verblijfplaats: default use woonadres, fallback is briefadres
-        verblijfplaats = mapped_object['verblijfplaats']
+        # verblijfplaats is not mapped for related persons, see get_filter_keys
+        if 'verblijfplaats' in mapped_object:
+            mapped_object['verblijfplaats'] = self._select_verblijfplaats(mapped_object['verblijfplaats'])
+
+        # Use overlijdensdatum for filtering, overlijden is only required when overleden personen are excluded
+        if not kwargs.get('inclusiefoverledenpersonen', False) and mapped_object['overlijden']['indicatieOverleden']:
+            # Skip overleden personen, unless explicitly included
+            mapped_object = None
+        return super().filter(mapped_object)
+
+    def _select_verblijfplaats(self, verblijfplaats: dict):
+        """Set verblijfplaats: default use woonadres, fallback is briefadres
+
+        :param verblijfplaats:
+        :return:
+        """
         for functie_adres in ['woonadres', 'briefadres']:
             adres = verblijfplaats[functie_adres]
             del verblijfplaats[functie_adres]
@@ -370,14 +436,15 @@ class NPSMapping(Mapping):
                     **adres,
                     **verblijfplaats
                 }
-        mapped_object['verblijfplaats'] = verblijfplaats
+        return verblijfplaats
 
-        # Use overlijdensdatum for filtering
-        is_overleden = mapped_object['overlijden']['indicatieOverleden']
-        if is_overleden and not kwargs.get('inclusiefoverledenpersonen', False):
-            # Skip overleden personen, unless explicitly included
-            mapped_object = None
-        return super().filter(mapped_object)
+    def get_filter_keys(self, **kwargs) -> list:
+        """Overleden personen are filtered out on overlijden, unless inclusiefoverledenpersonen is set
+
+        :param kwargs:
+        :return:
+        """
+        return [] if kwargs.get('inclusiefoverledenpersonen') else ['overlijden']
 
     def _add_related_object_links(self, mapped_object: dict, links: dict, embedded_type: str, route: str):
         """Adds links to embedded objects of the form /ingeschrevenpersonen/<bsn>/embedded_type/<n> for each object.
@@ -385,7 +452,7 @@ class NPSMapping(Mapping):
 
         Expects mapped_object to contain a burgerservicenummer (should always be the case for objects in this class).
 
-        :param mapped_object:
+        :param mapped_object: holds the number of embedded objects per embedded_type in _links
         :param links:
         :param embedded_type: e.g. ouders, partners
         :param route: the route name that is used to generate the link. Should accept route parameters 'bsn' and
@@ -400,11 +467,10 @@ class NPSMapping(Mapping):
                                 **{url_param: index}
                                 )
 
-        if mapped_object.get('_links', {}).get(embedded_type):
-            objects = mapped_object['_links'][embedded_type]
-
+        count = mapped_object.get('_links', {}).get(embedded_type)
+        if count:
             # Add the link to all embedded objects
-            links[embedded_type] = [{'href': url_for_object(c)} for c, o in enumerate(objects, 1)]
+            links[embedded_type] = [{'href': url_for_object(c)} for c in range(1, count + 1)]
 
             # Add the links to the embedded objects, if present
             for c, object in enumerate(mapped_object.get('_embedded', {}).get(embedded_type, []), 1):
@@ -495,6 +561,20 @@ class RelatedMapping(Mapping):
     def override_related_filters(self):  # pragma: no cover
         return {}
 
+    def get_related_keys(self, related_mapping: Mapping, keys: tuple = None) -> tuple:
+        """Returns the keys of the related mapping that are needed to map the related entity
+
+        Only the keys in include_related are kept (see filter), plus the keys that the related mapping needs to
+        filter the related entity. The related entity is mapped on these keys only.
+
+        :param related_mapping: the mapping of the related entity, eg NPSMapping
+        :param keys: optional projection of this mapping, only the keys in include_related that are in keys are used
+        :return:
+        """
+        include_related = self.include_related if keys is None else [key for key in self.include_related
+                                                                     if key in keys]
+        return tuple(include_related + related_mapping.get_filter_keys(**self.override_related_filters))
+
     def filter(self, mapped_object: dict, **kwargs):
         """Filters :mapped_object:. Only keeps the keys present in self.mapping and self.include_related.
 
@@ -575,6 +655,9 @@ class NPSNPSHUWMapping(RelatedMapping):
 
         return super().filter(mapped_object, **kwargs)
 
+    def get_filter_keys(self, **kwargs) -> list:
+        return ['datumOntbinding']
+
     def get_links(self, mapped_object: dict) -> dict:
         links = super().get_links(mapped_object)
 
@@ -650,6 +733,15 @@ class NPSFamilieRelatedMapping(RelatedMapping):
 
         return super().filter(mapped_object, **kwargs)
 
+    def get_filter_keys(self, **kwargs) -> list:
+        return [
+            'aanduidingStrijdigheidNietigheid',
+            'datumIngangFamilierechtelijkeBetrekkingRaw',
+            'datumEindeFamilierechtelijkeBetrekking',
+            'naam',
+            'geboorte',
+        ]
+
     def get_links(self, mapped_object: dict) -> dict:
         links = super().get_links(mapped_object)
 
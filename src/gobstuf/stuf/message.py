@@ -1,6 +1,8 @@
+from copy import deepcopy
 from io import StringIO
 import re
 import os
+import threading
 import xml.etree.ElementTree as ET
 
 from xml.dom import minidom
@@ -8,6 +10,26 @@ from xml.dom import minidom
 WILDCARD_CHARS = ['*', '?']
 STUF_WILDCARD_CHAR = '%'
 
+# ET.register_namespace changes a global registry. Every namespace is registered once, see register_namespaces
+_registered_namespaces = {}
+_registered_namespaces_lock = threading.Lock()
+
+
+def register_namespaces(namespaces: dict):
+    """Registers the prefixes of namespaces for serialization
+
+    Namespaces that are already registered with the same prefix are skipped, so that concurrent requests do not
+    modify the registry once all namespaces are known.
+
+    :param namespaces: url by prefix
+    :return:
+    """
+    with _registered_namespaces_lock:
+        for prefix, url in namespaces.items():
+            if _registered_namespaces.get(url) != prefix:
+                ET.register_namespace(prefix, url)
+                _registered_namespaces[url] = prefix
+
 
 class StufMessage:
     """Workable representation of a StUF message, based on ElementTree.
@@ -21,6 +43,26 @@ class StufMessage:
         self.tree = None
         self.load(msg)
 
+    @classmethod
+    def from_tree(cls, tree: ET.Element, namespaces: dict):
+        """Returns a StufMessage for an already parsed tree
+
+        :param tree: the root element of the message
+        :param namespaces: the namespaces used in the message
+        :return:
+        """
+        message = cls.__new__(cls)
+        message.namespaces = namespaces
+        message.tree = tree
+        return message
+
+    def copy(self):
+        """Returns a copy of this message. The copy has its own tree and shares the namespaces.
+
+        :return:
+        """
+        return self.from_tree(deepcopy(self.tree), self.namespaces)
+
     def load(self, msg: str):
         if not self.namespaces:
             self.set_namespaces(msg)
@@ -28,9 +70,7 @@ class StufMessage:
 
     def set_namespaces(self, msg):
         self.namespaces = dict([node for _, node in ET.iterparse(StringIO(msg), events=['start-ns'])])
-
-        for prefix, url in self.namespaces.items():
-            ET.register_namespace(prefix, url)
+        register_namespaces(self.namespaces)
 
     def find_elm(self, elements_str: str, tree=None):
         """Returns the first element in tree. Tree defaults to the message root.
@@ -78,6 +118,40 @@ class StufMessage:
             return []
         return parent.findall(elements[-1], self.namespaces)
 
+    def get_elm_index_path(self, elements_str: str, tree=None):
+        """Returns the position of the first element identified by elements_str as a list of child indexes.
+
+        The index path can be used to locate the element in any copy of the tree, without searching.
+
+        Example:
+            get_elm_index_path('a b') returns [1, 0] when a is the second child of the root and b is the first child
+            of a
+
+        :param elements_str:
+        :param tree:
+        :return:
+        """
+        parent = self.tree if tree is None else tree
+        index_path = []
+        for element in elements_str.split(' '):
+            elm = parent.find(element, self.namespaces)
+            assert elm is not None, f"Element {element} not found"
+            index_path.append(list(parent).index(elm))
+            parent = elm
+        return index_path
+
+    def get_elm_by_index_path(self, index_path: list, tree=None):
+        """Returns the element at the given index path, see get_elm_index_path
+
+        :param index_path:
+        :param tree:
+        :return:
+        """
+        elm = self.tree if tree is None else tree
+        for index in index_path:
+            elm = elm[index]
+        return elm
+
     def set_elm_value(self, elements_str: str, value: str, exact_match=True, tree=None):
         """Set the value of the first element identified by elements_str.
 
@@ -184,3 +258,94 @@ class StufMessage:
         # normalise newlines
         xml_string = os.linesep.join([s for s in xml_string.splitlines() if s.strip()])
         return xml_string
+
+
+class StufMessageParser:
+    """Parses a StUF message incrementally, from chunks of the message as they become available
+
+    Elements that are not needed are removed as soon as they have been parsed. An element is needed when its tag is
+    in tags or when it is part of the subtree of an element with a tag in subtree_tags. All elements are needed when
+    tags is None.
+
+    The elements at element_path (the tags of the element and its ancestors, starting at the root) are collected as
+    soon as they have been parsed and are removed from the message, see read_elements.
+    """
+
+    def __init__(self, element_path: list = None, tags: set = None, subtree_tags: set = None):
+        """
+
+        :param element_path: the resolved tags of the path to the elements to collect
+        :param tags: the resolved tags of the elements that are needed
+        :param subtree_tags: the resolved tags of the elements of which the complete subtree is needed
+        """
+        self.element_path = element_path
+        self.tags = tags
+        self.subtree_tags = subtree_tags or set()
+
+        self.root = None
+
+        self._parser = ET.XMLPullParser(events=('start', 'end'))
+        self._path = []
+        self._parents = []
+        self._subtree_depth = 0
+        self._elements = []
+
+    def feed(self, data):
+        """Parses the next chunk of the message
+
+        :param data: str or bytes
+        :return:
+        """
+        self._parser.feed(data)
+        self._read_events()
+
+    def close(self):
+        """Finishes parsing the message
+
+        :return: the root element of the message
+        """
+        self._parser.close()
+        self._read_events()
+        return self.root
+
+    def read_elements(self) -> list:
+        """Returns the elements at element_path that have been parsed since the last call
+
+        :return:
+        """
+        elements, self._elements = self._elements, []
+        return elements
+
+    def _read_events(self):
+        for event, elm in self._parser.read_events():
+            if event == 'start':
+                self._start(elm)
+            else:
+                self._end(elm)
+
+    def _start(self, elm: ET.Element):
+        if self.root is None:
+            self.root = elm
+        if elm.tag in self.subtree_tags:
+            self._subtree_depth += 1
+        self._path.append(elm.tag)
+        self._parents.append(elm)
+
+    def _end(self, elm: ET.Element):
+        is_collected = self._path == self.element_path
+        self._path.pop()
+        self._parents.pop()
+        if elm.tag in self.subtree_tags:
+            self._subtree_depth -= 1
+
+        if is_collected:
+            self._elements.append(elm)
+        elif self._is_needed(elm):
+            return
+
+        if self._parents:
+            # Any following siblings may already have been parsed, remove the element itself
+            self._parents[-1].remove(elm)
+
+    def _is_needed(self, elm: ET.Element):
+        return self.tags is None or self._subtree_depth > 0 or elm.tag in self.tags
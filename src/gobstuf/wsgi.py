@@ -1,4 +1,11 @@
+import gc
+
 from gobstuf.app import get_app
 
 # Run the app with uWSGI
 app = get_app()
+
+# The workers are forked from the process that loaded the app. Exclude the objects that have been created so far
+# (eg the reference data and the compiled mappings) from garbage collection, so that the collector does not touch
+# their memory pages and the pages stay shared between the workers
+gc.freeze()
@@ -0,0 +1,63 @@
+import json
+import os
+import tempfile
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from gobstuf.benchmarks.__main__ import main, run_stages
+from gobstuf.benchmarks.stages import Fixture
+
+RESULT = {'ops_per_sec': 1.0, 'p50_ms': 1.0, 'p99_ms': 1.0, 'allocated_kib': 1.0}
+
+
+class TestMain(TestCase):
+
+    def test_run_stages(self):
+        results = run_stages(['request', 'serialize'], Fixture(objects=2), 3, 1)
+        self.assertEqual(['request', 'serialize'], list(results))
+        self.assertEqual({'ops_per_sec', 'p50_ms', 'p99_ms', 'allocated_kib'}, set(results['request']))
+
+    @patch("builtins.print")
+    @patch("gobstuf.benchmarks.__main__.run_stages")
+    @patch("gobstuf.benchmarks.__main__.Fixture")
+    def test_main(self, mock_fixture, mock_run_stages, mock_print):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'baseline.json')
+
+            def read_stages():
+                with open(path) as f:
+                    return json.load(f)['stages']
+
+            mock_run_stages.return_value = {'parse': RESULT, 'serialize': RESULT}
+            main(['--baseline', path])
+            mock_fixture.assert_called_with(objects=20, relatives=3, seed=0)
+            mock_run_stages.assert_called_with(['request', 'parse', 'answer_object', 'all_answer_objects',
+                                                'related_detail_filter', 'wildcard_filter', 'serialize'],
+                                               mock_fixture.return_value, 1000, 10)
+            self.assertEqual({'parse': RESULT, 'serialize': RESULT}, read_stages())
+
+            # The stages that did not run are kept
+            mock_run_stages.return_value = {'parse': {**RESULT, 'ops_per_sec': 2.0}}
+            main(['parse', '--baseline', path])
+            mock_run_stages.assert_called_with(['parse'], mock_fixture.return_value, 1000, 10)
+            self.assertEqual({'parse': {**RESULT, 'ops_per_sec': 2.0}, 'serialize': RESULT}, read_stages())
+            self.assertIn('+100.0%*', mock_print.call_args[0][0])
+
+            # Unless they were run with other settings
+            main(['parse', '--baseline', path, '--iterations', '10', '--warmup', '2', '--objects', '5',
+                  '--relatives', '1', '--seed', '3'])
+            mock_fixture.assert_called_with(objects=5, relatives=1, seed=3)
+            mock_run_stages.assert_called_with(['parse'], mock_fixture.return_value, 10, 2)
+            self.assertEqual({'parse': {**RESULT, 'ops_per_sec': 2.0}}, read_stages())
+
+            mock_run_stages.return_value = {'parse': RESULT}
+            main(['parse', '--baseline', path, '--no-save'])
+            self.assertEqual({'parse': {**RESULT, 'ops_per_sec': 2.0}}, read_stages())
+
+    @patch("gobstuf.benchmarks.__main__.main")
+    def test_module_main(self, mock_main):
+        from gobstuf.benchmarks import __main__ as module
+        with patch.object(module, '__name__', '__main__'):
+            module.init()
+            mock_main.assert_called_once()
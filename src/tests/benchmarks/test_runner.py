@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from gobstuf.benchmarks.runner import (
+    percentile, measure_allocations, measure, load_baseline, save_baseline, get_change, format_report
+)
+
+
+class TestRunner(TestCase):
+
+    def test_percentile(self):
+        values = list(range(100, 0, -1))
+        self.assertEqual(50, percentile(values, 50))
+        self.assertEqual(99, percentile(values, 99))
+        self.assertEqual(100, percentile(values, 100))
+        self.assertEqual(1, percentile(values, 0))
+        self.assertEqual(7, percentile([7], 99))
+
+    def test_measure_allocations(self):
+        self.assertGreater(measure_allocations(lambda: [0] * 100000, 3), 100000 * 8)
+        self.assertLess(measure_allocations(lambda: None, 3), 1000)
+
+    @patch("gobstuf.benchmarks.runner.measure_allocations", lambda func, samples: 2048 * samples)
+    @patch("gobstuf.benchmarks.runner.time.perf_counter")
+    def test_measure(self, mock_perf_counter):
+        calls = []
+        # Every call takes 1 ms, the last one 5 ms
+        mock_perf_counter.side_effect = [0, 0.001] * 99 + [0, 0.005]
+
+        result = measure(lambda: calls.append(1), 100, warmup=5, allocation_samples=2)
+
+        self.assertEqual(105, len(calls))
+        self.assertEqual({
+            'ops_per_sec': round(100 / 0.104, 1),
+            'p50_ms': 1.0,
+            'p99_ms': 1.0,
+            'allocated_kib': 4.0,
+        }, result)
+
+    def test_baseline(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'baseline.json')
+            self.assertEqual({'stages': {}}, load_baseline(path))
+
+            results = {'parse': {'ops_per_sec': 10.0}}
+            save_baseline(path, results, {'iterations': 100})
+
+            baseline = load_baseline(path)
+            self.assertEqual(results, baseline['stages'])
+            self.assertEqual({'iterations': 100}, baseline['settings'])
+            self.assertIn('created', baseline)
+            self.assertIn('python', baseline)
+
+            with open(path) as f:
+                self.assertEqual(baseline, json.load(f))
+
+    def test_get_change(self):
+        self.assertEqual('', get_change(10, None, True))
+        self.assertEqual('', get_change(10, 0, True))
+        self.assertEqual('+10.0%*', get_change(11, 10, True))
+        self.assertEqual('+10.0%', get_change(11, 10, False))
+        self.assertEqual('-50.0%*', get_change(5, 10, False))
+        self.assertEqual('-50.0%', get_change(5, 10, True))
+
+    def test_format_report(self):
+        result = {'ops_per_sec': 200.0, 'p50_ms': 1.0, 'p99_ms': 2.0, 'allocated_kib': 10.0}
+        report = format_report({'parse': result, 'serialize': result}, {
+            'created': '2020-01-01T00:00:00',
+            'settings': {'iterations': 100},
+            'stages': {
+                'parse': {'ops_per_sec': 100.0, 'p50_ms': 2.0, 'p99_ms': 2.0, 'allocated_kib': 20.0},
+            }
+        }).split('\n')
+
+        self.assertEqual(4, len(report))
+        self.assertEqual(['stage', 'ops_per_sec', 'change', 'p50_ms', 'change', 'p99_ms', 'change', 'allocated_kib',
+                          'change'], report[0].split())
+        self.assertEqual(['parse', '200.0', '+100.0%*', '1.0', '-50.0%*', '2.0', '+0.0%', '10.0', '-50.0%*'],
+                         report[1].split())
+        self.assertEqual(['serialize', '200.0', '1.0', '2.0', '10.0'], report[2].split())
+        self.assertEqual("Compared with the baseline of 2020-01-01T00:00:00 {'iterations': 100}", report[3])
+
+        report = format_report({'parse': result}, {'stages': {}}).split('\n')
+        self.assertEqual(2, len(report))
@@ -0,0 +1,64 @@
+import json
+
+from unittest import TestCase
+
+from gobstuf.benchmarks.stages import STAGES, Fixture, get_app
+from gobstuf.stuf.message import StufMessage
+
+
+class TestStages(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.fixture = Fixture(objects=5, relatives=2, seed=1)
+
+    def run_stage(self, name):
+        with get_app().test_request_context('/brp/ingeschrevenpersonen'):
+            run = STAGES[name](self.fixture)
+            # Every call has the same result
+            first = run()
+            self.assertEqual(self._comparable(first), self._comparable(run()))
+            return first
+
+    def _comparable(self, result):
+        if isinstance(result, StufMessage):
+            return result.to_string()
+        return result.get_data() if hasattr(result, 'get_data') else result
+
+    def test_fixture(self):
+        self.assertEqual(Fixture(objects=5, relatives=2, seed=1).list_message, self.fixture.list_message)
+        self.assertEqual(5, self.fixture.list_message.count(b'<BG:object StUF:entiteittype="NPS"'))
+        self.assertEqual(1, self.fixture.person_message.count(b'<BG:object StUF:entiteittype="NPS"'))
+        self.assertEqual(2, self.fixture.person_message.count(b'StUF:entiteittype="NPSNPSHUW"'))
+
+    def test_request(self):
+        with get_app().test_request_context('/brp/ingeschrevenpersonen'):
+            message = STAGES['request'](self.fixture)()
+        self.assertIn(b'<StUF:gebruiker>benchmark</StUF:gebruiker>', message)
+        self.assertIn(b'1011AB', message)
+
+    def test_parse(self):
+        self.assertIsInstance(self.run_stage('parse'), StufMessage)
+
+    def test_answer_object(self):
+        person = self.run_stage('answer_object')
+        self.assertEqual(2, len(person['_embedded']['partners']) + 1)
+        self.assertEqual(2, len(person['_embedded']['kinderen']))
+        self.assertEqual(2, len(person['_embedded']['ouders']))
+
+    def test_all_answer_objects(self):
+        self.assertEqual(5, len(self.run_stage('all_answer_objects')))
+
+    def test_related_detail_filter(self):
+        partner = self.run_stage('related_detail_filter')
+        self.assertIn('burgerservicenummer', partner)
+        self.assertEqual('http://localhost/brp/ingeschrevenpersonen', partner['_links']['self']['href'])
+
+    def test_wildcard_filter(self):
+        persons = self.run_stage('wildcard_filter')
+        self.assertTrue(all(person['naam']['geslachtsnaam'].startswith('Jans') for person in persons))
+
+    def test_serialize(self):
+        response = self.run_stage('serialize')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(5, len(json.loads(response.get_data())['_embedded']['ingeschrevenpersonen']))
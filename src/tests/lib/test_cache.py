@@ -0,0 +1,77 @@
+import datetime
+
+from unittest import TestCase
+
+from freezegun import freeze_time
+
+from gobstuf.lib.cache import TTLCache, next_midnight
+
+
+class TestCache(TestCase):
+
+    def test_next_midnight(self):
+        timestamp = datetime.datetime(2020, 6, 1, 23, 59, 59).timestamp()
+        self.assertEqual(datetime.datetime(2020, 6, 2).timestamp(), next_midnight(timestamp))
+
+        timestamp = datetime.datetime(2020, 6, 2).timestamp()
+        self.assertEqual(datetime.datetime(2020, 6, 3).timestamp(), next_midnight(timestamp))
+
+    def test_get_set(self):
+        cache = TTLCache(2, 60)
+
+        self.assertIsNone(cache.get('a'))
+
+        cache.set('a', 'value a')
+        self.assertEqual('value a', cache.get('a'))
+        self.assertEqual(1, len(cache))
+
+        cache.set('a', 'other value a')
+        self.assertEqual('other value a', cache.get('a'))
+        self.assertEqual(1, len(cache))
+
+        cache.clear()
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(0, len(cache))
+
+    def test_lru(self):
+        cache = TTLCache(2, 60)
+
+        cache.set('a', 'value a')
+        cache.set('b', 'value b')
+
+        # a is used, b is the least recently used
+        cache.get('a')
+        cache.set('c', 'value c')
+
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual('value a', cache.get('a'))
+        self.assertEqual('value c', cache.get('c'))
+
+    def test_ttl(self):
+        cache = TTLCache(2, 60)
+
+        with freeze_time("2020-06-01 12:00:00") as frozen_time:
+            cache.set('a', 'value a')
+
+            frozen_time.tick(delta=datetime.timedelta(seconds=59))
+            self.assertEqual('value a', cache.get('a'))
+
+            frozen_time.tick(delta=datetime.timedelta(seconds=1))
+            self.assertIsNone(cache.get('a'))
+
+            # Expired entries are removed
+            self.assertEqual(0, len(cache))
+
+    def test_boundary(self):
+        cache = TTLCache(2, 600, boundary=next_midnight)
+
+        with freeze_time("2020-06-01 23:58:00") as frozen_time:
+            cache.set('a', 'value a')
+
+            frozen_time.tick(delta=datetime.timedelta(seconds=119))
+            self.assertEqual('value a', cache.get('a'))
+
+            # Expires at midnight, before the end of its time to live
+            frozen_time.tick(delta=datetime.timedelta(seconds=1))
+            self.assertIsNone(cache.get('a'))
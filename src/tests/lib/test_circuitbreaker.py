@@ -0,0 +1,159 @@
+import asyncio
+
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+from gobstuf.lib.circuitbreaker import CircuitBreaker, CircuitOpenException
+
+
+class MockClock:
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def fail():
+    raise ValueError()
+
+
+@patch("gobstuf.lib.circuitbreaker.time.monotonic", new_callable=MockClock)
+class TestCircuitBreaker(TestCase):
+
+    def setUp(self):
+        self.on_state_change = MagicMock()
+        self.breaker = CircuitBreaker('upstream', window_size=4, min_calls=2, failure_rate=0.5,
+                                      slow_call_duration=10, open_duration=30,
+                                      is_failure=lambda result: result == 'failure',
+                                      on_state_change=self.on_state_change)
+
+    def _open(self):
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                self.breaker.call(fail)
+
+    def test_closed(self, mock_clock):
+        self.assertEqual('result', self.breaker.call(lambda *args, **kwargs: 'result', 'arg', kwarg='kwarg'))
+        self.breaker.call(lambda: 'result')
+        self.assertEqual('failure', self.breaker.call(lambda: 'failure'))
+
+        # Below the failure rate, the window holds the last 4 calls
+        for _ in range(3):
+            self.breaker.call(lambda: 'result')
+        self.assertEqual('closed', self.breaker.state)
+        self.on_state_change.assert_not_called()
+
+    def test_open(self, mock_clock):
+        # Only one call, less than min_calls
+        with self.assertRaises(ValueError):
+            self.breaker.call(fail)
+        self.assertEqual('closed', self.breaker.state)
+
+        with self.assertRaises(ValueError):
+            self.breaker.call(fail)
+        self.assertEqual('open', self.breaker.state)
+        self.on_state_change.assert_called_with('upstream', 'open')
+
+        # Calls are rejected without being executed
+        func = MagicMock()
+        mock_clock.now = 10
+        with self.assertRaises(CircuitOpenException) as context:
+            self.breaker.call(func)
+        func.assert_not_called()
+        self.assertEqual('upstream', context.exception.name)
+        self.assertEqual(20, context.exception.retry_after)
+
+    def test_slow_calls(self, mock_clock):
+        def slow():
+            mock_clock.now += 11
+            return 'result'
+
+        for _ in range(2):
+            self.assertEqual('result', self.breaker.call(slow))
+        self.assertEqual('open', self.breaker.state)
+
+    def test_half_open(self, mock_clock):
+        self._open()
+        mock_clock.now = 30
+
+        def probe():
+            # Other calls are rejected while the probe is in flight
+            self.assertEqual('half_open', self.breaker.state)
+            with self.assertRaises(CircuitOpenException):
+                self.breaker.call(MagicMock())
+            return 'result'
+
+        # A successful probe closes the circuit
+        self.assertEqual('result', self.breaker.call(probe))
+        self.assertEqual('closed', self.breaker.state)
+        self.on_state_change.assert_called_with('upstream', 'closed')
+
+        # With a new window
+        with self.assertRaises(ValueError):
+            self.breaker.call(fail)
+        self.assertEqual('closed', self.breaker.state)
+
+    def test_half_open_failure(self, mock_clock):
+        self._open()
+        mock_clock.now = 30
+
+        # A failed probe opens the circuit again
+        self.breaker.call(lambda: 'failure')
+        self.assertEqual('open', self.breaker.state)
+
+        mock_clock.now = 59
+        with self.assertRaises(CircuitOpenException):
+            self.breaker.call(MagicMock())
+
+    def test_calls_started_before_open(self, mock_clock):
+        def call_while_opened():
+            self._open()
+            return 'result'
+
+        # The result of a call that started while the circuit was closed is ignored
+        self.breaker.call(call_while_opened)
+        self.assertEqual('open', self.breaker.state)
+
+    def test_call_async(self, mock_clock):
+        async def succeed(value):
+            return value
+
+        async def fail_async():
+            raise ValueError()
+
+        async def run():
+            for _ in range(2):
+                with self.assertRaises(ValueError):
+                    await self.breaker.call_async(fail_async)
+            self.assertEqual('open', self.breaker.state)
+
+            with self.assertRaises(CircuitOpenException):
+                await self.breaker.call_async(succeed, 'result')
+
+            # A cancelled probe counts as a failure, so that the circuit does not stay half open
+            mock_clock.now = 30
+
+            async def cancelled():
+                raise asyncio.CancelledError()
+
+            with self.assertRaises(asyncio.CancelledError):
+                await self.breaker.call_async(cancelled)
+            self.assertEqual('open', self.breaker.state)
+
+            mock_clock.now = 60
+            self.assertEqual('failure', await self.breaker.call_async(succeed, 'failure'))
+            self.assertEqual('open', self.breaker.state)
+
+        asyncio.run(run())
+
+    def test_defaults(self, mock_clock):
+        breaker = CircuitBreaker('upstream', window_size=1, min_calls=1, failure_rate=1, slow_call_duration=10,
+                                 open_duration=30)
+        self.assertEqual('failure', breaker.call(lambda: 'failure'))
+        self.assertEqual('closed', breaker.state)
+
+        with self.assertRaises(ValueError):
+            breaker.call(fail)
+        self.assertEqual('open', breaker.state)
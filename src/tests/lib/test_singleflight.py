@@ -0,0 +1,193 @@
+import asyncio
+import threading
+
+from unittest import TestCase
+from unittest.mock import MagicMock, call
+
+from gobstuf.lib.singleflight import SingleFlight, AsyncSingleFlight
+
+
+class CountingSingleFlight(SingleFlight):
+    """Signals every caller that waits for a leader"""
+
+    def __init__(self, on_result=None):
+        super().__init__(on_result)
+        self.waiting = threading.Semaphore(0)
+
+    def _wait(self, call):
+        self.waiting.release()
+        return super()._wait(call)
+
+
+class TestSingleFlight(TestCase):
+
+    def test_do(self):
+        single_flight = SingleFlight()
+        func = MagicMock(return_value='result')
+
+        self.assertEqual('result', single_flight.do('key', func, 'arg', kwarg='kwarg'))
+        func.assert_called_with('arg', kwarg='kwarg')
+
+        # Results are not kept
+        single_flight.do('key', func)
+        self.assertEqual(2, func.call_count)
+        self.assertEqual({}, single_flight._calls)
+
+    def test_do_exception(self):
+        single_flight = SingleFlight()
+
+        with self.assertRaises(ValueError):
+            single_flight.do('key', MagicMock(side_effect=ValueError))
+        self.assertEqual({}, single_flight._calls)
+
+    def _run_concurrent(self, keys, func, on_result=None):
+        """Runs do() for every key in a separate thread, while the leader for 'key' is in flight
+
+        :return: results and exceptions by thread
+        """
+        single_flight = CountingSingleFlight(on_result)
+        started = threading.Event()
+        release = threading.Event()
+
+        def leader():
+            started.set()
+            release.wait()
+            return func()
+
+        results = {}
+
+        def run(i, key, f):
+            try:
+                results[i] = single_flight.do(key, f)
+            except Exception as e:
+                results[i] = e
+
+        threads = [threading.Thread(target=run, args=(0, 'key', leader))]
+        threads[0].start()
+        started.wait()
+
+        threads += [threading.Thread(target=run, args=(i + 1, key, func)) for i, key in enumerate(keys)]
+        for thread in threads[1:]:
+            thread.start()
+
+        # Wait until the callers for 'key' are waiting for the leader, the others are done
+        for _ in range(keys.count('key')):
+            single_flight.waiting.acquire()
+        release.set()
+
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_do_concurrent(self):
+        func = MagicMock(return_value='result')
+
+        results = self._run_concurrent(['key', 'key', 'other key'], func)
+
+        self.assertEqual({0: 'result', 1: 'result', 2: 'result', 3: 'result'}, results)
+
+        # Once for the leader of 'key' and once for 'other key'
+        self.assertEqual(2, func.call_count)
+
+    def test_do_concurrent_exception(self):
+        exception = ValueError()
+        func = MagicMock(side_effect=exception)
+
+        results = self._run_concurrent(['key', 'key'], func)
+
+        # Waiting callers get the exception of the leader
+        self.assertEqual({0: exception, 1: exception, 2: exception}, results)
+        func.assert_called_once()
+
+    def test_do_on_result(self):
+        on_result = MagicMock()
+        single_flight = SingleFlight(on_result)
+        single_flight.do('key', MagicMock(return_value='result'))
+        on_result.assert_called_with('result', 1)
+
+        # Called with the number of callers that share the result, before they get it
+        func = MagicMock(return_value='result')
+        on_result = MagicMock()
+        results = self._run_concurrent(['key', 'key', 'other key'], func, on_result)
+        self.assertEqual({0: 'result', 1: 'result', 2: 'result', 3: 'result'}, results)
+        self.assertEqual(sorted([call('result', 3), call('result', 1)]), sorted(on_result.call_args_list))
+
+        # Not called on an exception
+        on_result = MagicMock()
+        self._run_concurrent(['key'], MagicMock(side_effect=ValueError), on_result)
+        on_result.assert_not_called()
+
+        # Waiting callers still get the result when on_result fails
+        results = self._run_concurrent(['key'], func, MagicMock(side_effect=ValueError))
+        self.assertIsInstance(results[0], ValueError)
+        self.assertEqual('result', results[1])
+
+
+class TestAsyncSingleFlight(TestCase):
+
+    def test_do(self):
+        single_flight = AsyncSingleFlight()
+        calls = []
+
+        async def func(*args, **kwargs):
+            calls.append((args, kwargs))
+            return 'result'
+
+        async def run():
+            self.assertEqual('result', await single_flight.do('key', func, 'arg', kwarg='kwarg'))
+            # Results are not kept
+            await asyncio.sleep(0)
+            self.assertEqual('result', await single_flight.do('key', func))
+
+        asyncio.run(run())
+        self.assertEqual([(('arg',), {'kwarg': 'kwarg'}), ((), {})], calls)
+        self.assertEqual({}, single_flight._calls)
+
+    def test_do_concurrent(self):
+        single_flight = AsyncSingleFlight()
+        calls = []
+
+        async def func(value):
+            calls.append(value)
+            await asyncio.sleep(0.01)
+            if value == 'error':
+                raise ValueError(value)
+            return value
+
+        async def run():
+            return await asyncio.gather(
+                single_flight.do('key', func, 'result'),
+                single_flight.do('key', func, 'result of waiting caller'),
+                single_flight.do('other key', func, 'other result'),
+                single_flight.do('error key', func, 'error'),
+                single_flight.do('error key', func, 'error'),
+                return_exceptions=True
+            )
+
+        results = asyncio.run(run())
+
+        # Callers with the same key share the first call and its result or exception
+        self.assertEqual(['result', 'result', 'other result'], results[:3])
+        self.assertIsInstance(results[3], ValueError)
+        self.assertIs(results[3], results[4])
+        self.assertEqual(['result', 'other result', 'error'], calls)
+        self.assertEqual({}, single_flight._calls)
+
+    def test_do_cancelled(self):
+        single_flight = AsyncSingleFlight()
+
+        async def func():
+            await asyncio.sleep(0.01)
+            return 'result'
+
+        async def run():
+            first = asyncio.ensure_future(single_flight.do('key', func))
+            second = asyncio.ensure_future(single_flight.do('key', func))
+            await asyncio.sleep(0)
+
+            # The call continues for the other callers when the first caller is cancelled
+            first.cancel()
+            self.assertEqual('result', await second)
+            self.assertTrue(first.cancelled())
+
+        asyncio.run(run())
@@ -0,0 +1,146 @@
+import re
+import threading
+
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from gobstuf.lib.stream import rewrite_chunks, SharedChunks
+
+
+class TestRewriteChunks(TestCase):
+
+    pattern = rb"any\.host(:\d{2,5})?"
+    replacement = b"localhost:8165"
+    max_length = len(b"any.host:12345")
+
+    def rewrite(self, chunks):
+        return b''.join(rewrite_chunks(chunks, self.pattern, self.replacement, self.max_length))
+
+    def test_rewrite_chunks(self):
+        self.assertEqual(b'', self.rewrite([]))
+        self.assertEqual(b'', self.rewrite([b'', b'']))
+        self.assertEqual(b'...localhost:8165...', self.rewrite([b'...any.host...']))
+        self.assertEqual(b'...localhost:8165...', self.rewrite([b'...any.host:123...']))
+
+    def test_rewrite_chunks_boundaries(self):
+        data = b'<a>http://any.host:8443/path</a><b>any.host</b>any.hostany.host:1any.host:123456any.host'
+        expect = re.sub(self.pattern, self.replacement, data)
+
+        # Split the data at every possible position, in two and in three chunks
+        for i in range(len(data) + 1):
+            self.assertEqual(expect, self.rewrite([data[:i], data[i:]]))
+            for j in range(i, len(data) + 1):
+                self.assertEqual(expect, self.rewrite([data[:i], data[i:j], data[j:]]))
+
+        # Byte by byte
+        self.assertEqual(expect, self.rewrite([data[i:i + 1] for i in range(len(data))]))
+
+    def test_rewrite_chunks_streams(self):
+        # Data is yielded before the stream ends, only a possible partial match is held back
+        chunks = rewrite_chunks(iter([b'x' * 100, b'any.ho', b'st']), self.pattern, self.replacement, self.max_length)
+        self.assertEqual(b'x' * (100 - self.max_length + 1), next(chunks))
+        self.assertEqual(b'x' * (self.max_length - 1) + b'localhost:8165', b''.join(chunks))
+
+
+class TestSharedChunks(TestCase):
+
+    def test_iter(self):
+        read = []
+
+        def chunks():
+            for chunk in [b'a', b'bc', b'd']:
+                read.append(chunk)
+                yield chunk
+
+        shared = SharedChunks(chunks(), readers=2)
+        self.assertEqual(0, shared.size)
+
+        # Chunks are read when they are needed
+        first = iter(shared)
+        self.assertEqual(b'a', next(first))
+        self.assertEqual([b'a'], read)
+
+        # And are read only once for all readers
+        self.assertEqual([b'a', b'bc', b'd'], list(shared))
+        self.assertEqual([b'bc', b'd'], list(first))
+        self.assertEqual([b'a', b'bc', b'd'], read)
+        self.assertEqual(4, shared.size)
+
+    def test_iter_keeps_unread_chunks_only(self):
+        shared = SharedChunks(iter([b'a', b'bc', b'd']))
+
+        # A single reader keeps no chunks
+        reader = iter(shared)
+        self.assertEqual(b'a', next(reader))
+        self.assertEqual([], shared._buffer)
+        self.assertEqual(b'bc', next(reader))
+        self.assertEqual([], shared._buffer)
+        self.assertEqual(3, shared.size)
+
+        # Any other reader is too late
+        with self.assertRaises(RuntimeError):
+            next(iter(shared))
+
+        # A chunk is kept until every reader has read it
+        shared = SharedChunks(iter([b'a', b'bc', b'd']))
+        shared.share(2)
+        first, second = iter(shared), iter(shared)
+        self.assertEqual([b'a', b'bc'], [next(first), next(first)])
+        self.assertEqual([b'a', b'bc'], shared._buffer)
+        self.assertEqual(b'a', next(second))
+        self.assertEqual([b'bc'], shared._buffer)
+        self.assertEqual([b'bc', b'd'], list(second))
+        self.assertEqual([b'd'], shared._buffer)
+        self.assertEqual([b'd'], list(first))
+        self.assertEqual([], shared._buffer)
+
+    def test_iter_any_number_of_readers(self):
+        shared = SharedChunks([b'a', b'bc'], readers=None)
+        for _ in range(3):
+            self.assertEqual([b'a', b'bc'], list(shared))
+
+    def test_iter_exception(self):
+        def chunks():
+            yield b'a'
+            raise IOError
+
+        shared = SharedChunks(chunks(), readers=2)
+        for _ in range(2):
+            reader = iter(shared)
+            self.assertEqual(b'a', next(reader))
+            with self.assertRaises(IOError):
+                next(reader)
+
+    def test_release(self):
+        on_close = MagicMock()
+        shared = SharedChunks(iter([b'a', b'bc']), readers=2, on_close=on_close)
+        self.assertEqual(b'a', next(iter(shared)))
+
+        shared.release()
+        on_close.assert_not_called()
+
+        # The last reader closes the stream and drops the chunks that have not been read by every reader
+        shared.release()
+        on_close.assert_called_once()
+        self.assertEqual([], shared._buffer)
+
+        shared.release()
+        on_close.assert_called_once()
+
+        # Without on_close
+        shared = SharedChunks([b'a'])
+        shared.release()
+
+    def test_iter_concurrent(self):
+        data = [bytes([i]) * 10 for i in range(200)]
+        shared = SharedChunks(iter(data), readers=8)
+        results = []
+
+        threads = [threading.Thread(target=lambda: results.append(list(shared))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([data] * 8, results)
+        self.assertEqual([], shared._buffer)
@@ -0,0 +1,188 @@
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+from flask import Flask, Response, request
+
+from gobstuf.loadtest import harness
+from gobstuf.loadtest.harness import (
+    get_gatekeeper_headers, FlaskTarget, HttpTarget, is_error, summarize, LoadTest, format_level, format_report,
+    NO_RESPONSE
+)
+
+
+class TestGatekeeperHeaders(TestCase):
+
+    @patch("gobstuf.loadtest.harness.USER_ID_HEADER", 'X-Auth-Userid')
+    @patch("gobstuf.loadtest.harness.USER_NAME_HEADER", 'X-Auth-Name')
+    @patch("gobstuf.loadtest.harness.ROLES_HEADER", 'X-Auth-Roles')
+    def test_get_gatekeeper_headers(self):
+        self.assertEqual({
+            'X-Auth-Userid': 'user',
+            'X-Auth-Name': 'user',
+            'X-Auth-Roles': 'fp_role',
+        }, get_gatekeeper_headers('user', 'fp_role'))
+
+
+class TestTargets(TestCase):
+
+    def test_flask_target(self):
+        app = Flask(__name__)
+
+        @app.route('/base/path')
+        def view():
+            status = 200 if request.headers.get('X-Test') == 'test' else 403
+            return Response((chunk for chunk in ['a', 'b']), status=status)
+
+        target = FlaskTarget(app, '/base')
+        self.assertEqual(200, target.get('/path', {'X-Test': 'test'}))
+        self.assertEqual(403, target.get('/path', {}))
+        self.assertEqual(404, target.get('/other', {}))
+
+    @patch("gobstuf.loadtest.harness.requests.Session")
+    def test_http_target(self, mock_session):
+        target = HttpTarget('http://localhost:8165/gob_stuf/', timeout=5)
+        mock_session.return_value.get.return_value.status_code = 200
+
+        self.assertEqual(200, target.get('/brp/ingeschrevenpersonen/1', {'X-Test': 'test'}))
+        mock_session.return_value.get.assert_called_with('http://localhost:8165/gob_stuf/brp/ingeschrevenpersonen/1',
+                                                         headers={'X-Test': 'test'}, timeout=5)
+
+        # The session of the thread is reused
+        target.get('/brp/ingeschrevenpersonen/2', {})
+        mock_session.assert_called_once()
+
+
+class TestSummarize(TestCase):
+
+    def test_is_error(self):
+        self.assertFalse(is_error(200))
+        self.assertFalse(is_error(304))
+        self.assertTrue(is_error(NO_RESPONSE))
+        self.assertTrue(is_error(404))
+        self.assertTrue(is_error(503))
+
+    def test_summarize(self):
+        results = [('bsn', 200, 0.001 * (i + 1)) for i in range(96)] + \
+                  [('bsn', 503, 0.2), ('bsn', 503, 0.3), ('wildcard', 500, 0.4), ('wildcard', NO_RESPONSE, 0.5)]
+        self.assertEqual({
+            'requests': 100,
+            'rps': 50.0,
+            'p50_ms': 50.0,
+            'p90_ms': 90.0,
+            'p99_ms': 400.0,
+            'max_ms': 500.0,
+            'error_rate': 0.04,
+            'errors': {503: 2, 500: 1, NO_RESPONSE: 1},
+        }, summarize(results, 2.0))
+
+    def test_summarize_empty(self):
+        self.assertEqual({
+            'requests': 0,
+            'rps': 0.0,
+            'p50_ms': 0.0,
+            'p90_ms': 0.0,
+            'p99_ms': 0.0,
+            'max_ms': 0.0,
+            'error_rate': 0.0,
+            'errors': {},
+        }, summarize([], 2.0))
+
+
+class MockMix:
+
+    def iter_requests(self, seed):
+        while True:
+            yield 'bsn', f'/bsn/{seed}'
+            yield 'wildcard', f'/wildcard/{seed}'
+
+
+class MockTarget:
+
+    def __init__(self):
+        self.paths = []
+
+    def get(self, path, headers):
+        assert headers == {'X-Test': 'test'}
+        self.paths.append(path)
+        if path.startswith('/wildcard'):
+            raise Exception("Connection refused")
+        return 200
+
+
+class TestLoadTest(TestCase):
+
+    def setUp(self):
+        self.target = MockTarget()
+        self.load_test = LoadTest(self.target, MockMix(), {'X-Test': 'test'}, seed=2)
+
+    @patch("gobstuf.loadtest.harness.logging")
+    def test_send(self, mock_logging):
+        kind, status, latency = self.load_test._send('bsn', '/bsn/1')
+        self.assertEqual(('bsn', 200), (kind, status))
+        self.assertGreaterEqual(latency, 0)
+
+        kind, status, latency = self.load_test._send('wildcard', '/wildcard/1')
+        self.assertEqual(('wildcard', NO_RESPONSE), (kind, status))
+        mock_logging.warning.assert_called_with("Request /wildcard/1 failed: Connection refused")
+
+    @patch("gobstuf.loadtest.harness.logging", MagicMock())
+    @patch("gobstuf.loadtest.harness.time.perf_counter")
+    def test_client(self, mock_perf_counter):
+        # Every request takes one second, the deadline is reached after three requests
+        mock_perf_counter.side_effect = [0, 0, 1, 1, 1, 2, 2, 2, 3, 3]
+        results = self.load_test._client(3, 3)
+        self.assertEqual(['/bsn/2003', '/wildcard/2003', '/bsn/2003'], self.target.paths)
+        self.assertEqual([('bsn', 200, 1), ('wildcard', NO_RESPONSE, 1), ('bsn', 200, 1)], results)
+
+    def test_run_level(self):
+        def client(index, deadline):
+            self.assertGreater(deadline, 0)
+            return [('bsn', 200, 0.001 * index)] * 2 + [('wildcard', NO_RESPONSE, 0.01)]
+
+        with patch.object(self.load_test, '_client', side_effect=client) as mock_client:
+            summary = self.load_test.run_level(4, 0.05)
+
+        self.assertEqual([0, 1, 2, 3], sorted(c[0][0] for c in mock_client.call_args_list))
+        self.assertEqual(4, summary['concurrency'])
+        self.assertEqual(12, summary['requests'])
+        self.assertEqual({NO_RESPONSE: 4}, summary['errors'])
+        self.assertEqual(['bsn', 'wildcard'], list(summary['kinds']))
+        self.assertEqual(8, summary['kinds']['bsn']['requests'])
+        self.assertEqual(3.0, summary['kinds']['bsn']['max_ms'])
+        self.assertEqual(1.0, summary['kinds']['wildcard']['error_rate'])
+
+    @patch("gobstuf.loadtest.harness.logging")
+    def test_run(self, mock_logging):
+        with patch.object(self.load_test, 'run_level') as mock_run_level:
+            mock_run_level.side_effect = lambda concurrency, duration: {
+                'concurrency': concurrency, 'requests': 10, 'rps': 5.0, 'p50_ms': 1.0, 'p90_ms': 2.0,
+                'p99_ms': 3.0, 'max_ms': 4.0, 'error_rate': 0.0, 'errors': {}
+            }
+
+            summaries = self.load_test.run([1, 2], 10, warmup=2)
+            self.assertEqual([1, 2], [summary['concurrency'] for summary in summaries])
+            self.assertEqual([((1, 2),), ((1, 10),), ((2, 10),)], [c[0:1] for c in mock_run_level.call_args_list])
+            self.assertEqual(2, mock_logging.info.call_count)
+
+            mock_run_level.reset_mock()
+            self.load_test.run([1], 10)
+            self.assertEqual([((1, 10),)], [c[0:1] for c in mock_run_level.call_args_list])
+
+
+class TestReport(TestCase):
+
+    def summary(self, concurrency, rps, errors=None):
+        return {'concurrency': concurrency, 'requests': 100, 'rps': rps, 'p50_ms': 1.0, 'p90_ms': 2.0,
+                'p99_ms': 3.0, 'max_ms': 4.0, 'error_rate': 0.01, 'errors': errors or {}}
+
+    def test_format_level(self):
+        self.assertEqual(['1', '100', '5.0', '1.0', '2.0', '3.0', '4.0', '0.01', '503:', '1'],
+                         format_level(self.summary(1, 5.0, {503: 1})).split())
+
+    def test_format_report(self):
+        report = format_report([self.summary(1, 5.0), self.summary(2, 9.0), self.summary(4, 8.0)]).split('\n')
+        self.assertEqual(harness.LEVEL_COLUMNS + ['errors'], report[0].split())
+        self.assertEqual(5, len(report))
+        self.assertEqual("Saturation: 9.0 requests per second at concurrency 2", report[-1])
+
+        self.assertEqual(1, len(format_report([]).split('\n')))
@@ -0,0 +1,71 @@
+import json
+import os
+import tempfile
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from gobstuf.loadtest.__main__ import main, levels, get_target
+from gobstuf.loadtest.harness import HttpTarget, FlaskTarget
+
+
+class TestMain(TestCase):
+
+    def test_levels(self):
+        self.assertEqual([1, 2, 4], levels('1,2,4'))
+
+    @patch("gobstuf.api.get_flask_app")
+    def test_get_target(self, mock_get_flask_app):
+        target = get_target('http://localhost:8165/gob_stuf')
+        self.assertIsInstance(target, HttpTarget)
+        self.assertEqual('http://localhost:8165/gob_stuf', target.url)
+
+        target = get_target()
+        self.assertIsInstance(target, FlaskTarget)
+        self.assertEqual(mock_get_flask_app.return_value, target.app)
+
+    @patch("builtins.print")
+    @patch("gobstuf.loadtest.__main__.get_gatekeeper_headers")
+    @patch("gobstuf.loadtest.__main__.get_target")
+    @patch("gobstuf.loadtest.__main__.LoadTest")
+    @patch("gobstuf.loadtest.__main__.RequestMix")
+    @patch("gobstuf.loadtest.__main__.Corpus")
+    def test_main(self, mock_corpus, mock_mix, mock_load_test, mock_get_target, mock_headers, mock_print):
+        mock_load_test.return_value.run.return_value = []
+
+        main([])
+        mock_corpus.assert_called_with(size=1000, seed=0)
+        mock_mix.assert_called_with(mock_corpus.return_value,
+                                    {'bsn': 4.0, 'expand': 2.0, 'postcode': 2.0, 'wildcard': 1.0})
+        mock_get_target.assert_called_with(None)
+        mock_headers.assert_called_with('loadtest', 'fp_loadtest')
+        mock_load_test.assert_called_with(mock_get_target.return_value, mock_mix.return_value,
+                                          mock_headers.return_value, seed=0)
+        mock_load_test.return_value.run.assert_called_with([1, 2, 4, 8, 16, 32], 10.0, 2.0)
+        mock_print.assert_called_once()
+
+        summaries = [{'concurrency': 2, 'rps': 1.0}]
+        mock_load_test.return_value.run.return_value = summaries
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output = os.path.join(tmpdir, 'results.json')
+            with patch("gobstuf.loadtest.__main__.format_report") as mock_format_report:
+                main(['--url', 'http://localhost:8001', '--concurrency', '2', '--duration', '5', '--warmup', '0',
+                      '--mix', 'bsn=1,wildcard=1', '--persons', '100', '--seed', '3', '--user', 'u', '--role', 'r',
+                      '--output', output])
+                mock_format_report.assert_called_with(summaries)
+
+            with open(output) as f:
+                self.assertEqual(summaries, json.load(f))
+
+        mock_corpus.assert_called_with(size=100, seed=3)
+        mock_mix.assert_called_with(mock_corpus.return_value, {'bsn': 1.0, 'wildcard': 1.0})
+        mock_get_target.assert_called_with('http://localhost:8001')
+        mock_headers.assert_called_with('u', 'r')
+        mock_load_test.return_value.run.assert_called_with([2], 5.0, 0.0)
+
+    @patch("gobstuf.loadtest.__main__.main")
+    def test_module_main(self, mock_main):
+        from gobstuf.loadtest import __main__ as module
+        with patch.object(module, '__name__', '__main__'):
+            module.init()
+            mock_main.assert_called_once()
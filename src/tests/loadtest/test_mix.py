@@ -0,0 +1,98 @@
+import random
+
+from unittest import TestCase
+from urllib.parse import urlsplit, parse_qs
+
+from gobstuf.loadtest.mix import (
+    bsn_request, expand_request, postcode_request, wildcard_request, parse_mix, RequestMix, EXPAND_VARIANTS,
+    DEFAULT_MIX
+)
+from gobstuf.mks_simulator.corpus import Corpus
+
+PERSON = {
+    'BG:inp.bsn': '123456782',
+    'BG:verblijfsadres': {
+        'BG:gor.openbareRuimteNaam': 'Kalverstraat',
+        'BG:aoa.postcode': '1012AB',
+        'BG:aoa.huisnummer': '12',
+    }
+}
+
+
+def get_query(path):
+    return {key: value[0] for key, value in parse_qs(urlsplit(path).query).items()}
+
+
+class TestRequests(TestCase):
+
+    def test_bsn_request(self):
+        self.assertEqual('/brp/ingeschrevenpersonen/123456782', bsn_request(PERSON, random.Random(0)))
+
+    def test_expand_request(self):
+        paths = {expand_request(PERSON, random.Random(seed)) for seed in range(50)}
+        self.assertEqual({f'/brp/ingeschrevenpersonen/123456782?expand={variant.replace(",", "%2C")}'
+                          for variant in EXPAND_VARIANTS}, paths)
+
+    def test_postcode_request(self):
+        path = postcode_request(PERSON, random.Random(0))
+        self.assertEqual('/brp/ingeschrevenpersonen', urlsplit(path).path)
+        self.assertEqual({'verblijfplaats__postcode': '1012AB', 'verblijfplaats__huisnummer': '12'}, get_query(path))
+
+    def test_wildcard_request(self):
+        for seed in range(20):
+            query = get_query(wildcard_request(PERSON, random.Random(seed)))
+            self.assertEqual('0363', query['verblijfplaats__gemeentevaninschrijving'])
+            self.assertEqual('12', query['verblijfplaats__huisnummer'])
+            naam = query['verblijfplaats__naamopenbareruimte']
+            self.assertRegex(naam, r'^\w{2,5}\*$')
+            self.assertTrue('Kalverstraat'.startswith(naam[:-1]))
+
+
+class TestParseMix(TestCase):
+
+    def test_parse_mix(self):
+        self.assertEqual({'bsn': 4.0, 'expand': 2.0, 'postcode': 2.0, 'wildcard': 1.0}, parse_mix(DEFAULT_MIX))
+        self.assertEqual({'bsn': 1.0, 'wildcard': 0.5}, parse_mix('bsn,wildcard=0.5'))
+
+        with self.assertRaisesRegex(ValueError, "Unknown request any"):
+            parse_mix('bsn=1,any=2')
+
+        with self.assertRaises(ValueError):
+            parse_mix('bsn=x')
+
+
+class TestRequestMix(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.corpus = Corpus(size=50, seed=1, briefadres_rate=0.5)
+
+    def take(self, iterator, n):
+        return [next(iterator) for _ in range(n)]
+
+    def test_iter_requests(self):
+        mix = RequestMix(self.corpus, {'bsn': 3, 'wildcard': 1})
+        requests = self.take(mix.iter_requests(1), 400)
+
+        # The same seed gives the same requests
+        self.assertEqual(requests, self.take(mix.iter_requests(1), 400))
+        self.assertNotEqual(requests, self.take(mix.iter_requests(2), 400))
+
+        kinds = [kind for kind, _ in requests]
+        self.assertEqual({'bsn', 'wildcard'}, set(kinds))
+        self.assertGreater(kinds.count('bsn'), 2 * kinds.count('wildcard'))
+
+        bsns = {person['BG:inp.bsn'] for person in self.corpus.persons}
+        for kind, path in requests:
+            if kind == 'bsn':
+                self.assertIn(path.split('/')[-1], bsns)
+
+    def test_residents(self):
+        mix = RequestMix(self.corpus, {'postcode': 1})
+        self.assertLess(len(mix.residents), len(self.corpus.persons))
+        self.assertTrue(all('BG:verblijfsadres' in person for person in mix.residents))
+
+        # Searches on address only ask for persons with a woonadres
+        postcodes = {person['BG:verblijfsadres']['BG:aoa.postcode'] for person in mix.residents}
+        for _, path in self.take(mix.iter_requests(0), 100):
+            self.assertIn(get_query(path)['verblijfplaats__postcode'], postcodes)
@@ -0,0 +1,57 @@
+from unittest import TestCase
+
+from gobstuf.mks_simulator.corpus import Corpus, get_text, compile_criterion
+
+
+class TestFunctions(TestCase):
+
+    def test_get_text(self):
+        person = {
+            'BG:inp.bsn': '1',
+            'BG:geboortedatum': {'@StUF:indOnvolledigeDatum': 'D', '#text': '20200101'},
+        }
+        self.assertEqual('1', get_text(person, ('BG:inp.bsn',)))
+        self.assertEqual('20200101', get_text(person, ('BG:geboortedatum',)))
+        self.assertIsNone(get_text(person, ('BG:verblijfsadres', 'BG:aoa.postcode')))
+
+    def test_compile_criterion(self):
+        predicate = compile_criterion('de%s')
+        self.assertTrue(predicate('De Vries'))
+        self.assertTrue(predicate('des'))
+        self.assertFalse(predicate('De Vries Jr'))
+        self.assertFalse(predicate(None))
+
+        predicate = compile_criterion('a.b')
+        self.assertTrue(predicate('A.B'))
+        self.assertFalse(predicate('axb'))
+
+
+class TestCorpus(TestCase):
+
+    def test_init(self):
+        corpus = Corpus(size=10, seed=1, kinderen=2)
+        self.assertEqual(10, len(corpus.persons))
+        self.assertEqual(10, len(corpus.by_bsn))
+        self.assertEqual([2] * 10, [len(person['BG:inp.heeftAlsKinderen']) for person in corpus.persons])
+
+        # The corpus is determined by the seed
+        self.assertEqual(corpus.persons, Corpus(size=10, seed=1, kinderen=2).persons)
+        self.assertNotEqual(corpus.persons, Corpus(size=10, seed=2, kinderen=2).persons)
+
+    def test_search(self):
+        corpus = Corpus(size=10, briefadres_rate=0)
+        person = corpus.persons[4]
+
+        self.assertEqual([person], corpus.search({('BG:inp.bsn',): person['BG:inp.bsn']}, None))
+        self.assertEqual([], corpus.search({('BG:inp.bsn',): '123'}, None))
+        self.assertEqual(corpus.persons, corpus.search({('BG:inp.bsn',): '1%'}, None))
+        self.assertEqual(corpus.persons[:3], corpus.search({}, 3))
+
+        # Persons share an address
+        adres = person['BG:verblijfsadres']
+        self.assertEqual(corpus.persons[3:6], corpus.search({
+            ('BG:verblijfsadres', 'BG:aoa.postcode'): adres['BG:aoa.postcode'],
+            ('BG:verblijfsadres', 'BG:aoa.huisnummer'): adres['BG:aoa.huisnummer'],
+        }, None))
+
+        self.assertEqual([], corpus.search({('BG:verblijfsadres', 'BG:aoa.huisletter'): 'A'}, None))
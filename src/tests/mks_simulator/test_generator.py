@@ -0,0 +1,139 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from gobstuf.mks_simulator.generator import PersonGenerator, bsn_numbers, is_valid_bsn, generate_answer, \
+    NATIONALITEITEN, LAST_YEAR, ADULT_AGE
+from gobstuf.stuf.brp.response.ingeschrevenpersonen import IngeschrevenpersonenStufResponse
+
+
+def count(person, relation):
+    return len(person[f'BG:inp.heeftAls{relation}'])
+
+
+class TestFunctions(TestCase):
+
+    def test_bsn_numbers(self):
+        bsns = bsn_numbers()
+        self.assertEqual(['100000009', '100000010', '100000022'], [next(bsns) for _ in range(3)])
+        self.assertEqual('123456782', next(bsn_numbers(123456780)))
+
+    def test_is_valid_bsn(self):
+        self.assertTrue(is_valid_bsn('123456782'))
+        self.assertFalse(is_valid_bsn('123456789'))
+
+    def test_generate_answer(self):
+        message = generate_answer(objects=15, seed=1, kinderen=30)
+        self.assertEqual(15, message.count(b'<BG:object '))
+        self.assertEqual(15 * 30, message.count(b'<BG:inp.heeftAlsKinderen '))
+
+        # The answer is determined by the seed and sizes
+        self.assertEqual(message, generate_answer(objects=15, seed=1, kinderen=30))
+        self.assertNotEqual(message, generate_answer(objects=15, seed=2, kinderen=30))
+
+        # Size is sampled per person
+        message = generate_answer(objects=10, kinderen=(0, 1))
+        self.assertTrue(0 < message.count(b'<BG:inp.heeftAlsKinderen ') < 10)
+
+
+class TestPersonGenerator(TestCase):
+
+    def test_sizes(self):
+        generator = PersonGenerator(kinderen=30, partners=4, ouders=1, nationaliteiten=3)
+        person = generator.person('123456782', generator.address(0))
+
+        self.assertEqual('123456782', person['BG:inp.bsn'])
+        self.assertEqual((30, 4, 1, 3), (count(person, 'Kinderen'), count(person, 'EchtgenootPartner'),
+                                         count(person, 'Ouders'), count(person, 'Nationaliteit')))
+
+        # All partners but the last one are historic
+        self.assertEqual([True, True, True, False], [partner['BG:datumOntbinding'] is not None
+                                                     for partner in person['BG:inp.heeftAlsEchtgenootPartner']])
+        self.assertEqual([code for code, _ in NATIONALITEITEN[:3]],
+                         [nationaliteit['BG:gerelateerde']['BG:code']
+                          for nationaliteit in person['BG:inp.heeftAlsNationaliteit']])
+        self.assertEqual(['V', '1'], [person['BG:inp.heeftAlsOuders'][0]['BG:gerelateerde']['BG:geslachtsaanduiding'],
+                                      person['BG:inp.heeftAlsOuders'][0]['BG:ouderAanduiding']])
+
+        generator = PersonGenerator(kinderen=0, partners=0, ouders=0, nationaliteiten=0)
+        person = generator.person('123456782', generator.address(0))
+        self.assertEqual((0, 0, 0, 0), (count(person, 'Kinderen'), count(person, 'EchtgenootPartner'),
+                                        count(person, 'Ouders'), count(person, 'Nationaliteit')))
+
+    def test_rates(self):
+        generator = PersonGenerator(briefadres_rate=1, incomplete_date_rate=1, overleden_rate=1)
+        person = generator.person('123456782', generator.address(0))
+
+        self.assertNotIn('BG:verblijfsadres', person)
+        self.assertIn('BG:postcode', person['BG:sub.correspondentieAdres'])
+        self.assertIn(person['BG:geboortedatum']['@StUF:indOnvolledigeDatum'], ['D', 'M', 'J2'])
+        self.assertEqual(8, len(person['BG:inp.datumInschrijving']))
+        self.assertIsNotNone(person['BG:overlijdensdatum'])
+
+        generator = PersonGenerator(briefadres_rate=0, incomplete_date_rate=0, overleden_rate=0)
+        person = generator.person('123456782', generator.address(0))
+
+        self.assertNotIn('BG:sub.correspondentieAdres', person)
+        self.assertEqual(8, len(person['BG:geboortedatum']))
+        self.assertIsNone(person['BG:overlijdensdatum'])
+
+    def test_dates(self):
+        # Relations start when the persons are adult, partnerships end after they start and persons die after their
+        # birth and relations
+        def age(geboortedatum, date):
+            return int(date[:4]) - int(geboortedatum[:4]) - (date[4:] < geboortedatum[4:])
+
+        generator = PersonGenerator(seed=1, partners=(1, 3), incomplete_date_rate=0, overleden_rate=0.5)
+        for person in generator.persons(200):
+            geboortedatum = person['BG:geboortedatum']
+            dates = [geboortedatum]
+            for partner in person['BG:inp.heeftAlsEchtgenootPartner']:
+                sluiting, ontbinding = partner['BG:datumSluiting'], partner['BG:datumOntbinding']
+                self.assertGreaterEqual(age(geboortedatum, sluiting), 17)
+                self.assertGreaterEqual(age(partner['BG:gerelateerde']['BG:geboortedatum'], sluiting), 17)
+                self.assertGreater(sluiting, dates[-1])
+                dates.extend([sluiting, ontbinding] if ontbinding else [sluiting])
+            for kind in person['BG:inp.heeftAlsKinderen']:
+                self.assertGreaterEqual(age(geboortedatum, kind['BG:gerelateerde']['BG:geboortedatum']), 17)
+                dates.append(kind['BG:datumIngangFamilierechtelijkeBetrekking'])
+            self.assertLessEqual(int(max(dates)[:4]), LAST_YEAR)
+            if person['BG:overlijdensdatum']:
+                self.assertGreater(person['BG:overlijdensdatum'], max(dates))
+
+        # Persons without relations can be minors
+        generator = PersonGenerator(partners=0, kinderen=0, incomplete_date_rate=0)
+        self.assertGreater(max(int(person['BG:geboortedatum'][:4]) for person in generator.persons(200)),
+                           LAST_YEAR - ADULT_AGE)
+
+    def test_incomplete_dates(self):
+        generator = PersonGenerator(incomplete_date_rate=1)
+        dates = {}
+        for _ in range(100):
+            date = generator._date(1980)
+            dates[date['@StUF:indOnvolledigeDatum']] = date['#text']
+        self.assertEqual('1980', dates['D'][:4])
+        self.assertEqual('01', dates['D'][6:])
+        self.assertEqual('0101', dates['M'][4:])
+        self.assertEqual('19000101', dates['J2'])
+
+    def test_persons(self):
+        persons = PersonGenerator().persons(6, household_size=3, start_bsn=123456780)
+        self.assertEqual('123456782', persons[0]['BG:inp.bsn'])
+
+        addresses = [person.get('BG:verblijfsadres', person.get('BG:sub.correspondentieAdres'))['BG:aoa.huisnummer']
+                     for person in persons]
+        self.assertEqual([addresses[0]] * 3, addresses[:3])
+
+    def test_mapping(self):
+        # The answer is mapped by the mappings for NPS and the related entities
+        message = generate_answer(seed=1, kinderen=2, partners=2, ouders=2, nationaliteiten=2, incomplete_date_rate=0,
+                                  briefadres_rate=0, overleden_rate=0)
+        response = IngeschrevenpersonenStufResponse(message.decode(), expand='partners,ouders,kinderen')
+        with patch("gobstuf.stuf.brp.response_mapping.get_auth_url", lambda *args, **kwargs: 'url'):
+            answer_object = response.get_answer_object()
+
+        self.assertEqual('woonadres', answer_object['verblijfplaats']['functieAdres'])
+        self.assertEqual(2, len(answer_object['nationaliteiten']))
+        # The historic partner is filtered out
+        self.assertEqual(1, len(answer_object['_embedded']['partners']))
+        self.assertEqual(2, len(answer_object['_embedded']['ouders']))
+        self.assertEqual(2, len(answer_object['_embedded']['kinderen']))
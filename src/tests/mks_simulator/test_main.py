@@ -0,0 +1,40 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from gobstuf.mks_simulator.__main__ import main, size
+
+
+class TestMain(TestCase):
+
+    def test_size(self):
+        self.assertEqual(3, size('3'))
+        self.assertEqual((0, 30), size('0,30'))
+
+    @patch("gobstuf.mks_simulator.__main__.web")
+    @patch("gobstuf.mks_simulator.__main__.MKSSimulator")
+    @patch("gobstuf.mks_simulator.__main__.Corpus")
+    def test_main(self, mock_corpus, mock_simulator, mock_web):
+        main(['--port', '8003', '--persons', '10', '--seed', '2', '--latency', '0.1', '--jitter', '0.05',
+              '--fault-rate', '0.01', '--fault-codes', 'StUF005,StUF008', '--unavailable-rate', '0.02',
+              '--max-answers', '100', '--kinderen', '30', '--partners', '1,5'])
+
+        mock_corpus.assert_called_with(size=10, seed=2, kinderen=30, partners=(1, 5), ouders=2, nationaliteiten=(1, 2))
+        mock_simulator.assert_called_with(mock_corpus.return_value, latency=0.1, jitter=0.05, fault_rate=0.01,
+                                          fault_codes=['StUF005', 'StUF008'], unavailable_rate=0.02,
+                                          max_answers=100, seed=2)
+        mock_web.run_app.assert_called_with(mock_simulator.return_value.get_app.return_value, host='0.0.0.0',
+                                            port=8003)
+
+        main([])
+        mock_corpus.assert_called_with(size=1000, seed=0, kinderen=(0, 3), partners=(0, 2), ouders=2,
+                                       nationaliteiten=(1, 2))
+        mock_simulator.assert_called_with(mock_corpus.return_value, latency=0.0, jitter=0.0, fault_rate=0.0,
+                                          fault_codes=['StUF003', 'StUF010'], unavailable_rate=0.0,
+                                          max_answers=None, seed=0)
+
+    @patch("gobstuf.mks_simulator.__main__.main")
+    def test_module_main(self, mock_main):
+        from gobstuf.mks_simulator import __main__ as module
+        with patch.object(module, '__name__', '__main__'):
+            module.init()
+            mock_main.assert_called_once()
@@ -0,0 +1,69 @@
+from unittest import TestCase
+from xml.etree.ElementTree import Element, tostring
+
+from flask import Flask
+
+from gobstuf.mks_simulator.messages import qname, get_prefixed_tag, append_element, answer_message, fault_message
+from gobstuf.stuf.brp.error_response import StufErrorResponse
+from gobstuf.stuf.brp.mapping_plan import NAMESPACES
+from gobstuf.stuf.message import StufMessage, register_namespaces
+
+
+class TestMessages(TestCase):
+
+    def test_qname(self):
+        self.assertEqual('{http://www.egem.nl/StUF/sector/bg/0310}inp.bsn', qname('BG:inp.bsn'))
+
+    def test_get_prefixed_tag(self):
+        self.assertEqual('BG:inp.bsn', get_prefixed_tag('{http://www.egem.nl/StUF/sector/bg/0310}inp.bsn'))
+        self.assertEqual('detail', get_prefixed_tag('detail'))
+
+    def test_append_element(self):
+        register_namespaces(NAMESPACES)
+        parent = Element('parent')
+        append_element(parent, 'BG:object', {
+            '@StUF:entiteittype': 'NPS',
+            'BG:geboortedatum': {'@StUF:indOnvolledigeDatum': 'D', '#text': '20200101'},
+            'BG:overlijdensdatum': None,
+            'BG:inp.heeftAlsKinderen': [{'BG:code': '1'}, {'BG:code': '2'}],
+        })
+        self.assertEqual(
+            '<parent><BG:object StUF:entiteittype="NPS">'
+            '<BG:geboortedatum StUF:indOnvolledigeDatum="D">20200101</BG:geboortedatum>'
+            '<BG:inp.heeftAlsKinderen><BG:code>1</BG:code></BG:inp.heeftAlsKinderen>'
+            '<BG:inp.heeftAlsKinderen><BG:code>2</BG:code></BG:inp.heeftAlsKinderen>'
+            '</BG:object></parent>',
+            tostring(parent).decode().replace(f' xmlns:BG="{NAMESPACES["BG"]}"', '')
+                                     .replace(f' xmlns:StUF="{NAMESPACES["StUF"]}"', ''))
+
+    def test_answer_message(self):
+        persons = [{'BG:inp.bsn': '1'}, {'BG:inp.bsn': '2'}]
+        question = {'applicatie': 'applicatie', 'gebruiker': 'gebruiker', 'referentienummer': 'ref'}
+
+        message = StufMessage(answer_message(persons, question).decode())
+        stuurgegevens = 'soapenv:Body BG:npsLa01 BG:stuurgegevens'
+        self.assertEqual('La01', message.get_elm_value(f'{stuurgegevens} StUF:berichtcode'))
+        self.assertEqual('ref', message.get_elm_value(f'{stuurgegevens} StUF:crossRefnummer'))
+        self.assertEqual('gebruiker', message.get_elm_value(f'{stuurgegevens} StUF:ontvanger StUF:gebruiker'))
+        self.assertEqual(['1', '2'], [message.get_elm_value('BG:inp.bsn', elm) for elm in
+                                      message.find_all_elms('soapenv:Body BG:npsLa01 BG:antwoord BG:object')])
+
+        # Without a question the message only depends on the persons
+        self.assertEqual(answer_message(persons), answer_message(persons))
+        self.assertIsNone(StufMessage(answer_message([]).decode()).find_elm(f'{stuurgegevens} StUF:crossRefnummer'))
+
+    def test_fault_message(self):
+        response = StufErrorResponse(fault_message('StUF003').decode())
+        self.assertEqual('Fo02', response.get_berichtcode())
+        self.assertEqual('StUF003', response.get_error_code())
+        self.assertEqual('server', response.get_error_plek())
+        self.assertEqual('De gevraagde gegevens zijn niet beschikbaar', response.get_error_omschrijving())
+
+        with Flask(__name__).test_request_context():
+            self.assertEqual(404, response.get_http_response().status_code)
+
+            response = StufErrorResponse(fault_message('StUF010', {'referentienummer': 'ref'}).decode())
+            self.assertEqual(403, response.get_http_response().status_code)
+
+        response = StufErrorResponse(fault_message('StUF999').decode())
+        self.assertEqual('StUF999', response.get_error_omschrijving())
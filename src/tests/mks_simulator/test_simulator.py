@@ -0,0 +1,130 @@
+import asyncio
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from gobstuf.mks_simulator.corpus import Corpus
+from gobstuf.mks_simulator.simulator import MKSSimulator, StufSyntaxError, parse_question
+from gobstuf.stuf.brp.error_response import StufErrorResponse
+from gobstuf.stuf.brp.request.ingeschrevenpersonen import IngeschrevenpersonenFilterStufRequest
+from gobstuf.stuf.brp.response.ingeschrevenpersonen import IngeschrevenpersonenStufResponse
+from gobstuf.stuf.message import StufMessage
+
+
+def get_question(**values):
+    request = IngeschrevenpersonenFilterStufRequest('gebruiker', 'applicatie', correlation_id='ref')
+    request.set_values(values)
+    return request.to_string()
+
+
+class TestFunctions(TestCase):
+
+    def test_parse_question(self):
+        question = parse_question(get_question(verblijfplaats__postcode='1234AB',
+                                               verblijfplaats__gemeentevaninschrijving='0363',
+                                               naam__geslachtsnaam='de*'))
+        self.assertEqual({
+            'applicatie': 'applicatie',
+            'gebruiker': 'gebruiker',
+            'referentienummer': 'ref',
+            'maximumAantal': 15,
+            'criteria': {
+                ('BG:verblijfsadres', 'BG:aoa.postcode'): '1234AB',
+                ('BG:inp.gemeenteVanInschrijving',): '0363',
+                ('BG:geslachtsnaam',): 'de%',
+            }
+        }, question)
+
+    def test_parse_question_without_maximum_aantal(self):
+        question = get_question(burgerservicenummer='123456789').replace(b'>15<', b'><')
+        self.assertIsNone(parse_question(question)['maximumAantal'])
+
+    def test_parse_question_errors(self):
+        for message in [b'no xml', b'<a/>', get_question().replace(b'BG:gelijk', b'BG:ongelijk')]:
+            with self.assertRaises(StufSyntaxError):
+                parse_question(message)
+
+class TestMKSSimulator(TestCase):
+
+    def setUp(self):
+        self.corpus = Corpus(size=20)
+
+    def test_get_delay(self):
+        simulator = MKSSimulator(self.corpus)
+        self.assertEqual(0, simulator.get_delay())
+
+        simulator = MKSSimulator(self.corpus, latency=1, jitter=0.5)
+        for _ in range(100):
+            self.assertTrue(0.5 <= simulator.get_delay() <= 1.5)
+
+        simulator = MKSSimulator(self.corpus, latency=0.1, jitter=1)
+        self.assertEqual(0, min(simulator.get_delay() for _ in range(100)))
+
+    def test_answer(self):
+        corpus = Corpus(size=2)
+        simulator = MKSSimulator(corpus)
+        status, message = simulator.answer(get_question(naam__geslachtsnaam='*'))
+        self.assertEqual(200, status)
+
+        response = IngeschrevenpersonenStufResponse(message.decode(), inclusiefoverledenpersonen=True)
+        with patch("gobstuf.stuf.brp.response_mapping.get_auth_url", lambda *args, **kwargs: 'url'):
+            answer_objects = response.get_all_answer_objects()
+        self.assertEqual([person['BG:inp.bsn'] for person in corpus.persons],
+                         [answer_object['burgerservicenummer'] for answer_object in answer_objects])
+
+        message = StufMessage(message.decode())
+        self.assertEqual('ref', message.get_elm_value('soapenv:Body BG:npsLa01 BG:stuurgegevens StUF:crossRefnummer'))
+
+    def test_answer_size(self):
+        person = self.corpus.persons[0]
+        simulator = MKSSimulator(self.corpus)
+
+        status, message = simulator.answer(get_question(burgerservicenummer=person['BG:inp.bsn']))
+        self.assertEqual(200, status)
+        self.assertEqual(1, message.count(b'<BG:object '))
+
+        status, message = simulator.answer(get_question(naam__geslachtsnaam='*'))
+        self.assertEqual(15, message.count(b'<BG:object '))
+
+        simulator = MKSSimulator(self.corpus, max_answers=5)
+        status, message = simulator.answer(get_question(naam__geslachtsnaam='*'))
+        self.assertEqual(5, message.count(b'<BG:object '))
+
+        status, message = simulator.answer(b'no xml')
+        self.assertEqual(500, status)
+        self.assertEqual('StUF011', StufErrorResponse(message.decode()).get_error_code())
+
+    def test_answer_faults(self):
+        simulator = MKSSimulator(self.corpus, fault_rate=1, seed=0)
+        codes = set()
+        for _ in range(20):
+            status, message = simulator.answer(get_question())
+            self.assertEqual(500, status)
+            codes.add(StufErrorResponse(message.decode()).get_error_code())
+        self.assertEqual({'StUF003', 'StUF010'}, codes)
+
+        simulator = MKSSimulator(self.corpus, fault_rate=0.5, fault_codes=['StUF005'], seed=0)
+        statuses = [simulator.answer(get_question())[0] for _ in range(100)]
+        self.assertTrue(20 < statuses.count(500) < 80)
+
+        # The same seed gives the same faults
+        simulator = MKSSimulator(self.corpus, fault_rate=0.5, fault_codes=['StUF005'], seed=0)
+        self.assertEqual(statuses, [simulator.answer(get_question())[0] for _ in range(100)])
+
+    def test_handle(self):
+        async def run(simulator, path, data):
+            async with TestClient(TestServer(simulator.get_app())) as client:
+                response = await client.post(path, data=data)
+                return response.status, response.headers['Content-Type'], await response.read()
+
+        simulator = MKSSimulator(self.corpus, latency=0.01)
+        status, content_type, body = asyncio.run(run(simulator, '/any/path', get_question()))
+        self.assertEqual(200, status)
+        self.assertEqual('text/xml; charset=utf-8', content_type)
+        self.assertEqual(15, body.count(b'<BG:object '))
+
+        simulator = MKSSimulator(self.corpus, unavailable_rate=1)
+        status, _, _ = asyncio.run(run(simulator, '/', get_question()))
+        self.assertEqual(503, status)
@@ -3,7 +3,28 @@ from unittest.mock import patch
 
 from requests.exceptions import HTTPError, ConnectionError
 
-from gobstuf.reference_data.code_resolver import CodeResolver, DataNotFoundException, DataItemNotFoundException
+from gobstuf.reference_data.code_resolver import CodeResolver, ReferenceTable, DataNotFoundException, \
+    DataItemNotFoundException
+
+
+class TestReferenceTable(TestCase):
+
+    def test_reference_table(self):
+        rows = (('1', 'one'), ('2', 'two'), ('2', 'second two'))
+
+        table = ReferenceTable(('code', 'omschrijving'), rows, 'code')
+        self.assertTrue(table)
+        self.assertEqual(2, len(table))
+        self.assertEqual('one', table.get_value('1', 'omschrijving'))
+        # Last row wins
+        self.assertEqual('second two', table.get_value('2', 'omschrijving'))
+        with self.assertRaises(KeyError):
+            table.get_value('3', 'omschrijving')
+
+        table = ReferenceTable(('code', 'omschrijving'), rows, 'omschrijving')
+        self.assertEqual('2', table.get_value('two', 'code'))
+
+        self.assertFalse(ReferenceTable(('code', 'omschrijving'), (), 'code'))
 
 
 class TestCodeResolver(TestCase):
@@ -12,13 +33,64 @@ class TestCodeResolver(TestCase):
         # Assert that landen table has been initialised
         self.assertTrue(CodeResolver._landen)
 
+    @patch("gobstuf.reference_data.code_resolver.save_snapshot")
+    @patch("gobstuf.reference_data.code_resolver.load_snapshot")
+    def test_initialize_snapshot(self, mock_load_snapshot, mock_save_snapshot):
+        tables = CodeResolver._read_tables()
+        sources = CodeResolver._get_sources()
+
+        # Load the tables from the snapshot
+        mock_load_snapshot.return_value = tables
+        with patch.object(CodeResolver, "_read_tables") as mock_read_tables:
+            CodeResolver.initialize()
+            mock_load_snapshot.assert_called_with(CodeResolver.SNAPSHOT, sources)
+            mock_read_tables.assert_not_called()
+            mock_save_snapshot.assert_not_called()
+        self.assertEqual('Amsterdam', CodeResolver.get_gemeente('363'))
+
+        # No valid snapshot, read the CSV files and save the snapshot
+        mock_load_snapshot.return_value = None
+        CodeResolver.initialize()
+        mock_save_snapshot.assert_called_with(CodeResolver.SNAPSHOT, sources, tables)
+        self.assertEqual('Amsterdam', CodeResolver.get_gemeente('363'))
+        self.assertEqual('0363', CodeResolver.get_gemeente_code('Amsterdam'))
+
+    @patch("gobstuf.reference_data.code_resolver.save_snapshot")
+    def test_build_snapshot(self, mock_save_snapshot):
+        self.assertEqual(mock_save_snapshot.return_value, CodeResolver.build_snapshot())
+        mock_save_snapshot.assert_called_with(CodeResolver.SNAPSHOT, CodeResolver._get_sources(),
+                                              CodeResolver._read_tables())
+
+    def test_read_table(self):
+        fields, rows = CodeResolver._read_table(CodeResolver.ADELLIJKE_TITEL)
+        self.assertEqual(('code', 'omschrijving', 'soort'), fields)
+        self.assertIn(('B', 'Baron', 'titel'), rows)
+
+    @patch("gobstuf.reference_data.code_resolver.get_sources")
+    def test_get_sources(self, mock_get_sources):
+        self.assertEqual(mock_get_sources.return_value, CodeResolver._get_sources())
+
+        mock_get_sources.side_effect = FileNotFoundError
+        self.assertIsNone(CodeResolver._get_sources())
+
     @patch("builtins.open")
-    def test_load_landen(self, mock_open):
+    def test_read_table_not_found(self, mock_open):
         mock_open.side_effect = FileNotFoundError
         with self.assertRaises(DataNotFoundException):
-            CodeResolver._load_data(CodeResolver.LANDEN, CodeResolver.CODE)
+            CodeResolver._read_table(CodeResolver.LANDEN)
         with self.assertRaises(DataNotFoundException):
-            CodeResolver._load_data(CodeResolver.GEMEENTEN, CodeResolver.CODE)
+            CodeResolver._read_table(CodeResolver.GEMEENTEN)
+
+    @patch("gobstuf.reference_data.code_resolver.save_snapshot")
+    @patch("gobstuf.reference_data.code_resolver.load_snapshot", lambda *args: None)
+    def test_initialize_table_not_found(self, mock_save_snapshot):
+        # Without a valid snapshot the tables are read from the CSV files, a missing table is reported
+        with patch.object(CodeResolver, "_set_tables") as mock_set_tables, \
+                patch("builtins.open", side_effect=FileNotFoundError):
+            with self.assertRaises(DataNotFoundException):
+                CodeResolver.initialize()
+        mock_set_tables.assert_not_called()
+        mock_save_snapshot.assert_not_called()
 
     def test_get_land(self):
         for method_name in ['get_land', 'get_gemeente']:
@@ -34,15 +106,14 @@ class TestCodeResolver(TestCase):
             with self.assertRaises(DataItemNotFoundException):
                 result = method("any code")
 
-        CodeResolver._landen['any code'] = {'omschrijving': 'any land'}
-        result = CodeResolver.get_land("any code")
-        self.assertEqual(result, 'any land')
+        landen = ReferenceTable(('code', 'omschrijving'), (('any code', 'any land'), ('0002', 'any land')), 'code')
+        with patch.object(CodeResolver, '_landen', landen):
+            result = CodeResolver.get_land("any code")
+            self.assertEqual(result, 'any land')
 
-        # Pad codes to 4 characters
-        CodeResolver._landen['0002'] = {'omschrijving': 'any land'}
-        for code in ['2', '02', '002']:
-            CodeResolver.get_land(code)
-            self.assertIsNone(CodeResolver._landen.get(code))
+            # Pad codes to 4 characters
+            for code in ['2', '02', '002']:
+                self.assertEqual('any land', CodeResolver.get_land(code))
 
     def test_get_gemeente_code(self):
         method = CodeResolver.get_gemeente_code
@@ -55,6 +126,7 @@ class TestCodeResolver(TestCase):
         with self.assertRaises(DataItemNotFoundException):
             result = method("any code")
 
-        CodeResolver._gemeenten_omschrijving['any omschrijving'] = {'code': 'any code'}
-        result = CodeResolver.get_gemeente_code("any omschrijving")
-        self.assertEqual(result, 'any code')
+        gemeenten = ReferenceTable(('code', 'omschrijving'), (('any code', 'any omschrijving'),), 'omschrijving')
+        with patch.object(CodeResolver, '_gemeenten_omschrijving', gemeenten):
+            result = CodeResolver.get_gemeente_code("any omschrijving")
+            self.assertEqual(result, 'any code')
@@ -0,0 +1,78 @@
+import os
+import tempfile
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from gobstuf.reference_data.snapshot import get_sources, load_snapshot, save_snapshot, build, init
+
+
+class TestSnapshot(TestCase):
+
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'any.snapshot')
+        self.source = os.path.join(self.dir.name, 'any.csv')
+        with open(self.source, 'w') as f:
+            f.write('any data')
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+    def test_get_sources(self):
+        stat = os.stat(self.source)
+        self.assertEqual({'any.csv': (stat.st_size, stat.st_mtime_ns)}, get_sources([self.source]))
+
+    def test_save_load(self):
+        sources = get_sources([self.source])
+        tables = {'any table': (('code', 'omschrijving'), (('1', 'one'), ('2', 'two')))}
+
+        # No snapshot
+        self.assertIsNone(load_snapshot(self.path, sources))
+
+        self.assertTrue(save_snapshot(self.path, sources, tables))
+        self.assertEqual(tables, load_snapshot(self.path, sources))
+        # The temporary file is gone
+        self.assertEqual(['any.csv', 'any.snapshot'], sorted(os.listdir(self.dir.name)))
+
+        # Source has changed
+        with open(self.source, 'a') as f:
+            f.write('more data')
+        self.assertIsNone(load_snapshot(self.path, get_sources([self.source])))
+
+        # Invalid snapshot
+        with open(self.path, 'wb') as f:
+            f.write(b'any invalid data')
+        self.assertIsNone(load_snapshot(self.path, sources))
+
+        with open(self.path, 'wb') as f:
+            f.write(b'')
+        self.assertIsNone(load_snapshot(self.path, sources))
+
+    @patch("gobstuf.reference_data.snapshot.SNAPSHOT_VERSION", 0)
+    def test_load_other_version(self):
+        sources = get_sources([self.source])
+        save_snapshot(self.path, sources, {})
+        with patch("gobstuf.reference_data.snapshot.SNAPSHOT_VERSION", 1):
+            self.assertIsNone(load_snapshot(self.path, sources))
+
+    @patch("gobstuf.reference_data.snapshot.logging")
+    def test_save_snapshot_failure(self, mock_logging):
+        path = os.path.join(self.dir.name, 'any dir', 'any.snapshot')
+        self.assertFalse(save_snapshot(path, {}, {}))
+        mock_logging.warning.assert_called()
+
+    @patch("gobstuf.reference_data.code_resolver.CodeResolver.build_snapshot")
+    def test_build(self, mock_build_snapshot):
+        mock_build_snapshot.return_value = True
+        build()
+
+        mock_build_snapshot.return_value = False
+        with self.assertRaises(SystemExit):
+            build()
+
+    @patch("gobstuf.reference_data.snapshot.build")
+    def test_init(self, mock_build):
+        with patch("gobstuf.reference_data.snapshot.__name__", "__main__"):
+            init()
+            mock_build.assert_called_once()
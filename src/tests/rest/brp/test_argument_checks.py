@@ -1,7 +1,7 @@
 from unittest import TestCase
 from unittest.mock import patch, MagicMock
 
-from gobstuf.rest.brp.argument_checks import ArgumentCheck
+from gobstuf.rest.brp.argument_checks import ArgumentCheck, ValidationPlan
 from gobstuf.reference_data.code_resolver import DataItemNotFoundException
 
 class TestArgumentCheck(TestCase):
@@ -84,3 +84,31 @@ class TestArgumentCheck(TestCase):
 
         self.assertIsNone(ArgumentCheck.validate(check, 'any gemeente'))
         self.assertTrue(ArgumentCheck.validate(check, 'invalid gemeente'))
+
+
+class TestValidationPlan(TestCase):
+
+    def test_validation_plan(self):
+        is_a = {'check': lambda v: v.startswith('a'), 'msg': 'not a'}
+        is_short = {'check': lambda v: len(v) < 3, 'msg': 'too long'}
+        checks_b = [is_a]
+        parameter_checks = {'a': is_a, 'b': checks_b, 'c': None}
+
+        plan = ValidationPlan(parameter_checks, {'b': 'b', 'd': 'd'}, [is_short])
+        self.assertEqual({'a': (is_a,), 'b': (is_a, is_short), 'd': (is_short,)}, dict(plan.checks))
+
+        # The checks of the arguments are not changed
+        self.assertEqual([is_a], checks_b)
+
+        # The plan cannot be changed
+        with self.assertRaises(TypeError):
+            plan.checks['c'] = (is_a,)
+
+        self.assertIsNone(plan.validate('a', 'a'))
+        self.assertEqual(is_a, plan.validate('a', 'b'))
+        self.assertEqual(is_short, plan.validate('b', 'aaaa'))
+        self.assertEqual(is_short, plan.validate('d', 'aaaa'))
+
+        # Arguments without checks are valid
+        self.assertIsNone(plan.validate('c', 'any value'))
+        self.assertIsNone(plan.validate('e', 'any value'))
@@ -1,11 +1,27 @@
+import asyncio
+import json
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
 from unittest import TestCase
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
+
+from flask import Flask, Response, g, request
+from requests import Response as MKSResponse
 
 from gobstuf.auth.routes import MKS_USER_KEY, MKS_APPLICATION_KEY
+from gobstuf.lib.cache import TTLCache
+from gobstuf.lib.circuitbreaker import CircuitOpenException
+from gobstuf.lib.stream import SharedChunks
+from gobstuf.metrics import RequestMetrics
 from gobstuf.rest.brp.base_view import (
     StufRestView, HTTPError,
     NoStufAnswerException,
-    StufRestFilterView
+    StufRestFilterView,
+    StufRestBatchView,
+    _share_mks_response,
+    mks_requests
 )
 from gobstuf.stuf.brp.error_response import UnknownErrorCode
 
@@ -40,8 +56,8 @@ class TestStufRestView(TestCase):
             def _validate(self, **kwargs) -> dict:
                 return super()._validate(**kwargs)
 
-            def _get(self, **kwargs):
-                return 'OK'
+            def _get(self, mks_user, mks_application, args, **kwargs):
+                return Response('OK')
 
             def _get_functional_query_parameters(self):
                 return {'expand': None}
@@ -69,19 +85,20 @@ class TestStufRestView(TestCase):
         obedient_child = StufRestViewObedientChild()
         obedient_child._validate_request_args = MagicMock(return_value=None)
 
-        self.assertEqual('OK', obedient_child.get(**kwargs))
+        with Flask(__name__).test_request_context():
+            self.assertEqual(b'OK', obedient_child.get(**kwargs).get_data())
 
     @patch("gobstuf.rest.brp.base_view.ROUTE_SCHEME", 'scheme')
     @patch("gobstuf.rest.brp.base_view.ROUTE_NETLOC", 'netloc')
     @patch("gobstuf.rest.brp.base_view.ROUTE_PATH_310", '/route/path')
     @patch("gobstuf.rest.brp.base_view.cert_post")
-    def test_make_request(self, mock_post):
+    def test_post_request(self, mock_post):
         stufreq = MagicMock()
         stufreq.soap_action = 'THE SOAP action'
         stufreq.to_string = lambda: 'string repr'
 
         view = StufRestView()
-        self.assertEqual(mock_post.return_value, view._make_request(stufreq))
+        self.assertEqual(mock_post.return_value, view._post_request(stufreq))
 
         mock_post.assert_called_with(
             'scheme://netloc/route/path',
@@ -92,6 +109,71 @@ class TestStufRestView(TestCase):
             }
         )
 
+    @patch("gobstuf.rest.brp.base_view.STUF_STREAMING_PARSER", True)
+    @patch("gobstuf.rest.brp.base_view.cert_post")
+    def test_post_request_streaming(self, mock_post):
+        class StufRestViewImpl(StufRestView):
+            response_template = MagicMock(parser_chunk_size=100)
+
+        stufreq = MagicMock()
+        mock_post.return_value.iter_content.return_value = iter([b'chunk1', b'chunk2'])
+
+        response = StufRestViewImpl()._post_request(stufreq)
+        self.assertEqual(mock_post.return_value, response)
+        self.assertTrue(mock_post.call_args[1]['stream'])
+        mock_post.return_value.iter_content.assert_called_with(100)
+
+        # The body is read once by every request that shares the response
+        response.chunks.share(2)
+        self.assertEqual([b'chunk1', b'chunk2'], list(response.chunks))
+        self.assertEqual([b'chunk1', b'chunk2'], list(response.chunks))
+
+        # The connection is released when every request has released the response
+        response.chunks.release()
+        mock_post.return_value.close.assert_not_called()
+        response.chunks.release()
+        mock_post.return_value.close.assert_called_once()
+
+    def test_share_mks_response(self):
+        response = MagicMock()
+        _share_mks_response(response, 3)
+        response.chunks.share.assert_called_with(3)
+
+        # Not streamed
+        _share_mks_response(object(), 3)
+
+        # The readers of a response of a single flight request
+        with patch("gobstuf.rest.brp.base_view.STUF_STREAMING_PARSER", True), \
+                patch("gobstuf.rest.brp.base_view.cert_post") as mock_post:
+            mock_post.return_value.iter_content.return_value = iter([b'chunk'])
+            class StufRestViewImpl(StufRestView):
+                response_template = MagicMock()
+
+            response = mks_requests.do('key', StufRestViewImpl()._post_request, MagicMock())
+            self.assertEqual(1, response.chunks._readers)
+
+    @patch("gobstuf.rest.brp.base_view.mks_requests")
+    def test_make_request(self, mock_mks_requests):
+        stufreq = MagicMock()
+        stufreq.fingerprint.return_value = 'fingerprint'
+
+        view = StufRestView()
+        view._post_request = MagicMock()
+
+        # Request is shared with concurrent requests with the same fingerprint for the same MKS user and application
+        self.assertEqual(mock_mks_requests.do.return_value, view._make_request(stufreq, 'user', 'application'))
+        mock_mks_requests.do.assert_called_with(
+            ('user', 'application', 'fingerprint'),
+            view._post_request,
+            stufreq
+        )
+
+        with patch("gobstuf.rest.brp.base_view.MKS_SINGLE_FLIGHT", False):
+            mock_mks_requests.do.reset_mock()
+            self.assertEqual(view._post_request.return_value, view._make_request(stufreq, 'user', 'application'))
+            view._post_request.assert_called_with(stufreq)
+            mock_mks_requests.do.assert_not_called()
+
     @patch("gobstuf.rest.brp.base_view.logging")
     @patch("gobstuf.rest.brp.base_view.RESTResponse")
     def test_error_response(self, mock_rest_response, mock_logging):
@@ -199,19 +281,20 @@ class TestStufRestView(TestCase):
             view._validate_called = True
             view._get_functional_query_parameters = MagicMock(return_value={'funcparam': True})
 
-            # Success response
-            self.assertEqual(mock_rest_response.ok.return_value, view._get(a=1, b=2))
+            # Success response. Without a response cache the response is requested
+            self.assertEqual(mock_rest_response.ok.return_value, view._get('user', 'application', {}, a=1, b=2))
             view.request_template.assert_called_with('user', 'application', correlation_id='the correlation id')
             view.request_template.return_value.set_values.assert_called_with({'a': 1, 'b': 2})
-            view._make_request.assert_called_with(view.request_template.return_value)
+            view._make_request.assert_called_with(view.request_template.return_value, 'user', 'application')
+            view._get_functional_query_parameters.assert_called_with({})
 
-            view.response_template.assert_called_with(view._make_request.return_value.text, a=1, b=2, funcparam=True, wildcards={})
+            view.response_template.assert_called_with(view._make_request.return_value.content, streaming_parser=False, a=1, b=2, funcparam=True, wildcards={})
             mock_rest_response.ok.assert_called_with(view.response_template.return_value.get_answer_object.return_value)
 
             # Error response
             view._make_request.return_value.raise_for_status.side_effect = HTTPError
-            self.assertEqual(view._error_response.return_value, view._get(a=1, b=2))
-            mock_response.assert_called_with(view._make_request.return_value.text)
+            self.assertEqual(view._error_response.return_value, view._get('user', 'application', {}, a=1, b=2))
+            mock_response.assert_called_with(view._make_request.return_value.content)
             view._error_response.assert_called_with(mock_response.return_value)
 
             # 404 response
@@ -219,7 +302,7 @@ class TestStufRestView(TestCase):
             view.response_template.return_value.get_answer_object.side_effect = NoStufAnswerException
             view._not_found_response = MagicMock()
 
-            self.assertEqual(mock_rest_response.not_found(), view._get(a=1, b=2))
+            self.assertEqual(mock_rest_response.not_found(), view._get('user', 'application', {}, a=1, b=2))
 
             # Test invalid request
             view._validate = lambda **kwargs: {'some': 'error'}
@@ -227,6 +310,167 @@ class TestStufRestView(TestCase):
             self.assertEqual(mock_rest_response.bad_request.return_value, view.get(**kwargs))
             mock_rest_response.bad_request.assert_called_with(some='error')
 
+    @patch("gobstuf.rest.brp.base_view.STUF_STREAMING_PARSER", True)
+    @patch("gobstuf.rest.brp.base_view.StufErrorResponse")
+    @patch("gobstuf.rest.brp.base_view.current_request_metrics")
+    def test_get_response_streaming(self, mock_metrics, mock_error_response):
+        class StufRestViewImpl(StufRestView):
+            request_template = MagicMock(parameter_wildcards={})
+            response_template = MagicMock()
+
+        view = StufRestViewImpl()
+        view._make_request = MagicMock()
+        view._make_request.return_value.chunks = SharedChunks([b'chunk1', b'chunk2'])
+        view._build_response = MagicMock(return_value=Response('data'))
+        view._error_response = MagicMock()
+
+        with Flask(__name__).test_request_context():
+            self.assertEqual(view._build_response.return_value, view._get_response('user', 'application', {}, a=1))
+
+            # The response is parsed from the chunks, the size is known when the response has been built
+            chunks = view.response_template.call_args[0][0]
+            self.assertEqual(view._make_request.return_value.chunks, chunks)
+            self.assertTrue(view.response_template.call_args[1]['streaming_parser'])
+            self.assertEqual(0, mock_metrics.return_value.mks_response_size)
+
+            view._build_response.side_effect = lambda *args, **kwargs: Response(list(chunks))
+            view._get_response('user', 'application', {}, a=1)
+            self.assertEqual(12, mock_metrics.return_value.mks_response_size)
+
+            # A streamed response reads the chunks while it is sent, the size is known when it is closed
+            view._make_request.return_value.chunks = SharedChunks([b'chunk1', b'chunk2', b'chunk3'])
+            view._build_response.side_effect = \
+                lambda *args, **kwargs: Response(iter(view.response_template.call_args[0][0]))
+            response = view._get_response('user', 'application', {}, a=1)
+            self.assertEqual(12, mock_metrics.return_value.mks_response_size)
+            self.assertEqual(b'chunk1chunk2chunk3', response.get_data())
+            response.close()
+            self.assertEqual(18, mock_metrics.return_value.mks_response_size)
+
+            # Error response
+            view._make_request.return_value.chunks = SharedChunks([b'chunk1', b'chunk2', b'chunk3'])
+            view._make_request.return_value.raise_for_status.side_effect = HTTPError
+            self.assertEqual(view._error_response.return_value, view._get_response('user', 'application', {}, a=1))
+            mock_error_response.assert_called_with(b'chunk1chunk2chunk3')
+
+    @patch("gobstuf.rest.brp.base_view.STUF_STREAMING_PARSER", True)
+    @patch("gobstuf.rest.brp.base_view.current_request_metrics", MagicMock())
+    def test_get_response_streaming_release(self):
+        class StufRestViewImpl(StufRestView):
+            request_template = MagicMock(parameter_wildcards={})
+            response_template = MagicMock()
+
+        view = StufRestViewImpl()
+        view._make_request = MagicMock()
+        on_close = view._make_request.return_value.close
+        view._make_request.return_value.chunks = SharedChunks([b'chunk'], on_close=on_close)
+        view._build_response = MagicMock(return_value=Response('data'))
+
+        with Flask(__name__).test_request_context():
+            # The MKS response is released when the response has been built
+            view._get_response('user', 'application', {}, a=1)
+            on_close.assert_called_once()
+
+            # Or when the response fails
+            on_close.reset_mock()
+            view._make_request.return_value.chunks = SharedChunks([b'chunk'], on_close=on_close)
+            view._build_response.side_effect = ValueError
+            with self.assertRaises(ValueError):
+                view._get_response('user', 'application', {}, a=1)
+            on_close.assert_called_once()
+
+            # Or when a streamed response is closed, eg when the client has gone
+            on_close.reset_mock()
+            view._make_request.return_value.chunks = SharedChunks([b'chunk'], on_close=on_close)
+            view._build_response.side_effect = lambda *args, **kwargs: Response(iter([b'data']))
+            response = view._get_response('user', 'application', {}, a=1)
+            on_close.assert_not_called()
+            response.close()
+            on_close.assert_called_once()
+
+    @patch("gobstuf.rest.brp.base_view.RequestMetrics")
+    def test_get_metrics(self, mock_request_metrics):
+        class StufRestViewImpl(StufRestView):
+            request_template = MagicMock()
+            response_template = MagicMock()
+
+        view = StufRestViewImpl()
+        view._validate = lambda **kwargs: {'some': 'error'}
+        view._validate_called = True
+
+        # The metrics are published with the view name and response status
+        with Flask(__name__).test_request_context():
+            response = view.get()
+        self.assertEqual(400, response.status_code)
+        mock_request_metrics.return_value.activate.assert_called_once()
+        mock_request_metrics.return_value.observe.assert_called_with('StufRestViewImpl', 400)
+
+    @patch("gobstuf.rest.brp.base_view.RequestMetrics")
+    def test_get_metrics_streamed(self, mock_request_metrics):
+        class StufRestViewImpl(StufRestView):
+            request_template = MagicMock()
+            response_template = MagicMock()
+
+        mock_request_metrics.return_value.iterate = lambda iterable: (chunk.upper() for chunk in iterable)
+        view = StufRestViewImpl()
+        view._handle_get = MagicMock(return_value=Response(iter([b'a', b'b'])))
+
+        # The metrics are published when the streamed response is closed
+        with Flask(__name__).test_request_context():
+            response = view.get()
+            mock_request_metrics.return_value.observe.assert_not_called()
+            self.assertEqual(b'AB', response.get_data())
+            response.close()
+        mock_request_metrics.return_value.observe.assert_called_with('StufRestViewImpl', 200)
+
+    @patch("gobstuf.rest.brp.base_view.RESPONSE_CACHE_REQUESTS")
+    def test_get_cached(self, mock_cache_requests):
+        view = StufRestView()
+        view.response_cache = TTLCache(10, 60)
+        view._response_cache_key = lambda mks_application, **kwargs: (mks_application, *kwargs.items())
+        view._get_response = MagicMock(return_value=Response('response data', status=200, headers={'a': 'b'}))
+
+        # Miss, the response is cached
+        self.assertEqual(view._get_response.return_value, view._get('user', 'application', {}, bsn=1))
+        view._get_response.assert_called_with('user', 'application', {}, bsn=1)
+        mock_cache_requests.labels.assert_called_with(view='StufRestView', result='miss')
+        mock_cache_requests.labels.return_value.inc.assert_called_once()
+
+        # Hit, a copy of the cached response is returned
+        response = view._get('user', 'application', {}, bsn=1)
+        view._get_response.assert_called_once()
+        mock_cache_requests.labels.assert_called_with(view='StufRestView', result='hit')
+
+        self.assertIsNot(view._get_response.return_value, response)
+        self.assertEqual(b'response data', response.get_data())
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('b', response.headers['a'])
+
+        # Only successful responses are cached
+        view._get_response.return_value = Response('not found', status=404)
+        self.assertEqual(view._get_response.return_value, view._get('user', 'application', {}, bsn=2))
+        self.assertEqual(view._get_response.return_value, view._get('user', 'application', {}, bsn=2))
+        self.assertEqual(3, view._get_response.call_count)
+
+        # Streamed responses are not cached
+        view._get_response.return_value = Response(iter([b'streamed']), status=200)
+        self.assertEqual(view._get_response.return_value, view._get('user', 'application', {}, bsn=3))
+        self.assertEqual(view._get_response.return_value, view._get('user', 'application', {}, bsn=3))
+        self.assertEqual(5, view._get_response.call_count)
+
+    def test_response_cache_key(self):
+        mock_request = MagicMock()
+        mock_request.url = 'any url'
+
+        with patch("gobstuf.rest.brp.base_view.request", mock_request):
+            view = StufRestView()
+            self.assertEqual((StufRestView, 'application', (('a', 1), ('b', 2)), 'any url'),
+                             view._response_cache_key('application', b=2, a=1))
+
+            # Different roles give different keys
+            self.assertNotEqual((StufRestView, 'application', (('a', 1), ('b', 2)), 'any url'),
+                                view._response_cache_key('other application', b=2, a=1))
+
     @patch("gobstuf.rest.brp.base_view.RESTResponse")
     def test_get_internal_server_error(self, mock_rest_response):
         view = StufRestView()
@@ -236,20 +480,153 @@ class TestStufRestView(TestCase):
         view._validate_called = True
         view._validate_request_args = MagicMock(return_value=None)
 
-        # Regular response
-        result = view.get(any='thing')
+        # Regular response, for the MKS user and application and the arguments of the request
+        with patch("gobstuf.rest.brp.base_view.request", MagicMock(args={'a': 'b'})), \
+                patch("gobstuf.rest.brp.base_view.g", MagicMock(get=lambda key: f"value of {key}")):
+            result = view.get(any='thing')
         self.assertEqual(result, view._get.return_value)
+        view._get.assert_called_with('value of MKS_GEBRUIKER', 'value of MKS_APPLICATIE', {'a': 'b'}, any='thing')
 
         # Request failed for an unknown reason
         view._get.side_effect = Exception
-        result = view.get(any='thing')
+        result = view.lookup('user', 'application', {}, any='thing')
         self.assertEqual(result, mock_rest_response.internal_server_error.return_value)
 
+        # MKS is unavailable
+        view._get.side_effect = CircuitOpenException('upstream', 10)
+        result = view.lookup('user', 'application', {}, any='thing')
+        self.assertEqual(result, mock_rest_response.service_unavailable.return_value)
+        mock_rest_response.service_unavailable.assert_called_with(retry_after=10)
+
         view._validate.side_effect = StufRestFilterView.InvalidQueryParametersException({'any': 'error'})
         view.get(any='thing')
         mock_rest_response.bad_request.assert_called_with(any='error')
 
 
+class TestStufRestViewAsync(TestCase):
+
+    @patch("gobstuf.rest.brp.base_view.RequestMetrics")
+    @patch("gobstuf.rest.brp.base_view.RESTResponse")
+    def test_get_async(self, mock_rest_response, mock_request_metrics):
+        view = StufRestView()
+        view._get_async = AsyncMock(return_value=Response('data'))
+        view._validate = MagicMock(return_value={})
+        view._validate_called = True
+
+        with patch("gobstuf.rest.brp.base_view.request", MagicMock(args={'a': 'b'})), \
+                patch("gobstuf.rest.brp.base_view.g", MagicMock(get=lambda key: f"value of {key}")):
+            # Regular response, the metrics are published
+            self.assertEqual(view._get_async.return_value, asyncio.run(view.get_async(any='thing')))
+            view._get_async.assert_awaited_with('value of MKS_GEBRUIKER', 'value of MKS_APPLICATIE', {'a': 'b'},
+                                                any='thing')
+            mock_request_metrics.return_value.observe.assert_called_with('StufRestView', 200)
+
+            # Request failed for an unknown reason
+            view._get_async.side_effect = Exception
+            self.assertEqual(mock_rest_response.internal_server_error.return_value,
+                             asyncio.run(view._handle_get_async(any='thing')))
+
+            # MKS is unavailable
+            view._get_async.side_effect = CircuitOpenException('upstream', 10)
+            self.assertEqual(mock_rest_response.service_unavailable.return_value,
+                             asyncio.run(view._handle_get_async(any='thing')))
+            mock_rest_response.service_unavailable.assert_called_with(retry_after=10)
+
+            # Invalid request
+            view._validate.return_value = {'some': 'error'}
+            self.assertEqual(mock_rest_response.bad_request.return_value,
+                             asyncio.run(view._handle_get_async(any='thing')))
+            mock_rest_response.bad_request.assert_called_with(some='error')
+
+    @patch("gobstuf.rest.brp.base_view.RESPONSE_CACHE_REQUESTS", MagicMock())
+    def test_get_async_cached(self):
+        view = StufRestView()
+        view._get_response_async = AsyncMock(return_value=Response('response data'))
+
+        # Without a response cache the response is requested
+        self.assertEqual(view._get_response_async.return_value,
+                         asyncio.run(view._get_async('user', 'application', {}, bsn=1)))
+
+        # Miss, the response is cached
+        view.response_cache = TTLCache(10, 60)
+        view._response_cache_key = lambda mks_application, **kwargs: (mks_application, *kwargs.items())
+        self.assertEqual(view._get_response_async.return_value,
+                         asyncio.run(view._get_async('user', 'application', {}, bsn=1)))
+        view._get_response_async.assert_awaited_with('user', 'application', {}, bsn=1)
+
+        # Hit, a copy of the cached response is returned
+        response = asyncio.run(view._get_async('user', 'application', {}, bsn=1))
+        self.assertEqual(2, view._get_response_async.await_count)
+        self.assertEqual(b'response data', response.get_data())
+
+    def test_get_response_async(self):
+        class StufRestViewImpl(StufRestView):
+            request_template = MagicMock()
+
+        view = StufRestViewImpl()
+        view._make_request_async = AsyncMock()
+        view._handle_mks_response = MagicMock()
+
+        with Flask(__name__).test_request_context(headers={'X-Correlation-ID': 'the correlation id'}):
+            self.assertEqual(view._handle_mks_response.return_value,
+                             asyncio.run(view._get_response_async('user', 'application', {'b': 'c'}, a=1)))
+
+        view.request_template.assert_called_with('user', 'application', correlation_id='the correlation id')
+        view.request_template.return_value.set_values.assert_called_with({'a': 1})
+        view._make_request_async.assert_awaited_with(view.request_template.return_value, 'user', 'application')
+        view._handle_mks_response.assert_called_with(view._make_request_async.return_value, {'b': 'c'}, a=1)
+
+    @patch("gobstuf.rest.brp.base_view.async_mks_requests")
+    def test_make_request_async(self, mock_mks_requests):
+        mock_mks_requests.do = AsyncMock()
+        stufreq = MagicMock()
+        stufreq.fingerprint.return_value = 'fingerprint'
+
+        view = StufRestView()
+        view._post_request_async = AsyncMock()
+
+        # Request is shared with concurrent requests with the same fingerprint for the same MKS user and application
+        self.assertEqual(mock_mks_requests.do.return_value,
+                         asyncio.run(view._make_request_async(stufreq, 'user', 'application')))
+        mock_mks_requests.do.assert_awaited_with(
+            ('user', 'application', 'fingerprint'),
+            view._post_request_async,
+            stufreq
+        )
+
+        with patch("gobstuf.rest.brp.base_view.MKS_SINGLE_FLIGHT", False):
+            mock_mks_requests.do.reset_mock()
+            self.assertEqual(view._post_request_async.return_value,
+                             asyncio.run(view._make_request_async(stufreq, 'user', 'application')))
+            view._post_request_async.assert_awaited_with(stufreq)
+            mock_mks_requests.do.assert_not_called()
+
+    @patch("gobstuf.rest.brp.base_view.ROUTE_SCHEME", 'scheme')
+    @patch("gobstuf.rest.brp.base_view.ROUTE_NETLOC", 'netloc')
+    @patch("gobstuf.rest.brp.base_view.ROUTE_PATH_310", '/route/path')
+    @patch("gobstuf.rest.brp.base_view.cert_post_async", new_callable=AsyncMock)
+    def test_post_request_async(self, mock_post):
+        mock_post.return_value = MKSResponse()
+        mock_post.return_value._content = b'content'
+        stufreq = MagicMock()
+        stufreq.soap_action = 'THE SOAP action'
+        stufreq.to_string = lambda: 'string repr'
+
+        response = asyncio.run(StufRestView()._post_request_async(stufreq))
+        self.assertEqual(mock_post.return_value, response)
+        mock_post.assert_awaited_with(
+            'scheme://netloc/route/path',
+            data='string repr',
+            headers={
+                'Soapaction': 'THE SOAP action',
+                'Content-Type': 'text/xml',
+            }
+        )
+
+        # The body has been read, it can be parsed from its chunks as well
+        self.assertEqual([b'content'], list(response.chunks))
+
+
 class StufRestFilterViewImpl(StufRestFilterView):
     name = 'stufrestfilterviewobjects'
 
@@ -314,7 +691,9 @@ class TestStufRestFilterView(TestCase):
         response_obj = MagicMock()
         response_obj.get_all_answer_objects = lambda: [{'object': 'A'}, {'object': 'B'}]
 
-        self.assertEqual(mock_rest_response.ok.return_value, view._build_response(response_obj))
+        with RequestMetrics().activate() as metrics:
+            self.assertEqual(mock_rest_response.ok.return_value, view._build_response(response_obj))
+        self.assertEqual(2, metrics.objects)
         mock_rest_response.ok.assert_called_with({
             '_embedded': {
                 'stufrestfilterviewobjects': [
@@ -324,6 +703,47 @@ class TestStufRestFilterView(TestCase):
             }
         }, {})
 
+    @patch("gobstuf.rest.brp.base_view.REST_STREAMING_RESPONSE", True)
+    @patch("gobstuf.rest.brp.base_view.RESTResponse")
+    def test_build_response_streaming(self, mock_rest_response):
+        view = StufRestFilterViewImpl()
+        response_obj = MagicMock()
+        response_obj.iter_answer_objects = lambda: iter([{'object': 'A'}, {'object': 'B'}])
+
+        self.assertEqual(mock_rest_response.ok_stream.return_value, view._build_response(response_obj))
+        name, objects, links = mock_rest_response.ok_stream.call_args[0]
+        self.assertEqual(('stufrestfilterviewobjects', {}), (name, links))
+
+        # The objects are counted when they have been sent
+        with RequestMetrics().activate() as metrics:
+            self.assertEqual([{'object': 'A'}, {'object': 'B'}], list(objects))
+        self.assertEqual(2, metrics.objects)
+
+        with RequestMetrics().activate() as metrics:
+            response_obj.iter_answer_objects = lambda: iter([])
+            self.assertEqual([], list(view._stream_answer_objects(response_obj)))
+        self.assertEqual(0, metrics.objects)
+
+    def test_stream_answer_objects_error(self):
+        view = StufRestFilterViewImpl()
+        response_obj = MagicMock()
+
+        # An error before the first object is raised before the response is sent
+        response_obj.iter_answer_objects.return_value.__next__.side_effect = ValueError
+        with self.assertRaises(ValueError):
+            view._stream_answer_objects(response_obj)
+
+        # A later error aborts the response
+        def objects():
+            yield {'object': 'A'}
+            raise ValueError
+
+        response_obj.iter_answer_objects = objects
+        streamed = view._stream_answer_objects(response_obj)
+        self.assertEqual({'object': 'A'}, next(streamed))
+        with self.assertRaises(ValueError):
+            next(streamed)
+
     def test_transform_query_parameter_value(self):
         view = StufRestFilterViewImpl()
         some_mock = MagicMock()
@@ -468,3 +888,140 @@ class TestStufRestFilterView(TestCase):
             }, view._validate_request_args(some='kwargs'))
             view._request_template_parameters.assert_called_with(some='kwargs')
 
+            # The plan is created once, validation does not change the checks of the request template
+            self.assertIs(view._get_validation_plan(), StufRestViewImpl()._get_validation_plan())
+            self.assertEqual(1, len(view.request_template.parameter_checks['attr7']))
+            view._validate_request_args(some='kwargs')
+            self.assertEqual(1, len(view.request_template.parameter_checks['attr7']))
+            self.assertEqual(1 + len(view.WILDCARD_CHECKS), len(view._get_validation_plan().checks['attr7']))
+
+    def test_get_request_args(self):
+        mock_request = MagicMock()
+        with patch("gobstuf.rest.brp.base_view.request", mock_request):
+            view = StufRestView()
+            view._transform_query_parameter_value = MagicMock(side_effect=lambda v: v.upper())
+
+            mock_request.args = {'a': 'a', 'b': 'b'}
+            self.assertEqual({'a': 'A', 'b': 'B'}, view._get_request_args())
+
+            # The request arguments are parsed once
+            self.assertEqual({'a': 'A', 'b': 'B'}, view._get_request_args())
+            self.assertEqual(2, view._transform_query_parameter_value.call_count)
+
+            mock_request.args = {'c': 'c'}
+            self.assertEqual({'c': 'C'}, view._get_request_args())
+
+
+
+class MockItemView(StufRestView):
+    lock = threading.Lock()
+    active = 0
+    max_active = 0
+
+    def _get_validation_errors(self, **kwargs) -> dict:
+        return {'title': 'invalid'} if kwargs['bsn'] == 'invalid' else {}
+
+    def lookup(self, mks_user, mks_application, args, bsn):
+        with self.lock:
+            MockItemView.active += 1
+            MockItemView.max_active = max(MockItemView.max_active, MockItemView.active)
+        try:
+            time.sleep(0.01)
+            data = {
+                'bsn': bsn,
+                'args': args.to_dict(),
+                'header': request.headers.get('X-Any'),
+                'user': mks_user,
+                'application': mks_application,
+                # The lookup runs in another thread, with a copy of the request context that has its own g
+                'g': g.get(MKS_USER_KEY),
+            }
+            return Response(json.dumps(data), status=200 if bsn != 'unknown' else 404)
+        finally:
+            with self.lock:
+                MockItemView.active -= 1
+
+
+class StufRestBatchViewImpl(StufRestBatchView):
+    item_view = MockItemView
+    item_parameter = 'bsn'
+    item_name = 'item'
+    values_name = 'values'
+    name = 'items'
+    max_size = 4
+    executor = ThreadPoolExecutor(max_workers=2)
+
+
+class TestStufRestBatchView(TestCase):
+
+    def setUp(self) -> None:
+        self.app = Flask(__name__)
+        self.app.add_url_rule('/items/batch', view_func=StufRestBatchViewImpl.as_view('batch'), methods=['POST'])
+        self.before_request = MagicMock()
+
+        @self.app.before_request
+        def set_mks_keys():
+            self.before_request()
+            setattr(g, MKS_USER_KEY, 'user')
+            setattr(g, MKS_APPLICATION_KEY, 'application')
+
+        MockItemView.max_active = 0
+
+    @patch("gobstuf.rest.brp.base_view.RequestMetrics")
+    def test_post(self, mock_request_metrics):
+        response = self.app.test_client().post('/items/batch?expand=any',
+                                               json={'values': ['1', 'unknown', '3', 'invalid']},
+                                               headers={'X-Any': 'any header'})
+        self.assertEqual(200, response.status_code)
+
+        items = response.get_json()['_embedded']['items']
+        expected_item = {
+            'args': {'expand': 'any'},
+            'header': 'any header',
+            'user': 'user',
+            'application': 'application',
+            'g': None,
+        }
+        self.assertEqual([
+            {'bsn': '1', 'status': 200, 'item': {**expected_item, 'bsn': '1'}},
+            {'bsn': 'unknown', 'status': 404, 'fout': {**expected_item, 'bsn': 'unknown'}},
+            {'bsn': '3', 'status': 200, 'item': {**expected_item, 'bsn': '3'}},
+        ], items[:3])
+        self.assertEqual({'bsn': 'invalid', 'status': 400}, {k: items[3][k] for k in ['bsn', 'status']})
+        self.assertEqual('invalid', items[3]['fout']['title'])
+        self.assertEqual('http://localhost/items/batch?expand=any', response.get_json()['_links']['self']['href'])
+
+        # The lookups are no requests of their own
+        self.before_request.assert_called_once()
+
+        # The metrics of the lookups are published separately from the metrics of the item view
+        self.assertEqual(4, mock_request_metrics.return_value.activate.call_count)
+        mock_request_metrics.return_value.observe.assert_any_call('StufRestBatchViewImpl.item', 200)
+        mock_request_metrics.return_value.observe.assert_any_call('StufRestBatchViewImpl.item', 404)
+        mock_request_metrics.return_value.observe.assert_any_call('StufRestBatchViewImpl.item', 400)
+
+        # Concurrency is bounded
+        self.assertLessEqual(MockItemView.max_active, 2)
+
+    def test_post_concurrent(self):
+        # The lookups of concurrent batch requests share the executor, together they never exceed its limit
+        responses = []
+
+        def post():
+            responses.append(self.app.test_client().post('/items/batch', json={'values': ['1', '2', '3', '4']}))
+
+        threads = [threading.Thread(target=post) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([200, 200], [response.status_code for response in responses])
+        self.assertEqual(2, MockItemView.max_active)
+
+    def test_post_invalid(self):
+        client = self.app.test_client()
+        for body in [None, [], {}, {'values': '1'}, {'values': [1]}, {'values': []}, {'values': ['1', '2', '3', '4', '5']}]:
+            response = client.post('/items/batch', json=body)
+            self.assertEqual(400, response.status_code)
+            self.assertEqual('paramsValidation', response.get_json()['code'])
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import re
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+from flask import Flask, g, request
+
+from gobstuf.auth.routes import MKS_USER_KEY, MKS_APPLICATION_KEY
+from gobstuf.rest.asgi import AsyncRESTApplication
+from gobstuf.rest.brp.views import IngeschrevenpersonenBsnView
+from gobstuf.rest.routes import REST_ROUTES
+
+REQUESTS = 200
+THREADS = 16
+
+
+class StubMKS:
+    """Answers every StUF request with the person that is asked for
+
+    The answer contains the gebruiker and applicatie of the request, so that any mix up between concurrent requests
+    shows up in the REST response.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def _value(self, tag: str, data: str):
+        # The first value of tag, eg the applicatie of the zender
+        return re.search(rf'{tag}>([^<]*)<', data).group(1)
+
+    def post(self, url, data, **kwargs):
+        with self.lock:
+            self.requests += 1
+
+        data = data.decode()
+        bsn = self._value('inp.bsn', data)
+        person = f'''
+<BG:object StUF:entiteittype="NPS">
+  <BG:inp.bsn>{bsn}</BG:inp.bsn>
+  <BG:geslachtsnaam>{self._value('gebruiker', data)}</BG:geslachtsnaam>
+  <BG:voornamen>{self._value('applicatie', data)}</BG:voornamen>
+</BG:object>'''
+        response = MagicMock()
+        response.iter_content = lambda chunk_size: iter([response.content])
+        response.content = f'''
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
+                  xmlns:BG="http://www.egem.nl/StUF/sector/bg/0310" xmlns:StUF="http://www.egem.nl/StUF/StUF0301">
+  <soapenv:Body><BG:npsLa01><BG:antwoord>{person}</BG:antwoord></BG:npsLa01></soapenv:Body>
+</soapenv:Envelope>'''.encode()
+        return response
+
+    async def post_async(self, url, data, **kwargs):
+        # Let the other requests run before the response is received
+        await asyncio.sleep(0)
+        return self.post(url, data, **kwargs)
+
+
+def get_app():
+    app = Flask(__name__)
+    for rule, view in REST_ROUTES:
+        app.add_url_rule(rule, view_func=view)
+
+    @app.before_request
+    def set_mks_user():
+        setattr(g, MKS_USER_KEY, request.headers['X-User'])
+        setattr(g, MKS_APPLICATION_KEY, request.headers['X-Role'])
+
+    return app
+
+
+@patch.object(IngeschrevenpersonenBsnView, 'response_cache', None)
+class TestConcurrentRequests(TestCase):
+    """Runs many requests in parallel threads against a stub MKS
+
+    Every request is for another person, user and role. Each response should contain its own person, user and role.
+    """
+
+    def setUp(self):
+        self.app = get_app()
+        self.mks = StubMKS()
+
+    def _get_request(self, i: int):
+        """Returns the path, query string and headers of request i"""
+        bsn = f'{i:09d}'
+        headers = {'X-User': f'user{i}', 'X-Role': f'role{i}'}
+        if i % 2:
+            return f'/brp/ingeschrevenpersonen/{bsn}', '', headers
+        # Search with a wildcard, validated and filtered by the view
+        return '/brp/ingeschrevenpersonen', f'burgerservicenummer={bsn}&naam__voornamen=role{i}*', headers
+
+    def _request(self, i: int):
+        path, query_string, headers = self._get_request(i)
+        response = self.app.test_client().get(path, query_string=query_string, headers=headers)
+        return i, response.status_code, json.loads(response.get_data())
+
+    async def _request_async(self, app, i: int):
+        path, query_string, headers = self._get_request(i)
+        scope = {
+            'type': 'http',
+            'http_version': '1.1',
+            'method': 'GET',
+            'path': path,
+            'query_string': query_string.encode(),
+            'headers': [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        }
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        await app(scope, None, send)
+        return i, messages[0]['status'], json.loads(b''.join(message.get('body', b'') for message in messages))
+
+    def _assert_person(self, i: int, person: dict):
+        self.assertEqual(f'{i:09d}', person['burgerservicenummer'])
+        self.assertEqual(f'user{i}', person['naam']['geslachtsnaam'])
+        self.assertEqual(f'role{i}', person['naam']['voornamen'])
+
+    @patch("gobstuf.rest.brp.base_view.STUF_STREAMING_PARSER", False)
+    @patch("gobstuf.rest.brp.base_view.REST_STREAMING_RESPONSE", False)
+    def test_concurrent_requests(self):
+        self._test_concurrent_requests()
+
+    @patch("gobstuf.rest.brp.base_view.STUF_STREAMING_PARSER", True)
+    @patch("gobstuf.rest.brp.base_view.REST_STREAMING_RESPONSE", True)
+    def test_concurrent_requests_streaming(self):
+        self._test_concurrent_requests()
+
+    @patch("gobstuf.rest.asgi.is_authorized", MagicMock(return_value=True))
+    @patch("gobstuf.rest.brp.base_view.STUF_STREAMING_PARSER", True)
+    @patch("gobstuf.rest.brp.base_view.REST_STREAMING_RESPONSE", True)
+    def test_concurrent_requests_async(self):
+        # All requests are handled at the same time by one event loop
+        app = AsyncRESTApplication(self.app, REST_ROUTES)
+
+        async def run():
+            return await asyncio.gather(*[self._request_async(app, i) for i in range(1, REQUESTS + 1)])
+
+        with patch("gobstuf.rest.brp.base_view.cert_post_async", self.mks.post_async):
+            results = asyncio.run(run())
+        self._assert_results(results)
+
+    def _test_concurrent_requests(self):
+        with patch("gobstuf.rest.brp.base_view.cert_post", self.mks.post), \
+                ThreadPoolExecutor(max_workers=THREADS) as executor:
+            results = list(executor.map(self._request, range(1, REQUESTS + 1)))
+        self._assert_results(results)
+
+    def _assert_results(self, results):
+        self.assertEqual(REQUESTS, self.mks.requests)
+        for i, status, data in results:
+            self.assertEqual(200, status, data)
+            if i % 2:
+                self._assert_person(i, data)
+            else:
+                persons = data['_embedded']['ingeschrevenpersonen']
+                self.assertEqual(1, len(persons))
+                self._assert_person(i, persons[0])
@@ -3,6 +3,8 @@ from unittest.mock import patch, MagicMock
 
 import json
 
+from flask import Response
+
 from gobstuf.rest.brp.rest_response import RESTResponse
 
 mock_response = MagicMock()
@@ -61,6 +63,29 @@ class TestRESTResponse(TestCase):
             self.assertEqual(result['status'], 200)
             self.assertEqual(response, RESTResponse._hal(any_data))
 
+    def test_json_stream_response(self):
+        with patch("gobstuf.rest.brp.rest_response.stream_with_context", lambda generator: generator):
+            data = {'_links': {'self': {'href': '[]'}}}
+            objects = [{'a': 1}, {'b': [2]}]
+            result = RESTResponse._json_stream_response(data, 'name', iter(objects), aap="noot")
+            self.assertEqual(result['aap'], "noot")
+
+            # The output is the same as for a complete response
+            expected = json.dumps({**data, '_embedded': {'name': objects}})
+            self.assertEqual(expected, ''.join(result['response']))
+
+            result = RESTResponse._json_stream_response(data, 'name', [])
+            self.assertEqual(json.dumps({**data, '_embedded': {'name': []}}), ''.join(result['response']))
+
+    def test_ok_stream(self):
+        with patch("gobstuf.rest.brp.rest_response.request", mock_request), \
+                patch("gobstuf.rest.brp.rest_response.stream_with_context", lambda generator: generator):
+            result = RESTResponse.ok_stream('name', iter([any_data]))
+            response = json.loads(''.join(result['response']))
+            self.assertEqual(result['content_type'], 'application/hal+json')
+            self.assertEqual(result['status'], 200)
+            self.assertEqual(response, RESTResponse._hal({'_embedded': {'name': [any_data]}}))
+
     def test_errors(self):
         with patch("gobstuf.rest.brp.rest_response.request", mock_request):
             for method in ['bad_request', 'forbidden', 'not_found']:
@@ -89,3 +114,16 @@ class TestRESTResponse(TestCase):
         with patch("gobstuf.rest.brp.rest_response.request", mock_request):
             result = RESTResponse.internal_server_error()
             self.assertEqual(result['status'], 500)
+
+    def test_service_unavailable(self):
+        with patch("gobstuf.rest.brp.rest_response.request", mock_request), \
+                patch("gobstuf.rest.brp.rest_response.Response", Response):
+            result = RESTResponse.service_unavailable()
+            self.assertEqual(503, result.status_code)
+            self.assertEqual('application/problem+json', result.content_type)
+            self.assertEqual('notAvailable', json.loads(result.get_data())['code'])
+            self.assertNotIn('Retry-After', result.headers)
+
+            # Retry after a whole number of seconds, at least 1
+            self.assertEqual('3', RESTResponse.service_unavailable(retry_after=2.1).headers['Retry-After'])
+            self.assertEqual('1', RESTResponse.service_unavailable(retry_after=0).headers['Retry-After'])
@@ -22,7 +22,10 @@ from gobstuf.rest.brp.views import (
     IngeschrevenpersonenStufKinderenDetailResponse,
     IngeschrevenpersonenStufKinderenListResponse,
     IngeschrevenpersonenBsnKinderenStufRequest,
+    IngeschrevenpersonenBsnBatchView,
+    bsn_response_cache,
 )
+from gobstuf.lib.cache import next_midnight
 
 
 class TestIngeschrevenpersonenView(TestCase):
@@ -45,6 +48,14 @@ class TestIngeschrevenpersonenBsnView(TestCase):
         self.assertEqual(IngeschrevenpersonenStufResponse, IngeschrevenpersonenBsnView.response_template)
         self.assertEqual(IngeschrevenpersonenBsnStufRequest, IngeschrevenpersonenBsnView.request_template)
 
+    def test_response_cache(self):
+        # BSN views and sub views share the response cache, which is cleared at midnight
+        self.assertEqual(bsn_response_cache, IngeschrevenpersonenBsnView.response_cache)
+        self.assertEqual(bsn_response_cache, IngeschrevenpersonenBsnKinderenDetailView.response_cache)
+        self.assertEqual(next_midnight, bsn_response_cache.boundary)
+
+        self.assertIsNone(IngeschrevenpersonenFilterView.response_cache)
+
     def test_get_not_found_message(self):
         kwargs = {'bsn': 'BEE ES EN'}
         self.assertEqual('Ingeschreven persoon niet gevonden met burgerservicenummer BEE ES EN.',
@@ -118,3 +129,10 @@ class TestIngeschrevenpersonenBsnKinderenDetailView(TestCase):
         kwargs = {'bsn': 'BEE ES EN'}
         self.assertEqual('Ingeschreven kind voor persoon niet gevonden met burgerservicenummer BEE ES EN.',
                          IngeschrevenpersonenBsnKinderenDetailView().get_not_found_message(**kwargs))
+
+
+class TestIngeschrevenpersonenBsnBatchView(TestCase):
+
+    def test_item_view(self):
+        self.assertEqual(IngeschrevenpersonenBsnView, IngeschrevenpersonenBsnBatchView.item_view)
+        self.assertEqual('bsn', IngeschrevenpersonenBsnBatchView.item_parameter)
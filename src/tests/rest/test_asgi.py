@@ -0,0 +1,163 @@
+import asyncio
+
+from unittest import TestCase
+from unittest.mock import patch, MagicMock, AsyncMock
+
+from flask import Flask, Response, abort, request
+from flask.views import MethodView
+
+from gobstuf.rest.asgi import get_environ, AsyncRESTApplication
+
+
+class MockView(MethodView):
+
+    def post(self, **kwargs):
+        return f"sync {kwargs}"
+
+    async def get_async(self, item_id):
+        await asyncio.sleep(0)
+        if item_id == 'error':
+            raise ValueError()
+        elif item_id == 'missing':
+            abort(404)
+        elif item_id == 'stream':
+            return Response(iter([b'chunk1', b'chunk2']))
+        return f"async {item_id} {request.args['q']}"
+
+
+def get_app():
+    app = Flask(__name__)
+    view_func = MockView.as_view('items')
+    app.add_url_rule('/items/<item_id>', view_func=view_func, methods=['GET', 'POST'])
+    app.add_url_rule('/status', view_func=lambda: 'OK')
+
+    @app.after_request
+    def after_request(response):
+        if request.args.get('after') == 'error':
+            raise ValueError()
+        response.headers['X-After'] = 'after'
+        return response
+
+    return AsyncRESTApplication(app, [('/items/<item_id>', view_func)])
+
+
+def get_scope(path, method='GET', query_string=b'', headers=None):
+    return {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'root_path': '',
+        'query_string': query_string,
+        'headers': headers or [],
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 12345),
+    }
+
+
+def call(app, scope):
+    """Calls the ASGI app, returns the status, headers and body of the response"""
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start, bodies = messages[0], messages[1:]
+    return start['status'], dict(start['headers']), [body['body'] for body in bodies if body['body']]
+
+
+@patch("gobstuf.rest.asgi.is_authorized", MagicMock(return_value=True))
+class TestAsyncRESTApplication(TestCase):
+
+    def test_get_environ(self):
+        scope = get_scope('/items/1', query_string=b'q=1', headers=[
+            (b'content-type', b'text/plain'),
+            (b'x-any', b'a'),
+            (b'x-any', b'b'),
+        ])
+        environ = get_environ(scope)
+
+        self.assertEqual('GET', environ['REQUEST_METHOD'])
+        self.assertEqual('/items/1', environ['PATH_INFO'])
+        self.assertEqual('q=1', environ['QUERY_STRING'])
+        self.assertEqual('testserver', environ['SERVER_NAME'])
+        self.assertEqual('80', environ['SERVER_PORT'])
+        self.assertEqual('127.0.0.1', environ['REMOTE_ADDR'])
+        self.assertEqual('text/plain', environ['CONTENT_TYPE'])
+        self.assertEqual('a,b', environ['HTTP_X_ANY'])
+
+        del scope['server'], scope['client']
+        environ = get_environ(scope)
+        self.assertEqual('localhost', environ['SERVER_NAME'])
+        self.assertNotIn('REMOTE_ADDR', environ)
+
+    def test_views(self):
+        app = get_app()
+        self.assertEqual({'items': MockView}, app.views)
+
+    def test_get_async(self):
+        status, headers, body = call(get_app(), get_scope('/items/1', query_string=b'q=any'))
+        self.assertEqual(200, status)
+        self.assertEqual([b'async 1 any'], body)
+
+        # The response has been processed by the Flask app
+        self.assertEqual(b'after', headers[b'x-after'])
+        self.assertEqual(b'11', headers[b'content-length'])
+
+    def test_get_async_streamed(self):
+        on_close = MagicMock()
+        with patch.object(Response, 'close', on_close):
+            status, _, body = call(get_app(), get_scope('/items/stream'))
+
+        self.assertEqual(200, status)
+        self.assertEqual([b'chunk1', b'chunk2'], body)
+        on_close.assert_called_once()
+
+    def test_get_async_forbidden(self):
+        with patch("gobstuf.rest.asgi.is_authorized") as mock_is_authorized:
+            mock_is_authorized.return_value = False
+            status, _, body = call(get_app(), get_scope('/items/1'))
+
+        self.assertEqual(403, status)
+        self.assertEqual([b'Forbidden'], body)
+        mock_is_authorized.assert_called_with('/items/<item_id>', item_id='1')
+
+    def test_get_async_errors(self):
+        app = get_app()
+
+        status, _, _ = call(app, get_scope('/items/missing'))
+        self.assertEqual(404, status)
+
+        status, _, _ = call(app, get_scope('/items/error'))
+        self.assertEqual(500, status)
+
+        status, _, _ = call(app, get_scope('/items/1', query_string=b'q=any&after=error'))
+        self.assertEqual(500, status)
+
+    def test_wsgi(self):
+        app = get_app()
+
+        # Any other request is handled by the Flask app
+        self.assertEqual((200, [b"sync {'item_id': '1'}"]), call(app, get_scope('/items/1', method='POST'))[::2])
+        self.assertEqual((200, [b'OK']), call(app, get_scope('/status'))[::2])
+        self.assertEqual(404, call(app, get_scope('/unknown'))[0])
+
+    @patch("gobstuf.rest.asgi.close_async_session", new_callable=AsyncMock)
+    def test_lifespan(self, mock_close_async_session):
+        messages = iter([{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}])
+        sent = []
+
+        async def receive():
+            return next(messages)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(get_app()({'type': 'lifespan'}, receive, send))
+        self.assertEqual(['lifespan.startup.complete', 'lifespan.shutdown.complete'], sent)
+        mock_close_async_session.assert_awaited_once()
@@ -1,9 +1,10 @@
 import datetime
+import os
 
 from unittest import TestCase
 from unittest.mock import patch, MagicMock, call
 
-from gobstuf.stuf.brp.base_request import StufRequest
+from gobstuf.stuf.brp.base_request import StufRequest, StufRequestTemplate, TEMPLATE_DIR
 
 
 class StufRequestImpl(StufRequest):
@@ -23,10 +24,15 @@ class StufRequestImpl(StufRequest):
 class StufRequestTestInit(TestCase):
     """ Tests initialisation of StufRequest """
 
-    @patch("builtins.open")
-    @patch("gobstuf.stuf.brp.base_request.StufMessage")
+    def setUp(self) -> None:
+        StufRequest._templates = {}
+
+    def tearDown(self) -> None:
+        StufRequest._templates = {}
+
+    @patch("gobstuf.stuf.brp.base_request.StufRequestTemplate")
     @patch("gobstuf.stuf.brp.base_request.StufRequest.set_element")
-    def test_init_set_values(self, mock_set_element, mock_message, mock_open):
+    def test_init_set_values(self, mock_set_element, mock_template):
         values = {
             'attr1': 'value1',
             'attr2': 'value2',
@@ -36,16 +42,80 @@ class StufRequestTestInit(TestCase):
         req.set_values(values)
 
         mock_set_element.assert_has_calls([
-            call(req.applicatie_path, 'APPLICATION_NAME'),
-            call(req.gebruiker_path, 'USERNAME'),
             call('PATH TO ATTR1', 'value1', True),
             # This attribute is converted by convert_param_attr2
             call('PATH TO ATTR2', 'value2value2', True),
         ])
 
-        self.assertEqual(mock_message.return_value, req.stuf_message)
+        template = mock_template.return_value
+        self.assertEqual(template.new_message.return_value, req.stuf_message)
+        mock_template.assert_called_with('/template/dir/template.xml', 'A B C', [
+            req.applicatie_path,
+            req.gebruiker_path,
+            req.tijdstip_bericht_path,
+            req.referentienummer_path,
+        ])
+        template.get_slot.assert_has_calls([
+            call(req.stuf_message, req.applicatie_path),
+            call(req.stuf_message, req.gebruiker_path),
+        ])
+
+    @patch("gobstuf.stuf.brp.base_request.StufRequestTemplate")
+    def test_get_template(self, mock_template):
+        # The template is parsed only once
+        template = StufRequestImpl.get_template()
+        self.assertEqual(mock_template.return_value, template)
+        self.assertEqual(template, StufRequestImpl.get_template())
+        StufRequestImpl('USERNAME', 'APPLICATION_NAME')
+        mock_template.assert_called_once()
+
+        # Per request class
+        class OtherStufRequestImpl(StufRequestImpl):
+            template = 'other_template.xml'
+
+        OtherStufRequestImpl.get_template()
+        mock_template.assert_called_with('/template/dir/other_template.xml', 'A B C', StufRequestImpl._slot_paths())
+
+
+class StufRequestTemplateTest(TestCase):
+
+    @patch("builtins.open")
+    @patch("gobstuf.stuf.brp.base_request.StufMessage")
+    def test_init(self, mock_message, mock_open):
+        mock_message.return_value.get_elm_index_path = lambda path: f"index of {path}"
+
+        template = StufRequestTemplate('/path/to/template.xml', 'A B', ['C D', 'E'])
+
+        mock_open.assert_called_with('/path/to/template.xml', 'r')
         mock_message.assert_called_with(mock_open().__enter__().read())
-        mock_open.assert_any_call('/template/dir/template.xml', 'r')
+        self.assertEqual(mock_message.return_value, template.stuf_message)
+        self.assertEqual({
+            'C D': 'index of A B C D',
+            'E': 'index of A B E',
+        }, template.slots)
+
+        self.assertEqual(mock_message.return_value.copy.return_value, template.new_message())
+
+        stuf_message = MagicMock()
+        self.assertEqual(stuf_message.get_elm_by_index_path.return_value, template.get_slot(stuf_message, 'E'))
+        stuf_message.get_elm_by_index_path.assert_called_with('index of A B E')
+
+    def test_template(self):
+        template = StufRequestTemplate(
+            os.path.join(TEMPLATE_DIR, 'ingeschrevenpersonen.xml'),
+            'soapenv:Body BG:npsLv01',
+            ['BG:stuurgegevens StUF:zender StUF:gebruiker']
+        )
+
+        message = template.new_message()
+        other_message = template.new_message()
+        template.get_slot(message, 'BG:stuurgegevens StUF:zender StUF:gebruiker').text = 'gebruiker'
+
+        # Every message has its own tree
+        self.assertEqual('gebruiker', message.get_elm_value(
+            'soapenv:Body BG:npsLv01 BG:stuurgegevens StUF:zender StUF:gebruiker'))
+        self.assertEqual('GEBRUIKER', other_message.get_elm_value(
+            'soapenv:Body BG:npsLv01 BG:stuurgegevens StUF:zender StUF:gebruiker'))
 
 
 @patch("gobstuf.stuf.brp.base_request.TEMPLATE_DIR", "/template/dir")
@@ -95,12 +165,12 @@ class StufRequestTest(TestCase):
         mock_random.randint.return_value = 12345
         req = StufRequestImpl('', '')
         req.stuf_message = MagicMock()
-        req.set_element = MagicMock()
+        req._set_slot = MagicMock()
         req.time_str = MagicMock(return_value='TIMESTR')
 
         self.assertEqual(req.stuf_message.to_string(), req.to_string())
 
-        req.set_element.assert_has_calls([
+        req._set_slot.assert_has_calls([
             call(req.tijdstip_bericht_path, req.time_str()),
             call(req.referentienummer_path, 'GOBTIMESTR_12345'),
         ])
@@ -108,12 +178,12 @@ class StufRequestTest(TestCase):
         # With correlation ID passed to constructor
         req = StufRequestImpl('', '', correlation_id='correlation id')
         req.stuf_message = MagicMock()
-        req.set_element = MagicMock()
+        req._set_slot = MagicMock()
         req.time_str = MagicMock(return_value='TIMESTR')
 
         self.assertEqual(req.stuf_message.to_string(), req.to_string())
 
-        req.set_element.assert_has_calls([
+        req._set_slot.assert_has_calls([
             call(req.tijdstip_bericht_path, req.time_str()),
             call(req.referentienummer_path, 'correlation id'),
         ])
@@ -124,3 +194,34 @@ class StufRequestTest(TestCase):
 
         self.assertEqual(req.to_string(), str(req))
 
+
+
+class StufRequestFingerprintTest(TestCase):
+
+    class BsnStufRequest(StufRequest):
+        template = 'ingeschrevenpersonen.xml'
+        content_root_elm = 'soapenv:Body BG:npsLv01'
+        parameter_paths = {
+            'bsn': 'BG:gelijk BG:inp.bsn'
+        }
+        soap_action = 'SOAP ACTION'
+
+    def _request(self, gebruiker='gebruiker', bsn='123456789'):
+        req = self.BsnStufRequest(gebruiker, 'applicatie')
+        req.set_values({'bsn': bsn})
+        return req
+
+    def test_fingerprint(self):
+        req = self._request()
+        fingerprint = req.fingerprint()
+        self.assertEqual(fingerprint, self._request().fingerprint())
+
+        # Tijdstip bericht and referentienummer are not part of the fingerprint
+        string_repr = req.to_string()
+        self.assertEqual(fingerprint, req.fingerprint())
+
+        # And are kept in the request
+        self.assertEqual(string_repr, req.stuf_message.to_string())
+
+        self.assertNotEqual(fingerprint, self._request(bsn='987654321').fingerprint())
+        self.assertNotEqual(fingerprint, self._request(gebruiker='other gebruiker').fingerprint())
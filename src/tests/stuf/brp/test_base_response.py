@@ -1,9 +1,14 @@
+import re
+
 from unittest import TestCase
 from unittest.mock import patch, MagicMock, call
 
 from gobstuf.stuf.brp.base_response import StufResponse, StufMappedResponse, NoStufAnswerException, Mapping, \
     MappedObjectWrapper, RelatedDetailResponseFilter, RelatedListResponseFilter, WildcardSearchResponseFilter
+from gobstuf.lib.utils import get_value
 from gobstuf.stuf.brp.response_mapping import RelatedMapping
+from gobstuf.stuf.message import StufMessage, StufMessageParser
+from gobstuf.stuf.brp.mapping_plan import MappingContext, resolve_path
 
 
 @patch("gobstuf.stuf.brp.base_response.StufMessage")
@@ -29,14 +34,14 @@ class StufMappedResponseImpl(StufMappedResponse):
             'attr1': 'XML PATH A',
             'attr2': 'XML PATH B',
             'attr3': {
-                'attr3a': 'XML PATH C - a',
-                'attr3b': 'XML PATH C - b'
+                'attr3a': 'XML PATH C_a',
+                'attr3b': 'XML PATH C_b'
             },
             'attr4': (len, 'XML PATH D'),
             'attr5': '=attr5 value',
             'attr6': 'XML PATH E@ATTR',
-            'attr7': 'XML PATH F!XPATH EXPRESSION',
-            'attr8': ['XML PATH A', 'attr']
+            'attr7': 'XML PATH F!.//XPATH[@x="1"]',
+            'attr8': ['LIST', 'attr']
         }
 
         def filter(self, obj, **kwargs):
@@ -172,31 +177,44 @@ class StufMappedResponseTest(TestCase):
         resp.stuf_message.find_all_elms.assert_called_with('ANSWER SECTION OBJECT')
 
     def _get_expected_mapped_result(self, resp):
-        mapping = resp._get_mapping(None).mapping
         return {
             '_links': {
                 'self': {
                     'href': 'http://path/to/me'
                 }
             },
-            'attr1': resp.stuf_message.get_elm_value(mapping['attr1']),
-            'attr2': resp.stuf_message.get_elm_value(mapping['attr2']),
+            'attr1': 'value A',
+            'attr2': 'value B',
             'attr3': {
-                'attr3a': resp.stuf_message.get_elm_value(mapping['attr3']['attr3a']),
-                'attr3b': resp.stuf_message.get_elm_value(mapping['attr3']['attr3b']),
+                'attr3a': 'value C a',
+                'attr3b': 'value C b',
             },
-            'attr4': len(resp.stuf_message.get_elm_value(mapping['attr4'][1])),
+            'attr4': len('value D'),
             'attr5': 'attr5 value',
-            'attr6': resp.stuf_message.get_elm_attr(mapping['attr6'], 'ATTR'),
-            'attr7': 'xpath XPATH EXPRESSION',
-            'attr8': []
+            'attr6': 'attr E',
+            'attr7': 'xpath F',
+            'attr8': ['item 1', 'item 2']
         }
 
     def _mock_stuf_message(self, resp):
-        resp.get_object_elm = MagicMock()
-        resp.stuf_message.get_elm_value = lambda a, o=None: f"value {a}"
-        resp.stuf_message.get_elm_attr = lambda a, attr, o=None: f"attr {attr}"
-        resp.stuf_message.get_elm_value_by_path = lambda a, path, o=None: f"xpath {path}"
+        resp.stuf_message = StufMessage('''
+<OBJECT>
+  <XML>
+    <PATH>
+      <A>value A</A>
+      <B>value B</B>
+      <C_a>value C a</C_a>
+      <C_b>value C b</C_b>
+      <D>value D</D>
+      <E ATTR="attr E" />
+      <F><XPATH x="0">other</XPATH><XPATH x="1">xpath F</XPATH></F>
+    </PATH>
+  </XML>
+  <LIST><attr>item 1</attr></LIST>
+  <LIST><attr>item 2</attr></LIST>
+</OBJECT>
+''')
+        resp.get_object_elm = MagicMock(return_value=resp.stuf_message.tree)
 
     def test_get_links(self):
         resp = StufMappedResponseImpl('msg')
@@ -238,9 +256,9 @@ class StufMappedResponseTest(TestCase):
             }
 
         resp = StufMappedResponseImpl('msg')
-        resp._sort_embedded_objects = MagicMock(side_effect = lambda o, t, m: o)
         resp.stuf_message.find_all_elms = lambda x, y: x
-        resp.create_objects_from_elements = lambda x: 'THE OBJECTS AT ' + x
+        resp._get_embedded_objects = MagicMock(side_effect=lambda x, t, m: ('THE OBJECTS AT ' + x, len(t)))
+        resp.count_objects_from_elements = MagicMock(side_effect=lambda x: len(x))
         resp.expand = ['partners', 'ouders']
 
         mapped_object = MappedObjectWrapper({}, MockedMapping(), 'some element')
@@ -252,16 +270,17 @@ class StufMappedResponseTest(TestCase):
                 'ouders': 'THE OBJECTS AT SOME OTHER PATH TO OUDERS',
             },
             '_links': {
-                'partners': 'THE OBJECTS AT SOME PATH TO PARTNERS',
-                'ouders': 'THE OBJECTS AT SOME OTHER PATH TO OUDERS',
+                'partners': 8,
+                'ouders': 6,
             }
         }, mapped_object.mapped_object)
-        resp._sort_embedded_objects.assert_has_calls([
-            call('THE OBJECTS AT SOME PATH TO PARTNERS', 'partners', mapped_object.mapping_class),
-            call('THE OBJECTS AT SOME OTHER PATH TO OUDERS', 'ouders', mapped_object.mapping_class),
+        resp._get_embedded_objects.assert_has_calls([
+            call('SOME PATH TO PARTNERS', 'partners', mapped_object.mapping_class),
+            call('SOME OTHER PATH TO OUDERS', 'ouders', mapped_object.mapping_class),
         ])
+        resp.count_objects_from_elements.assert_not_called()
 
-        # Leave out ouders, but links should always be added
+        # Leave out ouders, ouders are only counted but links should always be added
         resp.expand = ['partners']
         mapped_object = MappedObjectWrapper({}, MockedMapping(), 'some element')
         resp._add_embedded_objects(mapped_object)
@@ -271,10 +290,11 @@ class StufMappedResponseTest(TestCase):
                 'partners': 'THE OBJECTS AT SOME PATH TO PARTNERS',
             },
             '_links': {
-                'partners': 'THE OBJECTS AT SOME PATH TO PARTNERS',
-                'ouders': 'THE OBJECTS AT SOME OTHER PATH TO OUDERS',
+                'partners': 8,
+                'ouders': 25,
             }
         }, mapped_object.mapped_object)
+        resp.count_objects_from_elements.assert_called_once_with('SOME OTHER PATH TO OUDERS')
 
         # Expand nothing. Links should always be added
         resp.expand = []
@@ -283,11 +303,85 @@ class StufMappedResponseTest(TestCase):
 
         self.assertEqual({
             '_links': {
-                'partners': 'THE OBJECTS AT SOME PATH TO PARTNERS',
-                'ouders': 'THE OBJECTS AT SOME OTHER PATH TO OUDERS',
+                'partners': 21,
+                'ouders': 25,
             }
         }, mapped_object.mapped_object)
 
+    def test_get_embedded_objects(self):
+        class MockedMapping(Mapping):
+            entity_type = 'ENT'
+            mapping = {}
+
+            def sort_ouders(self, objects):
+                return list(reversed(objects))
+
+        mapping = MockedMapping()
+        resp = StufMappedResponseImpl('msg')
+        resp.create_objects_from_elements = lambda x: [e.upper() for e in x]
+        resp._create_object_at_index = MagicMock()
+
+        self.assertEqual((['C', 'B', 'A'], 3), resp._get_embedded_objects(['a', 'b', 'c'], 'ouders', mapping))
+        self.assertEqual((['A', 'B', 'C'], 3), resp._get_embedded_objects(['a', 'b', 'c'], 'partners', mapping))
+
+        # Only the object at the requested index. Sorted objects are all mapped
+        resp.embedded_index = {'ouders': 1, 'partners': 2}
+        self.assertEqual((['C'], 3), resp._get_embedded_objects(['a', 'b', 'c'], 'ouders', mapping))
+        resp.embedded_index = {'ouders': 4}
+        self.assertEqual(([], 3), resp._get_embedded_objects(['a', 'b', 'c'], 'ouders', mapping))
+        resp._create_object_at_index.assert_not_called()
+
+        # Unsorted objects are mapped only at the requested index
+        resp.embedded_index = {'partners': 2}
+        self.assertEqual(resp._create_object_at_index.return_value,
+                         resp._get_embedded_objects(['a', 'b', 'c'], 'partners', mapping))
+        resp._create_object_at_index.assert_called_with(['a', 'b', 'c'], 2)
+
+    def test_create_object_at_index(self):
+        resp = StufMappedResponseImpl('msg')
+        resp.create_object_from_element = MagicMock(side_effect=lambda x: None if x.startswith('no') else x.upper())
+        resp._has_object = MagicMock(side_effect=lambda x: not x.startswith('no'))
+
+        elements = ['no a', 'b', 'no c', 'd', 'e']
+        self.assertEqual((['B'], 3), resp._create_object_at_index(elements, 1))
+        resp.create_object_from_element.assert_has_calls([call('no a'), call('b')])
+        self.assertEqual(2, resp.create_object_from_element.call_count)
+
+        resp.create_object_from_element.reset_mock()
+        self.assertEqual((['E'], 3), resp._create_object_at_index(elements, 3))
+        resp.create_object_from_element.assert_called_once_with('e')
+
+        self.assertEqual(([], 3), resp._create_object_at_index(elements, 4))
+
+    def test_has_object(self):
+        resp = StufMappedResponseImpl('msg')
+        resp._get_mapping = MagicMock()
+        mapping = resp._get_mapping.return_value
+        mapping.get_filter_keys.return_value = ['a', 'b']
+        resp._get_filter_kwargs = MagicMock(return_value={'any kwarg': 'any value'})
+        resp.get_mapped_object = MagicMock()
+
+        self.assertTrue(resp._has_object('element'))
+        resp._get_mapping.assert_called_with('element')
+        mapping.get_filter_keys.assert_called_with(**{'any kwarg': 'any value'})
+        resp.get_mapped_object.assert_called_with('element', mapping, ('a', 'b'))
+        mapping.filter.assert_called_with(resp.get_mapped_object.return_value.mapped_object, **{'any kwarg': 'any value'})
+
+        # Filtered out
+        mapping.filter.return_value = None
+        self.assertFalse(resp._has_object('element'))
+
+        # Related object filtered out
+        resp.get_mapped_object.return_value = None
+        self.assertFalse(resp._has_object('element'))
+
+    def test_count_objects_from_elements(self):
+        resp = StufMappedResponseImpl('msg')
+        resp._has_object = lambda x: x != 'no object'
+
+        self.assertEqual(2, resp.count_objects_from_elements(['object', 'no object', 'object']))
+        self.assertEqual(0, resp.count_objects_from_elements([]))
+
     def test_get_answer_object(self):
         resp = StufMappedResponseImpl('msg')
         resp.get_object_elm = MagicMock()
@@ -356,6 +450,85 @@ class StufMappedResponseTest(TestCase):
         self.assertEqual(resp.create_objects_from_elements.return_value, resp.get_all_answer_objects())
         resp.create_objects_from_elements.assert_called_with(resp.get_all_object_elms.return_value)
 
+    def test_create_answer_objects(self):
+        resp = StufMappedResponseImpl('msg')
+        resp.stuf_message = StufMessage('<root><obj>1</obj><obj>2</obj><obj>3</obj></root>')
+        resp.create_objects_from_elements = MagicMock()
+        elements = list(resp.stuf_message.tree)
+
+        # Only the elements that pass all filters are mapped
+        filters = [MagicMock(), MagicMock()]
+        filters[0].filter_element.side_effect = lambda element, context: element.text != '1'
+        filters[1].filter_element.side_effect = lambda element, context: element.text != '3'
+        resp.response_filters_instances = filters
+
+        self.assertEqual(resp.create_objects_from_elements.return_value, resp._create_answer_objects(elements))
+        resp.create_objects_from_elements.assert_called_with([elements[1]])
+        context = filters[0].filter_element.call_args[0][1]
+        self.assertEqual(resp.stuf_message.tree, context.root)
+
+        # Without filters or elements nothing is filtered
+        resp.response_filters_instances = []
+        resp._create_answer_objects(elements)
+        resp.create_objects_from_elements.assert_called_with(elements)
+
+        resp.response_filters_instances = filters
+        resp.stuf_message = None
+        resp._create_answer_objects([])
+        resp.create_objects_from_elements.assert_called_with([])
+
+    def test_load_streaming(self):
+        with patch.object(StufMappedResponseImpl, 'streaming_parser', True):
+            resp = StufMappedResponseImpl('msg')
+        self.assertEqual('msg', resp.source)
+        self.assertIsNone(resp.stuf_message)
+
+    def test_get_chunks(self):
+        resp = StufMappedResponseImpl('abcde', streaming_parser=True, parser_chunk_size=2)
+        self.assertEqual(['ab', 'cd', 'e'], list(resp._get_chunks()))
+
+        resp.source = b'abc'
+        self.assertEqual([b'ab', b'c'], list(resp._get_chunks()))
+
+        resp.source = iter([b'abc', b'def'])
+        self.assertEqual(resp.source, resp._get_chunks())
+
+    @patch("gobstuf.stuf.brp.base_response.StufMessageParser")
+    @patch("gobstuf.stuf.brp.base_response.StufObjectMapping")
+    def test_get_parser(self, mock_object_mapping, mock_parser):
+        resp = IngeschrevenpersonenImpl('msg', streaming_parser=True)
+        object_path = resolve_path(f"{resp.answer_section} {resp.object_elm}", resp.namespaces)
+
+        mock_object_mapping.get_tags.return_value = {'a'}, {'b'}
+        self.assertEqual(mock_parser.return_value, resp._get_parser())
+        mock_parser.assert_called_with(None, {'a', *object_path}, {'b'})
+
+        resp._get_parser(collect_objects=True)
+        mock_parser.assert_called_with(object_path, {'a', *object_path}, {'b'})
+
+        # All elements are kept when the tags are unknown
+        mock_object_mapping.get_tags.return_value = None, set()
+        resp._get_parser()
+        mock_parser.assert_called_with(None, None, set())
+
+    def test_iter_answer_objects(self):
+        resp = StufMappedResponseImpl('msg')
+        resp.get_all_answer_objects = MagicMock(return_value=['obj1', 'obj2'])
+        self.assertEqual(['obj1', 'obj2'], list(resp.iter_answer_objects()))
+
+    def test_iter_answer_objects_streaming(self):
+        resp = StufMappedResponseImpl('msg', streaming_parser=True)
+        resp._get_chunks = MagicMock(return_value=['chunk1', 'chunk2'])
+        resp._get_parser = MagicMock()
+        resp._get_parsed_answer_objects = MagicMock(side_effect=[['obj1'], [], ['obj2', 'obj3']])
+
+        self.assertEqual(['obj1', 'obj2', 'obj3'], resp.get_all_answer_objects())
+        parser = resp._get_parser.return_value
+        resp._get_parser.assert_called_with(collect_objects=True)
+        parser.feed.assert_has_calls([call('chunk1'), call('chunk2')])
+        parser.close.assert_called_once()
+        resp._get_parsed_answer_objects.assert_called_with(parser)
+
     def test_get_all_answer_objects_with_filters(self):
         resp = StufMappedResponseImpl('msg')
         resp.get_all_object_elms = MagicMock()
@@ -381,20 +554,32 @@ class StufMappedResponseTest(TestCase):
 
         resp = StufMappedResponseImpl('msg')
         resp.get_mapped_object = MagicMock()
+        resp._get_mapping = MagicMock()
+        resp._get_mapping.return_value.get_filter_keys.return_value = ['filter key']
         resp._get_filter_kwargs = MagicMock(return_value={'some': 'val', 'override': 'this one'})
 
-        res = resp._get_mapped_related_object(RelatedMappingImpl(), 'some wrapper object')
+        resp.stuf_message = StufMessage('''
+<BG:wrapper xmlns:BG="http://www.egem.nl/StUF/sector/bg/0310">
+  <BG:gerelateerde><BG:attr>any value</BG:attr></BG:gerelateerde>
+</BG:wrapper>
+''', resp.namespaces)
+        wrapper = resp.stuf_message.tree
+
+        res = resp._get_mapped_related_object(RelatedMappingImpl(), wrapper)
         self.assertEqual(resp.get_mapped_object().get_filtered_object.return_value, res)
         resp.get_mapped_object().get_filtered_object.assert_called_with(
             some='val',
             override='this one is overridden'
         )
 
-        resp.stuf_message.find_elm.return_value = None
-        self.assertIsNone(resp._get_mapped_related_object(RelatedMappingImpl(), 'some wrapper object'))
+        # Correct element is mapped, on the related keys only
+        resp._get_mapping.assert_called_with(wrapper[0])
+        resp._get_mapping.return_value.get_filter_keys.assert_called_with(override='this one is overridden')
+        resp.get_mapped_object.assert_any_call(wrapper[0], resp._get_mapping.return_value, ('filter key',))
 
-        # Correct element is mapped
-        resp.stuf_message.find_elm.assert_called_with('BG:gerelateerde', 'some wrapper object')
+        # No related object
+        wrapper.remove(wrapper[0])
+        self.assertIsNone(resp._get_mapped_related_object(RelatedMappingImpl(), wrapper))
 
     def test_get_mapped_object_related(self):
         class RelatedMappingImpl(RelatedMapping):
@@ -403,17 +588,16 @@ class StufMappedResponseTest(TestCase):
 
         resp = StufMappedResponseImpl('msg')
         resp._get_mapped_related_object = MagicMock(return_value={'relatedA': 'attrA'})
-        resp.stuf_message.get_elm_value = lambda x, _: {
-            'attrB': 'valueB',
-            'relatedA': 'valueA',
-        }[x]
+        resp.stuf_message = StufMessage('<object><attrB>valueB</attrB><relatedA>valueA</relatedA></object>')
+        obj = resp.stuf_message.tree
 
-        res = resp.get_mapped_object('Object', RelatedMappingImpl())
+        res = resp.get_mapped_object(obj, RelatedMappingImpl())
 
         self.assertEqual({'relatedA': 'attrA', 'extra attr': 'valueB'}, res.mapped_object)
+        resp._get_mapped_related_object.assert_called_with(res.mapping_class, obj, None)
 
         resp._get_mapped_related_object.return_value = None
-        self.assertIsNone(resp.get_mapped_object('Object', RelatedMappingImpl()))
+        self.assertIsNone(resp.get_mapped_object(obj, RelatedMappingImpl()))
 
     @patch("gobstuf.stuf.brp.base_response.StufObjectMapping.get_for_entity_type")
     def test_get_mapping(self, mock_get_for_entity_type):
@@ -432,6 +616,44 @@ class StufMappedResponseTest(TestCase):
         mock_get_for_entity_type.assert_called_with('TST')
 
 
+class StufMappedResponseStreamingTest(TestCase):
+
+    def test_to_string(self):
+        resp = StufMappedResponseImpl('<root><a>1</a></root>', streaming_parser=True)
+        resp._get_parser = MagicMock(return_value=StufMessageParser())
+        self.assertEqual('<?xml version="1.0" ?>\n<root>\n\t<a>1</a>\n</root>', resp.to_string())
+
+    def test_parse(self):
+        resp = StufMappedResponseImpl('<root><a>1</a></root>', streaming_parser=True, parser_chunk_size=3)
+        parser = StufMessageParser()
+        resp._get_parser = MagicMock(return_value=parser)
+
+        resp.parse()
+        self.assertEqual('1', resp.stuf_message.get_elm_value('a'))
+        self.assertEqual(parser.root, resp.stuf_message.tree)
+
+        # Parsed only once
+        resp.parse()
+        resp._get_parser.assert_called_once()
+
+    def test_get_parsed_answer_objects(self):
+        resp = StufMappedResponseImpl('msg', streaming_parser=True)
+        resp.create_objects_from_elements = MagicMock(return_value=['obj1', 'obj2'])
+        resp._filter_answer_objects = MagicMock()
+        parser = MagicMock(root=None)
+
+        self.assertEqual(resp._filter_answer_objects.return_value, resp._get_parsed_answer_objects(parser))
+        resp.create_objects_from_elements.assert_called_with(parser.read_elements.return_value)
+        resp._filter_answer_objects.assert_called_with(['obj1', 'obj2'])
+        self.assertIsNone(resp.stuf_message)
+
+        # The message is set as soon as its root has been parsed
+        parser.root = ET.Element('root')
+        resp._get_parsed_answer_objects(parser)
+        self.assertEqual(parser.root, resp.stuf_message.tree)
+        self.assertEqual(resp.namespaces, resp.stuf_message.namespaces)
+
+
 import xml.etree.ElementTree as ET
 
 
@@ -508,6 +730,16 @@ class TestRelatedDetailResponseFilter(TestCase):
 
         self.assertEqual(resp.related_type, 'relation')
 
+        # Only the requested relation is embedded in the response
+        mock_response = MagicMock(embedded_index={}, expand=[])
+        RelatedDetailResponseFilterImpl(mock_response, relation_id='2')
+        self.assertEqual({'relation': 2}, mock_response.embedded_index)
+
+        # Unless the id is not a valid index
+        mock_response = MagicMock(embedded_index={}, expand=[])
+        RelatedDetailResponseFilterImpl(mock_response, relation_id='0')
+        self.assertEqual({}, mock_response.embedded_index)
+
     def test_filter_response(self):
         mock_request = MagicMock()
 
@@ -534,6 +766,35 @@ class TestRelatedDetailResponseFilter(TestCase):
             result = resp.filter_response(mapped_object)
             self.assertEqual(result, expected)
 
+    def test_filter_response_embedded_index(self):
+        mock_request = MagicMock()
+
+        with patch("gobstuf.stuf.brp.base_response.request", mock_request):
+            mock_response = MagicMock(embedded_index={}, expand=[])
+            resp = RelatedDetailResponseFilterImpl(mock_response, relation_id=2)
+
+            # Only the requested relation is embedded
+            mapped_object = {
+                'other': 'value',
+                '_embedded': {
+                    'relation': [
+                        {'a': 2}
+                    ]
+                }
+            }
+
+            expected = {
+                'a': 2,
+                '_links': {'self': {'href': mock_request.base_url}}
+            }
+
+            result = resp.filter_response(mapped_object)
+            self.assertEqual(result, expected)
+
+            # The requested relation does not exist
+            mapped_object['_embedded']['relation'] = []
+            self.assertIsNone(resp.filter_response(mapped_object))
+
     def test_filter_response_no_relations(self):
         mock_request = MagicMock()
 
@@ -586,6 +847,9 @@ class TestRelatedListResponseFilter(TestCase):
     def test_init(self):
         self.assertEqual(self.resp.related_type, 'relation')
 
+    def test_filter_element(self):
+        self.assertTrue(self.resp.filter_element(MagicMock(), MagicMock()))
+
     def test_filter_response(self):
         mock_request = MagicMock()
 
@@ -614,6 +878,35 @@ class TestRelatedListResponseFilter(TestCase):
             result = self.resp.filter_response(mapped_object)
             self.assertEqual(result, expected)
 
+    def test_filter_response_embedded_index(self):
+        mock_request = MagicMock()
+
+        with patch("gobstuf.stuf.brp.base_response.request", mock_request):
+            mock_response = MagicMock(embedded_index={}, expand=[])
+            resp = RelatedDetailResponseFilterImpl(mock_response, relation_id=2)
+
+            # Only the requested relation is embedded
+            mapped_object = {
+                'other': 'value',
+                '_embedded': {
+                    'relation': [
+                        {'a': 2}
+                    ]
+                }
+            }
+
+            expected = {
+                'a': 2,
+                '_links': {'self': {'href': mock_request.base_url}}
+            }
+
+            result = resp.filter_response(mapped_object)
+            self.assertEqual(result, expected)
+
+            # The requested relation does not exist
+            mapped_object['_embedded']['relation'] = []
+            self.assertIsNone(resp.filter_response(mapped_object))
+
     def test_filter_response_no_relations(self):
         mock_request = MagicMock()
 
@@ -652,6 +945,54 @@ class TestWildcardSearchResponseFilter(TestCase):
         wildcards = {'attr': 'any value'}
         resp = WildcardSearchResponseFilterImpl(self.mock_response, **wildcards)
         self.assertEqual(resp.wildcards, wildcards)
+        self.assertEqual({'attr': re.compile('^any value$', re.IGNORECASE)}, resp.patterns)
+
+    def test_filter_element(self):
+        response = MagicMock(namespaces={'BG': 'http://www.egem.nl/StUF/sector/bg/0310'}, wildcard_elements={
+            'naam__geslachtsnaam': ['BG:geslachtsnaam'],
+            'verblijfplaats__naamOpenbareRuimte': ['BG:verblijfsadres BG:gor.openbareRuimteNaam',
+                                                   'BG:sub.correspondentieAdres BG:gor.openbareRuimteNaam'],
+        })
+        message = StufMessage('''
+<BG:objects xmlns:BG="http://www.egem.nl/StUF/sector/bg/0310">
+  <BG:object>
+    <BG:geslachtsnaam>Jansen</BG:geslachtsnaam>
+    <BG:verblijfsadres><BG:gor.openbareRuimteNaam>Kalverstraat</BG:gor.openbareRuimteNaam></BG:verblijfsadres>
+  </BG:object>
+  <BG:object>
+    <BG:geslachtsnaam>Jansen</BG:geslachtsnaam>
+    <BG:sub.correspondentieAdres>
+      <BG:gor.openbareRuimteNaam>Damrak</BG:gor.openbareRuimteNaam>
+    </BG:sub.correspondentieAdres>
+  </BG:object>
+  <BG:object>
+    <BG:geslachtsnaam>Bakker</BG:geslachtsnaam>
+    <BG:verblijfsadres><BG:gor.openbareRuimteNaam>Damstraat</BG:gor.openbareRuimteNaam></BG:verblijfsadres>
+  </BG:object>
+  <BG:object>
+    <BG:verblijfsadres><BG:gor.openbareRuimteNaam>Damstraat</BG:gor.openbareRuimteNaam></BG:verblijfsadres>
+  </BG:object>
+</BG:objects>
+''')
+        context = MappingContext(message.tree)
+        objects = list(message.tree)
+
+        def passes(**wildcards):
+            filter = WildcardSearchResponseFilterImpl(response, **wildcards)
+            return [filter.filter_element(obj, context) for obj in objects]
+
+        self.assertEqual([True, True, False, False], passes(naam__geslachtsnaam='jans*'))
+        self.assertEqual([False, True, True, True], passes(verblijfplaats__naamOpenbareRuimte='Dam*'))
+        self.assertEqual([False, True, False, False],
+                         passes(naam__geslachtsnaam='Jans*', verblijfplaats__naamOpenbareRuimte='Dam*'))
+
+        # Attributes without elements are filtered after mapping
+        self.assertEqual([True, True, True, True], passes(naam__voornamen='Jan*'))
+
+    def test_filter_response_without_value(self):
+        filter = WildcardSearchResponseFilterImpl(self.mock_response, naam__geslachtsnaam='Jan*')
+        self.assertIsNone(filter.filter_response({'naam': {}}))
+        self.assertIsNone(filter.filter_response({'naam': {'geslachtsnaam': None}}))
 
     def test_filter_response(self):
         mock_response_objects = [
@@ -722,3 +1063,126 @@ class TestWildcardSearchResponseFilter(TestCase):
 
         for query, expected in cases:
             self.assertEqual(expected, filter._convert_wildcard_query(query))
+
+
+class IngeschrevenpersonenImpl(StufMappedResponse):
+    answer_section = 'soapenv:Envelope soapenv:Body BG:npsLa01 BG:antwoord'
+    object_elm = 'BG:object'
+    filter_kwargs = ['inclusiefoverledenpersonen']
+
+
+class PartnersDetailResponseFilterImpl(RelatedDetailResponseFilter):
+    related_type = 'partners'
+
+
+class IngeschrevenpersonenPartnersDetailImpl(IngeschrevenpersonenImpl):
+    response_filters = [PartnersDetailResponseFilterImpl]
+
+
+@patch("gobstuf.stuf.brp.response_mapping.get_auth_url",
+       lambda name, **kwargs: f'{name}/{kwargs["bsn"]}/{kwargs.get("partners_id")}')
+class TestEmbeddedObjectsIntegrated(TestCase):
+
+    def _partner(self, bsn, ontbonden=False):
+        return f'''
+<BG:inp.heeftAlsEchtgenootPartner StUF:entiteittype="NPSNPSHUW">
+  <BG:gerelateerde StUF:entiteittype="NPS">
+    <BG:inp.bsn>{bsn}</BG:inp.bsn>
+    <BG:geslachtsnaam>naam {bsn}</BG:geslachtsnaam>
+  </BG:gerelateerde>
+  {'<BG:datumOntbinding>20000101</BG:datumOntbinding>' if ontbonden else ''}
+</BG:inp.heeftAlsEchtgenootPartner>'''
+
+    def _msg(self):
+        partners = self._partner('2', True) + self._partner('3') + self._partner('4', True) + self._partner('5')
+        return f'''
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/"
+                  xmlns:BG="http://www.egem.nl/StUF/sector/bg/0310" xmlns:StUF="http://www.egem.nl/StUF/StUF0301">
+  <soapenv:Body><BG:npsLa01><BG:antwoord>
+    <BG:object StUF:entiteittype="NPS"><BG:inp.bsn>1</BG:inp.bsn>{partners}</BG:object>
+  </BG:antwoord></BG:npsLa01></soapenv:Body>
+</soapenv:Envelope>'''
+
+    def test_embedded_objects(self):
+        expanded = IngeschrevenpersonenImpl(self._msg(), expand='partners').get_answer_object()
+        counted = IngeschrevenpersonenImpl(self._msg()).get_answer_object()
+
+        # Ontbonden huwelijken are not counted
+        self.assertEqual(['3', '5'], [p['burgerservicenummer'] for p in expanded['_embedded']['partners']])
+        self.assertEqual(2, len(counted['_links']['partners']))
+        self.assertEqual(expanded['_links'], counted['_links'])
+        self.assertNotIn('_embedded', counted)
+
+    def test_streaming_parser(self):
+        other = '<BG:other><BG:inp.bsn>0</BG:inp.bsn></BG:other><StUF:tijdstipRegistratie>1</StUF:tijdstipRegistratie>'
+        msg = self._msg().replace('<BG:inp.bsn>', other + '<BG:inp.bsn>')
+        msg = msg.replace('</BG:antwoord>', '<BG:object StUF:entiteittype="NPS"><BG:inp.bsn>6</BG:inp.bsn>'
+                                            '</BG:object></BG:antwoord>')
+
+        for expand in ['', 'partners']:
+            expected = IngeschrevenpersonenImpl(msg, expand=expand).get_all_answer_objects()
+            self.assertEqual(['1', '6'], [obj['burgerservicenummer'] for obj in expected])
+            for chunk_size in [1, 100, len(msg)]:
+                resp = IngeschrevenpersonenImpl(msg, expand=expand, streaming_parser=True,
+                                                parser_chunk_size=chunk_size)
+                self.assertEqual(expected, resp.get_all_answer_objects())
+                resp = IngeschrevenpersonenImpl(msg, expand=expand, streaming_parser=True,
+                                                parser_chunk_size=chunk_size)
+                self.assertEqual(expected[0], resp.get_answer_object())
+
+        # Answer objects are removed once they have been mapped, unmapped elements are removed while parsing
+        resp = IngeschrevenpersonenImpl(msg, streaming_parser=True)
+        resp.get_all_answer_objects()
+        self.assertIsNotNone(resp.stuf_message.find_elm(resp.answer_section))
+        self.assertEqual([], resp.get_all_object_elms())
+        self.assertNotIn('tijdstipRegistratie', resp.to_string())
+
+    def test_embedded_object_at_index(self):
+        mock_request = MagicMock()
+
+        with patch("gobstuf.stuf.brp.base_response.request", mock_request):
+            resp = IngeschrevenpersonenPartnersDetailImpl(self._msg(), partners_id='2')
+            result = resp.get_answer_object()
+
+            self.assertEqual('5', result['burgerservicenummer'])
+            self.assertEqual(mock_request.base_url, result['_links']['self']['href'])
+
+            resp = IngeschrevenpersonenPartnersDetailImpl(self._msg(), partners_id='3')
+            with self.assertRaises(NoStufAnswerException):
+                resp.get_answer_object()
+
+
+@patch("gobstuf.stuf.brp.response_mapping.get_auth_url", lambda *args, **kwargs: 'url')
+class TestWildcardSearch(TestCase):
+
+    def get_objects(self, streaming_parser=False, **wildcards):
+        from gobstuf.mks_simulator.generator import generate_answer
+        from gobstuf.stuf.brp.response.ingeschrevenpersonen import IngeschrevenpersonenStufResponse
+
+        message = generate_answer(objects=40, seed=3, briefadres_rate=0.2).decode()
+        response = IngeschrevenpersonenStufResponse(message, inclusiefoverledenpersonen=True, wildcards=wildcards,
+                                                    streaming_parser=streaming_parser)
+        with patch.object(response, 'create_object_from_element',
+                          wraps=response.create_object_from_element) as mock_create:
+            objects = response.get_all_answer_objects()
+        return objects, mock_create.call_count
+
+    def test_not_matching_objects_are_not_mapped(self):
+        all_objects, mapped = self.get_objects()
+        self.assertEqual(40, mapped)
+
+        for streaming_parser in [False, True]:
+            wildcards = {
+                'naam__geslachtsnaam': 'B*',
+                'naam__voornamen': '*a*',
+                'verblijfplaats__naamOpenbareRuimte': '*gracht',
+            }
+            for attribute, value in wildcards.items():
+                objects, mapped = self.get_objects(streaming_parser, **{attribute: value})
+                pattern = re.compile(value.replace('*', '.*'), re.IGNORECASE)
+                expected = [obj for obj in all_objects if pattern.fullmatch(get_value(obj, *attribute.split('__')))]
+
+                self.assertTrue(0 < len(expected) < 40)
+                self.assertEqual(expected, objects)
+                # The objects that do not match are not mapped
+                self.assertEqual(len(expected), mapped)
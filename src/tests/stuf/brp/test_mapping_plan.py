@@ -0,0 +1,217 @@
+import xml.etree.ElementTree as ET
+
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from gobstuf.stuf.brp.mapping_plan import NAMESPACES, MappingContext, MappingPlan, _resolve_tag, compile_path, \
+    compile_findall, compile_mapping, resolve_path, collect_path_tags, collect_tags
+
+BG = '{http://www.egem.nl/StUF/sector/bg/0310}'
+
+XML = '''
+<root xmlns:BG="http://www.egem.nl/StUF/sector/bg/0310" xmlns:StUF="http://www.egem.nl/StUF/StUF0301">
+  <BG:object>
+    <BG:naam>first</BG:naam>
+    <BG:naam>second</BG:naam>
+    <BG:geboortedatum StUF:indOnvolledigeDatum="V">20000101</BG:geboortedatum>
+    <BG:adres><BG:postcode>1234AB</BG:postcode></BG:adres>
+    <BG:extra>
+      <StUF:extraElement naam="a">value a</StUF:extraElement>
+      <StUF:extraElement naam="b">value b</StUF:extraElement>
+    </BG:extra>
+    <BG:kind><BG:naam>kind 1</BG:naam></BG:kind>
+    <BG:kind><BG:naam>kind 2</BG:naam></BG:kind>
+  </BG:object>
+  <BG:postcode>root postcode</BG:postcode>
+</root>
+'''
+
+
+class TestMappingContext(TestCase):
+
+    def test_child(self):
+        root = ET.fromstring(XML)
+        obj = root[0]
+        context = MappingContext(root)
+
+        self.assertEqual(root, context.root)
+
+        # First matching child is returned
+        self.assertEqual('first', context.child(obj, f'{BG}naam').text)
+        self.assertIsNone(context.child(obj, f'{BG}any'))
+
+        # Children are indexed once per element
+        obj.remove(obj[0])
+        self.assertEqual('first', context.child(obj, f'{BG}naam').text)
+        self.assertEqual('second', MappingContext(root).child(obj, f'{BG}naam').text)
+
+
+class TestMappingPlan(TestCase):
+
+    def setUp(self) -> None:
+        self.root = ET.fromstring(XML)
+        self.obj = self.root[0]
+        self.context = MappingContext(self.root)
+
+    def test_resolve_tag(self):
+        self.assertEqual(f'{BG}inp.bsn', _resolve_tag('BG:inp.bsn', NAMESPACES))
+        self.assertEqual('tag', _resolve_tag('tag', NAMESPACES))
+
+        # Unknown namespace or anything else than a simple tag
+        self.assertIsNone(_resolve_tag('ANY:tag', NAMESPACES))
+        self.assertIsNone(_resolve_tag('.//BG:tag', NAMESPACES))
+        self.assertIsNone(_resolve_tag('BG:tag[@naam="a"]', NAMESPACES))
+
+    def test_compile_path(self):
+        find = compile_path('BG:adres BG:postcode', NAMESPACES)
+        self.assertEqual('1234AB', find(self.obj, self.context).text)
+
+        # When an element is not found the search continues from the root (StufMessage.find_elm)
+        find = compile_path('BG:any BG:postcode', NAMESPACES)
+        self.assertEqual('root postcode', find(self.obj, self.context).text)
+
+        find = compile_path('BG:adres BG:any', NAMESPACES)
+        self.assertIsNone(find(self.obj, self.context))
+
+        # Other than simple tags are found by ElementTree
+        find = compile_path('BG:extra StUF:extraElement[@naam="b"]', NAMESPACES)
+        self.assertEqual('value b', find(self.obj, self.context).text)
+
+    def test_compile_findall(self):
+        findall = compile_findall('BG:kind', NAMESPACES)
+        self.assertEqual(['kind 1', 'kind 2'], [elm[0].text for elm in findall(self.obj, self.context)])
+
+        # Parent is the root if the element has no children
+        self.assertEqual([], findall(self.obj[0], self.context))
+
+        # The parent of a path is searched from the root (StufMessage.find_all_elms)
+        findall = compile_findall('BG:object BG:naam', NAMESPACES)
+        self.assertEqual(['first', 'second'], [elm.text for elm in findall(None, self.context)])
+
+        findall = compile_findall('BG:any BG:naam', NAMESPACES)
+        self.assertEqual([], findall(self.obj, self.context))
+
+        findall = compile_findall('BG:extra StUF:extraElement[@naam="a"]', NAMESPACES)
+        self.assertEqual([], findall(self.obj, self.context))
+
+        findall = compile_findall('BG:object .//StUF:extraElement', NAMESPACES)
+        self.assertEqual(['value a', 'value b'], [elm.text for elm in findall(self.obj, self.context)])
+
+    def test_compile_mapping(self):
+        mapping = {
+            'naam': 'BG:naam',
+            'literal': '=literal value',
+            'attribute': 'BG:geboortedatum@StUF:indOnvolledigeDatum',
+            'no attribute': 'BG:any@StUF:indOnvolledigeDatum',
+            'xpath': 'BG:extra!.//StUF:extraElement[@naam="b"]',
+            'no xpath': 'BG:extra!.//StUF:extraElement[@naam="c"]',
+            'no xpath element': 'BG:any!.//StUF:extraElement[@naam="b"]',
+            'missing': 'BG:any',
+            'nested': {
+                'postcode': 'BG:adres BG:postcode',
+                'method': (lambda *args: '-'.join(args), 'BG:naam', 'BG:adres BG:postcode'),
+            },
+            'list': ['BG:kind', {
+                'naam': 'BG:naam',
+            }]
+        }
+
+        extract = compile_mapping(mapping, NAMESPACES)
+        self.assertEqual({
+            'naam': 'first',
+            'literal': 'literal value',
+            'attribute': 'V',
+            'no attribute': None,
+            'xpath': 'value b',
+            'no xpath': None,
+            'no xpath element': None,
+            'missing': None,
+            'nested': {
+                'postcode': '1234AB',
+                'method': 'first-1234AB',
+            },
+            'list': [{'naam': 'kind 1'}, {'naam': 'kind 2'}]
+        }, extract(self.obj, self.context))
+
+    def test_resolve_path(self):
+        self.assertEqual([f'{BG}object', f'{BG}inp.bsn'], resolve_path('BG:object BG:inp.bsn', NAMESPACES))
+
+        with self.assertRaises(AssertionError):
+            resolve_path('BG:object .//BG:inp.bsn', NAMESPACES)
+
+    def test_collect_path_tags(self):
+        tags, subtree_tags = set(), set()
+        self.assertTrue(collect_path_tags('BG:adres BG:postcode', NAMESPACES, tags, subtree_tags))
+        self.assertEqual({f'{BG}adres', f'{BG}postcode'}, tags)
+        self.assertEqual(set(), subtree_tags)
+
+        # The subtree of the element before a non-simple element is visited
+        tags, subtree_tags = set(), set()
+        self.assertTrue(collect_path_tags('BG:extra .//StUF:extraElement BG:any', NAMESPACES, tags, subtree_tags))
+        self.assertEqual({f'{BG}extra'}, tags)
+        self.assertEqual({f'{BG}extra'}, subtree_tags)
+
+        # Unknown when the path starts with a non-simple element
+        self.assertFalse(collect_path_tags('.//BG:naam', NAMESPACES, set(), set()))
+
+    def test_collect_tags(self):
+        mapping = {
+            'naam': 'BG:naam',
+            'literal': '=literal value',
+            'attribute': 'BG:geboortedatum@StUF:indOnvolledigeDatum',
+            'xpath': 'BG:extra!.//StUF:extraElement[@naam="b"]',
+            'nested': {
+                'method': (lambda *args: '-'.join(args), 'BG:naam', 'BG:adres BG:postcode'),
+            },
+            'list': ['BG:kind', {
+                'naam': 'BG:naam',
+            }]
+        }
+        tags, subtree_tags = set(), set()
+        self.assertTrue(collect_tags(mapping, NAMESPACES, tags, subtree_tags))
+        self.assertEqual({f'{BG}naam', f'{BG}geboortedatum', f'{BG}extra', f'{BG}adres', f'{BG}postcode',
+                          f'{BG}kind'}, tags)
+        self.assertEqual({f'{BG}extra'}, subtree_tags)
+
+        self.assertFalse(collect_tags({'naam': 'BG:naam', 'any': './/BG:naam'}, NAMESPACES, set(), set()))
+        self.assertFalse(collect_tags({'list': ['.//BG:kind', {}]}, NAMESPACES, set(), set()))
+
+    @patch("gobstuf.stuf.brp.mapping_plan.compile_mapping")
+    @patch("gobstuf.stuf.brp.mapping_plan.compile_path")
+    def test_mapping_plan(self, mock_compile_path, mock_compile_mapping):
+        mapping = MagicMock()
+        mapping.related_entity_wrapper = 'BG:gerelateerde'
+
+        plan = MappingPlan(mapping)
+        self.assertEqual(mock_compile_mapping.return_value, plan.extract)
+        mock_compile_mapping.assert_called_with(mapping.mapping, NAMESPACES)
+        self.assertEqual(mock_compile_path.return_value, plan.find_related)
+        mock_compile_path.assert_called_with('BG:gerelateerde', NAMESPACES)
+
+        # Projection on keys
+        mapping.mapping = {'a': 'BG:a', 'b': 'BG:b', 'c': 'BG:c'}
+        MappingPlan(mapping, keys=('c', 'a', 'd'))
+        mock_compile_mapping.assert_called_with({'a': 'BG:a', 'c': 'BG:c'}, NAMESPACES)
+
+        # Empty mapping, no related entity
+        mapping = type('MockMapping', (), {'mapping': {}})()
+        plan = MappingPlan(mapping)
+        self.assertIsNone(plan.extract)
+        self.assertIsNone(plan.find_related)
+
+    def test_mapping_plan_tags(self):
+        mapping = type('MockMapping', (), {
+            'mapping': {'naam': 'BG:naam', 'postcode': 'BG:adres BG:postcode'},
+            'related_entity_wrapper': 'BG:gerelateerde',
+            'related': {'kinderen': 'BG:kind'},
+        })()
+        plan = MappingPlan(mapping)
+        self.assertEqual({f'{BG}naam', f'{BG}adres', f'{BG}postcode', f'{BG}gerelateerde', f'{BG}kind'}, plan.tags)
+        self.assertEqual(set(), plan.subtree_tags)
+
+        plan = MappingPlan(mapping, keys=('naam',))
+        self.assertEqual({f'{BG}naam', f'{BG}gerelateerde', f'{BG}kind'}, plan.tags)
+
+        # Visited elements cannot be determined
+        mapping.related_entity_wrapper = './/BG:gerelateerde'
+        self.assertIsNone(MappingPlan(mapping).tags)
@@ -1,7 +1,7 @@
 import freezegun
 
 from unittest import TestCase
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 from gobstuf.stuf.brp.response_mapping import (
     Mapping, NPSMapping, StufObjectMapping, RelatedMapping, NPSNPSHUWMapping, NPSNPSOUDMapping, NPSNPSKNDMapping, NPSFamilieRelatedMapping
 )
@@ -62,6 +62,10 @@ class TestMapping(TestCase):
         # Default filtering is return all non null values
         self.assertEqual(mapping.filter(obj), expect)
 
+    def test_get_filter_keys(self):
+        mapping = MappingImpl()
+        self.assertEqual([], mapping.get_filter_keys(any_kwarg='any value'))
+
 
 class TestStufObjectMapping(TestCase):
 
@@ -79,6 +83,50 @@ class TestStufObjectMapping(TestCase):
         with self.assertRaises(Exception):
             StufObjectMapping.get_for_entity_type('NONEXISTENT')
 
+    @patch.dict(StufObjectMapping.plans)
+    @patch("gobstuf.stuf.brp.response_mapping.MappingPlan")
+    def test_register_compiles_plan(self, mock_plan):
+        StufObjectMapping.register(MappingImpl)
+
+        self.assertEqual(mock_plan.return_value, StufObjectMapping.plans[MappingImpl])
+        self.assertIsInstance(mock_plan.call_args[0][0], MappingImpl)
+
+    @patch("gobstuf.stuf.brp.response_mapping.MappingPlan")
+    def test_get_plan(self, mock_plan):
+        class UnregisteredMapping(Mapping):
+            mapping = {}
+            entity_type = 'UNREGISTERED'
+
+        mapping = UnregisteredMapping()
+
+        # Compiled on first use
+        self.assertEqual(mock_plan.return_value, StufObjectMapping.get_plan(mapping))
+        mock_plan.assert_called_with(mapping, keys=None)
+
+        # And reused for any instance of the same class
+        self.assertEqual(mock_plan.return_value, StufObjectMapping.get_plan(UnregisteredMapping()))
+        mock_plan.assert_called_once()
+
+        # A projection on keys is compiled separately, and also reused
+        StufObjectMapping.get_plan(mapping, ('a', 'b'))
+        mock_plan.assert_called_with(mapping, keys=('a', 'b'))
+        StufObjectMapping.get_plan(UnregisteredMapping(), ('a', 'b'))
+        self.assertEqual(2, mock_plan.call_count)
+
+    def test_get_tags(self):
+        plan1 = MagicMock(tags={'a', 'b'}, subtree_tags={'b'})
+        plan2 = MagicMock(tags={'b', 'c'}, subtree_tags=set())
+        plans = {MappingImpl: plan1, MappingImpl2: plan2}
+        mappings = {'TST': MappingImpl, 'TST2': MappingImpl2}
+
+        with patch.dict(StufObjectMapping.plans, plans, clear=True), \
+                patch.dict(StufObjectMapping.mappings, mappings, clear=True):
+            self.assertEqual(({'a', 'b', 'c'}, {'b'}), StufObjectMapping.get_tags())
+
+            # Unknown for any of the mappings is unknown
+            plan2.tags = None
+            self.assertEqual((None, set()), StufObjectMapping.get_tags())
+
 
 class TestNPSMapping(TestCase):
 
@@ -443,6 +491,12 @@ class TestNPSMapping(TestCase):
         result = mapping.filter(obj, **kwargs)
         self.assertEqual(result, {'any key': 'any value', 'overlijden': {'indicatieOverleden': True}})
 
+        # Projected object, without verblijfplaats and overlijden
+        obj = {'naam': 'any naam'}
+        kwargs = {'inclusiefoverledenpersonen': True}
+        result = mapping.filter(obj, **kwargs)
+        self.assertEqual(result, {'naam': 'any naam'})
+
         obj = self.empty_mapping(mapping.mapping)
         obj['verblijfplaats']['woonadres'] = {'any key': 'any value'}
         result = mapping.filter(obj)
@@ -468,14 +522,8 @@ class TestNPSMapping(TestCase):
                 ]
             },
             '_links': {
-                'thetype': [
-                    {'burgerservicenummer': 'digitdigitdigit1'},
-                    {'burgerservicenummer': 'digitdigitdigit2'},
-                ],
-                'theothertype': [
-                    {'burgerservicenummer': 'digitdigitdigit3'},
-                    {'burgerservicenummer': 'digitdigitdigit4'},
-                ]
+                'thetype': 2,
+                'theothertype': 2
             }
         }
         links = {}
@@ -511,14 +559,8 @@ class TestNPSMapping(TestCase):
                 ]
             },
             '_links': {
-                'thetype': [
-                    {'burgerservicenummer': 'digitdigitdigit1'},
-                    {'burgerservicenummer': 'digitdigitdigit2'},
-                ],
-                'theothertype': [
-                    {'burgerservicenummer': 'digitdigitdigit3'},
-                    {'burgerservicenummer': 'digitdigitdigit4'},
-                ]
+                'thetype': 2,
+                'theothertype': 2
             },
             'burgerservicenummer': 'digitdigitdigit'
         }, mapped_object)
@@ -557,10 +599,7 @@ class TestNPSMapping(TestCase):
                 ]
             },
             '_links': {
-                'partners': [
-                    {'burgerservicenummer': 'digitdigitdigit1'},
-                    {'burgerservicenummer': 'digitdigitdigit2'},
-                ]
+                'partners': 2
             },
         }
 
@@ -587,6 +626,26 @@ class TestNPSMapping(TestCase):
 
 class TestRelatedMapping(TestCase):
 
+    def test_get_related_keys(self):
+        class RelatedMappingImpl(RelatedMapping):
+            entity_type = 'RELMAP'
+            mapping = {'D': 'not important'}
+            include_related = ['A', 'B']
+            override_related_filters = {'inclusiefoverledenpersonen': True}
+
+        mapping = RelatedMappingImpl()
+        related_mapping = MagicMock()
+        related_mapping.get_filter_keys.return_value = ['C']
+
+        self.assertEqual(('A', 'B', 'C'), mapping.get_related_keys(related_mapping))
+        related_mapping.get_filter_keys.assert_called_with(inclusiefoverledenpersonen=True)
+
+        # Overleden personen are included, overlijden is not required to filter the related person
+        self.assertEqual(('A', 'B'), mapping.get_related_keys(NPSMapping()))
+
+        # Projection
+        self.assertEqual(('B', 'C'), mapping.get_related_keys(related_mapping, ('B', 'D')))
+
     def test_filter(self):
         class RelatedMappingImpl(RelatedMapping):
             entity_type = 'RELMAP'
@@ -628,6 +687,10 @@ class TestNPSNPSHUWMapping(TestCase):
         mapped_object = {}
         self.assertEqual({}, mapping.get_links(mapped_object))
 
+    def test_get_filter_keys(self):
+        mapping = NPSNPSHUWMapping()
+        self.assertEqual(['datumOntbinding'], mapping.get_filter_keys())
+
     def test_filter(self):
         mapping = NPSNPSHUWMapping()
 
@@ -677,6 +740,16 @@ class TestNPSFamilieRelatedMapping(TestCase):
         mapped_object = {}
         self.assertEqual({}, mapping.get_links(mapped_object))
 
+    def test_get_filter_keys(self):
+        mapping = self.NPSFamilieRelatedMappingImpl()
+        self.assertEqual([
+            'aanduidingStrijdigheidNietigheid',
+            'datumIngangFamilierechtelijkeBetrekkingRaw',
+            'datumEindeFamilierechtelijkeBetrekking',
+            'naam',
+            'geboorte',
+        ], mapping.get_filter_keys(inclusiefoverledenpersonen=True))
+
     def test_filter(self):
         mapping = self.NPSFamilieRelatedMappingImpl()
 
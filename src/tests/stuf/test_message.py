@@ -1,7 +1,7 @@
 from unittest import TestCase
 from unittest.mock import patch, MagicMock, call
 
-from gobstuf.stuf.message import StufMessage
+from gobstuf.stuf.message import StufMessage, StufMessageParser, register_namespaces
 
 
 class StufMessageInitLoadTest(TestCase):
@@ -30,6 +30,7 @@ class StufMessageInitLoadTest(TestCase):
 @patch("gobstuf.stuf.message.StufMessage.load", MagicMock())
 class StufMessageTest(TestCase):
 
+    @patch("gobstuf.stuf.message._registered_namespaces", {})
     @patch("gobstuf.stuf.message.StringIO")
     @patch("gobstuf.stuf.message.ET")
     def test_set_namespaces(self, mock_et, mock_stringio):
@@ -55,6 +56,20 @@ class StufMessageTest(TestCase):
             'prefix3': 'url3',
         }, message.namespaces)
 
+    @patch("gobstuf.stuf.message._registered_namespaces", {})
+    @patch("gobstuf.stuf.message.ET")
+    def test_register_namespaces(self, mock_et):
+        register_namespaces({'prefix1': 'url1', 'prefix2': 'url2'})
+        self.assertEqual(2, mock_et.register_namespace.call_count)
+
+        # Namespaces are registered once, unless their prefix changes
+        register_namespaces({'prefix1': 'url1', 'prefix2': 'url2'})
+        self.assertEqual(2, mock_et.register_namespace.call_count)
+
+        register_namespaces({'prefix1': 'url1', 'other': 'url2'})
+        mock_et.register_namespace.assert_called_with('other', 'url2')
+        self.assertEqual(3, mock_et.register_namespace.call_count)
+
     def test_find_elm(self):
         message = StufMessage('')
         message.tree = MagicMock()
@@ -274,3 +289,100 @@ class TestXML(TestCase):
             '2',
             '3',
         ], [elm.text for elm in stuf_message.find_all_elms('elm8 elm8sub')])
+
+
+class StufMessageTreeTest(TestCase):
+    msg = """<root xmlns:StUF="http://www.egem.nl/StUF/StUF0301">
+    <elm1>value</elm1>
+    <elm2>
+        <elm3 />
+        <StUF:elm4>value4</StUF:elm4>
+    </elm2>
+</root>"""
+
+    def test_from_tree(self):
+        message = StufMessage(self.msg)
+        other_message = StufMessage.from_tree(message.tree, message.namespaces)
+        self.assertEqual(message.tree, other_message.tree)
+        self.assertEqual(message.namespaces, other_message.namespaces)
+
+    def test_copy(self):
+        message = StufMessage(self.msg)
+        copy = message.copy()
+        self.assertIsNot(message.tree, copy.tree)
+        self.assertEqual(message.namespaces, copy.namespaces)
+        self.assertEqual(message.to_string(), copy.to_string())
+
+        copy.set_elm_value('elm1', 'new value')
+        self.assertEqual('value', message.get_elm_value('elm1'))
+        self.assertEqual('new value', copy.get_elm_value('elm1'))
+
+    def test_elm_index_path(self):
+        message = StufMessage(self.msg)
+        index_path = message.get_elm_index_path('elm2 StUF:elm4')
+        self.assertEqual([1, 1], index_path)
+
+        copy = message.copy()
+        self.assertEqual('value4', copy.get_elm_by_index_path(index_path).text)
+        self.assertEqual(message.tree, message.get_elm_by_index_path([]))
+
+        with self.assertRaises(AssertionError):
+            message.get_elm_index_path('elm2 elm5')
+
+
+class StufMessageParserTest(TestCase):
+    msg = """<root xmlns:StUF="http://www.egem.nl/StUF/StUF0301">
+    <answer>
+        <object><a>1</a><b>2</b><StUF:extra><c>3</c><d>4</d></StUF:extra></object>
+        <other><a>other</a></other>
+        <object><a>5</a><b>6</b></object>
+    </answer>
+    <a>7</a>
+</root>"""
+
+    tags = {'answer', 'object', 'a', '{http://www.egem.nl/StUF/StUF0301}extra'}
+    subtree_tags = {'{http://www.egem.nl/StUF/StUF0301}extra'}
+
+    def _parse(self, parser, chunk_size):
+        for i in range(0, len(self.msg), chunk_size):
+            parser.feed(self.msg[i:i + chunk_size])
+        return parser.close()
+
+    def test_parse(self):
+        for chunk_size in [1, 7, len(self.msg)]:
+            parser = StufMessageParser(tags=self.tags, subtree_tags=self.subtree_tags)
+            root = self._parse(parser, chunk_size)
+            self.assertEqual(parser.root, root)
+            self.assertEqual('root', root.tag)
+
+            # Only the elements with a tag in tags and their subtrees are kept, other elements are removed
+            objects = root.findall('answer/object')
+            self.assertEqual(2, len(objects))
+            self.assertEqual(['1', '3', '4'], [elm.text for elm in objects[0].iter() if elm.tag in 'abcd'])
+            self.assertEqual(['5'], [elm.text for elm in objects[1].iter() if elm.tag in 'abcd'])
+            self.assertIsNone(root.find('answer/other'))
+            self.assertEqual('7', root.find('a').text)
+            self.assertEqual([], parser.read_elements())
+
+    def test_parse_all(self):
+        parser = StufMessageParser()
+        root = self._parse(parser, 7)
+        self.assertEqual('other', root.find('answer/other/a').text)
+        self.assertEqual('2', root.find('answer/object/b').text)
+
+    def test_read_elements(self):
+        parser = StufMessageParser(['root', 'answer', 'object'], self.tags, self.subtree_tags)
+        parser.feed(self.msg[:150].encode())
+        objects = parser.read_elements()
+        self.assertEqual(1, len(objects))
+        self.assertEqual('1', objects[0].find('a').text)
+        self.assertIsNone(objects[0].find('b'))
+        self.assertEqual([], parser.read_elements())
+
+        parser.feed(self.msg[150:].encode())
+        root = parser.close()
+        self.assertEqual(['5'], [elm.find('a').text for elm in parser.read_elements()])
+
+        # Collected elements are removed from the message
+        self.assertEqual([], root.findall('answer/object'))
+        self.assertEqual('7', root.find('a').text)
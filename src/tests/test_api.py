@@ -1,16 +1,27 @@
 import unittest
 from unittest import mock
 
-from gobstuf.api import _health, _routed_url, _update_response, _update_request
+from gobstuf.api import _health, _metrics, _routed_url, _update_response, _update_request, _stream_response
 from gobstuf.api import _get_stuf, _post_stuf, _stuf, _handle_stuf_request
 from gobstuf.api import get_flask_app
-from werkzeug.exceptions import BadRequest, MethodNotAllowed
+from werkzeug.exceptions import BadRequest, MethodNotAllowed, ServiceUnavailable
+
+from gobstuf.lib.circuitbreaker import CircuitOpenException
 
 class MockResponse:
 
-    def __init__(self, text, status_code=200):
+    def __init__(self, text, status_code=200, headers=None):
         self.text = text
         self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        data = self.text.encode()
+        return (data[i:i + chunk_size] for i in range(0, len(data), chunk_size))
+
+    def close(self):
+        self.closed = True
 
 
 @mock.patch('gobstuf.api.AuditLogMiddleware', mock.MagicMock())
@@ -24,6 +35,12 @@ class TestAPI(unittest.TestCase):
         result = _health()
         self.assertEqual(result, "Connectivity OK")
 
+    @mock.patch("gobstuf.api.get_metrics", return_value=(b"any metrics", "text/plain; version=0.0.4"))
+    def test_metrics(self, mock_get_metrics):
+        response = _metrics()
+        self.assertEqual(b"any metrics", response.data)
+        self.assertEqual("text/plain; version=0.0.4", response.content_type)
+
     def test_routed_url(self):
         result = _routed_url("proto://domain/path?args")
         self.assertEqual("ROUTE_SCHEME://ROUTE_NETLOC/path?args", result)
@@ -51,6 +68,14 @@ class TestAPI(unittest.TestCase):
             result = _update_response(f"...ROUTE_NETLOC:{n}...")
             self.assertNotEqual(result, expect)
 
+    @mock.patch("gobstuf.api.STUF_PROXY_CHUNK_SIZE", 4)
+    def test_stream_response(self):
+        response = MockResponse("...ROUTE_NETLOC:1234...ROUTE_NETLOC...ROUTE_NETLOC")
+        result = _stream_response(response)
+        self.assertEqual(b"...localhost:GOB_STUF_PORT...localhost:GOB_STUF_PORT...localhost:GOB_STUF_PORT",
+                         b''.join(result))
+        self.assertTrue(response.closed)
+
     def test_update_request(self):
         result = _update_request("...localhost:GOB_STUF_PORT...")
         self.assertEqual(result, "...ROUTE_NETLOC...")
@@ -66,7 +91,7 @@ class TestAPI(unittest.TestCase):
 
         response = _get_stuf("any url")
         self.assertEqual(response, "get")
-        mock_get.assert_called_with("any url")
+        mock_get.assert_called_with("any url", stream=True)
 
     @mock.patch("gobstuf.api.cert_post")
     def test_post_stuf(self, mock_post):
@@ -86,7 +111,7 @@ class TestAPI(unittest.TestCase):
 
         response = _post_stuf(url, data, headers)
         self.assertEqual(response, "post")
-        mock_post.assert_called_with(url, data=data, headers=expect_headers)
+        mock_post.assert_called_with(url, data=data, headers=expect_headers, stream=True)
 
         for h in [{},
                   {"Soapaction": "Any action"},
@@ -114,6 +139,13 @@ class TestAPI(unittest.TestCase):
         with self.assertRaisesRegex(MethodNotAllowed, '405 Method Not Allowed'):
             _handle_stuf_request(request, routed_url)
 
+        # Fail fast when the circuit for the underlying SOAP API is open
+        request = type('MockGet', (object,), {'method': 'GET'})
+        mock_get_stuf.side_effect = CircuitOpenException('upstream', 2.5)
+        with self.assertRaises(ServiceUnavailable) as context:
+            _handle_stuf_request(request, routed_url)
+        self.assertEqual('3', context.exception.get_response().headers['Retry-After'])
+
 
     @mock.patch("gobstuf.api._handle_stuf_request", return_value=MockResponse('get', 123))
     @mock.patch("gobstuf.api.flask")
@@ -128,6 +160,18 @@ class TestAPI(unittest.TestCase):
 
         response = _stuf()
         self.assertEqual(response.data, b"get")
+        self.assertEqual('text/xml', response.content_type)
+
+        # Upstream content type is passed through with the streamed data
+        mock_handle_stuf.return_value = MockResponse('get', headers={'Content-Type': 'text/xml; charset=iso-8859-1'})
+        response = _stuf()
+        self.assertEqual(response.data, b"get")
+        self.assertEqual('text/xml; charset=iso-8859-1', response.content_type)
+
+        with mock.patch("gobstuf.api.STUF_PROXY_STREAMING", False):
+            response = _stuf()
+            self.assertEqual(response.data, b"get")
+            self.assertEqual('text/xml; charset=utf-8', response.content_type)
 
     @mock.patch("gobstuf.api._handle_stuf_request", return_value=MockResponse('get', 123))
     @mock.patch("gobstuf.api.flask")
@@ -1,9 +1,11 @@
+import os
+
 import freezegun
 
 from unittest import TestCase
 from unittest.mock import patch, MagicMock
 
-from gobstuf.app import handle_brp_regression_test_msg, SERVICEDEFINITION, run_message_thread, run, get_app
+from gobstuf.app import handle_brp_regression_test_msg, SERVICEDEFINITION, run_message_service, run, get_app
 
 
 class TestApp(TestCase):
@@ -32,32 +34,37 @@ class TestApp(TestCase):
             'summary': mock_logger.get_summary()
         }, res)
 
-    @patch("gobstuf.app.os")
     @patch("gobstuf.app.messagedriven_service")
-    def test_run_message_thread(self, mock_messagedriven_service, mock_os):
-        run_message_thread()
+    def test_run_message_service(self, mock_messagedriven_service):
+        # Exit when the message driven service has ended
+        with self.assertRaises(SystemExit) as context:
+            run_message_service()
         mock_messagedriven_service.assert_called_with(SERVICEDEFINITION, "StUF")
-        # Call _exit when the message driven service has ended
-        mock_os._exit.assert_called_once()
+        self.assertEqual(os.EX_UNAVAILABLE, context.exception.code)
 
-        mock_os._exit.reset_mock()
+        # Also exit when the message driven service has failed
         mock_messagedriven_service.side_effect = Exception()
-        run_message_thread()
-        # Also call _exit when the message driven service has failed
-        mock_os._exit.assert_called_once()
+        with self.assertRaises(SystemExit) as context:
+            run_message_service()
+        self.assertEqual(os.EX_UNAVAILABLE, context.exception.code)
 
-    @patch("gobstuf.app.Thread")
+    @patch("gobstuf.app.Process")
     @patch("gobstuf.app.get_flask_app")
-    def test_get_app(self, mock_flask_app, mock_thread):
+    def test_get_app(self, mock_flask_app, mock_process):
         self.assertEqual(mock_flask_app(), get_app())
 
-        mock_thread.assert_called_with(target=run_message_thread)
-        mock_thread().start.assert_called_once()
+        # The message service is not started by the web app
+        mock_process.assert_not_called()
 
     @patch("gobstuf.app.GOB_STUF_PORT", 1234)
+    @patch("gobstuf.app.Process")
     @patch("gobstuf.app.get_app")
-    def test_run(self, mock_get_app):
+    def test_run(self, mock_get_app, mock_process):
         mock_app = MagicMock()
         mock_get_app.return_value = mock_app
         run()
         mock_app.run.assert_called_with(port=1234)
+
+        # Locally the message service runs in a separate process
+        mock_process.assert_called_with(target=run_message_service, daemon=True)
+        mock_process.return_value.start.assert_called_once()
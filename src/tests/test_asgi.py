@@ -0,0 +1,13 @@
+import unittest
+from unittest import mock
+
+
+class TestAsgi(unittest.TestCase):
+
+    @mock.patch('gobstuf.rest.asgi.AsyncRESTApplication')
+    @mock.patch('gobstuf.app.get_app')
+    def test_asgi(self, mock_get_app, mock_application):
+        import gobstuf.asgi
+        from gobstuf.rest.routes import REST_ROUTES
+        mock_application.assert_called_with(mock_get_app.return_value, REST_ROUTES)
+        self.assertEqual(mock_application.return_value, gobstuf.asgi.app)
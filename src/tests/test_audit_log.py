@@ -1,9 +1,11 @@
+import threading
 import unittest
 from unittest.mock import patch, MagicMock, ANY
 
 import json
 
-from gobstuf.audit_log import GOBAuditLogHandler, get_log_handler, get_user_from_request, get_nested_item, on_audit_log_exception
+from gobstuf.audit_log import GOBAuditLogHandler, AuditLogWriter, get_log_handler, get_user_from_request, \
+    get_nested_item, on_audit_log_exception, write_audit_logs, write_audit_log, audit_log_writer
 
 class TestAuditLog(unittest.TestCase):
 
@@ -11,93 +13,103 @@ class TestAuditLog(unittest.TestCase):
         log_handler = GOBAuditLogHandler()
         self.assertIsNotNone(log_handler)
 
-    @patch('gobstuf.audit_log.uuid.uuid4', lambda: 'any uuid')
-    @patch('gobstuf.audit_log.AuditLogger')
-    @patch('gobstuf.audit_log.on_audit_log_exception')
-    def test_emit(self, mock_on_audit_log_exception, mock_audit_logger):
+    @patch('gobstuf.audit_log.audit_log_writer')
+    def test_emit(self, mock_writer):
         mock_request = MagicMock()
 
         with patch('gobstuf.audit_log.request', mock_request):
-
-            mock_request.headers = {}
-            log_handler = GOBAuditLogHandler()
-
-            log_handler.format = MagicMock()
-            record = None
-            log_handler.emit(record)
-            mock_on_audit_log_exception.assert_called_with(ANY, record)
-
-            log_handler.format.side_effect = lambda record: json.dumps(record)
-            record = {
-                "audit": {
-                    "http_request": {
-                        "url": "any url",
-                        "any request data": "any request value",
-                    },
-                    "http_response": {
-                        "any response data": "any response value",
-                    },
-                    "user": {
-                        "ip": "any ip",
-                        "any user data": "any user value",
-                    },
-                    "any audit data": "any audit value"
-                }
-            }
-            log_handler.emit(record)
-            mock_audit_logger.get_instance.assert_called_with()
-            audit_logger = mock_audit_logger.get_instance.return_value
-            audit_logger.log_request.assert_called_with(
-                source="any url",
-                destination="any ip",
-                extra_data={
-                    **{key: record["audit"][key] for key in ["http_request", "user", "any audit data"]},
-                    'X-Correlation-ID': None,
-                    'X-Unique-ID': None,
-                },
-                request_uuid="any uuid"
-            )
-            audit_logger.log_response.assert_called_with(
-                source="any url",
-                destination="any ip",
-                extra_data={
-                    key: record["audit"][key] for key in ["http_response", "user", "any audit data"]
-                },
-                request_uuid="any uuid"
-            )
-
-            # Test with correlation ID and unique ID set
             mock_request.headers = {
                 'X-Correlation-ID': 'some correlation id',
                 'X-Unique-ID': 'some unique id'
             }
-            log_handler.emit(record)
-            mock_audit_logger.get_instance.assert_called_with()
-            audit_logger = mock_audit_logger.get_instance.return_value
-            audit_logger.log_request.assert_called_with(
-                source="any url",
-                destination="any ip",
-                extra_data={
-                    **{key: record["audit"][key] for key in ["http_request", "user", "any audit data"]},
-                    'X-Correlation-ID': 'some correlation id',
-                    'X-Unique-ID': 'some unique id',
-                },
-                request_uuid="some correlation id"
-            )
-            audit_logger.log_response.assert_called_with(
-                source="any url",
-                destination="any ip",
-                extra_data={
-                    key: record["audit"][key] for key in ["http_response", "user", "any audit data"]
-                },
-                request_uuid="some correlation id"
-            )
+            log_handler = GOBAuditLogHandler()
+            log_handler.format = MagicMock()
+
+            # The entry is written in the background
+            log_handler.emit('any record')
+            log_handler.format.assert_called_with('any record')
+            mock_writer.put.assert_called_with((log_handler.format.return_value,
+                                                'some correlation id',
+                                                'some unique id'))
 
+    @patch('gobstuf.audit_log.write_audit_log')
+    @patch('gobstuf.audit_log.AuditLogger')
+    def test_write_audit_logs(self, mock_audit_logger, mock_write_audit_log):
+        write_audit_logs([('record 1', 'id 1', 'unique 1'), ('record 2', 'id 2', 'unique 2')])
+        audit_logger = mock_audit_logger.get_instance.return_value
+        mock_write_audit_log.assert_any_call(audit_logger, 'record 1', 'id 1', 'unique 1')
+        mock_write_audit_log.assert_called_with(audit_logger, 'record 2', 'id 2', 'unique 2')
 
-            mock_on_audit_log_exception.reset_mock()
-            audit_logger.log_request.side_effect = Exception("any exception")
-            log_handler.emit(record)
-            mock_on_audit_log_exception.assert_called_with(audit_logger.log_request.side_effect, record)
+    @patch('gobstuf.audit_log.uuid.uuid4', lambda: 'any uuid')
+    @patch('gobstuf.audit_log.on_audit_log_exception')
+    def test_write_audit_log(self, mock_on_audit_log_exception):
+        audit_logger = MagicMock()
+
+        formatted_record = MagicMock()
+        write_audit_log(audit_logger, formatted_record, None, None)
+        mock_on_audit_log_exception.assert_called_with(ANY, formatted_record)
+
+        record = {
+            "audit": {
+                "http_request": {
+                    "url": "any url",
+                    "any request data": "any request value",
+                },
+                "http_response": {
+                    "any response data": "any response value",
+                },
+                "user": {
+                    "ip": "any ip",
+                    "any user data": "any user value",
+                },
+                "any audit data": "any audit value"
+            }
+        }
+        write_audit_log(audit_logger, json.dumps(record), None, None)
+        audit_logger.log_request.assert_called_with(
+            source="any url",
+            destination="any ip",
+            extra_data={
+                **{key: record["audit"][key] for key in ["http_request", "user", "any audit data"]},
+                'X-Correlation-ID': None,
+                'X-Unique-ID': None,
+            },
+            request_uuid="any uuid"
+        )
+        audit_logger.log_response.assert_called_with(
+            source="any url",
+            destination="any ip",
+            extra_data={
+                key: record["audit"][key] for key in ["http_response", "user", "any audit data"]
+            },
+            request_uuid="any uuid"
+        )
+
+        # Test with correlation ID and unique ID set
+        write_audit_log(audit_logger, json.dumps(record), 'some correlation id', 'some unique id')
+        audit_logger.log_request.assert_called_with(
+            source="any url",
+            destination="any ip",
+            extra_data={
+                **{key: record["audit"][key] for key in ["http_request", "user", "any audit data"]},
+                'X-Correlation-ID': 'some correlation id',
+                'X-Unique-ID': 'some unique id',
+            },
+            request_uuid="some correlation id"
+        )
+        audit_logger.log_response.assert_called_with(
+            source="any url",
+            destination="any ip",
+            extra_data={
+                key: record["audit"][key] for key in ["http_response", "user", "any audit data"]
+            },
+            request_uuid="some correlation id"
+        )
+
+        mock_on_audit_log_exception.reset_mock()
+        audit_logger.log_request.side_effect = Exception("any exception")
+        write_audit_log(audit_logger, json.dumps(record), None, None)
+        mock_on_audit_log_exception.assert_called_with(audit_logger.log_request.side_effect, record)
 
     @patch('gobstuf.audit_log.get_client_ip')
     def test_get_user_from_request(self, mock_get_client_ip):
@@ -130,3 +142,81 @@ class TestAuditLog(unittest.TestCase):
         msg_to_be_logged = 'any message'
         on_audit_log_exception(Exception(), msg_to_be_logged)
         mock_logger.error.assert_called_with(ANY, msg_to_be_logged)
+
+
+class TestAuditLogWriter(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.batches = []
+        self.writer = AuditLogWriter(self.batches.append, queue_size=10, batch_size=3, flush_interval=60)
+
+    def tearDown(self) -> None:
+        self.writer.stop()
+
+    def test_audit_log_writer(self):
+        self.assertEqual(write_audit_logs, audit_log_writer.write)
+
+    def test_batch_size(self):
+        for entry in range(7):
+            self.writer.put(entry)
+
+        # All pending entries are written on stop
+        self.writer.stop()
+        self.assertEqual([[0, 1, 2], [3, 4, 5], [6]], self.batches)
+
+        # A new writer is started on the next put
+        self.writer.put(7)
+        self.writer.stop()
+        self.assertEqual([7], self.batches[-1])
+
+    def test_flush_interval(self):
+        written = threading.Event()
+        self.writer.write = lambda batch: (self.batches.append(batch), written.set())
+        self.writer.flush_interval = 0.01
+
+        self.writer.put(0)
+        self.assertTrue(written.wait(5))
+        self.assertEqual([[0]], self.batches)
+
+    def test_backpressure(self):
+        writing = threading.Event()
+        proceed = threading.Event()
+
+        def blocking_write(batch):
+            writing.set()
+            proceed.wait(5)
+            self.batches.append(batch)
+
+        self.writer = AuditLogWriter(blocking_write, queue_size=1, batch_size=1, flush_interval=60)
+
+        self.writer.put(0)
+        self.assertTrue(writing.wait(5))
+        self.writer.put(1)
+
+        # The queue is full, the next put waits for the writer
+        putter = threading.Thread(target=self.writer.put, args=(2,))
+        putter.start()
+        putter.join(0.05)
+        self.assertTrue(putter.is_alive())
+
+        proceed.set()
+        putter.join(5)
+        self.writer.stop()
+        self.assertEqual([[0], [1], [2]], self.batches)
+
+    @patch('gobstuf.audit_log.on_audit_log_exception')
+    def test_write_exception(self, mock_on_audit_log_exception):
+        exception = Exception("any exception")
+        self.writer.write = MagicMock(side_effect=exception)
+
+        self.writer.put('entry 1')
+        self.writer.put('entry 2')
+        self.writer.stop()
+        mock_on_audit_log_exception.assert_any_call(exception, 'entry 1')
+        mock_on_audit_log_exception.assert_called_with(exception, 'entry 2')
+
+    def test_reset(self):
+        self.writer.put(0)
+        self.writer.reset()
+        self.assertIsNone(self.writer._thread)
+        self.assertTrue(self.writer._queue.empty())
@@ -1,7 +1,21 @@
+import asyncio
+import datetime
+import ssl
+import tempfile
 import unittest
 from unittest import mock
 
-from gobstuf.certrequest import cert_get, cert_post
+from aiohttp import web
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.serialization import pkcs12, BestAvailableEncryption
+
+from gobstuf import certrequest
+from gobstuf.certrequest import cert_get, cert_post, get_session, _create_adapter, _get_adapter, _reset, \
+    _create_ssl_context, get_async_session, close_async_session, cert_post_async, get_circuit_breaker, \
+    _is_upstream_failure
+from gobstuf.lib.circuitbreaker import CircuitOpenException
 
 class MockResponse:
 
@@ -12,26 +26,280 @@ class MockResponse:
 class TestConfig(unittest.TestCase):
 
     def setUp(self) -> None:
-        pass
+        _reset()
+
+    def tearDown(self) -> None:
+        _reset()
 
-    @mock.patch("gobstuf.certrequest.get")
-    def test_get(self, mock_get):
+    @mock.patch("gobstuf.certrequest.get_session")
+    def test_get(self, mock_get_session):
+        mock_get = mock_get_session.return_value.get
         mock_get.return_value = MockResponse()
 
         response = cert_get("any url")
-        mock_get.assert_called_with("any url", pkcs12_filename="PKCS12_FILENAME", pkcs12_password="PKCS12_PASSWORD")
+        mock_get.assert_called_with("any url", timeout=(5.0, 30.0))
 
         self.assertIsInstance(response, MockResponse)
 
-    @mock.patch("gobstuf.certrequest.post")
-    def test_post(self, mock_post):
+    @mock.patch("gobstuf.certrequest.get_session")
+    def test_post(self, mock_get_session):
+        mock_post = mock_get_session.return_value.post
         mock_post.return_value = MockResponse()
 
         cert_post("any url", data="any data", headers={"a": 0})
-        mock_post.assert_called_with("any url", data="any data", headers={"a": 0}, pkcs12_filename="PKCS12_FILENAME", pkcs12_password="PKCS12_PASSWORD")
+        mock_post.assert_called_with("any url", data="any data", headers={"a": 0}, timeout=(5.0, 30.0))
 
         # headers is a default argument
         response = cert_post("any url", data="any data", headers={})
-        mock_post.assert_called_with("any url", data="any data", headers={}, pkcs12_filename="PKCS12_FILENAME", pkcs12_password="PKCS12_PASSWORD")
+        mock_post.assert_called_with("any url", data="any data", headers={}, timeout=(5.0, 30.0))
+
+        # An explicit timeout is respected
+        cert_post("any url", data="any data", timeout=1)
+        mock_post.assert_called_with("any url", data="any data", timeout=1)
 
         self.assertIsInstance(response, MockResponse)
+
+    @mock.patch("gobstuf.certrequest.Pkcs12Adapter")
+    @mock.patch("gobstuf.certrequest.HTTPAdapter")
+    def test_create_adapter(self, mock_http_adapter, mock_pkcs12_adapter):
+        self.assertEqual(mock_pkcs12_adapter.return_value, _create_adapter())
+        mock_pkcs12_adapter.assert_called_with(pkcs12_filename="PKCS12_FILENAME",
+                                               pkcs12_password="PKCS12_PASSWORD",
+                                               pool_maxsize=10)
+
+        with mock.patch("gobstuf.certrequest.PKCS12_FILENAME", None):
+            self.assertEqual(mock_http_adapter.return_value, _create_adapter())
+            mock_http_adapter.assert_called_with(pool_maxsize=10)
+
+    @mock.patch("gobstuf.certrequest._create_adapter")
+    def test_get_adapter(self, mock_create_adapter):
+        # The adapter is created once
+        self.assertEqual(mock_create_adapter.return_value, _get_adapter())
+        self.assertEqual(mock_create_adapter.return_value, _get_adapter())
+        mock_create_adapter.assert_called_once()
+
+        # And again after a reset (fork)
+        _reset()
+        _get_adapter()
+        self.assertEqual(2, mock_create_adapter.call_count)
+
+    @mock.patch("gobstuf.certrequest._get_adapter")
+    @mock.patch("gobstuf.certrequest.Session")
+    def test_get_session(self, mock_session, mock_get_adapter):
+        session = get_session()
+        self.assertEqual(mock_session.return_value, session)
+        session.mount.assert_has_calls([
+            mock.call('https://', mock_get_adapter.return_value),
+            mock.call('http://', mock_get_adapter.return_value),
+        ])
+
+        # The session is reused within the same thread
+        self.assertEqual(session, get_session())
+        mock_session.assert_called_once()
+
+    @mock.patch("gobstuf.certrequest._get_adapter", mock.MagicMock())
+    def test_get_session_keep_alive(self):
+        self.assertNotEqual('close', get_session().headers.get('Connection'))
+
+        _reset()
+        with mock.patch("gobstuf.certrequest.MKS_KEEP_ALIVE", False):
+            self.assertEqual('close', get_session().headers['Connection'])
+
+    @mock.patch("gobstuf.certrequest.PKCS12_FILENAME", None)
+    def test_get_session_per_thread(self):
+        import threading
+
+        sessions = []
+        thread = threading.Thread(target=lambda: sessions.append(get_session()))
+        thread.start()
+        thread.join()
+
+        self.assertIsNot(sessions[0], get_session())
+        # But all sessions share the same adapter
+        self.assertIs(sessions[0].get_adapter('https://any'), get_session().get_adapter('https://any'))
+        self.assertIs(certrequest._adapter, get_session().get_adapter('https://any'))
+
+create_default_context = ssl.create_default_context
+
+
+def create_pkcs12(password: bytes) -> bytes:
+    """Returns a PKCS12 file with a self signed certificate"""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(x509.oid.NameOID.COMMON_NAME, 'gobstuf')])
+    now = datetime.datetime.utcnow()
+    cert = x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key()) \
+        .serial_number(1).not_valid_before(now).not_valid_after(now + datetime.timedelta(days=1)) \
+        .sign(key, hashes.SHA256())
+    return pkcs12.serialize_key_and_certificates(b'gobstuf', key, cert, None, BestAvailableEncryption(password))
+
+
+class TestAsync(unittest.TestCase):
+
+    def setUp(self) -> None:
+        _reset()
+
+    def tearDown(self) -> None:
+        _reset()
+
+    @mock.patch("gobstuf.certrequest.ssl.create_default_context")
+    def test_create_ssl_context(self, mock_create_context):
+        with mock.patch("gobstuf.certrequest.PKCS12_FILENAME", None), \
+                mock.patch.dict("gobstuf.certrequest.os.environ", {'REQUESTS_CA_BUNDLE': 'any bundle'}):
+            self.assertEqual(mock_create_context.return_value, _create_ssl_context())
+            mock_create_context.assert_called_with(cafile='any bundle')
+            mock_create_context.return_value.load_cert_chain.assert_not_called()
+
+        with tempfile.NamedTemporaryFile(suffix='.p12') as p12:
+            p12.write(create_pkcs12(b'secret'))
+            p12.flush()
+
+            with mock.patch("gobstuf.certrequest.PKCS12_FILENAME", p12.name), \
+                    mock.patch("gobstuf.certrequest.PKCS12_PASSWORD", 'secret'):
+                _create_ssl_context()
+                mock_create_context.return_value.load_cert_chain.assert_called_once()
+
+                # The certificate is loaded in the SSL context
+                mock_create_context.side_effect = create_default_context
+                self.assertIsInstance(_create_ssl_context(), ssl.SSLContext)
+
+    @mock.patch("gobstuf.certrequest._create_ssl_context", mock.MagicMock(return_value=False))
+    def test_get_async_session(self):
+        async def run():
+            # The session is created once
+            session = get_async_session()
+            self.assertIs(session, get_async_session())
+            self.assertFalse(session.connector.force_close)
+            self.assertEqual(100, session.connector.limit)
+            self.assertEqual(5.0, session.timeout.sock_connect)
+            self.assertEqual(30.0, session.timeout.sock_read)
+
+            await close_async_session()
+            self.assertTrue(session.closed)
+            # Closing twice is allowed
+            await close_async_session()
+
+            with mock.patch("gobstuf.certrequest.MKS_KEEP_ALIVE", False):
+                session = get_async_session()
+                self.assertTrue(session.connector.force_close)
+            await close_async_session()
+
+        asyncio.run(run())
+
+    @mock.patch("gobstuf.certrequest._create_ssl_context", mock.MagicMock(return_value=False))
+    def test_cert_post_async(self):
+        async def handler(request):
+            return web.Response(body=b'response to ' + await request.read(), status=500,
+                                headers={'Soapaction': request.headers['Soapaction']})
+
+        async def run():
+            app = web.Application()
+            app.router.add_post('/path', handler)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, '127.0.0.1', 0)
+            await site.start()
+            port = site._server.sockets[0].getsockname()[1]
+
+            try:
+                return await cert_post_async(f'http://127.0.0.1:{port}/path', data=b'any data',
+                                             headers={'Soapaction': 'any action'})
+            finally:
+                await close_async_session()
+                await runner.cleanup()
+
+        response = asyncio.run(run())
+        self.assertEqual(500, response.status_code)
+        self.assertEqual('Internal Server Error', response.reason)
+        self.assertEqual(b'response to any data', response.content)
+        self.assertEqual('any action', response.headers['soapaction'])
+        self.assertTrue(response.url.endswith('/path'))
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self) -> None:
+        _reset()
+
+    def tearDown(self) -> None:
+        _reset()
+
+    @mock.patch("gobstuf.certrequest.observe_circuit_state")
+    def test_get_circuit_breaker(self, mock_observe):
+        # One circuit breaker per upstream
+        breaker = get_circuit_breaker('https://mks:8443/path')
+        self.assertEqual('mks:8443', breaker.name)
+        self.assertIs(breaker, get_circuit_breaker('https://mks:8443/other/path'))
+        self.assertIsNot(breaker, get_circuit_breaker('https://other'))
+        mock_observe.assert_called_with('other', 'closed', transition=False)
+
+        self.assertEqual(10, breaker.min_calls)
+        self.assertEqual(0.5, breaker.failure_rate)
+        self.assertEqual(10.0, breaker.slow_call_duration)
+        self.assertEqual(30.0, breaker.open_duration)
+        self.assertIs(mock_observe, breaker.on_state_change)
+
+        # And again after a reset (fork)
+        _reset()
+        self.assertIsNot(breaker, get_circuit_breaker('https://mks:8443/path'))
+
+        with mock.patch("gobstuf.certrequest.MKS_CIRCUIT_BREAKER", False):
+            self.assertIsNone(get_circuit_breaker('https://mks:8443/path'))
+
+    def test_is_upstream_failure(self):
+        # MKS errors (500) are functional errors
+        for status, failure in [(200, False), (500, False), (502, True), (503, True), (504, True)]:
+            self.assertEqual(failure, _is_upstream_failure(MockResponse(status)))
+
+    @mock.patch("gobstuf.certrequest.MKS_CIRCUIT_REJECTED")
+    @mock.patch("gobstuf.certrequest.get_session")
+    def test_post_circuit_open(self, mock_get_session, mock_rejected):
+        mock_post = mock_get_session.return_value.post
+        mock_post.side_effect = ConnectionError
+
+        # The circuit opens after MKS_CIRCUIT_MIN_CALLS failed requests
+        for _ in range(10):
+            with self.assertRaises(ConnectionError):
+                cert_post("https://mks/path")
+
+        mock_post.reset_mock()
+        for send in [cert_post, cert_get]:
+            with self.assertRaises(CircuitOpenException):
+                send("https://mks/path")
+        mock_post.assert_not_called()
+        mock_rejected.labels.assert_called_with(upstream='mks')
+        self.assertEqual(2, mock_rejected.labels.return_value.inc.call_count)
+
+        # Requests to other upstreams are sent
+        mock_post.side_effect = None
+        mock_post.return_value = MockResponse()
+        cert_post("https://other/path")
+
+        # Without circuit breaker the request is always sent
+        with mock.patch("gobstuf.certrequest.MKS_CIRCUIT_BREAKER", False):
+            cert_post("https://mks/path")
+
+    @mock.patch("gobstuf.certrequest.MKS_CIRCUIT_REJECTED")
+    @mock.patch("gobstuf.certrequest._post_async")
+    def test_post_async_circuit_open(self, mock_post_async, mock_rejected):
+        async def post(url, **kwargs):
+            if 'mks' in url:
+                raise ConnectionError()
+            return MockResponse(200)
+
+        mock_post_async.side_effect = post
+
+        async def run():
+            for _ in range(10):
+                with self.assertRaises(ConnectionError):
+                    await cert_post_async("https://mks/path")
+
+            mock_post_async.reset_mock()
+            with self.assertRaises(CircuitOpenException):
+                await cert_post_async("https://mks/path")
+            mock_post_async.assert_not_called()
+            mock_rejected.labels.return_value.inc.assert_called_once()
+
+            with mock.patch("gobstuf.certrequest.MKS_CIRCUIT_BREAKER", False):
+                self.assertEqual(200, (await cert_post_async("https://other/path")).status_code)
+
+        asyncio.run(run())
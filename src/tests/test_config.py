@@ -1,7 +1,7 @@
 import unittest
 from unittest import mock
 
-from gobstuf.config import _getenv
+from gobstuf.config import _getenv, _getenv_number, _getenv_bool
 
 class TestConfig(unittest.TestCase):
 
@@ -40,3 +40,31 @@ class TestConfig(unittest.TestCase):
         # Not as variable value
         with self.assertRaises(AssertionError):
             _getenv("SOME KNOWN VARIABLE")
+
+    @mock.patch("os.getenv")
+    def test_getenv_number(self, mock_getenv):
+        mock_getenv.side_effect = lambda varname, value=None: "10"
+        self.assertEqual(10, _getenv_number("ANY VARIABLE", 5))
+        self.assertEqual(10.0, _getenv_number("ANY VARIABLE", 5.0, number_type=float))
+
+        # Default value for invalid numbers
+        mock_getenv.side_effect = lambda varname, value=None: "ten"
+        self.assertEqual(5, _getenv_number("ANY VARIABLE", 5))
+
+        # Default value if not set
+        mock_getenv.side_effect = lambda varname, value=None: value
+        self.assertEqual(5, _getenv_number("ANY VARIABLE", 5))
+
+    @mock.patch("os.getenv")
+    def test_getenv_bool(self, mock_getenv):
+        for value, expected in [("true", True), ("True", True), ("false", False), ("FALSE", False)]:
+            mock_getenv.side_effect = lambda varname, default=None: value
+            self.assertEqual(expected, _getenv_bool("ANY VARIABLE", None))
+
+        # Default value for invalid booleans
+        mock_getenv.side_effect = lambda varname, value=None: "yes"
+        self.assertTrue(_getenv_bool("ANY VARIABLE", True))
+
+        # Default value if not set
+        mock_getenv.side_effect = lambda varname, value=None: value
+        self.assertFalse(_getenv_bool("ANY VARIABLE", False))
@@ -0,0 +1,10 @@
+import unittest
+from unittest import mock
+
+
+class TestMessageService(unittest.TestCase):
+
+    @mock.patch('gobstuf.app.run_message_service')
+    def test_message_service(self, mock_run_message_service):
+        import gobstuf.message_service
+        mock_run_message_service.assert_called_once()
@@ -0,0 +1,151 @@
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+from gobstuf.metrics import RequestMetrics, current_request_metrics, stage, get_metrics, observe_circuit_state
+
+
+class MockClock:
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRequestMetrics(TestCase):
+
+    @patch("gobstuf.metrics.time.perf_counter", new_callable=MockClock)
+    def test_stage(self, mock_clock):
+        metrics = RequestMetrics()
+
+        with metrics.stage('outer'):
+            mock_clock.now = 1
+            with metrics.stage('inner'):
+                mock_clock.now = 3
+            mock_clock.now = 4
+            with metrics.stage('inner'):
+                mock_clock.now = 8
+            mock_clock.now = 16
+
+        # Time spent in the inner stage is not counted for the outer stage
+        self.assertEqual({'outer': 1 + 1 + 8, 'inner': 2 + 4}, metrics.durations)
+
+    def test_stage_exception(self):
+        metrics = RequestMetrics()
+
+        with self.assertRaises(ValueError):
+            with metrics.stage('any'):
+                raise ValueError()
+        self.assertIn('any', metrics.durations)
+        self.assertEqual([], metrics._stages)
+
+    def test_activate(self):
+        metrics = RequestMetrics()
+
+        # Outside a request the metrics are thrown away
+        self.assertIsNot(metrics, current_request_metrics())
+        with stage('any'):
+            pass
+        self.assertEqual({}, metrics.durations)
+
+        with metrics.activate():
+            self.assertIs(metrics, current_request_metrics())
+            with stage('any'):
+                pass
+        self.assertIn('any', metrics.durations)
+        self.assertIsNot(metrics, current_request_metrics())
+
+    def test_iterate(self):
+        metrics = RequestMetrics()
+
+        def items():
+            for item in range(2):
+                with stage('any'):
+                    yield current_request_metrics()
+
+        # The metrics are active while an item is produced
+        result = list(metrics.iterate(items()))
+        self.assertEqual([metrics, metrics], result)
+        self.assertIn('any', metrics.durations)
+        self.assertIsNot(metrics, current_request_metrics())
+
+        # The iterable is closed when the iteration stops early
+        closed = []
+
+        def endless():
+            try:
+                while True:
+                    yield 'item'
+            finally:
+                closed.append(True)
+
+        iteration = metrics.iterate(endless())
+        self.assertEqual('item', next(iteration))
+        iteration.close()
+        self.assertEqual([True], closed)
+
+    @patch("gobstuf.metrics.RESPONSE_OBJECTS")
+    @patch("gobstuf.metrics.MKS_RESPONSE_SIZE")
+    @patch("gobstuf.metrics.STAGE_DURATION")
+    def test_observe(self, mock_stage_duration, mock_response_size, mock_response_objects):
+        metrics = RequestMetrics()
+        metrics.durations = {'parse': 0.5}
+
+        metrics.observe('AnyView', 404)
+        mock_stage_duration.labels.assert_called_with(view='AnyView', stage='parse', status=404)
+        mock_stage_duration.labels.return_value.observe.assert_called_with(0.5)
+        mock_response_size.labels.assert_not_called()
+        mock_response_objects.labels.assert_not_called()
+
+        metrics.mks_response_size = 1000
+        metrics.objects = 0
+        metrics.observe('AnyView', 200)
+        mock_response_size.labels.assert_called_with(view='AnyView', status=200)
+        mock_response_size.labels.return_value.observe.assert_called_with(1000)
+        mock_response_objects.labels.assert_called_with(view='AnyView', status=200)
+        mock_response_objects.labels.return_value.observe.assert_called_with(0)
+
+
+class TestGetMetrics(TestCase):
+
+    @patch("gobstuf.metrics.generate_latest")
+    @patch("gobstuf.metrics.multiprocess")
+    @patch("gobstuf.metrics.CollectorRegistry")
+    def test_get_metrics(self, mock_registry, mock_multiprocess, mock_generate_latest):
+        with patch.dict("gobstuf.metrics.os.environ", {}, clear=True):
+            data, content_type = get_metrics()
+            self.assertEqual(mock_generate_latest.return_value, data)
+            self.assertTrue(content_type.startswith('text/plain'))
+            mock_multiprocess.MultiProcessCollector.assert_not_called()
+
+        # Aggregate the metrics of all workers
+        with patch.dict("gobstuf.metrics.os.environ", {'prometheus_multiproc_dir': '/any/dir'}):
+            get_metrics()
+            mock_multiprocess.MultiProcessCollector.assert_called_with(mock_registry.return_value)
+            mock_generate_latest.assert_called_with(mock_registry.return_value)
+
+    def test_get_metrics_exposition(self):
+        metrics = RequestMetrics()
+        metrics.durations = {'parse': 0.001}
+        metrics.observe('TestGetMetricsView', 200)
+
+        data, _ = get_metrics()
+        self.assertIn(b'gobstuf_stage_duration_seconds_count{stage="parse",status="200",view="TestGetMetricsView"} 1.0',
+                      data)
+
+
+class TestObserveCircuitState(TestCase):
+
+    @patch("gobstuf.metrics.MKS_CIRCUIT_TRANSITIONS")
+    @patch("gobstuf.metrics.MKS_CIRCUIT_STATE")
+    def test_observe_circuit_state(self, mock_state, mock_transitions):
+        observe_circuit_state('upstream', 'closed', transition=False)
+        mock_state.labels.assert_called_with(upstream='upstream')
+        mock_state.labels.return_value.set.assert_called_with(0)
+        mock_transitions.labels.assert_not_called()
+
+        observe_circuit_state('upstream', 'open')
+        mock_state.labels.return_value.set.assert_called_with(2)
+        mock_transitions.labels.assert_called_with(upstream='upstream', state='open')
+        mock_transitions.labels.return_value.inc.assert_called_once()
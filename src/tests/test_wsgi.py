@@ -3,7 +3,9 @@ from unittest import mock
 
 class TestWsgi(unittest.TestCase):
 
+    @mock.patch('gc.freeze')
     @mock.patch('gobstuf.app.get_app')
-    def test_wsgi(self, mock_get_app):
+    def test_wsgi(self, mock_get_app, mock_freeze):
         import gobstuf.wsgi
         mock_get_app.assert_called()
+        mock_freeze.assert_called()